@@ -91,6 +91,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.PermissionResolutionMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -221,3 +222,62 @@ SPECTACULAR_SETTINGS = {
     # more settings found at:
     # https://drf-spectacular.readthedocs.io/en/latest/settings.html
 }
+
+# PLUGIN JOB DATA TRANSFER
+# ------------------------------------------------------------------------------
+# Maximum size in bytes of a job's zip file that is kept in memory before it is
+# spooled to a temporary file on disk
+PLUGIN_JOB_ZIP_MAX_MEMORY_SIZE = env.int('PLUGIN_JOB_ZIP_MAX_MEMORY_SIZE',
+                                         64 * 1024 * 1024)
+# Number of threads concurrently transferring objects between storage and a job's
+# zip file
+PLUGIN_JOB_ZIP_STORAGE_WORKERS = env.int('PLUGIN_JOB_ZIP_STORAGE_WORKERS', 8)
+
+# STORAGE CONNECTIONS
+# ------------------------------------------------------------------------------
+# Maximum number of concurrent connections each process keeps open to the storage
+# service (Swift connections or S3 HTTP connections)
+STORAGE_MAX_CONNECTIONS = env.int('STORAGE_MAX_CONNECTIONS', 10)
+
+# FILE DOWNLOADS
+# ------------------------------------------------------------------------------
+# How the file download resources serve the file data after the permission checks:
+# '' streams it through the API worker, 'redirect' redirects to a presigned S3 URL
+# or a Swift temporary URL, 'x-accel-redirect' (nginx) and 'x-sendfile' (Apache,
+# lighttpd) hand the file over to the front web server (filesystem storage only)
+FILE_DOWNLOAD_OFFLOAD = env.str('FILE_DOWNLOAD_OFFLOAD', '')
+# Number of seconds the presigned and temporary download URLs are valid for
+FILE_DOWNLOAD_URL_EXPIRATION = env.int('FILE_DOWNLOAD_URL_EXPIRATION', 300)
+# Internal nginx location aliased to the storage's MEDIA_ROOT
+FILE_DOWNLOAD_ACCEL_REDIRECT_LOCATION = env.str('FILE_DOWNLOAD_ACCEL_REDIRECT_LOCATION',
+                                                '/protected-files/')
+# Size in bytes of the chunks in which the file data is read from storage and sent
+FILE_DOWNLOAD_CHUNK_SIZE = env.int('FILE_DOWNLOAD_CHUNK_SIZE', 64 * 1024)
+# Whether the downloads served under ASGI read the file data with asynchronous
+# iterators instead of blocking a thread for each download
+FILE_DOWNLOAD_ASYNC_STREAMING = env.bool('FILE_DOWNLOAD_ASYNC_STREAMING', True)
+
+# CHUNKED UPLOADS
+# ------------------------------------------------------------------------------
+# Maximum size in bytes of each chunk of the resumable user file uploads
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = env.int('CHUNKED_UPLOAD_MAX_CHUNK_SIZE',
+                                        64 * 1024 * 1024)
+# Number of seconds after their last chunk unfinished uploads are discarded
+CHUNKED_UPLOAD_EXPIRATION = env.int('CHUNKED_UPLOAD_EXPIRATION', 7 * 24 * 3600)
+# Number of seconds after which a chunk still being uploaded no longer blocks the
+# upload of other chunks (e.g. when the request sending it was interrupted)
+CHUNKED_UPLOAD_CHUNK_TIMEOUT = env.int('CHUNKED_UPLOAD_CHUNK_TIMEOUT', 3600)
+
+# FOLDER MOVES
+# ------------------------------------------------------------------------------
+# Folders containing at least this number of files are moved by an asynchronous
+# celery task instead of within the API request (0 always moves them synchronously)
+FOLDER_ASYNC_MOVE_MIN_FILES = env.int('FOLDER_ASYNC_MOVE_MIN_FILES', 0)
+
+# PFCON STATUS POLLING
+# ------------------------------------------------------------------------------
+# Whether the periodic job status check requests the status of all the running jobs
+# concurrently and only schedules a status check task for the finished ones
+PFCON_BATCH_STATUS_POLLING = env.bool('PFCON_BATCH_STATUS_POLLING', False)
+# Number of threads concurrently requesting job statuses from the pfcon services
+PFCON_STATUS_POLL_WORKERS = env.int('PFCON_STATUS_POLL_WORKERS', 20)
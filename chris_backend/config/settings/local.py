@@ -101,6 +101,8 @@ SWIFT_CONTAINER_NAME = 'users'
 SWIFT_CONNECTION_PARAMS = {'user': SWIFT_USERNAME,
                            'key': SWIFT_KEY,
                            'authurl': SWIFT_AUTH_URL}
+# secret key of the account's temporary URLs (X-Account-Meta-Temp-URL-Key)
+SWIFT_TEMP_URL_KEY = os.getenv('SWIFT_TEMP_URL_KEY')
 MEDIA_ROOT = None
 S3_BUCKET_NAME = None
 S3_CONNECTION_PARAMS = None
@@ -126,6 +128,14 @@ elif STORAGE_ENV == 's3':
     AWS_S3_ADDRESSING_STYLE = 'path'
     AWS_S3_SIGNATURE_VERSION = 's3v4'
 
+if FILE_DOWNLOAD_OFFLOAD not in ('', 'redirect', 'x-accel-redirect', 'x-sendfile'):
+    raise ImproperlyConfigured(
+        f"Unsupported value '{FILE_DOWNLOAD_OFFLOAD}' for FILE_DOWNLOAD_OFFLOAD")
+if (FILE_DOWNLOAD_OFFLOAD in ('x-accel-redirect', 'x-sendfile') and
+        STORAGE_ENV not in ('fslink', 'filesystem')):
+    raise ImproperlyConfigured(f"FILE_DOWNLOAD_OFFLOAD='{FILE_DOWNLOAD_OFFLOAD}' "
+                               f"requires a filesystem STORAGE_ENV")
+
 try:
     verify_storage_connection(
         STORAGES=STORAGES,
@@ -82,6 +82,8 @@ if STORAGE_ENV == 'swift':
     SWIFT_CONNECTION_PARAMS = {'user': SWIFT_USERNAME,
                                'key': SWIFT_KEY,
                                'authurl': SWIFT_AUTH_URL}
+    # secret key of the account's temporary URLs (X-Account-Meta-Temp-URL-Key)
+    SWIFT_TEMP_URL_KEY = get_secret('SWIFT_TEMP_URL_KEY', default='')
     verify_storage = lambda: verify_storage_connection(
         STORAGES=STORAGES,
         SWIFT_CONTAINER_NAME=SWIFT_CONTAINER_NAME,
@@ -117,6 +119,14 @@ elif STORAGE_ENV in ('fslink', 'filesystem'):
 else:
     verify_storage = lambda: verify_storage_connection()
 
+if FILE_DOWNLOAD_OFFLOAD not in ('', 'redirect', 'x-accel-redirect', 'x-sendfile'):
+    raise ImproperlyConfigured(
+        f"Unsupported value '{FILE_DOWNLOAD_OFFLOAD}' for FILE_DOWNLOAD_OFFLOAD")
+if (FILE_DOWNLOAD_OFFLOAD in ('x-accel-redirect', 'x-sendfile') and
+        STORAGE_ENV not in ('fslink', 'filesystem')):
+    raise ImproperlyConfigured(f"FILE_DOWNLOAD_OFFLOAD='{FILE_DOWNLOAD_OFFLOAD}' "
+                               f"requires a filesystem STORAGE_ENV")
+
 try:
     verify_storage()
 except Exception as e:
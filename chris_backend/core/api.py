@@ -508,6 +508,18 @@ urlpatterns = format_suffix_patterns([
          userfile_views.UserFileDetail.as_view(),
          name='userfile-detail'),
 
+    path('v1/userfiles/uploads/',
+         userfile_views.UserFileUploadList.as_view(),
+         name='userfileupload-list'),
+
+    path('v1/userfiles/uploads/<int:pk>/',
+         userfile_views.UserFileUploadDetail.as_view(),
+         name='userfileupload-detail'),
+
+    path('v1/userfiles/uploads/<int:pk>/finalize/',
+         userfile_views.UserFileUploadFinalize.as_view(),
+         name='userfileupload-finalize'),
+
     re_path(r'^v1/userfiles/(?P<pk>[0-9]+)/.*$',
             userfile_views.UserFileResource.as_view(),
             name='userfile-resource'),
@@ -607,6 +619,12 @@ urlpatterns = format_suffix_patterns([
         name='chrisfolder-detail',
     ),
 
+    path(
+        'v1/filebrowser/<int:pk>/archive/',
+        filebrowser_views.FileBrowserFolderArchive.as_view(),
+        name='chrisfolder-archive',
+    ),
+
     path(
         'v1/filebrowser/<int:pk>/children/',
         filebrowser_views.FileBrowserFolderChildList.as_view(),
@@ -42,12 +42,16 @@ task_routes = {
         {'queue': 'periodic'},
     'plugininstances.tasks.delete_plugin_instances_jobs_from_remote':
         {'queue': 'periodic'},
+    'userfiles.tasks.delete_expired_user_file_uploads': {'queue': 'periodic'},
+    'plugininstances.tasks.schedule_dependent_plugin_instances': {'queue': 'main2'},
     'plugininstances.tasks.delete_plugin_instance': {'queue': 'main2'},
     'feeds.tasks.delete_feed': {'queue': 'main2'},
     'filebrowser.tasks.delete_folder': {'queue': 'main2'},
+    'filebrowser.tasks.move_folder': {'queue': 'main2'},
     'pacsfiles.tasks.delete_pacs_series': {'queue': 'main2'},
     'pacsfiles.tasks.send_pacs_query': {'queue': 'main2'},
-    'pacsfiles.tasks.register_pacs_series': {'queue': 'main2'}
+    'pacsfiles.tasks.register_pacs_series': {'queue': 'main2'},
+    'pacsfiles.tasks.register_pacs_series_batch': {'queue': 'main2'}
 }
 app.conf.update(task_routes=task_routes)
 
@@ -58,11 +62,17 @@ POLL_INTERVAL = float(os.getenv('CUBE_CELERY_POLL_INTERVAL', '5.0'))
 How often to poll for plugin instance status changes.
 """
 
+WAITING_POLL_INTERVAL = float(os.getenv('CUBE_CELERY_WAITING_POLL_INTERVAL', '120.0'))
+"""
+How often to look for waiting plugin instances that were not released (or cancelled)
+when their parent plugin instances finished. This is only a safety net.
+"""
+
 # setup periodic tasks
 app.conf.beat_schedule = {
     'schedule-waiting-plugin-instances-every-45-seconds': {
         'task': 'plugininstances.tasks.schedule_waiting_plugin_instances',
-        'schedule': POLL_INTERVAL,
+        'schedule': WAITING_POLL_INTERVAL,
     },
     'check-running-plugin-instances-exec-status-every-30-seconds': {
         'task': 'plugininstances.tasks.check_running_plugin_instances_exec_status',
@@ -70,7 +80,7 @@ app.conf.beat_schedule = {
     },
     'cancel-waiting-plugin-instances-every-30-seconds': {
         'task': 'plugininstances.tasks.cancel_waiting_plugin_instances',
-        'schedule': POLL_INTERVAL,
+        'schedule': WAITING_POLL_INTERVAL,
     },
     'handle-remote-cleanup-every-60-seconds': {
         'task': 'plugininstances.tasks.handle_remote_cleanup',
@@ -88,6 +98,10 @@ app.conf.beat_schedule = {
         'task': 'plugininstances.tasks.delete_plugin_instances_jobs_from_remote',
         'schedule': 7200.0,
     },
+    'delete-expired-user-file-uploads-every-3600-seconds': {
+        'task': 'userfiles.tasks.delete_expired_user_file_uploads',
+        'schedule': 3600.0,
+    },
 }
 
 # use logging settings in Django settings
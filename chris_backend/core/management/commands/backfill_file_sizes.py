@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.models import ChrisFolder, ChrisFile
+from core.storage import connect_storage
+
+
+class Command(BaseCommand):
+    help = ('Store in the DB the size of the files registered before file sizes were '
+            'stored. The sizes are taken from a single storage listing per folder '
+            'instead of a storage request per file.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='number of files updated with a single query')
+
+    def handle(self, *args, **options):
+        storage_manager = connect_storage(settings)
+        batch_size = options['batch_size']
+
+        folder_ids = ChrisFile.objects.filter(size__isnull=True).values_list(
+            'parent_folder_id', flat=True).distinct()
+        folders = ChrisFolder.objects.filter(id__in=folder_ids).order_by('path')
+
+        n_updated = n_missing = 0
+        for folder in folders.iterator():
+            files = list(ChrisFile.objects.filter(parent_folder=folder,
+                                                  size__isnull=True).only('id', 'fname'))
+            sizes = {info.path: info.size
+                     for info in storage_manager.ls_info(folder.path)}
+            updated = []
+            for f in files:
+                size = sizes.get(f.fname.name)
+                if size is None:
+                    n_missing += 1
+                    self.stdout.write(self.style.WARNING(
+                        f"File '{f.fname.name}' not found in storage."))
+                else:
+                    f.size = size
+                    updated.append(f)
+            ChrisFile.objects.bulk_update(updated, ['size'], batch_size=batch_size)
+            n_updated += len(updated)
+
+        self.stdout.write(f'Stored the size of {n_updated} files, {n_missing} files '
+                          f'were not found in storage.')
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import resource
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.models import ChrisFolder
+from core.storage import connect_storage
+from userfiles.models import UserFile
+
+
+class Command(BaseCommand):
+    help = ('Benchmark many concurrent downloads of a file served by this process '
+            'through the ASGI handler with synchronous (buffered) and asynchronous '
+            'streaming from storage. The synthetic user and file are deleted '
+            'afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--downloads', type=int, default=100,
+                            help='number of concurrent downloads')
+        parser.add_argument('--size', type=int, default=8 * 1024 * 1024,
+                            help='size in bytes of the downloaded file')
+        parser.add_argument('--client-delay', type=float, default=0.0,
+                            help='seconds the simulated slow clients wait after '
+                                 'receiving each chunk')
+        parser.add_argument('--mode', choices=['sync', 'async', 'both'],
+                            default='both', help='streaming mode(s) to benchmark')
+
+    def handle(self, *args, **options):
+        username = 'benchmark_file_downloads_user'
+        file_path = f'home/{username}/uploads/benchmark.bin'
+        storage_manager = connect_storage(settings)
+        user = User.objects.create_user(username=username)
+        try:
+            token = Token.objects.create(user=user)
+            storage_manager.upload_obj(file_path, os.urandom(options['size']),
+                                       content_type='application/octet-stream')
+            (folder, _) = ChrisFolder.objects.get_or_create(
+                path=os.path.dirname(file_path), owner=user)
+            user_file = UserFile(owner=user, parent_folder=folder, size=options['size'])
+            user_file.fname.name = file_path
+            user_file.save()
+            url = reverse('userfile-resource', kwargs={'pk': user_file.id})
+
+            # the asynchronous run goes first so that its peak RSS isn't hidden by
+            # the buffered responses of the synchronous one
+            modes = ['async', 'sync'] if options['mode'] == 'both' else [options['mode']]
+            for mode in modes:
+                with override_settings(FILE_DOWNLOAD_ASYNC_STREAMING=mode == 'async',
+                                       FILE_DOWNLOAD_OFFLOAD=''):
+                    self.run_benchmark(mode, url + 'benchmark.bin', token.key, options)
+        finally:
+            user.delete()
+            if storage_manager.obj_exists(file_path):
+                storage_manager.delete_obj(file_path)
+
+    def run_benchmark(self, mode, url, token_key, options):
+        """
+        Run the concurrent downloads in a new event loop and report the results.
+        """
+        start = time.perf_counter()
+        (results, peak_threads) = asyncio.run(
+            self.download_all(url, token_key, options['downloads'],
+                              options['client_delay']))
+        elapsed = time.perf_counter() - start
+
+        ok = sum(1 for (status, received) in results
+                 if status == 200 and received == options['size'])
+        total_mib = sum(received for (_, received) in results) / (1024 * 1024)
+        max_rss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(f'{mode}: {ok}/{len(results)} complete downloads in '
+                          f'{elapsed:.3f}s ({total_mib / elapsed:.1f} MiB/s), '
+                          f'peak {peak_threads} threads, max RSS {max_rss_mib:.0f} MiB')
+
+    @staticmethod
+    async def download_all(url, token_key, n_downloads, client_delay):
+        """
+        Download the file concurrently through the ASGI handler and return the list of
+        (status, received bytes) pairs along with the peak number of threads.
+        """
+        handler = ASGIHandler()
+        host = next((h for h in settings.ALLOWED_HOSTS
+                     if h != '*' and not h.startswith('.')), 'localhost')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': url,
+            'raw_path': url.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [(b'host', host.encode()),
+                        (b'authorization', f'Token {token_key}'.encode())],
+            'client': ('127.0.0.1', 0),
+            'server': (host, 80),
+        }
+
+        async def download():
+            response = {'status': None, 'received': 0}
+            request_sent = False
+
+            async def receive():
+                nonlocal request_sent
+                if not request_sent:
+                    request_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await asyncio.Future()  # the client never disconnects
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    response['status'] = message['status']
+                elif message['type'] == 'http.response.body':
+                    response['received'] += len(message.get('body', b''))
+                    if client_delay:
+                        await asyncio.sleep(client_delay)
+
+            await handler(dict(scope), receive, send)
+            return response['status'], response['received']
+
+        peak_threads = threading.active_count()
+
+        async def sample_threads():
+            nonlocal peak_threads
+            while True:
+                peak_threads = max(peak_threads, threading.active_count())
+                await asyncio.sleep(0.01)
+
+        sampler = asyncio.create_task(sample_threads())
+        try:
+            results = await asyncio.gather(*(download() for _ in range(n_downloads)))
+        finally:
+            sampler.cancel()
+        return results, peak_threads
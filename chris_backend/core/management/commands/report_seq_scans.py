@@ -0,0 +1,120 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models import (ChrisFolder, ChrisFile, ChrisLinkFile, FolderUserPermission,
+                         get_folder_permission_lineage_paths)
+from pacsfiles.models import PACSFile
+
+
+# (table, column) pairs filtered with prefix (LIKE 'prefix%') lookups
+PREFIX_COLUMNS = [
+    ('core_chrisfolder', 'path'),
+    ('core_chrisfile', 'fname'),
+    ('core_chrislinkfile', 'fname'),
+    ('core_chrislinkfile', 'path'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Report which of the file browser queries are planned by PostgreSQL with '
+            'sequential scans at the current table sizes and which prefix-search '
+            '(varchar_pattern_ops) indexes are missing.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='home',
+                            help='folder path used as the prefix of the queries')
+        parser.add_argument('--analyze', action='store_true',
+                            help='run EXPLAIN ANALYZE (the queries are executed)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('This command requires a PostgreSQL database.')
+
+        path = options['path'].strip('/')
+        analyze = options['analyze']
+        tables = sorted({table for (table, _) in PREFIX_COLUMNS})
+
+        self.stdout.write('Estimated table sizes:')
+        for (table, rows) in self.get_table_sizes(tables):
+            self.stdout.write(f'  {table}: {rows} rows')
+
+        missing = self.get_missing_prefix_indexes()
+        for (table, column) in missing:
+            self.stdout.write(self.style.WARNING(
+                f'Missing prefix index on {table}.{column}, create it with:\n'
+                f'  CREATE INDEX CONCURRENTLY {table}_{column}_like ON {table} '
+                f'({column} varchar_pattern_ops);'))
+
+        seq_scan_count = 0
+        for (name, qs) in self.get_queries(path):
+            plan = json.loads(qs.explain(format='json', analyze=analyze))
+            seq_scans = sorted(set(self.find_seq_scans(plan[0]['Plan'])))
+            if seq_scans:
+                seq_scan_count += 1
+                self.stdout.write(self.style.WARNING(
+                    f'SEQ SCAN  {name}: {", ".join(seq_scans)}'))
+            else:
+                self.stdout.write(f'OK        {name}')
+
+        summary = (f'{seq_scan_count} queries with sequential scans, '
+                   f'{len(missing)} missing prefix indexes.')
+        if seq_scan_count or missing:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
+
+    @staticmethod
+    def get_queries(path):
+        """
+        Return the list of (name, queryset) pairs of the file browser's hot queries.
+        """
+        prefix = path + '/'
+        return [
+            ('folder by path', ChrisFolder.objects.filter(path=path)),
+            ('folder lineage permissions', FolderUserPermission.objects.filter(
+                folder__path__in=get_folder_permission_lineage_paths(path))),
+            ('descendant folders', ChrisFolder.objects.filter(path__startswith=prefix)),
+            ('descendant files', ChrisFile.objects.filter(fname__startswith=prefix)),
+            ('descendant link files', ChrisLinkFile.objects.filter(
+                fname__startswith=prefix)),
+            ('link files pointing into folder', ChrisLinkFile.objects.filter(
+                path__startswith=prefix)),
+            ('PACS files', PACSFile.get_base_queryset()),
+        ]
+
+    @staticmethod
+    def get_table_sizes(tables):
+        """
+        Return the planner's estimate of the number of rows of the given tables.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT relname, reltuples::bigint FROM pg_class '
+                           'WHERE relname = ANY(%s) ORDER BY relname', [tables])
+            return cursor.fetchall()
+
+    @staticmethod
+    def get_missing_prefix_indexes():
+        """
+        Return the list of (table, column) pairs filtered with prefix lookups that
+        don't have a varchar_pattern_ops index.
+        """
+        tables = list({table for (table, _) in PREFIX_COLUMNS})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tablename, indexdef FROM pg_indexes '
+                           'WHERE tablename = ANY(%s)', [tables])
+            index_defs = cursor.fetchall()
+        return [(table, column) for (table, column) in PREFIX_COLUMNS
+                if not any(t == table and f'{column} varchar_pattern_ops' in d
+                           for (t, d) in index_defs)]
+
+    @classmethod
+    def find_seq_scans(cls, node):
+        """
+        Yield the names of the relations scanned sequentially in a JSON plan node.
+        """
+        if node.get('Node Type') == 'Seq Scan':
+            yield node.get('Relation Name')
+        for child in node.get('Plans', []):
+            yield from cls.find_seq_scans(child)
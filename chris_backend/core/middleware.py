@@ -5,6 +5,8 @@ from django.conf import settings
 
 from collectionjson.renderers import CollectionJsonRenderer
 
+from .models import permission_resolution_scope
+
 
 class RenderedResponse(HttpResponse):
     """
@@ -48,3 +50,17 @@ class ResponseMiddleware(object):
         mime = request.META.get('HTTP_ACCEPT')
         if mime != 'text/html':
             return api_500(request)
+
+
+class PermissionResolutionMiddleware(object):
+    """
+    Middleware that shares the users' permission resolvers among all the access
+    checks made while processing a request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with permission_resolution_scope():
+            return self.get_response(request)
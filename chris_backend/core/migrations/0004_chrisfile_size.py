@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_chrisfolder_deletion_error_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chrisfile',
+            name='size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
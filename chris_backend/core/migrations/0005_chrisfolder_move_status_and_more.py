@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-17 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_chrisfile_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chrisfolder',
+            name='move_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='chrisfolder',
+            name='move_progress',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chrisfolder',
+            name='move_requested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chrisfolder',
+            name='move_status',
+            field=models.CharField(choices=[('inactive', 'Inactive'), ('pending', 'Pending'), ('failed', 'Failed')], default='inactive', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='chrisfolder',
+            name='move_target_path',
+            field=models.CharField(blank=True, max_length=1024),
+        ),
+    ]
@@ -0,0 +1,107 @@
+from django.db import migrations
+from django.db.models.functions import Length
+
+
+# top-level folders whose permissions are not inherited by their descendants
+STRUCTURAL_FOLDER_PATHS = ('', 'home', 'PUBLIC', 'SHARED', 'PIPELINES', 'SERVICES',
+                           'SERVICES/PACS')
+
+PERMISSION_MODELS = (('Group', 'group'), ('User', 'user'))
+
+
+def get_permission_models(apps, suffix):
+    return (apps.get_model('core', 'Folder' + suffix),
+            apps.get_model('core', 'File' + suffix),
+            apps.get_model('core', 'LinkFile' + suffix))
+
+
+def get_shared_folders_permissions(FolderPermission):
+    """
+    Return the folder permissions that are inherited by the folder's descendants
+    ordered so that ancestors are processed before their descendants.
+    """
+    return FolderPermission.objects.select_related('folder').exclude(
+        folder__path__in=STRUCTURAL_FOLDER_PATHS).order_by(Length('folder__path'))
+
+
+def remove_inherited_permissions(apps, schema_editor):
+    """
+    Delete the groups and users permission rows that were copied to all the
+    descendants of a folder when the folder was shared. These are now inherited
+    from the shared folder. Only the rows of the descendants owned by the owner of
+    the shared folder and with the same permission are removed as any other row was
+    granted on its own.
+    """
+    for (suffix, owner_field) in PERMISSION_MODELS:
+        (FolderPermission, FilePermission,
+         LinkFilePermission) = get_permission_models(apps, suffix + 'Permission')
+
+        for perm in get_shared_folders_permissions(FolderPermission).iterator():
+            if not FolderPermission.objects.filter(pk=perm.pk).exists():
+                continue  # already removed as inherited from a processed ancestor
+
+            path = perm.folder.path + '/'
+            owner_id = perm.folder.owner_id
+            lookup = {owner_field: getattr(perm, owner_field + '_id'),
+                      'permission': perm.permission}
+
+            FolderPermission.objects.filter(folder__path__startswith=path,
+                                            folder__owner_id=owner_id,
+                                            **lookup).delete()
+            FilePermission.objects.filter(file__fname__startswith=path,
+                                          file__owner_id=owner_id,
+                                          **lookup).delete()
+            LinkFilePermission.objects.filter(link_file__fname__startswith=path,
+                                              link_file__owner_id=owner_id,
+                                              **lookup).delete()
+
+
+def restore_inherited_permissions(apps, schema_editor):
+    """
+    Copy the groups and users permissions of the shared folders to their descendants
+    owned by the owner of the shared folder. Descendants that already have a
+    permission for the group or user keep it.
+    """
+    ChrisFolder = apps.get_model('core', 'ChrisFolder')
+    ChrisFile = apps.get_model('core', 'ChrisFile')
+    ChrisLinkFile = apps.get_model('core', 'ChrisLinkFile')
+
+    for (suffix, owner_field) in PERMISSION_MODELS:
+        (FolderPermission, FilePermission,
+         LinkFilePermission) = get_permission_models(apps, suffix + 'Permission')
+
+        for perm in get_shared_folders_permissions(FolderPermission).iterator():
+            path = perm.folder.path + '/'
+            owner_id = perm.folder.owner_id
+            lookup = {owner_field + '_id': getattr(perm, owner_field + '_id'),
+                      'permission': perm.permission}
+
+            folder_ids = ChrisFolder.objects.filter(
+                path__startswith=path, owner_id=owner_id).values_list('id', flat=True)
+            FolderPermission.objects.bulk_create(
+                [FolderPermission(folder_id=pk, **lookup) for pk in folder_ids],
+                batch_size=1000, ignore_conflicts=True)
+
+            file_ids = ChrisFile.objects.filter(
+                fname__startswith=path, owner_id=owner_id).values_list('id', flat=True)
+            FilePermission.objects.bulk_create(
+                [FilePermission(file_id=pk, **lookup) for pk in file_ids],
+                batch_size=1000, ignore_conflicts=True)
+
+            link_file_ids = ChrisLinkFile.objects.filter(
+                fname__startswith=path, owner_id=owner_id).values_list('id', flat=True)
+            LinkFilePermission.objects.bulk_create(
+                [LinkFilePermission(link_file_id=pk, **lookup) for pk in link_file_ids],
+                batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_chrisfolder_move_status_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_inherited_permissions,
+                             restore_inherited_permissions),
+    ]
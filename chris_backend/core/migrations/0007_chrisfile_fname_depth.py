@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-17 14:02
+
+import django.db.models.expressions
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_remove_inherited_permissions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chrisfile',
+            name='fname_depth',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.functions.text.Length('fname'), '-', django.db.models.functions.text.Length(django.db.models.functions.text.Replace('fname', models.Value('/'), models.Value('')))), output_field=models.IntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='chrisfile',
+            index=models.Index(fields=['fname_depth', 'parent_folder'], name='core_chrisfile_depth_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-17 16:40
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_chrisfile_fname_depth'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='chrisfile',
+            name='fname_feed_id',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(models.Func('fname', models.Value('^home/[^/]+/feeds/feed_([0-9]{1,18})/'), function='substring', output_field=models.CharField()), models.BigIntegerField()), output_field=models.BigIntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='chrisfile',
+            index=models.Index(fields=['fname_feed_id'], name='core_chrisfile_feed_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chrisfile',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('fname'), name='gin_trgm_ops'), name='core_chrisfile_fname_trgm_idx'),
+        ),
+    ]
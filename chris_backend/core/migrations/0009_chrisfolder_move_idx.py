@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_chrisfile_fname_feed_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chrisfolder',
+            index=models.Index(condition=models.Q(('move_status', 'pending')), fields=['move_status'], name='core_chrisfolder_move_idx'),
+        ),
+    ]
@@ -4,10 +4,13 @@ import uuid
 import io
 import os
 import pathlib
+import threading
+from contextlib import contextmanager
 
 from django.db import models
-from django.db.models.functions import Length
-from django.db.models.signals import post_delete
+from django.db.models.functions import Cast, Length, Replace, Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.signals import post_delete, post_save, m2m_changed
 from django.utils import timezone
 from django.dispatch import receiver
 from django.conf import settings
@@ -37,6 +40,244 @@ def validate_permission(permission):
     return permission
 
 
+# top-level folders whose groups and users permissions only apply to the folder itself
+# and are not inherited by the users' and services' folders and files within them
+STRUCTURAL_FOLDER_PATHS = frozenset(
+    ('', 'home', 'PUBLIC', 'SHARED', 'PIPELINES', 'SERVICES', 'SERVICES/PACS'))
+
+
+def get_folder_lineage_paths(path):
+    """
+    Return the paths of the folder with the given path and all its ancestor folders.
+    """
+    parts = path.split('/')
+    return ['/'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def get_folder_permission_lineage_paths(path, include_folder=True):
+    """
+    Return the paths of the folders whose groups and users permissions apply to the
+    folder with the given path or, if ``include_folder`` is False, to the files and
+    link files within it. Permissions granted to a folder are inherited by all its
+    descendants except for those granted to the structural top-level folders.
+    """
+    lineage = [p for p in get_folder_lineage_paths(path)
+               if p not in STRUCTURAL_FOLDER_PATHS]
+    if include_folder and path in STRUCTURAL_FOLDER_PATHS:
+        lineage.append(path)
+    return lineage
+
+
+def folders_grant_group_permission(folder_paths, group, permission=''):
+    """
+    Return whether a group has been granted a permission to access any of the folders
+    with the given paths. A single query on the indexed folder path is performed.
+    """
+    lookup = models.Q(folder__path__in=folder_paths, group=group)
+    if permission:
+        lookup &= models.Q(permission=validate_permission(permission))
+    return FolderGroupPermission.objects.filter(lookup).exists()
+
+
+_permission_resolvers = threading.local()
+
+
+@contextmanager
+def permission_resolution_scope():
+    """
+    Context manager that shares a single ``PermissionResolver`` per user within the
+    context (typically a single API request) so that repeated access checks on the
+    same objects don't hit the DB again.
+    """
+    if getattr(_permission_resolvers, 'scope', None) is not None:
+        yield  # nested context, the outermost context owns the resolvers
+        return
+    _permission_resolvers.scope = {}
+    try:
+        yield
+    finally:
+        _permission_resolvers.scope = None
+
+
+def clear_permission_resolvers():
+    """
+    Discard the permission resolvers shared within the current resolution scope.
+    """
+    scope = getattr(_permission_resolvers, 'scope', None)
+    if scope:
+        scope.clear()
+
+
+class PermissionQuerySet(models.QuerySet):
+    """
+    QuerySet of the permissions granted to access folders, files and link files that
+    discards the shared permission resolvers when the permissions are changed in
+    bulk (no post_save signals are sent in that case).
+    """
+
+    def update(self, **kwargs):
+        rows = super(PermissionQuerySet, self).update(**kwargs)
+        clear_permission_resolvers()
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super(PermissionQuerySet, self).bulk_create(objs, *args, **kwargs)
+        clear_permission_resolvers()
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        rows = super(PermissionQuerySet, self).bulk_update(objs, fields, *args, **kwargs)
+        clear_permission_resolvers()
+        return rows
+
+
+class PermissionResolver(object):
+    """
+    Resolve the permissions granted to a user to access folders, files and link
+    files. The user's group ids are loaded only once and the permission grants of
+    a batch of objects are loaded with a single query per object type and cached
+    for the lifetime of the resolver. The resolvers shared within a resolution scope
+    are discarded whenever permissions or group memberships change, including bulk
+    changes made through the permission models' querysets.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._group_ids = None
+        self._grants = {}  # (obj type, folder path or pk, permission) -> granted
+
+    @classmethod
+    def for_user(cls, user):
+        """
+        Return the resolver shared by the current resolution scope for the user or a
+        new resolver if there is no resolution scope.
+        """
+        scope = getattr(_permission_resolvers, 'scope', None)
+        if scope is None or user.pk is None:
+            return cls(user)
+        resolver = scope.get(user.pk)
+        if resolver is None:
+            resolver = scope[user.pk] = cls(user)
+        return resolver
+
+    def get_group_ids(self):
+        """
+        Return the ids of the user's groups.
+        """
+        if self._group_ids is None:
+            self._group_ids = list(self.user.groups.values_list('id', flat=True))
+        return self._group_ids
+
+    def can_access(self, obj):
+        """
+        Return whether the user is allowed to read-access the given folder, file or
+        link file.
+        """
+        return bool(self.filter_accessible([obj]))
+
+    def filter_accessible(self, objs):
+        """
+        Return the list of the given folders, files and link files that the user is
+        allowed to read-access.
+        """
+        objs = list(objs)
+        if self.user.username == 'chris':
+            return objs
+        pending = [obj for obj in objs if not (obj.owner_id == self.user.pk or
+                                                obj.public)]
+        denied = set(id(obj) for obj in pending).difference(
+            id(obj) for obj in self.filter_permitted(pending))
+        return [obj for obj in objs if id(obj) not in denied]
+
+    def has_permission(self, obj, permission=''):
+        """
+        Return whether the user has been granted a permission to access the given
+        folder, file or link file (perhaps through one of its groups or one of the
+        object's ancestor folders).
+        """
+        return bool(self.filter_permitted([obj], permission))
+
+    def filter_permitted(self, objs, permission=''):
+        """
+        Return the list of the given folders, files and link files that the user has
+        been granted a permission to access (perhaps through one of its groups or one
+        of the objects' ancestor folders).
+        """
+        if permission:
+            validate_permission(permission)
+
+        items = []
+        for obj in objs:
+            if isinstance(obj, ChrisFolder):
+                items.append(('folder', obj.pk, obj.path))
+            elif isinstance(obj, ChrisLinkFile):
+                items.append(('linkfile', obj.pk, os.path.dirname(obj.fname.name)))
+            else:
+                items.append(('file', obj.pk, os.path.dirname(obj.fname.name)))
+        granted = self.get_granted_items(items, permission)
+        return [obj for (obj, item) in zip(objs, items) if item in granted]
+
+    def get_granted_items(self, items, permission=''):
+        """
+        Return the subset of the given (obj type, pk, folder path) items that have
+        been granted the permission. Files and link files are granted either
+        directly or through their folder's lineage. Folders are granted through
+        their lineage (including the folder itself). Grants on the structural
+        top-level folders are not inherited.
+        """
+        if not items or not self.user.is_authenticated:
+            return set()
+
+        lineages = {(obj_type, path): get_folder_permission_lineage_paths(
+                        path, include_folder=obj_type == 'folder')
+                    for (obj_type, _, path) in items}
+        self._load_grants('folder', set().union(*lineages.values()), permission)
+
+        granted = set()
+        pending = {'file': [], 'linkfile': []}
+        for item in items:
+            (obj_type, pk, path) = item
+            if any(self._grants[('folder', p, permission)]
+                   for p in lineages[(obj_type, path)]):
+                granted.add(item)
+            elif obj_type != 'folder':
+                pending[obj_type].append(item)
+
+        for (obj_type, pending_items) in pending.items():
+            if pending_items:
+                self._load_grants(obj_type, {pk for (_, pk, _) in pending_items},
+                                  permission)
+                granted.update(item for item in pending_items
+                               if self._grants[(obj_type, item[1], permission)])
+        return granted
+
+    def _load_grants(self, obj_type, keys, permission):
+        """
+        Load with a single query the grants of the objects of the given type with the
+        given keys (folder paths or file/link file pks) that are not cached yet.
+        """
+        missing = [k for k in keys if (obj_type, k, permission) not in self._grants]
+        if not missing:
+            return
+        (model, field) = {'folder': (ChrisFolder, 'path'),
+                          'file': (ChrisFile, 'pk'),
+                          'linkfile': (ChrisLinkFile, 'pk')}[obj_type]
+
+        user_lookup = {f'{obj_type}userpermission__user': self.user}
+        group_lookup = {f'{obj_type}grouppermission__group__in': self.get_group_ids()}
+        if permission:
+            user_lookup[f'{obj_type}userpermission__permission'] = permission
+            group_lookup[f'{obj_type}grouppermission__permission'] = permission
+        lookup = models.Q(**user_lookup)
+        if self.get_group_ids():
+            lookup |= models.Q(**group_lookup)
+
+        qs = model.objects.filter(**{f'{field}__in': missing}).filter(lookup)
+        granted_keys = set(qs.values_list(field, flat=True).distinct())
+        for k in missing:
+            self._grants[(obj_type, k, permission)] = k in granted_keys
+
+
 def user_can_access_obj(obj, user):
     """
     Return whether the given user is allowed to read-access the given storage
@@ -47,8 +288,7 @@ def user_can_access_obj(obj, user):
     object is public, or the user has been granted any permission to it
     (possibly through one of their groups).
     """
-    return (obj.owner == user or user.username == 'chris' or obj.public
-            or obj.has_user_permission(user))
+    return PermissionResolver.for_user(user).can_access(obj)
 
 
 class PathAccessError(Exception):
@@ -91,29 +331,108 @@ def validate_path_access(user, path):
         raise PathAccessError(
             f"This field may not reference a home's feeds folder path '{path}'.")
 
-    try:
-        obj = ChrisFolder.objects.get(path=path)
-    except ChrisFolder.DoesNotExist:  # path is not a folder
-        try:
-            obj = ChrisFile.objects.get(fname=path)
-        except ChrisFile.DoesNotExist:  # path is not a file
-            try:
-                obj = ChrisLinkFile.objects.get(fname=path)
-
-                if obj.path in ('PUBLIC', 'SHARED'):
-                    raise PathAccessError(
-                        f"This field may not reference an invalid path '{path}'.")
+    # look the path up as a folder, a file and a link file with a single query
+    char_field = models.CharField()
+    fields = ('id', 'owner_id', 'public')
+    folders = ChrisFolder.objects.filter(path=path).values_list(
+        models.Value('folder', output_field=char_field), *fields,
+        models.Value('', output_field=char_field))
+    files = ChrisFile.objects.filter(fname=path).values_list(
+        models.Value('file', output_field=char_field), *fields,
+        models.Value('', output_field=char_field))
+    link_files = ChrisLinkFile.objects.filter(fname=path).values_list(
+        models.Value('linkfile', output_field=char_field), *fields, 'path')
+    rows = list(folders.union(files, link_files, all=True))
+
+    if not rows:  # path is not a folder, a file or a link file
+        raise PathAccessError(
+            f"This field may not reference an invalid path '{path}'.")
 
-            except ChrisLinkFile.DoesNotExist:  # path is not a link file
-                raise PathAccessError(
-                    f"This field may not reference an invalid path '{path}'.")
+    (obj_type, pk, owner_id, public, link_path) = rows[0]
 
-    if not user_can_access_obj(obj, user):
+    if obj_type == 'linkfile' and link_path in ('PUBLIC', 'SHARED'):
         raise PathAccessError(
-            f"User does not have permission to access path '{path}'.")
+            f"This field may not reference an invalid path '{path}'.")
+
+    if not (owner_id == user.pk or user.username == 'chris' or public):
+        folder_path = path if obj_type == 'folder' else os.path.dirname(path)
+        item = (obj_type, pk, folder_path)
+        resolver = PermissionResolver.for_user(user)
+
+        if not resolver.get_granted_items([item]):
+            raise PathAccessError(
+                f"User does not have permission to access path '{path}'.")
     return path
 
 
+_storage_deletion = threading.local()
+
+
+@contextmanager
+def deferred_storage_deletion():
+    """
+    Context manager that defers the deletion from storage of the data of the files,
+    link files and folders deleted from the DB within the context. Instead of the
+    per-object storage requests made by the post_delete receivers, the data is
+    deleted in batches when the context exits without errors.
+
+    Note that the post_delete signals are still sent for every deleted row and so
+    Django still fetches the rows before deleting them. They can't be suppressed with
+    a raw delete because other apps' receivers (e.g. feeds, PACS, permission caches)
+    and the cascades must still run. The rows are fetched and deleted in batches so
+    the number of DB queries doesn't depend on the number of deleted rows, and the
+    receivers here just record the storage paths instead of making storage requests.
+    """
+    if getattr(_storage_deletion, 'pending', None) is not None:
+        yield  # nested context, the outermost context deletes the data
+        return
+    pending = {'files': [], 'folders': []}
+    _storage_deletion.pending = pending
+    try:
+        yield
+    finally:
+        _storage_deletion.pending = None
+
+    storage_manager = connect_storage(settings)
+    try:
+        storage_manager.delete_objs(pending['files'])
+
+        # remove any leftover data not registered in the DB under the topmost folders
+        top_folder_paths = []
+        for path in sorted(pending['folders']):
+            if not any(path.startswith(top + '/') for top in top_folder_paths):
+                top_folder_paths.append(path)
+        for path in top_folder_paths:
+            if storage_manager.path_exists(path):
+                storage_manager.delete_path(path)
+    except Exception as e:
+        logger.error('Storage error, detail: %s' % str(e))
+
+
+def defer_file_deletion(storage_path):
+    """
+    Schedule the deletion from storage of a file's data if called within a
+    ``deferred_storage_deletion`` context. Returns whether the deletion was deferred.
+    """
+    pending = getattr(_storage_deletion, 'pending', None)
+    if pending is None:
+        return False
+    pending['files'].append(storage_path)
+    return True
+
+
+def defer_folder_deletion(storage_path):
+    """
+    Schedule the deletion from storage of a folder's data if called within a
+    ``deferred_storage_deletion`` context. Returns whether the deletion was deferred.
+    """
+    pending = getattr(_storage_deletion, 'pending', None)
+    if pending is None:
+        return False
+    pending['folders'].append(storage_path)
+    return True
+
+
 class AsyncDeletableModel(models.Model):
     class DeletionStatus(models.TextChoices):
         INACTIVE = 'inactive'
@@ -150,6 +469,52 @@ class AsyncDeletableModel(models.Model):
         self.save(update_fields=['deletion_status', 'deletion_error'])
 
 
+class AsyncMovableModel(models.Model):
+    class MoveStatus(models.TextChoices):
+        INACTIVE = 'inactive'
+        PENDING = 'pending'
+        FAILED = 'failed'
+
+    move_status = models.CharField(max_length=10, choices=MoveStatus.choices,
+                                   default=MoveStatus.INACTIVE)
+    move_requested_at = models.DateTimeField(null=True, blank=True)
+    move_target_path = models.CharField(max_length=1024, blank=True)
+    move_progress = models.PositiveSmallIntegerField(default=0)  # percentage
+    move_error = models.TextField(blank=True)
+
+    class Meta:
+        abstract = True
+
+    def is_pending_move(self) -> bool:
+        return self.move_status == self.MoveStatus.PENDING
+
+    def mark_move_pending(self, new_path: str) -> bool:
+        """
+        Returns True if the move to the new path was scheduled by this call.
+        Returns False if a move was already pending.
+        """
+        fields = {'move_status': self.MoveStatus.PENDING,
+                  'move_requested_at': timezone.now(),
+                  'move_target_path': new_path,
+                  'move_progress': 0,
+                  'move_error': ''}
+        # a single conditional update so that concurrent requests can't both
+        # schedule the move
+        updated = type(self).objects.filter(pk=self.pk).exclude(
+            move_status=self.MoveStatus.PENDING).update(**fields)
+        if not updated:
+            return False
+
+        for (name, value) in fields.items():
+            setattr(self, name, value)
+        return True
+
+    def mark_move_failed(self, error: Exception | str):
+        self.move_status = self.MoveStatus.FAILED
+        self.move_error = str(error)
+        self.save(update_fields=['move_status', 'move_error'])
+
+
 class ChrisInstance(models.Model):
     """
     Model class that defines a singleton representing a ChRIS instance.
@@ -186,7 +551,7 @@ class ChrisInstance(models.Model):
         return obj
 
 
-class ChrisFolder(AsyncDeletableModel):
+class ChrisFolder(AsyncDeletableModel, AsyncMovableModel):
     creation_date = models.DateTimeField(auto_now_add=True)
     path = models.CharField(max_length=1024, unique=True)  # folder's path
     public = models.BooleanField(blank=True, default=False, db_index=True)
@@ -200,6 +565,11 @@ class ChrisFolder(AsyncDeletableModel):
 
     class Meta:
         ordering = ('-path',)
+        indexes = [
+            # only the few folders with a pending move are indexed for get_moving_folder
+            models.Index(fields=['move_status'], name='core_chrisfolder_move_idx',
+                         condition=models.Q(move_status='pending')),
+        ]
 
     def __str__(self):
         return self.path
@@ -226,15 +596,16 @@ class ChrisFolder(AsyncDeletableModel):
             self.owner = User.objects.get(username='chris')
         super(ChrisFolder, self).save(*args, **kwargs)
 
-    def move(self, new_path):
+    def move(self, new_path, progress=None):
         """
-        Custom method to move the folder's tree to a new path.
+        Custom method to move the folder's tree to a new path. If given,
+        ``progress(done, total)`` is called as the files are moved in storage.
         """
         new_path = new_path.strip('/')
         path = str(self.path)
 
         storage_manager = connect_storage(settings)
-        storage_manager.move_path(path, new_path)
+        storage_manager.move_path(path, new_path, progress)
 
         prefix = path + '/'  # avoid sibling folders with paths that start with path
 
@@ -276,35 +647,18 @@ class ChrisFolder(AsyncDeletableModel):
     def has_group_permission(self, group, permission=''):
         """
         Custom method to determine whether a group has been granted a permission
-        to access the folder.
+        to access the folder (perhaps through one of the folder's ancestors).
         """
-        if not permission:
-            qs = FolderGroupPermission.objects.filter(group=group, folder=self)
-        else:
-            p = validate_permission(permission)
-            qs = FolderGroupPermission.objects.filter(group=group, folder=self,
-                                                      permission=p)
-        return qs.exists()
+        return folders_grant_group_permission(
+            get_folder_permission_lineage_paths(self.path), group, permission)
 
     def has_user_permission(self, user, permission=''):
         """
         Custom method to determine whether a user has been granted a permission
-        to access the folder (perhaps through one of its groups).
+        to access the folder (perhaps through one of its groups or one of the folder's
+        ancestors).
         """
-        grp_qs = user.groups.all()
-
-        if not permission:
-            if FolderUserPermission.objects.filter(folder=self, user=user).exists():
-                return True
-            qs = FolderGroupPermission.objects.filter(folder=self, group__in=grp_qs)
-        else:
-            p = validate_permission(permission)
-            if FolderUserPermission.objects.filter(folder=self, user=user,
-                                                   permission=p).exists():
-                return True
-            qs = FolderGroupPermission.objects.filter(folder=self, permission=p,
-                                                      group__in=grp_qs)
-        return qs.exists()
+        return PermissionResolver.for_user(user).has_permission(self, permission)
 
     def get_groups_permissions_queryset(self):
         """
@@ -467,6 +821,20 @@ class ChrisFolder(AsyncDeletableModel):
             lf.public = public_tf
         ChrisLinkFile.objects.bulk_update(link_files, ['public'])
 
+    @classmethod
+    def get_moving_folder(cls, path):
+        """
+        Custom class method to return a folder being moved asynchronously whose source
+        or target path is the passed path, one of its ancestors or one of its
+        descendants, or None if there is no such folder.
+        """
+        path = path.strip().strip('/')
+        lineage = get_folder_lineage_paths(path)
+        return cls.objects.filter(move_status=cls.MoveStatus.PENDING).filter(
+            models.Q(path__in=lineage) | models.Q(path__startswith=path + '/') |
+            models.Q(move_target_path__in=lineage) |
+            models.Q(move_target_path__startswith=path + '/')).first()
+
     @classmethod
     def get_first_existing_folder_ancestor(cls, path):
         """
@@ -495,6 +863,8 @@ class ChrisFolder(AsyncDeletableModel):
 @receiver(post_delete, sender=ChrisFolder)
 def auto_delete_folder_from_storage(sender, instance, **kwargs):
     storage_path = instance.path
+    if defer_folder_deletion(storage_path):
+        return
     storage_manager = connect_storage(settings)
     try:
         if storage_manager.path_exists(storage_path):
@@ -512,80 +882,22 @@ class ChrisFolderFilter(FilterSet):
 
 
 class FolderGroupPermission(models.Model):
+    """
+    Permission granted to a group to access a folder and, by inheritance, all the
+    folders, files and link files within the folder.
+    """
     permission = models.CharField(choices=PERMISSION_CHOICES, default='r', max_length=1)
     folder = models.ForeignKey(ChrisFolder, on_delete=models.CASCADE)
     group = models.ForeignKey(Group, on_delete=models.CASCADE)
 
+    objects = PermissionQuerySet.as_manager()
+
     class Meta:
         unique_together = ('folder', 'group',)
 
     def __str__(self):
         return self.permission
 
-    def save(self, *args, **kwargs):
-        """
-        Overriden to grant the group permission to all the folders, files and link
-        files within the folder.
-        """
-        super(FolderGroupPermission, self).save(*args, **kwargs)
-
-        group = self.group
-        permission = self.permission
-        path = str(self.folder.path)
-        prefix = path + '/'  # avoid sibling folders with paths that start with path
-
-        folders = ChrisFolder.objects.filter(path__startswith=prefix)
-        objs = []
-        for folder in folders:
-            perm = FolderGroupPermission(folder=folder, group=group,
-                                         permission=permission)
-            objs.append(perm)
-        FolderGroupPermission.objects.bulk_create(objs, update_conflicts=True,
-                                                  update_fields=['permission'],
-                                                  unique_fields=['folder_id', 'group_id'])
-
-        files = ChrisFile.objects.filter(fname__startswith=prefix)
-        objs = []
-        for f in files:
-            perm = FileGroupPermission(file=f, group=group, permission=permission)
-            objs.append(perm)
-        FileGroupPermission.objects.bulk_create(objs, update_conflicts=True,
-                                                update_fields=['permission'],
-                                                unique_fields=['file_id', 'group_id'])
-
-        link_files = ChrisLinkFile.objects.filter(fname__startswith=prefix)
-        objs = []
-        for lf in link_files:
-            perm = LinkFileGroupPermission(link_file=lf, group=group,
-                                           permission=permission)
-            objs.append(perm)
-        LinkFileGroupPermission.objects.bulk_create(objs, update_conflicts=True,
-                                                    update_fields=['permission'],
-                                                    unique_fields=['link_file_id',
-                                                                   'group_id'])
-
-    def delete(self, *args, **kwargs):
-        """
-        Overriden to remove the group permission to all the folders, files and
-        link files within the folder.
-        """
-        super(FolderGroupPermission, self).delete(*args, **kwargs)
-
-        group = self.group
-        permission = self.permission
-        path = str(self.folder.path)
-        prefix = path + '/'  # avoid sibling folders with paths that start with path
-
-        FolderGroupPermission.objects.filter(folder__path__startswith=prefix, group=group,
-                                             permission=permission).delete()
-
-        FileGroupPermission.objects.filter(file__fname__startswith=prefix, group=group,
-                                           permission=permission).delete()
-
-        LinkFileGroupPermission.objects.filter(link_file__fname__startswith=prefix,
-                                               group=group,
-                                               permission=permission).delete()
-
 
 class FolderGroupPermissionFilter(FilterSet):
     group_name = django_filters.CharFilter(field_name='group__name', lookup_expr='exact')
@@ -596,77 +908,22 @@ class FolderGroupPermissionFilter(FilterSet):
 
 
 class FolderUserPermission(models.Model):
+    """
+    Permission granted to a user to access a folder and, by inheritance, all the
+    folders, files and link files within the folder.
+    """
     permission = models.CharField(choices=PERMISSION_CHOICES, default='r', max_length=1)
     folder = models.ForeignKey(ChrisFolder, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    objects = PermissionQuerySet.as_manager()
+
     class Meta:
         unique_together = ('folder', 'user',)
 
     def __str__(self):
         return self.permission
 
-    def save(self, *args, **kwargs):
-        """
-        Overriden to grant the user permission to all the folders, files and link
-        files within the folder.
-        """
-        super(FolderUserPermission, self).save(*args, **kwargs)
-
-        user = self.user
-        permission = self.permission
-        path = str(self.folder.path)
-        prefix = path + '/'  # avoid sibling folders with paths that start with path
-
-        folders = ChrisFolder.objects.filter(path__startswith=prefix)
-        objs = []
-        for folder in folders:
-            perm = FolderUserPermission(folder=folder, user=user, permission=permission)
-            objs.append(perm)
-        FolderUserPermission.objects.bulk_create(objs, update_conflicts=True,
-                                                 update_fields=['permission'],
-                                                 unique_fields=['folder_id', 'user_id'])
-
-        files = ChrisFile.objects.filter(fname__startswith=prefix)
-        objs = []
-        for f in files:
-            perm = FileUserPermission(file=f, user=user, permission=permission)
-            objs.append(perm)
-        FileUserPermission.objects.bulk_create(objs, update_conflicts=True,
-                                               update_fields=['permission'],
-                                               unique_fields=['file_id', 'user_id'])
-
-        link_files = ChrisLinkFile.objects.filter(fname__startswith=prefix)
-        objs = []
-        for lf in link_files:
-            perm = LinkFileUserPermission(link_file=lf, user=user, permission=permission)
-            objs.append(perm)
-        LinkFileUserPermission.objects.bulk_create(objs, update_conflicts=True,
-                                                   update_fields=['permission'],
-                                                   unique_fields=['link_file_id',
-                                                                  'user_id'])
-
-    def delete(self, *args, **kwargs):
-        """
-        Overriden to remove the user permission to all the folders, files and
-        link files within the folder.
-        """
-        super(FolderUserPermission, self).delete(*args, **kwargs)
-
-        user = self.user
-        permission = self.permission
-        path = str(self.folder.path)
-        prefix = path + '/'  # avoid sibling folders with paths that start with path
-
-        FolderUserPermission.objects.filter(folder__path__startswith=prefix, user=user,
-                                            permission=permission).delete()
-
-        FileUserPermission.objects.filter(file__fname__startswith=prefix, user=user,
-                                          permission=permission).delete()
-
-        LinkFileUserPermission.objects.filter(link_file__fname__startswith=prefix,
-                                              user=user, permission=permission).delete()
-
 
 class FolderUserPermissionFilter(FilterSet):
     username = django_filters.CharFilter(field_name='user__username', lookup_expr='exact')
@@ -679,6 +936,22 @@ class FolderUserPermissionFilter(FilterSet):
 class ChrisFile(models.Model):
     creation_date = models.DateTimeField(auto_now_add=True)
     fname = models.FileField(max_length=1024, unique=True)
+    # number of slashes in the file's path, computed and stored by the DB
+    fname_depth = models.GeneratedField(
+        expression=Length('fname') - Length(Replace('fname', models.Value('/'),
+                                                      models.Value(''))),
+        output_field=models.IntegerField(), db_persist=True)
+    # id of the feed containing the file (files under home/<username>/feeds/feed_<id>),
+    # computed and stored by the DB (at most 18 digits always fit in a bigint)
+    fname_feed_id = models.GeneratedField(
+        expression=Cast(models.Func('fname',
+                                    models.Value(
+                                        r'^home/[^/]+/feeds/feed_([0-9]{1,18})/'),
+                                    function='substring',
+                                    output_field=models.CharField()),
+                        models.BigIntegerField()),
+        output_field=models.BigIntegerField(), db_persist=True)
+    size = models.BigIntegerField(null=True, blank=True)  # size in bytes
     public = models.BooleanField(blank=True, default=False, db_index=True)
     parent_folder = models.ForeignKey(ChrisFolder, on_delete=models.CASCADE,
                                       related_name='chris_files')
@@ -690,18 +963,31 @@ class ChrisFile(models.Model):
 
     class Meta:
         ordering = ('-fname',)
+        indexes = [
+            models.Index(fields=['fname_depth', 'parent_folder'],
+                         name='core_chrisfile_depth_idx'),
+            models.Index(fields=['fname_feed_id'], name='core_chrisfile_feed_id_idx'),
+            # trigram index usable by the (case-insensitive) fname__icontains lookups
+            GinIndex(OpClass(Upper('fname'), name='gin_trgm_ops'),
+                     name='core_chrisfile_fname_trgm_idx'),
+        ]
 
     def __str__(self):
         return self.fname.name
 
     def save(self, *args, **kwargs):
         """
-        Overriden to ensure file paths never start or end with slashes. Also, to delete
-        a leftover file in storage if any error happens when saving the file.
+        Overriden to ensure file paths never start or end with slashes and to store
+        the size of newly uploaded file data. Also, to delete a leftover file in
+        storage if any error happens when saving the file.
         """
         path = self.fname.name
         if path.startswith('/') or path.endswith('/'):
             raise ValueError('Paths starting or ending with slashes are not allowed.')
+        if self.size is None and not self.fname._committed:
+            # the size of the data about to be uploaded is known without a storage
+            # request, files registered by path must be passed their size
+            self.size = self.fname.size
         try:
             super(ChrisFile, self).save(*args, **kwargs)
         except Exception:
@@ -741,34 +1027,27 @@ class ChrisFile(models.Model):
     def has_group_permission(self, group, permission=''):
         """
         Custom method to determine whether a group has been granted a permission to
-        access the file.
+        access the file (perhaps through one of the file's ancestor folders).
         """
         if not permission:
             qs = FileGroupPermission.objects.filter(group=group, file=self)
         else:
             p = validate_permission(permission)
             qs = FileGroupPermission.objects.filter(group=group, file=self, permission=p)
-        return qs.exists()
+        if qs.exists():
+            return True
+        folder_path = os.path.dirname(self.fname.name)
+        return folders_grant_group_permission(
+            get_folder_permission_lineage_paths(folder_path, include_folder=False),
+            group, permission)
 
     def has_user_permission(self, user, permission=''):
         """
         Custom method to determine whether a user has been granted a permission to
-        access the file (perhaps through one of its groups).
+        access the file (perhaps through one of its groups or one of the file's
+        ancestor folders).
         """
-        grp_qs = user.groups.all()
-
-        if not permission:
-            if FileUserPermission.objects.filter(file=self, user=user).exists():
-                return True
-            qs = FileGroupPermission.objects.filter(file=self, group__in=grp_qs)
-        else:
-            p = validate_permission(permission)
-            if FileUserPermission.objects.filter(file=self, user=user,
-                                                 permission=p).exists():
-                return True
-            qs = FileGroupPermission.objects.filter(file=self, permission=p,
-                                                    group__in=grp_qs)
-        return qs.exists()
+        return PermissionResolver.for_user(user).has_permission(self, permission)
 
     def get_groups_permissions_queryset(self):
         """
@@ -910,6 +1189,17 @@ class ChrisFile(models.Model):
         else:
             lf.delete()
 
+    def get_size(self):
+        """
+        Custom method to get the size of the file in bytes. The size is only fetched
+        from storage (and then stored in the DB) for legacy files registered before
+        sizes were stored in the DB.
+        """
+        if self.size is None:
+            self.size = self.fname.size
+            ChrisFile.objects.filter(pk=self.pk).update(size=self.size)
+        return self.size
+
     @classmethod
     def get_base_queryset(cls):
         """
@@ -922,6 +1212,8 @@ class ChrisFile(models.Model):
 @receiver(post_delete, sender=ChrisFile)
 def auto_delete_file_from_storage(sender, instance, **kwargs):
     storage_path = instance.fname.name
+    if defer_file_deletion(storage_path):
+        return
     storage_manager = connect_storage(settings)
     try:
         if storage_manager.obj_exists(storage_path):
@@ -935,6 +1227,8 @@ class FileGroupPermission(models.Model):
     file = models.ForeignKey(ChrisFile, on_delete=models.CASCADE)
     group = models.ForeignKey(Group, on_delete=models.CASCADE)
 
+    objects = PermissionQuerySet.as_manager()
+
     class Meta:
         unique_together = ('file', 'group',)
 
@@ -955,6 +1249,8 @@ class FileUserPermission(models.Model):
     file = models.ForeignKey(ChrisFile, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    objects = PermissionQuerySet.as_manager()
+
     class Meta:
         unique_together = ('file', 'user',)
 
@@ -1041,7 +1337,7 @@ class ChrisLinkFile(models.Model):
     def has_group_permission(self, group, permission=''):
         """
         Custom method to determine whether a group has been granted a permission to
-        access the link file.
+        access the link file (perhaps through one of the link file's ancestor folders).
         """
         if not permission:
             qs = LinkFileGroupPermission.objects.filter(group=group, link_file=self)
@@ -1049,27 +1345,20 @@ class ChrisLinkFile(models.Model):
             p = validate_permission(permission)
             qs = LinkFileGroupPermission.objects.filter(group=group, link_file=self,
                                                         permission=p)
-        return qs.exists()
+        if qs.exists():
+            return True
+        folder_path = os.path.dirname(self.fname.name)
+        return folders_grant_group_permission(
+            get_folder_permission_lineage_paths(folder_path, include_folder=False),
+            group, permission)
 
     def has_user_permission(self, user, permission=''):
         """
         Custom method to determine whether a user has been granted a permission to
-        access the link file (perhaps through one of its groups).
+        access the link file (perhaps through one of its groups or one of the link file's
+        ancestor folders).
         """
-        grp_qs = user.groups.all()
-
-        if not permission:
-            if LinkFileUserPermission.objects.filter(link_file=self, user=user).exists():
-                return True
-            qs = LinkFileGroupPermission.objects.filter(link_file=self, group__in=grp_qs)
-        else:
-            p = validate_permission(permission)
-            if LinkFileUserPermission.objects.filter(link_file=self, user=user,
-                                                     permission=p).exists():
-                return True
-            qs = LinkFileGroupPermission.objects.filter(link_file=self, permission=p,
-                                                        group__in=grp_qs)
-        return qs.exists()
+        return PermissionResolver.for_user(user).has_permission(self, permission)
 
     def get_groups_permissions_queryset(self):
         """
@@ -1219,6 +1508,8 @@ class ChrisLinkFile(models.Model):
 @receiver(post_delete, sender=ChrisLinkFile)
 def auto_delete_file_from_storage(sender, instance, **kwargs):
     storage_path = instance.fname.name
+    if defer_file_deletion(storage_path):
+        return
     storage_manager = connect_storage(settings)
     try:
         if storage_manager.obj_exists(storage_path):
@@ -1232,6 +1523,8 @@ class LinkFileGroupPermission(models.Model):
     link_file = models.ForeignKey(ChrisLinkFile, on_delete=models.CASCADE)
     group = models.ForeignKey(Group, on_delete=models.CASCADE)
 
+    objects = PermissionQuerySet.as_manager()
+
     class Meta:
         unique_together = ('link_file', 'group',)
 
@@ -1252,6 +1545,8 @@ class LinkFileUserPermission(models.Model):
     link_file = models.ForeignKey(ChrisLinkFile, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    objects = PermissionQuerySet.as_manager()
+
     class Meta:
         unique_together = ('link_file', 'user',)
 
@@ -1267,6 +1562,23 @@ class LinkFileUserPermissionFilter(FilterSet):
         fields = ['id', 'username']
 
 
+@receiver(post_save, sender=FolderGroupPermission)
+@receiver(post_save, sender=FolderUserPermission)
+@receiver(post_save, sender=FileGroupPermission)
+@receiver(post_save, sender=FileUserPermission)
+@receiver(post_save, sender=LinkFileGroupPermission)
+@receiver(post_save, sender=LinkFileUserPermission)
+@receiver(post_delete, sender=FolderGroupPermission)
+@receiver(post_delete, sender=FolderUserPermission)
+@receiver(post_delete, sender=FileGroupPermission)
+@receiver(post_delete, sender=FileUserPermission)
+@receiver(post_delete, sender=LinkFileGroupPermission)
+@receiver(post_delete, sender=LinkFileUserPermission)
+@receiver(m2m_changed, sender=User.groups.through)
+def clear_permission_resolvers_on_change(sender, **kwargs):
+    clear_permission_resolvers()
+
+
 class FileDownloadToken(models.Model):
     creation_date = models.DateTimeField(auto_now_add=True)
     owner = models.ForeignKey('auth.User', on_delete=models.CASCADE)
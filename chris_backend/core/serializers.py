@@ -58,6 +58,8 @@ class ChrisFileSerializer(serializers.HyperlinkedModelSerializer,
         """
         Get the size of the file in bytes.
         """
+        if isinstance(obj, ChrisFile):
+            return obj.get_size()
         return obj.fname.size
 
     @extend_schema_field(OpenApiTypes.URI)
@@ -1,4 +1,6 @@
-from typing import Dict, Any, ContextManager
+import os
+import threading
+from typing import Dict, Any, ContextManager, Tuple
 from tempfile import TemporaryDirectory
 import unittest.mock
 from contextlib import contextmanager
@@ -9,21 +11,60 @@ from core.storage.plain_fs import FilesystemManager
 from core.storage.s3manager import S3Manager
 
 
+_managers: Dict[Tuple, StorageManager] = {}  # process-wide cache of storage managers
+_managers_lock = threading.Lock()
+
+
 def connect_storage(settings) -> StorageManager:
     """
     :param settings: django.conf.settings object
-    :returns: a manager for the storage configured by settings
+    :returns: a manager for the storage configured by settings. Managers are lazily
+              created the first time they are requested and shared by all the
+              threads of the process afterwards.
+    """
+    key = __get_manager_key(settings)
+    manager = _managers.get(key)
+    if manager is None:
+        with _managers_lock:
+            manager = _managers.get(key)
+            if manager is None:
+                manager = _create_storage_manager(settings)
+                _managers[key] = manager
+    return manager
+
+
+def _create_storage_manager(settings) -> StorageManager:
+    """
+    :param settings: django.conf.settings object
+    :returns: a new manager for the storage configured by settings
     """
     storage_name = __get_storage_name(settings)
+    max_connections = getattr(settings, 'STORAGE_MAX_CONNECTIONS', 10)
     if storage_name == 'SwiftStorage':
-        return SwiftManager(settings.SWIFT_CONTAINER_NAME, settings.SWIFT_CONNECTION_PARAMS)
+        return SwiftManager(settings.SWIFT_CONTAINER_NAME, settings.SWIFT_CONNECTION_PARAMS,
+                            max_connections, getattr(settings, 'SWIFT_TEMP_URL_KEY', None))
     elif storage_name == 'FileSystemStorage':
         return FilesystemManager(settings.MEDIA_ROOT)
     elif storage_name == 'S3Boto3Storage':
-        return S3Manager(settings.S3_BUCKET_NAME, settings.S3_CONNECTION_PARAMS)
+        return S3Manager(settings.S3_BUCKET_NAME, settings.S3_CONNECTION_PARAMS,
+                         max_connections)
     raise ValueError(f'Unsupported storage system: {storage_name}')
 
 
+def _reset_storage_managers() -> None:
+    """
+    Discard the cached storage managers. Registered to run in forked child
+    processes (e.g. celery prefork workers) so that they never share the parent's
+    network connections.
+    """
+    global _managers_lock
+    _managers.clear()
+    _managers_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_storage_managers)
+
+
 def verify_storage_connection(**kwargs) -> None:
     """
     Create a ``StorageManager`` for the given settings. Raises an exception if the connection
@@ -32,7 +73,7 @@ def verify_storage_connection(**kwargs) -> None:
     If the connection works, then ``StorageManager.create_container`` is called.
     """
     settings = _DummySettings(kwargs)
-    storage_manager = connect_storage(settings)
+    storage_manager = _create_storage_manager(settings)
     storage_manager.create_container()
 
 
@@ -67,3 +108,16 @@ class _DummySettings:
 
 def __get_storage_name(settings: Any) -> str:
     return settings.STORAGES['default']['BACKEND'].rsplit('.', maxsplit=1)[-1]
+
+
+def __get_manager_key(settings: Any) -> Tuple:
+    storage_name = __get_storage_name(settings)
+    if storage_name == 'SwiftStorage':
+        location = (settings.SWIFT_CONTAINER_NAME,
+                    repr(sorted(settings.SWIFT_CONNECTION_PARAMS.items())))
+    elif storage_name == 'S3Boto3Storage':
+        location = (settings.S3_BUCKET_NAME,
+                    repr(sorted(settings.S3_CONNECTION_PARAMS.items())))
+    else:
+        location = (getattr(settings, 'MEDIA_ROOT', None),)
+    return (storage_name, getattr(settings, 'STORAGE_MAX_CONNECTIONS', 10)) + location
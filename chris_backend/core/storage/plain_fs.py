@@ -1,9 +1,21 @@
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import os
 import shutil
-from typing import Union, List, Dict, AnyStr, Optional
+import uuid
+from typing import Union, List, Dict, AnyStr, Optional, Iterator
 
-from core.storage.storagemanager import StorageManager
+from core.storage.storagemanager import (StorageManager, ObjectInfo, ProgressCallback,
+                                         DOWNLOAD_CHUNK_SIZE)
+
+# number of threads concurrently deleting files in delete_objs
+_DELETE_WORKERS = 8
+
+# directory under the base directory where the data of chunked uploads is appended to
+# (under the base so that completing an upload is an atomic rename), it's hidden from
+# the listings
+_CHUNKED_UPLOADS_DIR = '.chunked_uploads'
 
 
 class FilesystemManager(StorageManager):
@@ -27,7 +39,16 @@ class FilesystemManager(StorageManager):
         if self.obj_exists(path_prefix):
             return [path_prefix]
         all_paths = (self.__base / path_prefix).rglob('*')
-        return [str(p.relative_to(self.__base)) for p in all_paths if p.is_file()]
+        paths = (p.relative_to(self.__base) for p in all_paths if p.is_file())
+        return [str(p) for p in paths if p.parts[0] != _CHUNKED_UPLOADS_DIR]
+
+    def ls_info(self, path_prefix: str) -> List[ObjectInfo]:
+        return [self.__obj_info(p) for p in self.ls(path_prefix)]
+
+    def __obj_info(self, file_path: str) -> ObjectInfo:
+        st = (self.__base / file_path).stat()
+        # like web servers do, derive the etag from the modification time and size
+        return ObjectInfo(file_path, st.st_size, f'{st.st_mtime_ns:x}-{st.st_size:x}')
 
     def path_exists(self, path: str) -> bool:
         return (self.__base / path).exists()
@@ -54,6 +75,48 @@ class FilesystemManager(StorageManager):
     def download_obj(self, file_path: str) -> AnyStr:
         return (self.__base / file_path).read_bytes()
 
+    def obj_info(self, file_path: str) -> ObjectInfo:
+        return self.__obj_info(file_path)
+
+    def download_obj_range(self, file_path: str, start: int, end: int,
+                           chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+        with open(self.__base / file_path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def start_chunked_upload(self, file_path: str) -> str:
+        upload_id = uuid.uuid4().hex
+        tmp_path = self.__chunked_upload_path(upload_id)
+        tmp_path.parent.mkdir(exist_ok=True, parents=True)
+        tmp_path.touch()
+        return upload_id
+
+    def upload_chunk(self, file_path: str, upload_id: str, part_number: int,
+                     offset: int, data: bytes) -> str:
+        with open(self.__chunked_upload_path(upload_id), 'r+b') as f:
+            f.seek(offset)
+            f.write(data)
+            f.truncate()  # drop the data of a previous attempt past this chunk
+        return str(part_number)
+
+    def complete_chunked_upload(self, file_path: str, upload_id: str,
+                                parts: List[str]) -> None:
+        dst = self.__base / file_path
+        dst.parent.mkdir(exist_ok=True, parents=True)
+        os.replace(self.__chunked_upload_path(upload_id), dst)
+
+    def abort_chunked_upload(self, file_path: str, upload_id: str) -> None:
+        self.__chunked_upload_path(upload_id).unlink(missing_ok=True)
+
+    def __chunked_upload_path(self, upload_id: str) -> Path:
+        return self.__base / _CHUNKED_UPLOADS_DIR / upload_id
+
     def copy_obj(self, src: str, dst: str) -> None:
         src_path = self.__base / src
         dst_path = self.__base / dst
@@ -63,7 +126,16 @@ class FilesystemManager(StorageManager):
     def delete_obj(self, file_path: str) -> None:
         (self.__base / file_path).unlink()
 
-    def copy_path(self, src: str, dst: str) -> None:
+    def delete_objs(self, file_paths: List[str]) -> None:
+        # unlink is I/O bound so a few threads speed up deletes on network filesystems
+        with ThreadPoolExecutor(max_workers=_DELETE_WORKERS) as executor:
+            list(executor.map(self.__unlink, file_paths))
+
+    def __unlink(self, file_path: str) -> None:
+        (self.__base / file_path).unlink(missing_ok=True)
+
+    def copy_path(self, src: str, dst: str,
+                  progress: Optional[ProgressCallback] = None) -> None:
         src_path = self.__base / src
         dst_path = self.__base / dst
 
@@ -76,8 +148,11 @@ class FilesystemManager(StorageManager):
             shutil.copytree(src_path, dst_path)
         else:
             self.copy_obj(src, dst)
+        if progress is not None:
+            progress(1, 1)  # a single filesystem operation
 
-    def move_path(self, src: str, dst: str) -> None:
+    def move_path(self, src: str, dst: str,
+                  progress: Optional[ProgressCallback] = None) -> None:
         src_path = self.__base / src
         dst_path = self.__base / dst
 
@@ -94,6 +169,8 @@ class FilesystemManager(StorageManager):
         else:
             dst_path.parent.mkdir(parents=True, exist_ok=True)
             src_path.rename(dst_path)
+        if progress is not None:
+            progress(1, 1)  # a single filesystem operation
 
     def delete_path(self, path: str) -> None:
         p = self.__base / path
@@ -108,7 +185,8 @@ class FilesystemManager(StorageManager):
             self.delete_obj(path)
 
 
-    def sanitize_obj_names(self, path: str) -> Dict[str, str]:
+    def sanitize_obj_names(self, path: str,
+                           obj_paths: Optional[List[str]] = None) -> Dict[str, str]:
         """
         Removes commas from the names of all files and folders under the specified
         input folder path.
@@ -119,7 +197,8 @@ class FilesystemManager(StorageManager):
 
         Returns a dictionary that only contains modified file paths. Keys are the
         original file paths and values are the new file paths. Deleted files have
-        the empty string as the value.
+        the empty string as the value. The ``obj_paths`` listing is not used, the
+        local folder tree is walked instead.
         """
         new_file_paths = {}
         p = self.__base / path
@@ -0,0 +1,58 @@
+"""
+Connection pool module.
+"""
+
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Generic, Iterator, TypeVar
+
+T = TypeVar('T')
+
+
+class ConnectionPool(Generic[T]):
+    """
+    A thread-safe pool of at most ``max_size`` connections. Connections are lazily
+    created by the ``connect`` callable the first time they are needed and are
+    reused afterwards. Threads requesting a connection when ``max_size`` connections
+    are already in use block until one of them is released.
+    """
+
+    def __init__(self, connect: Callable[[], T], max_size: int):
+        if max_size < 1:
+            raise ValueError('The maximum number of connections must be at least 1.')
+        self._connect = connect
+        self.max_size = max_size
+        self._idle = queue.LifoQueue()  # most recently used connections first
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self.opened = 0  # number of connections created
+        self.reused = 0  # number of times an idle connection has been handed out
+
+    @contextmanager
+    def connection(self) -> Iterator[T]:
+        """
+        Context manager that checks out a connection from the pool and returns it
+        to the pool when the context exits.
+        """
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()  # raises if the connection can not be created
+                with self._lock:
+                    self.opened += 1
+            else:
+                with self._lock:
+                    self.reused += 1
+            try:
+                yield conn
+            finally:
+                self._idle.put(conn)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Return the number of connections opened and reused so far.
+        """
+        with self._lock:
+            return {'opened': self.opened, 'reused': self.reused}
@@ -11,15 +11,17 @@ MD5 hashes. We disable this via botocore.config.Config below.
 """
 
 import logging
+import threading
 import time
 from pathlib import Path
-from typing import Dict, List, AnyStr, Optional
+from typing import Dict, List, AnyStr, Optional, Iterator
 
 import boto3
 from botocore.config import Config
 from botocore.exceptions import ClientError
 
-from core.storage.storagemanager import StorageManager
+from core.storage.storagemanager import (StorageManager, ObjectInfo, ProgressCallback,
+                                         DOWNLOAD_CHUNK_SIZE, run_concurrently)
 
 logger = logging.getLogger(__name__)
 
@@ -33,28 +35,62 @@ _S3_CLIENT_CONFIG = Config(
 )
 
 
+# maximum number of keys accepted by a single DeleteObjects request
+_S3_MAX_DELETE_KEYS = 1000
+
+# maximum size of an object copied with a single CopyObject request
+_S3_MAX_COPY_SIZE = 5 * 1024 ** 3
+
+# size of the parts of larger objects copied with UploadPartCopy requests (objects up
+# to the S3 maximum of 5 TB fit in the 10000 parts allowed by a multipart upload)
+_S3_COPY_PART_SIZE = 512 * 1024 ** 2
+
+# minimum size of every part of a multipart upload but the last one
+_S3_MIN_PART_SIZE = 5 * 1024 ** 2
+
+
 class S3Manager(StorageManager):
 
-    def __init__(self, bucket_name: str, conn_params: dict):
+    min_upload_chunk_size = _S3_MIN_PART_SIZE
+
+    def __init__(self, bucket_name: str, conn_params: dict, max_connections: int = 10):
         self.bucket_name = bucket_name
         self.conn_params = conn_params
+        # maximum number of HTTP connections kept in the client's connection pool
+        self.max_connections = max_connections
         self._client = None
+        # boto3 clients are thread-safe once created but their creation is not
+        self._client_lock = threading.Lock()
+        self._connections_opened = 0
+        self._connections_reused = 0
 
     def __get_client(self):
         """
         Connect to S3-compatible storage and return the client object.
         """
-        if self._client is not None:
+        with self._client_lock:
+            if self._client is None:
+                self._client = self.__create_client()
+                self._connections_opened += 1
+            else:
+                self._connections_reused += 1
             return self._client
+
+    def __create_client(self):
+        """
+        Create the S3 client object.
+        """
+        config = _S3_CLIENT_CONFIG.merge(
+            Config(max_pool_connections=self.max_connections))
         for i in range(5):
             try:
-                self._client = boto3.client(
+                client = boto3.client(
                     's3',
                     endpoint_url=self.conn_params.get('endpoint_url'),
                     aws_access_key_id=self.conn_params.get('access_key'),
                     aws_secret_access_key=self.conn_params.get('secret_key'),
                     region_name=self.conn_params.get('region_name', 'us-east-1'),
-                    config=_S3_CLIENT_CONFIG,
+                    config=config,
                 )
             except ClientError as e:
                 logger.error(str(e))
@@ -62,7 +98,15 @@ class S3Manager(StorageManager):
                     raise
                 time.sleep(0.4)
             else:
-                return self._client
+                return client
+
+    def get_connection_stats(self) -> Dict[str, int]:
+        """
+        Return the number of S3 clients opened and reused by this manager.
+        """
+        with self._client_lock:
+            return {'opened': self._connections_opened,
+                    'reused': self._connections_reused}
 
     def create_container(self) -> None:
         """
@@ -109,6 +153,33 @@ class S3Manager(StorageManager):
                 break
         return l_ls
 
+    def ls_info(self, path: str) -> List[ObjectInfo]:
+        """
+        Return a list with the key, size and etag of the objects in the bucket with
+        the given path as prefix.
+        """
+        l_info = []
+        if not path:
+            return l_info
+        client = self.__get_client()
+        for i in range(5):
+            try:
+                l_info = []
+                paginator = client.get_paginator('list_objects_v2')
+                pages = paginator.paginate(Bucket=self.bucket_name, Prefix=path)
+                for page in pages:
+                    for obj in page.get('Contents', []):
+                        l_info.append(ObjectInfo(obj['Key'], obj['Size'],
+                                                 obj['ETag'].strip('"')))
+            except ClientError as e:
+                logger.error(str(e))
+                if i == 4:
+                    raise
+                time.sleep(0.4)
+            else:
+                break
+        return l_info
+
     def path_exists(self, path: str) -> bool:
         """
         Return True if any objects exist under the given path prefix.
@@ -185,11 +256,151 @@ class S3Manager(StorageManager):
                     raise
                 time.sleep(0.4)
 
+    def obj_info(self, file_path: str) -> ObjectInfo:
+        """
+        Return the key, size and etag of an object from a HEAD request.
+        """
+        client = self.__get_client()
+        for i in range(5):
+            try:
+                resp = client.head_object(Bucket=self.bucket_name, Key=file_path)
+                return ObjectInfo(file_path, resp['ContentLength'],
+                                  resp['ETag'].strip('"'))
+            except ClientError as e:
+                logger.error(str(e))
+                if i == 4:
+                    raise
+                time.sleep(0.4)
+
+    def download_obj_range(self, file_path: str, start: int, end: int,
+                           chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Stream a byte range of an object's data with a ranged GetObject request.
+        """
+        client = self.__get_client()
+        for i in range(5):
+            try:
+                resp = client.get_object(Bucket=self.bucket_name, Key=file_path,
+                                         Range=f'bytes={start}-{end}')
+                return resp['Body'].iter_chunks(chunk_size)
+            except ClientError as e:
+                logger.error(str(e))
+                if i == 4:
+                    raise
+                time.sleep(0.4)
+
+    def get_download_url(self, file_path: str, expires_in: int,
+                         filename: Optional[str] = None) -> str:
+        """
+        Return a presigned GetObject URL of an object. Signing doesn't send any
+        request to the S3 service.
+        """
+        params = {'Bucket': self.bucket_name, 'Key': file_path}
+        if filename:
+            params['ResponseContentDisposition'] = f'attachment; filename="{filename}"'
+        return self.__get_client().generate_presigned_url('get_object', Params=params,
+                                                          ExpiresIn=expires_in)
+
+    def start_chunked_upload(self, file_path: str) -> str:
+        """
+        Create a multipart upload of an object and return its upload id.
+        """
+        client = self.__get_client()
+        for i in range(5):
+            try:
+                return client.create_multipart_upload(Bucket=self.bucket_name,
+                                                      Key=file_path)['UploadId']
+            except ClientError as e:
+                logger.error(str(e))
+                if i == 4:
+                    raise
+                time.sleep(0.4)
+
+    def upload_chunk(self, file_path: str, upload_id: str, part_number: int,
+                     offset: int, data: bytes) -> str:
+        """
+        Upload a part of a multipart upload and return its etag.
+        """
+        client = self.__get_client()
+        for i in range(5):
+            try:
+                resp = client.upload_part(Bucket=self.bucket_name, Key=file_path,
+                                          PartNumber=part_number, UploadId=upload_id,
+                                          Body=data)
+                return resp['ETag']
+            except ClientError as e:
+                logger.error(str(e))
+                if i == 4:
+                    raise
+                time.sleep(0.4)
+
+    def complete_chunked_upload(self, file_path: str, upload_id: str,
+                                parts: List[str]) -> None:
+        """
+        Complete a multipart upload from the etags of its parts.
+        """
+        client = self.__get_client()
+        multipart_upload = {'Parts': [{'ETag': etag, 'PartNumber': part_number}
+                                      for part_number, etag in enumerate(parts, start=1)]}
+        for i in range(5):
+            try:
+                client.complete_multipart_upload(Bucket=self.bucket_name, Key=file_path,
+                                                 UploadId=upload_id,
+                                                 MultipartUpload=multipart_upload)
+            except ClientError as e:
+                logger.error(str(e))
+                if i == 4:
+                    raise
+                time.sleep(0.4)
+            else:
+                break
+
+    def abort_chunked_upload(self, file_path: str, upload_id: str) -> None:
+        """
+        Abort a multipart upload, which deletes its uploaded parts.
+        """
+        client = self.__get_client()
+        for i in range(5):
+            try:
+                client.abort_multipart_upload(Bucket=self.bucket_name, Key=file_path,
+                                              UploadId=upload_id)
+            except ClientError as e:
+                if e.response['Error']['Code'] == 'NoSuchUpload':
+                    return
+                logger.error(str(e))
+                if i == 4:
+                    raise
+                time.sleep(0.4)
+            else:
+                break
+
     def copy_obj(self, src: str, dst: str) -> None:
         """
         Copy an object within the same bucket.
         """
         client = self.__get_client()
+        for i in range(5):
+            try:
+                size = client.head_object(Bucket=self.bucket_name,
+                                          Key=src)['ContentLength']
+            except ClientError as e:
+                logger.error(str(e))
+                if i == 4:
+                    raise
+                time.sleep(0.4)
+            else:
+                break
+        self.__copy_key(client, src, dst, size)
+
+    def __copy_key(self, client, src: str, dst: str, size: int) -> None:
+        """
+        Copy an object of the given size within the same bucket. Objects larger than
+        the maximum size of a single copy request (5 GB) are copied part by part with
+        a multipart upload.
+        """
+        if size > _S3_MAX_COPY_SIZE:
+            self.__multipart_copy(client, src, dst, size)
+            return
         copy_source = {'Bucket': self.bucket_name, 'Key': src}
         for i in range(5):
             try:
@@ -206,6 +417,45 @@ class S3Manager(StorageManager):
             else:
                 break
 
+    def __multipart_copy(self, client, src: str, dst: str, size: int) -> None:
+        """
+        Copy a large object within the same bucket using UploadPartCopy requests.
+        """
+        copy_source = {'Bucket': self.bucket_name, 'Key': src}
+        upload_id = client.create_multipart_upload(Bucket=self.bucket_name,
+                                                   Key=dst)['UploadId']
+        try:
+            parts = []
+            for part_number, start in enumerate(range(0, size, _S3_COPY_PART_SIZE),
+                                                start=1):
+                end = min(start + _S3_COPY_PART_SIZE, size) - 1
+                for i in range(5):
+                    try:
+                        resp = client.upload_part_copy(
+                            Bucket=self.bucket_name,
+                            Key=dst,
+                            CopySource=copy_source,
+                            CopySourceRange=f'bytes={start}-{end}',
+                            PartNumber=part_number,
+                            UploadId=upload_id,
+                        )
+                    except ClientError as e:
+                        logger.error(str(e))
+                        if i == 4:
+                            raise
+                        time.sleep(0.4)
+                    else:
+                        break
+                parts.append({'ETag': resp['CopyPartResult']['ETag'],
+                              'PartNumber': part_number})
+            client.complete_multipart_upload(Bucket=self.bucket_name, Key=dst,
+                                             UploadId=upload_id,
+                                             MultipartUpload={'Parts': parts})
+        except Exception:
+            client.abort_multipart_upload(Bucket=self.bucket_name, Key=dst,
+                                          UploadId=upload_id)
+            raise
+
     def delete_obj(self, file_path: str) -> None:
         """
         Delete an object from S3.
@@ -222,24 +472,45 @@ class S3Manager(StorageManager):
             else:
                 break
 
-    def copy_path(self, src: str, dst: str) -> None:
+    def delete_objs(self, file_paths: List[str]) -> None:
+        """
+        Delete many objects from S3 using batch delete requests (up to 1000 objects
+        per request).
+        """
+        client = self.__get_client()
+        for start in range(0, len(file_paths), _S3_MAX_DELETE_KEYS):
+            keys = file_paths[start:start + _S3_MAX_DELETE_KEYS]
+            self.__delete_keys(client, keys)
+
+    def copy_path(self, src: str, dst: str,
+                  progress: Optional[ProgressCallback] = None) -> None:
+        """
+        Copy all objects under src prefix to dst prefix with concurrent server-side
+        copies.
+        """
+        self.__copy_objs(self.ls_info(src), src, dst, progress)
+
+    def move_path(self, src: str, dst: str,
+                  progress: Optional[ProgressCallback] = None) -> None:
         """
-        Copy all objects under src prefix to dst prefix.
+        Move all objects under src prefix to dst prefix (copy + delete). The source
+        objects are only deleted after all of them have been successfully copied.
         """
-        l_ls = self.ls(src)
-        for obj_key in l_ls:
-            new_key = obj_key.replace(src, dst, 1)
-            self.copy_obj(obj_key, new_key)
+        l_info = self.ls_info(src)
+        self.__copy_objs(l_info, src, dst, progress)
+        self.delete_objs([info.path for info in l_info])
 
-    def move_path(self, src: str, dst: str) -> None:
+    def __copy_objs(self, l_info: List[ObjectInfo], src: str, dst: str,
+                    progress: Optional[ProgressCallback]) -> None:
         """
-        Move all objects under src prefix to dst prefix (copy + delete).
+        Concurrently copy the passed objects from the src prefix to the dst prefix
+        using as many threads as pooled HTTP connections.
         """
-        l_ls = self.ls(src)
-        for obj_key in l_ls:
-            new_key = obj_key.replace(src, dst, 1)
-            self.copy_obj(obj_key, new_key)
-            self.delete_obj(obj_key)
+        client = self.__get_client()
+        run_concurrently(lambda info: self.__copy_key(client, info.path,
+                                                      info.path.replace(src, dst, 1),
+                                                      info.size),
+                         l_info, self.max_connections, progress)
 
     def delete_path(self, path: str) -> None:
         """
@@ -253,24 +524,39 @@ class S3Manager(StorageManager):
 
         for page in pages:
             contents = page.get('Contents', [])
-            if not contents:
-                continue
-            delete_keys = [{'Key': obj['Key']} for obj in contents]
-            for i in range(5):
-                try:
-                    client.delete_objects(
-                        Bucket=self.bucket_name,
-                        Delete={'Objects': delete_keys, 'Quiet': True},
-                    )
-                except ClientError as e:
-                    logger.error(str(e))
-                    if i == 4:
-                        raise
-                    time.sleep(0.4)
-                else:
+            if contents:
+                self.__delete_keys(client, [obj['Key'] for obj in contents])
+
+    def __delete_keys(self, client, keys: List[str]) -> None:
+        """
+        Delete up to 1000 objects with a single S3 request. Objects that fail to be
+        deleted are retried.
+        """
+        for i in range(5):
+            try:
+                resp = client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True},
+                )
+            except ClientError as e:
+                logger.error(str(e))
+                if i == 4:
+                    raise
+                time.sleep(0.4)
+            else:
+                errors = resp.get('Errors', [])
+                if not errors:
                     break
+                for error in errors:
+                    logger.error(f"Could not delete object '{error['Key']}', "
+                                 f"detail: {error.get('Message', error.get('Code'))}")
+                if i == 4:
+                    raise IOError(f'Could not delete {len(errors)} objects from S3.')
+                keys = [error['Key'] for error in errors]
+                time.sleep(0.4)
 
-    def sanitize_obj_names(self, path: str) -> Dict[str, str]:
+    def sanitize_obj_names(self, path: str,
+                           obj_paths: Optional[List[str]] = None) -> Dict[str, str]:
         """
         Removes commas from the paths of all objects that start with the specified
         input path/prefix.
@@ -281,10 +567,11 @@ class S3Manager(StorageManager):
 
         Returns a dictionary that only contains modified object paths. Keys are the
         original object paths and values are the new object paths. Deleted objects have
-        the empty string as the value.
+        the empty string as the value. The ``obj_paths`` listing is used instead of
+        listing the path again if given.
         """
         new_obj_paths = {}
-        l_ls = self.ls(path)
+        l_ls = self.ls(path) if obj_paths is None else obj_paths
 
         if len(l_ls) != 1 or l_ls[0] != path:  # path is a prefix
             p = Path(path)
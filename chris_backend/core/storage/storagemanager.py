@@ -1,6 +1,25 @@
 
 import abc
-from typing import List, Dict, AnyStr, Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import (List, Dict, AnyStr, Optional, NamedTuple, Callable, Iterable, Iterator,
+                    AsyncIterator, Any)
+
+# signature of the callables passed to report the progress of long operations, they
+# receive the number of files already processed and the total number of files
+ProgressCallback = Callable[[int, int], None]
+
+# size of the chunks in which ranges of file data are streamed from the storage service
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class ObjectInfo(NamedTuple):
+    """
+    Metadata of a file stored in the storage service.
+    """
+    path: str
+    size: int
+    etag: Optional[str] = None
 
 
 class StorageManager(abc.ABC):
@@ -22,12 +41,27 @@ class StorageManager(abc.ABC):
         """
         ...
 
+    def get_connection_stats(self) -> Dict[str, int]:
+        """
+        :returns: the number of connections to the storage service opened and reused
+                  by this manager. Managers that don't connect to a service return 0s.
+        """
+        return {'opened': 0, 'reused': 0}
+
     def ls(self, path_prefix: str) -> List[str]:
         """
         :returns: a list of all files under a given path prefix.
         """
         ...
 
+    def ls_info(self, path_prefix: str) -> List[ObjectInfo]:
+        """
+        :returns: a list with the path, size and etag of all files under a given path
+                  prefix. Implementations should get the metadata from the same
+                  listing request(s) used by ``ls`` rather than querying each file.
+        """
+        ...
+
     def path_exists(self, path: str) -> bool:
         """
         :returns: True if path exists (whether it be a directory OR file)
@@ -56,6 +90,89 @@ class StorageManager(abc.ABC):
         """
         ...
 
+    def obj_info(self, file_path: str) -> ObjectInfo:
+        """
+        :returns: the path, size and etag of an existing file, without downloading
+                  its data.
+        """
+        ...
+
+    def download_obj_range(self, file_path: str, start: int, end: int,
+                           chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Stream the bytes from ``start`` to ``end`` (both inclusive) of a file's data in
+        chunks of at most ``chunk_size`` bytes. Only the requested range is read from
+        the storage service.
+        """
+        ...
+
+    async def adownload_obj_range(self, file_path: str, start: int, end: int,
+                                  chunk_size: int = DOWNLOAD_CHUNK_SIZE
+                                  ) -> AsyncIterator[bytes]:
+        """
+        Asynchronous version of ``download_obj_range``. This default implementation
+        reads every chunk with ``download_obj_range`` in a worker thread, so a
+        download only takes a thread while a chunk is being read and the next chunk
+        isn't read before the consumer asks for it. Managers with an asynchronous
+        client may override it.
+        """
+        chunks = await asyncio.to_thread(self.download_obj_range, file_path, start,
+                                         end, chunk_size)
+        chunks = iter(chunks)
+        try:
+            while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                yield chunk
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                await asyncio.to_thread(close)
+
+    def get_download_url(self, file_path: str, expires_in: int,
+                         filename: Optional[str] = None) -> Optional[str]:
+        """
+        :returns: a signed URL from which clients can download the file data directly
+                  from the storage service for ``expires_in`` seconds, or None if the
+                  storage service doesn't support it. If given, ``filename`` is the
+                  name clients should save the file as.
+        """
+        return None
+
+    # minimum size in bytes of every chunk of a chunked upload but the last one
+    min_upload_chunk_size = 1
+
+    def start_chunked_upload(self, file_path: str) -> str:
+        """
+        Start uploading the data of a file in chunks. The file only exists at the
+        given path after ``complete_chunked_upload`` is called.
+
+        :returns: the id of the chunked upload
+        """
+        ...
+
+    def upload_chunk(self, file_path: str, upload_id: str, part_number: int,
+                     offset: int, data: bytes) -> str:
+        """
+        Upload the ``part_number``-th (starting at 1) chunk of a chunked upload, which
+        starts at byte ``offset`` of the file. Uploading a chunk again replaces it.
+
+        :returns: the chunk's tag, to be passed to ``complete_chunked_upload``
+        """
+        ...
+
+    def complete_chunked_upload(self, file_path: str, upload_id: str,
+                                parts: List[str]) -> None:
+        """
+        Assemble the chunks of a chunked upload, given by their tags in order, into the
+        file at the given path.
+        """
+        ...
+
+    def abort_chunked_upload(self, file_path: str, upload_id: str) -> None:
+        """
+        Discard the chunks uploaded so far by a chunked upload.
+        """
+        ...
+
     def copy_obj(self, src: str, dst: str) -> None:
         """
         Copy file data to a new path.
@@ -70,15 +187,28 @@ class StorageManager(abc.ABC):
         """
         ...
 
-    def copy_path(self, src: str, dst: str) -> None:
+    def delete_objs(self, file_paths: List[str]) -> None:
+        """
+        Delete the data of many files using as few requests to the storage service as
+        possible. Paths that don't exist are ignored.
+        """
+        ...
+
+    def copy_path(self, src: str, dst: str,
+                  progress: Optional[ProgressCallback] = None) -> None:
         """
         Copy all the data under a src path to a new dst path.
+
+        If given, ``progress(done, total)`` is called as files are copied.
         """
         ...
 
-    def move_path(self, src: str, dst: str) -> None:
+    def move_path(self, src: str, dst: str,
+                  progress: Optional[ProgressCallback] = None) -> None:
         """
         Move all the data under a src path to a new dst path.
+
+        If given, ``progress(done, total)`` is called as files are moved.
         """
         ...
 
@@ -88,7 +218,8 @@ class StorageManager(abc.ABC):
         """
         ...
 
-    def sanitize_obj_names(self, path: str) -> Dict[str, str]:
+    def sanitize_obj_names(self, path: str,
+                           obj_paths: Optional[List[str]] = None) -> Dict[str, str]:
         """
         Removes commas from the names of all files and folders under the input path.
         Handles special cases:
@@ -96,8 +227,33 @@ class StorageManager(abc.ABC):
             - Folders with names that only contain commas and white spaces are removed
             after moving their contents to the parent folder.
 
+        If given, ``obj_paths`` is a listing of the files under the path the caller
+        already has, which implementations may use instead of listing the path again.
+
         Returns a dictionary that only contains the modified file paths. Keys are the
         original file paths and values are the new file paths. Deleted files have
         the empty string as their value.
         """
         ...
+
+
+def run_concurrently(fn: Callable[[Any], Any], items: Iterable[Any], max_workers: int,
+                     progress: Optional[ProgressCallback] = None) -> None:
+    """
+    Call ``fn`` on every item using a pool of ``max_workers`` threads. If given,
+    ``progress(done, total)`` is called every time a call completes. The first
+    exception raised by ``fn`` is re-raised after the pending calls are cancelled.
+    """
+    items = list(items)
+    total = len(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(fn, item) for item in items]
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                future.result()
+                if progress is not None:
+                    progress(done, total)
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
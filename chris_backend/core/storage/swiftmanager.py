@@ -2,56 +2,80 @@
 Swift storage manager module.
 """
 
+import json
 import logging
 import os
 import time
+import uuid
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
+from urllib.parse import quote, urlencode, urlsplit
 
 from swiftclient import Connection
+from swiftclient.client import get_object as swift_get_object
 from swiftclient.exceptions import ClientException
+from swiftclient.utils import generate_temp_url
 
-from core.storage.storagemanager import StorageManager
+from core.storage.storagemanager import (StorageManager, ObjectInfo, DOWNLOAD_CHUNK_SIZE,
+                                         run_concurrently)
+from core.storage.pool import ConnectionPool
 
 logger = logging.getLogger(__name__)
 
+# upper limit for the number of objects deleted with a single bulk delete request
+_SWIFT_MAX_BULK_DELETES = 1000
+
+# suffix of the name of the container with the segments of the static large objects
+# created by chunked uploads
+_SWIFT_SEGMENTS_CONTAINER_SUFFIX = '_segments'
+
 
 class SwiftManager(StorageManager):
 
-    def __init__(self, container_name, conn_params):
+    def __init__(self, container_name, conn_params, max_connections=10,
+                 temp_url_key=None):
         self.container_name = container_name
         # swift storage connection parameters dictionary
         self.conn_params = conn_params
-        # swift storage connection object
-        self._conn = None
+        # secret key of the account's temporary URLs, None if they are not enabled
+        self.temp_url_key = temp_url_key
+        # swift storage connection objects are not thread-safe so each thread checks
+        # out its own connection from a pool for the duration of every operation
+        self._pool = ConnectionPool(self.__create_connection, max_connections)
+        self._max_bulk_deletes = None  # lazily fetched from the cluster's capabilities
+        self.segments_container_name = container_name + _SWIFT_SEGMENTS_CONTAINER_SUFFIX
 
-    def __get_connection(self):
+    def __create_connection(self):
         """
         Connect to swift storage and return the connection object.
         """
-        if self._conn is not None:
-            return self._conn
         for i in range(5):  # 5 retries at most
             try:
-                self._conn = Connection(**self.conn_params)
+                conn = Connection(**self.conn_params)
             except ClientException as e:
                 logger.error(str(e))
                 if i == 4:
                     raise  # give up
                 time.sleep(0.4)
             else:
-                return self._conn
+                return conn
+
+    def get_connection_stats(self):
+        """
+        Return the number of swift connections opened and reused by this manager.
+        """
+        return self._pool.get_stats()
 
     def create_container(self):
         """
         Create the storage container.
         """
-        conn = self.__get_connection()
-        try:
-            conn.put_container(self.container_name)
-        except ClientException as e:
-            logger.error(str(e))
-            raise
+        with self._pool.connection() as conn:
+            try:
+                conn.put_container(self.container_name)
+            except ClientException as e:
+                logger.error(str(e))
+                raise
 
     def ls(self, path):
         """
@@ -60,67 +84,305 @@ class SwiftManager(StorageManager):
         """
         return self._ls(path, b_full_listing=True)
 
+    def ls_info(self, path):
+        """
+        Return a list with the name, size and etag of the objects in the swift storage
+        with the provided path as a prefix.
+        """
+        return [ObjectInfo(d_obj['name'], d_obj['bytes'], d_obj['hash'])
+                for d_obj in self._get_listing(path, b_full_listing=True)]
+
     def _ls(self, path, b_full_listing: bool):
         """
         Note to developers: the body of ``_ls`` was originally the body of ``self.ls``,
         though it's been renamed to ``_ls`` so that ``self.ls``'s signature could be
         changed. ``self.ls`` originally accepted ``**kwargs`` but that is no longer the case.
         """
-        l_ls = []  # listing of names to return
+        return [d_obj['name'] for d_obj in self._get_listing(path, b_full_listing)]
+
+    def _get_listing(self, path, b_full_listing: bool):
+        """
+        Return the list of object dictionaries (name, bytes, hash, ...) in swift
+        storage with the provided path as a prefix.
+        """
+        ld_obj = []  # listing of object dictionaries to return
         if path:
-            conn = self.__get_connection()
+            with self._pool.connection() as conn:
+                for i in range(5):
+                    try:
+                        # get the full list of objects in Swift storage with given prefix
+                        ld_obj = conn.get_container(self.container_name,
+                                                    prefix=path,
+                                                    full_listing=b_full_listing)[1]
+                    except ClientException as e:
+                        logger.error(str(e))
+                        if i == 4:
+                            raise
+                        time.sleep(0.4)
+                    else:
+                        break
+        return ld_obj
+
+    def path_exists(self, path):
+        """
+        Return True/False if passed path exists in swift storage.
+        """
+        return len(self._ls(path, b_full_listing=False)) > 0
+
+    def obj_exists(self, obj_path):
+        """
+        Return True/False if passed object exists in swift storage.
+        """
+        with self._pool.connection() as conn:
+            for i in range(5):
+                try:
+                    conn.head_object(self.container_name, obj_path)
+                except ClientException as e:
+                    if e.http_status == 404:
+                        return False
+                    else:
+                        logger.error(str(e))
+                        if i == 4:
+                            raise
+                        time.sleep(0.4)
+                else:
+                    return True
+
+    def upload_obj(self, swift_path, contents, content_type=None):
+        """
+        Upload an object (a file contents) into swift storage.
+        """
+        with self._pool.connection() as conn:
             for i in range(5):
                 try:
-                    # get the full list of objects in Swift storage with given prefix
-                    ld_obj = conn.get_container(self.container_name,
-                                                prefix=path,
-                                                full_listing=b_full_listing)[1]
+                    conn.put_object(self.container_name,
+                                    swift_path,
+                                    contents=contents,
+                                    content_type=content_type)
                 except ClientException as e:
                     logger.error(str(e))
                     if i == 4:
                         raise
                     time.sleep(0.4)
                 else:
-                    l_ls = [d_obj['name'] for d_obj in ld_obj]
                     break
-        return l_ls
 
-    def path_exists(self, path):
+    def download_obj(self, obj_path):
         """
-        Return True/False if passed path exists in swift storage.
+        Download an object from swift storage.
         """
-        return len(self._ls(path, b_full_listing=False)) > 0
+        with self._pool.connection() as conn:
+            for i in range(5):
+                try:
+                    resp_headers, obj_contents = conn.get_object(self.container_name,
+                                                                 obj_path)
+                except ClientException as e:
+                    logger.error(str(e))
+                    if i == 4:
+                        raise
+                    time.sleep(0.4)
+                else:
+                    return obj_contents
 
-    def obj_exists(self, obj_path):
+    def obj_info(self, obj_path):
         """
-        Return True/False if passed object exists in swift storage.
+        Return the name, size and etag of an object in swift storage from a HEAD
+        request.
+        """
+        with self._pool.connection() as conn:
+            for i in range(5):
+                try:
+                    headers = conn.head_object(self.container_name, obj_path)
+                except ClientException as e:
+                    logger.error(str(e))
+                    if i == 4:
+                        raise
+                    time.sleep(0.4)
+                else:
+                    return ObjectInfo(obj_path, int(headers['content-length']),
+                                      headers['etag'].strip('"'))
+
+    def download_obj_range(self, obj_path, start, end, chunk_size=DOWNLOAD_CHUNK_SIZE):
+        """
+        Stream a byte range of an object from swift storage. The range is read over a
+        new HTTP connection authenticated with the token of a pooled connection, so
+        slow readers don't keep any of the pooled connections checked out.
         """
-        conn = self.__get_connection()
         for i in range(5):
+            with self._pool.connection() as conn:
+                if not conn.token or i > 0:
+                    conn.get_auth()  # the token may have expired
+                (url, token) = (conn.url, conn.token)
+                http_conn = conn.http_connection(url)
             try:
-                conn.head_object(self.container_name, obj_path)
+                resp_headers, body = swift_get_object(
+                    url, token, self.container_name, obj_path, http_conn=http_conn,
+                    resp_chunk_size=chunk_size, headers={'Range': f'bytes={start}-{end}'})
             except ClientException as e:
-                if e.http_status == 404:
-                    return False
+                logger.error(str(e))
+                if i == 4:
+                    raise
+                time.sleep(0.4)
+            else:
+                try:
+                    yield from body
+                finally:
+                    body.close()  # release the HTTP connection if not fully read
+                break
+
+    def get_download_url(self, obj_path, expires_in, filename=None):
+        """
+        Return a temporary URL of an object signed with the account's temp URL key,
+        or None if no key was configured.
+        """
+        if not self.temp_url_key:
+            return None
+        with self._pool.connection() as conn:
+            storage_url = conn.url or conn.get_auth()[0]
+        url = urlsplit(storage_url)
+        path = f'{url.path}/{self.container_name}/{obj_path}'
+        temp_url = generate_temp_url(path, expires_in, self.temp_url_key, 'GET')
+        (temp_path, query) = temp_url.split('?', 1)
+        if filename:
+            query += '&' + urlencode({'filename': filename})
+        return f'{url.scheme}://{url.netloc}{quote(temp_path)}?{query}'
+
+    def start_chunked_upload(self, swift_path):
+        """
+        Start a chunked upload whose chunks are uploaded as the segments of a static
+        large object (SLO) to the segments container and return its id.
+        """
+        with self._pool.connection() as conn:
+            for i in range(5):
+                try:
+                    conn.put_container(self.segments_container_name)
+                except ClientException as e:
+                    logger.error(str(e))
+                    if i == 4:
+                        raise
+                    time.sleep(0.4)
                 else:
+                    break
+        return uuid.uuid4().hex
+
+    def upload_chunk(self, swift_path, upload_id, part_number, offset, data):
+        """
+        Upload a chunk as a segment of a static large object and return its etag.
+        """
+        segment_path = self.__get_segment_path(upload_id, part_number)
+        with self._pool.connection() as conn:
+            for i in range(5):
+                try:
+                    return conn.put_object(self.segments_container_name, segment_path,
+                                           contents=data)
+                except ClientException as e:
                     logger.error(str(e))
                     if i == 4:
                         raise
                     time.sleep(0.4)
-            else:
-                return True
 
-    def upload_obj(self, swift_path, contents, content_type=None):
+    def complete_chunked_upload(self, swift_path, upload_id, parts):
         """
-        Upload an object (a file contents) into swift storage.
+        Create the static large object manifest referencing the uploaded segments.
+        """
+        manifest = [{'path': f'/{self.segments_container_name}/'
+                             f'{self.__get_segment_path(upload_id, part_number)}',
+                     'etag': etag}
+                    for part_number, etag in enumerate(parts, start=1)]
+        with self._pool.connection() as conn:
+            for i in range(5):
+                try:
+                    conn.put_object(self.container_name, swift_path,
+                                    contents=json.dumps(manifest),
+                                    query_string='multipart-manifest=put')
+                except ClientException as e:
+                    logger.error(str(e))
+                    if i == 4:
+                        raise
+                    time.sleep(0.4)
+                else:
+                    break
+
+    def abort_chunked_upload(self, swift_path, upload_id):
+        """
+        Delete the segments uploaded so far by a chunked upload.
+        """
+        with self._pool.connection() as conn:
+            for i in range(5):
+                try:
+                    _, listing = conn.get_container(self.segments_container_name,
+                                                    prefix=upload_id + '/',
+                                                    full_listing=True)
+                except ClientException as e:
+                    if e.http_status == 404:
+                        return
+                    logger.error(str(e))
+                    if i == 4:
+                        raise
+                    time.sleep(0.4)
+                else:
+                    break
+            for segment in listing:
+                try:
+                    conn.delete_object(self.segments_container_name, segment['name'])
+                except ClientException as e:
+                    if e.http_status != 404:
+                        raise
+
+    @staticmethod
+    def __get_segment_path(upload_id, part_number):
+        return f'{upload_id}/{part_number:08d}'
+
+    def copy_obj(self, obj_path, dest_path):
+        """
+        Copy an object to a new destination in swift storage. The segments of a static
+        large object are copied along with its manifest so that the copy can be
+        deleted independently of the original (a server-side copy of the whole object
+        would also fail for objects over 5 GB).
+        """
+        with self._pool.connection() as conn:
+            self._copy_obj(conn, obj_path, dest_path, self._is_slo(conn, obj_path))
+
+    def _copy_obj(self, conn, obj_path, dest_path, is_slo=False):
+        """
+        Copy an object with a server-side copy or, for a static large object, copy
+        its segments and create a new manifest referencing the copies.
+        """
+        if is_slo:
+            upload_id = uuid.uuid4().hex
+            manifest = []
+            for (part_number, segment) in enumerate(
+                    self._get_slo_segments(conn, obj_path), start=1):
+                (container, segment_name) = segment['name'].lstrip('/').split('/', 1)
+                segment_path = self.__get_segment_path(upload_id, part_number)
+                self._copy(conn, container, segment_name,
+                           f'/{self.segments_container_name}/{segment_path}')
+                manifest.append({'path': f'/{self.segments_container_name}/'
+                                         f'{segment_path}',
+                                 'etag': segment['hash']})
+            self._put_slo_manifest(conn, dest_path, manifest)
+        else:
+            dest = os.path.join('/' + self.container_name, dest_path.lstrip('/'))
+            self._copy(conn, self.container_name, obj_path, dest)
+
+    def _move_slo(self, conn, obj_path, dest_path):
+        """
+        Create a manifest at the destination referencing the segments of a static
+        large object. The segments now belong to the new manifest so the source
+        manifest must be deleted without its segments.
+        """
+        manifest = [{'path': segment['name'], 'etag': segment['hash']}
+                    for segment in self._get_slo_segments(conn, obj_path)]
+        self._put_slo_manifest(conn, dest_path, manifest)
+
+    def _copy(self, conn, container, obj_path, dest):
+        """
+        Server-side copy an object of the given container to the destination path
+        (prefixed by its container).
         """
-        conn = self.__get_connection()
         for i in range(5):
             try:
-                conn.put_object(self.container_name,
-                                swift_path,
-                                contents=contents,
-                                content_type=content_type)
+                conn.copy_object(container, obj_path, dest)
             except ClientException as e:
                 logger.error(str(e))
                 if i == 4:
@@ -129,31 +391,46 @@ class SwiftManager(StorageManager):
             else:
                 break
 
-    def download_obj(self, obj_path):
+    def _is_slo(self, conn, obj_path):
         """
-        Download an object from swift storage.
+        Return whether an object is a static large object manifest.
         """
-        conn = self.__get_connection()
         for i in range(5):
             try:
-                resp_headers, obj_contents = conn.get_object(self.container_name, obj_path)
+                headers = conn.head_object(self.container_name, obj_path)
             except ClientException as e:
                 logger.error(str(e))
                 if i == 4:
                     raise
                 time.sleep(0.4)
             else:
-                return obj_contents
+                return headers.get('x-static-large-object', '').lower() == 'true'
 
-    def copy_obj(self, obj_path, dest_path):
+    def _get_slo_segments(self, conn, obj_path):
+        """
+        Return the list of segments (name, hash, bytes) of a static large object.
+        """
+        for i in range(5):
+            try:
+                _, body = conn.get_object(self.container_name, obj_path,
+                                          query_string='multipart-manifest=get')
+            except ClientException as e:
+                logger.error(str(e))
+                if i == 4:
+                    raise
+                time.sleep(0.4)
+            else:
+                return json.loads(body)
+
+    def _put_slo_manifest(self, conn, obj_path, manifest):
         """
-        Copy an object to a new destination in swift storage.
+        Create a static large object manifest referencing the given segments.
         """
-        conn = self.__get_connection()
-        dest = os.path.join('/' + self.container_name, dest_path.lstrip('/'))
         for i in range(5):
             try:
-                conn.copy_object(self.container_name, obj_path, dest)
+                conn.put_object(self.container_name, obj_path,
+                                contents=json.dumps(manifest),
+                                query_string='multipart-manifest=put')
             except ClientException as e:
                 logger.error(str(e))
                 if i == 4:
@@ -162,41 +439,177 @@ class SwiftManager(StorageManager):
             else:
                 break
 
+    def _get_slo_paths(self, file_paths):
+        """
+        Return the set of the passed paths that are static large object manifests
+        from a listing of each of their parent folders (container listings flag
+        manifests with a "slo_etag").
+        """
+        paths = set(file_paths)
+        slo_paths = set()
+        with self._pool.connection() as conn:
+            for prefix in {os.path.dirname(path) + '/' for path in paths}:
+                for i in range(5):
+                    try:
+                        _, listing = conn.get_container(self.container_name,
+                                                        prefix=prefix, delimiter='/',
+                                                        full_listing=True)
+                    except ClientException as e:
+                        logger.error(str(e))
+                        if i == 4:
+                            raise
+                        time.sleep(0.4)
+                    else:
+                        break
+                slo_paths.update(d_obj['name'] for d_obj in listing
+                                 if 'slo_etag' in d_obj and d_obj['name'] in paths)
+        return slo_paths
+
     def delete_obj(self, obj_path):
         """
-        Delete an object from swift storage.
+        Delete an object from swift storage. The segments of a static large object are
+        deleted along with its manifest (the query string has no effect on other
+        objects). An object that is not found is considered already deleted.
+        """
+        with self._pool.connection() as conn:
+            self._delete_obj(conn, obj_path, query_string='multipart-manifest=delete')
+
+    def delete_objs(self, file_paths):
+        """
+        Delete many objects from swift storage using the bulk delete middleware (up to
+        the cluster's maximum number of objects per request). Objects are deleted one
+        by one when the swift cluster doesn't support bulk deletes. Static large
+        objects are deleted one by one along with their segments.
+        """
+        if self._get_max_bulk_deletes():
+            slo_paths = self._get_slo_paths(file_paths)
+        else:
+            slo_paths = set(file_paths)  # the query string has no effect on other objects
+        self._delete_objs(file_paths, slo_paths)
+
+    def _delete_objs(self, file_paths, slo_paths):
+        """
+        Delete the passed objects. The segments of the static large objects in
+        ``slo_paths`` are deleted too while only the manifest of any other static large
+        object is deleted (e.g. after its segments were moved to another manifest).
+        """
+        max_deletes = self._get_max_bulk_deletes()
+        with self._pool.connection() as conn:
+            for obj_path in file_paths:
+                if obj_path in slo_paths:
+                    self._delete_obj(conn, obj_path,
+                                     query_string='multipart-manifest=delete')
+                elif not max_deletes:
+                    self._delete_obj(conn, obj_path)
+        if max_deletes:
+            bulk_paths = [path for path in file_paths if path not in slo_paths]
+            for start in range(0, len(bulk_paths), max_deletes):
+                self._bulk_delete(bulk_paths[start:start + max_deletes])
+
+    def _delete_obj(self, conn, obj_path, query_string=None):
+        """
+        Delete an object with a single DELETE request (no existence check). An object
+        that is not found is considered already deleted.
         """
-        conn = self.__get_connection()
         for i in range(5):
             try:
-                conn.delete_object(self.container_name, obj_path)
+                conn.delete_object(self.container_name, obj_path,
+                                   query_string=query_string)
             except ClientException as e:
+                if e.http_status == 404:
+                    return
                 logger.error(str(e))
                 if i == 4:
                     raise
                 time.sleep(0.4)
             else:
-                break
+                return
+
+    def _get_max_bulk_deletes(self):
+        """
+        Return the maximum number of objects that can be deleted with a single bulk
+        delete request or 0 if the swift cluster doesn't support bulk deletes.
+        """
+        if self._max_bulk_deletes is None:
+            with self._pool.connection() as conn:
+                try:
+                    capabilities = conn.get_capabilities()
+                except ClientException as e:
+                    logger.error(str(e))
+                    return 0  # try again next time
+            bulk_delete = capabilities.get('bulk_delete')
+            self._max_bulk_deletes = min(
+                bulk_delete.get('max_deletes_per_request', 10000),
+                _SWIFT_MAX_BULK_DELETES) if bulk_delete else 0
+        return self._max_bulk_deletes
 
-    def copy_path(self, src: str, dst: str) -> None:
-        l_ls = self.ls(src)
-        for obj_path in l_ls:
-            new_obj_path = obj_path.replace(src, dst, 1)
-            self.copy_obj(obj_path, new_obj_path)
+    def _bulk_delete(self, obj_paths):
+        """
+        Delete the passed objects with a single bulk delete request.
+        """
+        data = '\n'.join(quote(f'/{self.container_name}/{obj_path}')
+                         for obj_path in obj_paths)
+        headers = {'Content-Type': 'text/plain', 'Accept': 'application/json'}
+        with self._pool.connection() as conn:
+            for i in range(5):
+                try:
+                    _, body = conn.post_account(headers, query_string='bulk-delete',
+                                                data=data.encode('utf-8'))
+                except ClientException as e:
+                    logger.error(str(e))
+                    if i == 4:
+                        raise
+                    time.sleep(0.4)
+                else:
+                    break
+        result = json.loads(body)
+        if result.get('Errors'):
+            for obj_name, status in result['Errors']:
+                logger.error(f"Could not delete object '{obj_name}', detail: {status}")
+            raise IOError(f"Could not delete {len(result['Errors'])} objects from "
+                          f"swift storage, response status: {result['Response Status']}")
+
+    def copy_path(self, src: str, dst: str, progress=None) -> None:
+        """
+        Copy all objects under src prefix to dst prefix with concurrent server-side
+        copies.
+        """
+        ld_obj = self._get_listing(src, b_full_listing=True)
+        self.__copy_objs(ld_obj, src, dst, progress)
+
+    def move_path(self, src: str, dst: str, progress=None) -> None:
+        """
+        Move all objects under src prefix to dst prefix. The source objects are only
+        deleted after all of them have been successfully copied. The segments of the
+        static large objects are not copied but referenced by new manifests.
+        """
+        ld_obj = self._get_listing(src, b_full_listing=True)
+        self.__copy_objs(ld_obj, src, dst, progress, move=True)
+        self._delete_objs([d_obj['name'] for d_obj in ld_obj], set())
+
+    def __copy_objs(self, ld_obj, src, dst, progress, move=False):
+        """
+        Concurrently copy the passed listed objects from the src prefix to the dst
+        prefix using as many threads as pooled connections.
+        """
+        def copy(d_obj):
+            obj_path = d_obj['name']
+            dest_path = obj_path.replace(src, dst, 1)
+            with self._pool.connection() as conn:
+                if move and 'slo_etag' in d_obj:
+                    self._move_slo(conn, obj_path, dest_path)
+                else:
+                    self._copy_obj(conn, obj_path, dest_path, 'slo_etag' in d_obj)
 
-    def move_path(self, src: str, dst: str) -> None:
-        l_ls = self.ls(src)
-        for obj_path in l_ls:
-            new_obj_path = obj_path.replace(src, dst, 1)
-            self.copy_obj(obj_path, new_obj_path)
-            self.delete_obj(obj_path)
+        run_concurrently(copy, ld_obj, self._pool.max_size, progress)
 
     def delete_path(self, path: str) -> None:
-        l_ls = self.ls(path)
-        for obj_path in l_ls:
-            self.delete_obj(obj_path)
+        ld_obj = self._get_listing(path, b_full_listing=True)
+        self._delete_objs([d_obj['name'] for d_obj in ld_obj],
+                          {d_obj['name'] for d_obj in ld_obj if 'slo_etag' in d_obj})
 
-    def sanitize_obj_names(self, path: str) -> Dict[str, str]:
+    def sanitize_obj_names(self, path: str,
+                           obj_paths: Optional[List[str]] = None) -> Dict[str, str]:
         """
         Removes commas from the paths of all objects that start with the specified
         input path/prefix.
@@ -207,10 +620,11 @@ class SwiftManager(StorageManager):
 
         Returns a dictionary that only contains modified object paths. Keys are the
         original object paths and values are the new object paths. Deleted objects have
-        the empty string as the value.
+        the empty string as the value. The ``obj_paths`` listing is used instead of
+        listing the path again if given.
         """
         new_obj_paths = {}
-        l_ls = self.ls(path)
+        l_ls = self.ls(path) if obj_paths is None else obj_paths
 
         if len(l_ls) != 1 or l_ls[0] != path:  # Path is a prefix
             p = Path(path)
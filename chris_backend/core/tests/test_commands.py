@@ -0,0 +1,56 @@
+import io
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.management.commands.report_seq_scans import Command as ReportSeqScans
+from core.models import ChrisFolder, ChrisFile
+from core.storage.storagemanager import ObjectInfo
+
+
+class ReportSeqScansCommandTests(TestCase):
+
+    def test_find_seq_scans(self):
+        plan = {'Node Type': 'Nested Loop', 'Plans': [
+            {'Node Type': 'Seq Scan', 'Relation Name': 'core_chrisfile'},
+            {'Node Type': 'Index Scan', 'Relation Name': 'core_chrisfolder'}]}
+        self.assertEqual(list(ReportSeqScans.find_seq_scans(plan)), ['core_chrisfile'])
+
+    def test_prefix_indexes_exist(self):
+        """
+        Test whether the varchar_pattern_ops indexes used by the prefix lookups are
+        created by the migrations.
+        """
+        self.assertEqual(ReportSeqScans.get_missing_prefix_indexes(), [])
+
+    def test_report_lists_all_queries(self):
+        out = io.StringIO()
+        call_command('report_seq_scans', path='home/foo', stdout=out)
+        output = out.getvalue()
+        for (name, _) in ReportSeqScans.get_queries('home/foo'):
+            self.assertIn(name, output)
+
+
+class BackfillFileSizesCommandTests(TestCase):
+
+    def test_backfill_stores_sizes_from_folder_listings(self):
+        user = User.objects.create_user(username='foo', password='bar')
+        (folder, _) = ChrisFolder.objects.get_or_create(path='home/foo/uploads',
+                                                        owner=user)
+        paths = ['home/foo/uploads/file1.txt', 'home/foo/uploads/file2.txt']
+        for path in paths:
+            f = ChrisFile(parent_folder=folder, owner=user)
+            f.fname.name = path
+            f.save()
+
+        storage_manager_mock = mock.Mock()
+        storage_manager_mock.ls_info.return_value = [ObjectInfo(paths[0], 10, 'etag')]
+        with mock.patch('core.management.commands.backfill_file_sizes.connect_storage',
+                        return_value=storage_manager_mock):
+            call_command('backfill_file_sizes', stdout=io.StringIO())
+
+        storage_manager_mock.ls_info.assert_called_once_with('home/foo/uploads')
+        self.assertEqual(ChrisFile.objects.get(fname=paths[0]).size, 10)
+        self.assertIsNone(ChrisFile.objects.get(fname=paths[1]).size)  # not in storage
@@ -5,11 +5,15 @@ import os
 from unittest import mock
 
 from django.test import TestCase, tag
+from django.test.utils import CaptureQueriesContext
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import connection
 
-from core.models import (ChrisFolder, ChrisFile, ChrisLinkFile, PathAccessError,
-                         validate_path_access, user_can_access_obj)
+from core.models import (ChrisFolder, ChrisFile, ChrisLinkFile, FolderUserPermission,
+                         PathAccessError, validate_path_access, user_can_access_obj,
+                         deferred_storage_deletion, PermissionResolver,
+                         permission_resolution_scope)
 from core.storage import connect_storage
 from userfiles.models import UserFile
 
@@ -54,6 +58,129 @@ class ChrisFolderModelTests(ModelTests):
         self.assertEqual(folder.path, 'home')
 
 
+    def test_mark_move_pending_only_succeeds_once(self):
+        """
+        Test whether custom mark_move_pending method only marks a folder that is not
+        already pending a move, even through a stale instance.
+        """
+        user = User.objects.get(username=self.username)
+        folder, _ = ChrisFolder.objects.get_or_create(path='home/moving', owner=user)
+        stale_folder = ChrisFolder.objects.get(pk=folder.pk)
+
+        self.assertTrue(folder.mark_move_pending('home/moved'))
+        self.assertEqual(folder.move_status, ChrisFolder.MoveStatus.PENDING)
+        self.assertFalse(stale_folder.mark_move_pending('home/other'))
+        folder.refresh_from_db()
+        self.assertEqual(folder.move_target_path, 'home/moved')
+
+    def test_get_moving_folder(self):
+        """
+        Test whether custom get_moving_folder class method returns the folder being
+        moved from or to the passed path, its ancestors or its descendants.
+        """
+        user = User.objects.get(username=self.username)
+        folder, _ = ChrisFolder.objects.get_or_create(path='home/moving/inner',
+                                                      owner=user)
+        self.assertIsNone(ChrisFolder.get_moving_folder('home/moving'))
+        folder.mark_move_pending('home/moved/inner')
+
+        for path in ('home/moving', 'home/moving/inner/file.txt', 'home/moved',
+                     'home/moved/inner/sub'):
+            self.assertEqual(ChrisFolder.get_moving_folder(path), folder)
+        self.assertIsNone(ChrisFolder.get_moving_folder('home/moving_other'))
+
+
+    def test_deferred_storage_deletion(self):
+        """
+        Test whether deleting a folder within a deferred_storage_deletion context
+        deletes the storage data of all its files with a single batch request.
+        """
+        owner = User.objects.get(username=self.username)
+        folder = ChrisFolder.objects.create(path=f'home/{self.username}/tmp/a',
+                                            owner=owner)
+        paths = [f'home/{self.username}/tmp/a/file1.txt',
+                 f'home/{self.username}/tmp/a/b/file2.txt']
+        for path in paths:
+            (parent_folder, _) = ChrisFolder.objects.get_or_create(
+                path=os.path.dirname(path), owner=owner)
+            f = ChrisFile(parent_folder=parent_folder, owner=owner)
+            f.fname.name = path
+            f.save()
+
+        storage_manager_mock = mock.Mock()
+        storage_manager_mock.path_exists = mock.Mock(return_value=False)
+        with mock.patch('core.models.connect_storage') as connect_storage_mock:
+            connect_storage_mock.return_value = storage_manager_mock
+            with deferred_storage_deletion():
+                ChrisFolder.objects.get(path=f'home/{self.username}/tmp').delete()
+                storage_manager_mock.delete_objs.assert_not_called()
+
+        storage_manager_mock.obj_exists.assert_not_called()
+        storage_manager_mock.delete_obj.assert_not_called()
+        storage_manager_mock.delete_objs.assert_called_once()
+        self.assertEqual(sorted(storage_manager_mock.delete_objs.call_args[0][0]),
+                         sorted(paths))
+        storage_manager_mock.path_exists.assert_called_once_with(
+            f'home/{self.username}/tmp')
+        self.assertFalse(ChrisFile.objects.filter(fname__in=paths).exists())
+
+    def test_deferred_storage_deletion_query_count(self):
+        """
+        Test whether the number of DB queries made when deleting a folder within a
+        deferred_storage_deletion context doesn't depend on the number of its files.
+        """
+        owner = User.objects.get(username=self.username)
+        storage_manager_mock = mock.Mock()
+        storage_manager_mock.path_exists = mock.Mock(return_value=False)
+
+        n_queries = []
+        for n_files in (2, 40):
+            path = f'home/{self.username}/tmp{n_files}'
+            folder = ChrisFolder.objects.create(path=f'{path}/a', owner=owner)
+            for i in range(n_files):
+                f = ChrisFile(parent_folder=folder, owner=owner)
+                f.fname.name = f'{path}/a/file{i}.txt'
+                f.save()
+
+            with mock.patch('core.models.connect_storage') as connect_storage_mock:
+                connect_storage_mock.return_value = storage_manager_mock
+                with CaptureQueriesContext(connection) as queries:
+                    with deferred_storage_deletion():
+                        ChrisFolder.objects.get(path=path).delete()
+            n_queries.append(len(queries))
+            self.assertFalse(ChrisFile.objects.filter(
+                fname__startswith=path + '/').exists())
+        self.assertEqual(n_queries[0], n_queries[1])
+
+    def test_permissions_are_inherited_by_descendants(self):
+        """
+        Test whether a user permission granted to a folder is inherited by all the
+        folders and files under it without creating permission rows for them.
+        """
+        owner = User.objects.get(username=self.username)
+        other = User.objects.create_user(username='other', password='other-pass')
+        folder = ChrisFolder.objects.create(path=f'home/{self.username}/shared',
+                                            owner=owner)
+        inner_folder = ChrisFolder.objects.create(
+            path=f'home/{self.username}/shared/a/b', owner=owner)
+        f = ChrisFile(parent_folder=inner_folder, owner=owner)
+        f.fname.name = f'home/{self.username}/shared/a/b/file.txt'
+        f.save()
+
+        folder.grant_user_permission(other, 'r')
+
+        self.assertTrue(inner_folder.has_user_permission(other))
+        self.assertTrue(inner_folder.has_user_permission(other, 'r'))
+        self.assertFalse(inner_folder.has_user_permission(other, 'w'))
+        self.assertTrue(f.has_user_permission(other, 'r'))
+        self.assertFalse(inner_folder.get_users_permissions_queryset().exists())
+        self.assertFalse(f.get_users_permissions_queryset().exists())
+
+        folder.remove_user_permission(other, 'r')
+        self.assertFalse(inner_folder.has_user_permission(other))
+        self.assertFalse(f.has_user_permission(other))
+
+
 class ChrisFileModelTests(ModelTests):
 
     def setUp(self):
@@ -90,6 +217,33 @@ class ChrisFileModelTests(ModelTests):
             self.assertEqual(self.file.parent_folder.path, f'home/{self.username}/tests')
             storage_manager_mock.delete_obj.assert_called_with(self.upload_path)
 
+    def test_get_size(self):
+        """
+        Test whether custom 'get_size' method returns the stored size without
+        accessing storage and falls back to storage when the size is unknown.
+        """
+        self.file.size = 10
+        with mock.patch.object(type(self.file.fname), 'size',
+                               new_callable=mock.PropertyMock) as size_mock:
+            size_mock.return_value = 20
+            self.assertEqual(self.file.get_size(), 10)
+            size_mock.assert_not_called()
+            self.file.size = None
+            self.assertEqual(self.file.get_size(), 20)
+        self.assertEqual(ChrisFile.objects.get(pk=self.file.pk).size, 20)
+
+    def test_save_does_not_access_storage_for_files_registered_by_path(self):
+        """
+        Test whether overriden 'save' method doesn't fetch the size from storage of a
+        file registered by path without a size.
+        """
+        f = ChrisFile(parent_folder=self.file.parent_folder, owner=self.file.owner)
+        f.fname.name = f'home/{self.username}/uploads/file2.txt'
+        with mock.patch.object(type(f.fname), 'size',
+                               new_callable=mock.PropertyMock) as size_mock:
+            f.save()
+            size_mock.assert_not_called()
+        self.assertIsNone(f.size)
 
 class UserCanAccessObjTests(ModelTests):
     """
@@ -126,6 +280,83 @@ class UserCanAccessObjTests(ModelTests):
         self.assertTrue(user_can_access_obj(folder, user))
 
 
+class PermissionResolverTests(ModelTests):
+    """
+    Tests for the batched ``PermissionResolver``.
+    """
+
+    def setUp(self):
+        super(PermissionResolverTests, self).setUp()
+        self.owner = User.objects.get(username=self.username)
+        self.other = User.objects.create_user(username='other', password='other-pass')
+        self.folder = ChrisFolder.objects.create(path=f'home/{self.username}/data',
+                                                 owner=self.owner)
+        self.files = []
+        for i in range(20):
+            f = ChrisFile(parent_folder=self.folder, owner=self.owner)
+            f.fname.name = f'home/{self.username}/data/file{i}.txt'
+            f.save()
+            self.files.append(f)
+
+    def test_filter_accessible_uses_constant_number_of_queries(self):
+        """
+        Test whether the access to a batch of files is resolved with one query for
+        the user's groups, one for the folder grants and one for the file grants
+        regardless of the number of files.
+        """
+        self.files[3].grant_user_permission(self.other, 'r')
+        resolver = PermissionResolver(self.other)
+
+        with self.assertNumQueries(3):
+            accessible = resolver.filter_accessible(self.files)
+        self.assertEqual(accessible, [self.files[3]])
+
+        self.folder.grant_user_permission(self.other, 'r')
+        resolver = PermissionResolver(self.other)
+
+        with self.assertNumQueries(2):  # all granted through the folder
+            accessible = resolver.filter_accessible(self.files)
+        self.assertEqual(accessible, self.files)
+
+    def test_resolvers_are_shared_within_a_resolution_scope(self):
+        """
+        Test whether repeated access checks within a resolution scope are answered
+        from the shared resolver's cache and whether changes to the grants clear it.
+        """
+        with permission_resolution_scope():
+            self.assertFalse(self.folder.has_user_permission(self.other))
+
+            with self.assertNumQueries(0):
+                self.assertFalse(self.folder.has_user_permission(self.other))
+                self.assertFalse(user_can_access_obj(self.folder, self.other))
+
+            self.folder.grant_user_permission(self.other, 'r')
+            self.assertTrue(self.folder.has_user_permission(self.other))
+
+            self.folder.remove_user_permission(self.other, 'r')
+            self.assertFalse(self.folder.has_user_permission(self.other))
+
+    def test_bulk_permission_changes_clear_shared_resolvers(self):
+        """
+        Test whether grants revoked or changed in bulk through the permission
+        querysets are seen by the resolvers shared within a resolution scope.
+        """
+        with permission_resolution_scope():
+            self.folder.grant_user_permission(self.other, 'w')
+            self.assertTrue(self.folder.has_user_permission(self.other, 'w'))
+
+            FolderUserPermission.objects.filter(folder=self.folder).update(
+                permission='r')
+            self.assertFalse(self.folder.has_user_permission(self.other, 'w'))
+
+            FolderUserPermission.objects.filter(folder=self.folder).delete()
+            self.assertFalse(self.folder.has_user_permission(self.other))
+
+            FolderUserPermission.objects.bulk_create(
+                [FolderUserPermission(folder=self.folder, user=self.other)])
+            self.assertTrue(self.folder.has_user_permission(self.other))
+
+
 class ValidatePathAccessTests(ModelTests):
     """
     Tests for the centralized ``validate_path_access`` path-access
@@ -83,12 +83,75 @@ class FilesystemManagerCRUDTests(TestCase):
         result = self.manager.ls('test/single.txt')
         self.assertEqual(result, ['test/single.txt'])
 
+    def test_ls_info(self):
+        """ls_info returns the path and size of every object under the prefix."""
+        self.manager.upload_obj('test/info/a.txt', b'a')
+        self.manager.upload_obj('test/info/sub/bc.txt', b'bc')
+        result = sorted(self.manager.ls_info('test/info'))
+        self.assertEqual([(info.path, info.size) for info in result],
+                         [('test/info/a.txt', 1), ('test/info/sub/bc.txt', 2)])
+        self.assertTrue(all(info.etag for info in result))
+
+    def test_obj_info(self):
+        self.manager.upload_obj('test/info.txt', b'some data')
+        info = self.manager.obj_info('test/info.txt')
+        self.assertEqual((info.path, info.size), ('test/info.txt', 9))
+        self.assertTrue(info.etag)
+
+    def test_download_obj_range(self):
+        self.manager.upload_obj('test/range.txt', b'0123456789')
+        chunks = self.manager.download_obj_range('test/range.txt', 2, 7, chunk_size=4)
+        self.assertEqual(b''.join(chunks), b'234567')
+
+    async def test_adownload_obj_range(self):
+        self.manager.upload_obj('test/arange.txt', b'0123456789')
+        chunks = [chunk async for chunk in self.manager.adownload_obj_range(
+            'test/arange.txt', 2, 7, chunk_size=4)]
+        self.assertEqual(chunks, [b'2345', b'67'])
+
+    def test_chunked_upload(self):
+        upload_id = self.manager.start_chunked_upload('test/chunked.bin')
+        parts = [self.manager.upload_chunk('test/chunked.bin', upload_id, 1, 0, b'abc')]
+        # a retried chunk replaces the data of the previous attempt
+        self.manager.upload_chunk('test/chunked.bin', upload_id, 2, 3, b'xyz!')
+        parts.append(self.manager.upload_chunk('test/chunked.bin', upload_id, 2, 3,
+                                               b'de'))
+        self.assertFalse(self.manager.obj_exists('test/chunked.bin'))
+        self.manager.complete_chunked_upload('test/chunked.bin', upload_id, parts)
+        self.assertEqual(self.manager.download_obj('test/chunked.bin'), b'abcde')
+
+    def test_ls_hides_chunked_uploads(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = FilesystemManager(tmp)
+            upload_id = manager.start_chunked_upload('test/pending.bin')
+            manager.upload_chunk('test/pending.bin', upload_id, 1, 0, b'data')
+            manager.upload_obj('test/file.txt', b'data')
+            self.assertEqual(manager.ls(''), ['test/file.txt'])
+            self.assertEqual([info.path for info in manager.ls_info('')],
+                             ['test/file.txt'])
+
+    def test_abort_chunked_upload(self):
+        upload_id = self.manager.start_chunked_upload('test/aborted.bin')
+        self.manager.upload_chunk('test/aborted.bin', upload_id, 1, 0, b'data')
+        self.manager.abort_chunked_upload('test/aborted.bin', upload_id)
+        self.manager.abort_chunked_upload('test/aborted.bin', upload_id)  # idempotent
+        self.assertFalse(self.manager.obj_exists('test/aborted.bin'))
+        self.assertEqual(self.manager.ls('test'), [])
+
     def test_delete_obj(self):
         self.manager.upload_obj('test/del.txt', b'delete me')
         self.assertTrue(self.manager.obj_exists('test/del.txt'))
         self.manager.delete_obj('test/del.txt')
         self.assertFalse(self.manager.obj_exists('test/del.txt'))
 
+    def test_delete_objs(self):
+        """delete_objs deletes all the given files and ignores missing ones."""
+        self.manager.upload_obj('test/delmany/a.txt', b'a')
+        self.manager.upload_obj('test/delmany/sub/b.txt', b'b')
+        self.manager.delete_objs(['test/delmany/a.txt', 'test/delmany/sub/b.txt',
+                                  'test/delmany/missing.txt'])
+        self.assertEqual(self.manager.ls('test/delmany'), [])
+
     def test_copy_obj(self):
         self.manager.upload_obj('test/src.txt', b'copy me')
         self.manager.copy_obj('test/src.txt', 'test/dst.txt')
@@ -88,6 +88,43 @@ class S3ManagerCRUDTests(TestCase):
         result = self.manager.ls('')
         self.assertEqual(result, [])
 
+    def test_obj_info(self):
+        self.manager.upload_obj('test/info.txt', b'some data')
+        info = self.manager.obj_info('test/info.txt')
+        self.assertEqual((info.path, info.size), ('test/info.txt', 9))
+        self.assertTrue(info.etag)
+
+    def test_download_obj_range(self):
+        self.manager.upload_obj('test/range.txt', b'0123456789')
+        chunks = self.manager.download_obj_range('test/range.txt', 2, 7, chunk_size=4)
+        self.assertEqual(b''.join(chunks), b'234567')
+
+    def test_get_download_url(self):
+        self.manager.upload_obj('test/presigned.txt', b'data')
+        url = self.manager.get_download_url('test/presigned.txt', 60, 'presigned.txt')
+        self.assertIn('test/presigned.txt', url)
+        self.assertIn('X-Amz-Signature=', url)
+        self.assertIn('X-Amz-Expires=60', url)
+
+    def test_chunked_upload(self):
+        part_size = self.manager.min_upload_chunk_size
+        upload_id = self.manager.start_chunked_upload('test/chunked.bin')
+        parts = [self.manager.upload_chunk('test/chunked.bin', upload_id, 1, 0,
+                                           b'a' * part_size),
+                 self.manager.upload_chunk('test/chunked.bin', upload_id, 2, part_size,
+                                           b'b')]
+        self.assertFalse(self.manager.obj_exists('test/chunked.bin'))
+        self.manager.complete_chunked_upload('test/chunked.bin', upload_id, parts)
+        self.assertEqual(self.manager.download_obj('test/chunked.bin'),
+                         b'a' * part_size + b'b')
+
+    def test_abort_chunked_upload(self):
+        upload_id = self.manager.start_chunked_upload('test/aborted.bin')
+        self.manager.upload_chunk('test/aborted.bin', upload_id, 1, 0, b'data')
+        self.manager.abort_chunked_upload('test/aborted.bin', upload_id)
+        self.manager.abort_chunked_upload('test/aborted.bin', upload_id)  # idempotent
+        self.assertFalse(self.manager.obj_exists('test/aborted.bin'))
+
     def test_delete_obj(self):
         self.manager.upload_obj('test/del.txt', b'delete me')
         self.assertTrue(self.manager.obj_exists('test/del.txt'))
@@ -0,0 +1,101 @@
+"""
+Unit tests for the storage connection helpers.
+
+These tests always run regardless of STORAGE_ENV since they only use the
+FilesystemManager and in-memory fake connections.
+"""
+
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from core.storage import connect_storage
+from core.storage import helpers
+from core.storage.pool import ConnectionPool
+from core.storage.storagemanager import run_concurrently
+
+
+class ConnectionPoolTests(TestCase):
+
+    def test_connections_are_created_lazily_and_reused(self):
+        connect = mock.Mock(side_effect=lambda: object())
+        pool = ConnectionPool(connect, max_size=2)
+        connect.assert_not_called()
+
+        with pool.connection() as conn1:
+            pass
+        with pool.connection() as conn2:
+            pass
+        self.assertIs(conn1, conn2)
+        self.assertEqual(pool.get_stats(), {'opened': 1, 'reused': 1})
+
+    def test_concurrent_checkouts_open_new_connections(self):
+        pool = ConnectionPool(lambda: object(), max_size=2)
+        with pool.connection() as conn1:
+            with pool.connection() as conn2:
+                self.assertIsNot(conn1, conn2)
+        self.assertEqual(pool.get_stats(), {'opened': 2, 'reused': 0})
+
+    def test_connection_is_returned_to_pool_on_error(self):
+        pool = ConnectionPool(lambda: object(), max_size=1)
+        with self.assertRaises(ValueError):
+            with pool.connection():
+                raise ValueError('boom')
+        with pool.connection():
+            pass
+        self.assertEqual(pool.get_stats(), {'opened': 1, 'reused': 1})
+
+    def test_max_size_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            ConnectionPool(lambda: object(), max_size=0)
+
+
+class RunConcurrentlyTests(TestCase):
+
+    def test_calls_fn_on_every_item_and_reports_progress(self):
+        results = []
+        progress = mock.Mock()
+        run_concurrently(results.append, range(5), max_workers=3, progress=progress)
+        self.assertEqual(sorted(results), [0, 1, 2, 3, 4])
+        self.assertEqual(progress.call_count, 5)
+        progress.assert_called_with(5, 5)
+
+    def test_reraises_first_error(self):
+        def fail_on_odd(item):
+            if item % 2:
+                raise ValueError(item)
+
+        with self.assertRaises(ValueError):
+            run_concurrently(fail_on_odd, range(10), max_workers=2)
+
+
+class ConnectStorageTests(TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.settings = helpers._DummySettings({
+            'STORAGES': {'default': {'BACKEND': 'fake.FileSystemStorage'}},
+            'MEDIA_ROOT': self._tmp.name
+        })
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_connect_storage_returns_shared_manager(self):
+        manager = connect_storage(self.settings)
+        self.assertIs(connect_storage(self.settings), manager)
+
+    def test_connect_storage_returns_different_manager_for_different_settings(self):
+        manager = connect_storage(self.settings)
+        with tempfile.TemporaryDirectory() as other_tmp:
+            other_settings = helpers._DummySettings({
+                'STORAGES': self.settings.STORAGES,
+                'MEDIA_ROOT': other_tmp
+            })
+            self.assertIsNot(connect_storage(other_settings), manager)
+
+    def test_reset_storage_managers_discards_cached_managers(self):
+        manager = connect_storage(self.settings)
+        helpers._reset_storage_managers()
+        self.assertIsNot(connect_storage(self.settings), manager)
@@ -12,6 +12,7 @@ Run via justfile:
 """
 
 import unittest
+import unittest.mock
 
 from django.conf import settings
 from django.test import TestCase, tag
@@ -89,11 +90,66 @@ class SwiftManagerCRUDTests(TestCase):
         result = self.manager.ls('')
         self.assertEqual(result, [])
 
+    def test_obj_info(self):
+        self.manager.upload_obj('test/info.txt', b'some data')
+        info = self.manager.obj_info('test/info.txt')
+        self.assertEqual((info.path, info.size), ('test/info.txt', 9))
+        self.assertTrue(info.etag)
+
+    def test_download_obj_range(self):
+        self.manager.upload_obj('test/range.txt', b'0123456789')
+        chunks = self.manager.download_obj_range('test/range.txt', 2, 7, chunk_size=4)
+        self.assertEqual(b''.join(chunks), b'234567')
+
+    def test_download_obj_range_does_not_hold_pooled_connection(self):
+        manager = SwiftManager(settings.SWIFT_CONTAINER_NAME,
+                               settings.SWIFT_CONNECTION_PARAMS, max_connections=1)
+        manager.upload_obj('test/range.txt', b'0123456789')
+        chunks = manager.download_obj_range('test/range.txt', 0, 9, chunk_size=4)
+        self.assertEqual(next(chunks), b'0123')
+        # the only pooled connection is available while the range is being read
+        self.assertTrue(manager.obj_exists('test/range.txt'))
+        self.assertEqual(b''.join(chunks), b'456789')
+
+    def test_get_download_url(self):
+        self.assertIsNone(self.manager.get_download_url('test/temp url.txt', 60))
+        manager = SwiftManager(settings.SWIFT_CONTAINER_NAME,
+                               settings.SWIFT_CONNECTION_PARAMS, temp_url_key='secret')
+        url = manager.get_download_url('test/temp url.txt', 60, 'temp url.txt')
+        self.assertIn(f'/{settings.SWIFT_CONTAINER_NAME}/test/temp%20url.txt'
+                      f'?temp_url_sig=', url)
+        self.assertIn('&filename=temp+url.txt', url)
+
+    def test_chunked_upload(self):
+        upload_id = self.manager.start_chunked_upload('test/chunked.bin')
+        parts = [self.manager.upload_chunk('test/chunked.bin', upload_id, 1, 0, b'abc'),
+                 self.manager.upload_chunk('test/chunked.bin', upload_id, 2, 3, b'de')]
+        self.assertFalse(self.manager.obj_exists('test/chunked.bin'))
+        self.manager.complete_chunked_upload('test/chunked.bin', upload_id, parts)
+        self.assertEqual(self.manager.download_obj('test/chunked.bin'), b'abcde')
+
+        # the segments are deleted along with the manifest
+        self.manager.delete_obj('test/chunked.bin')
+        with self.manager._pool.connection() as conn:
+            _, listing = conn.get_container(self.manager.segments_container_name,
+                                            prefix=upload_id + '/')
+        self.assertEqual(listing, [])
+
+    def test_abort_chunked_upload(self):
+        upload_id = self.manager.start_chunked_upload('test/aborted.bin')
+        self.manager.upload_chunk('test/aborted.bin', upload_id, 1, 0, b'data')
+        self.manager.abort_chunked_upload('test/aborted.bin', upload_id)
+        with self.manager._pool.connection() as conn:
+            _, listing = conn.get_container(self.manager.segments_container_name,
+                                            prefix=upload_id + '/')
+        self.assertEqual(listing, [])
+
     def test_delete_obj(self):
         self.manager.upload_obj('test/del.txt', b'delete me')
         self.assertTrue(self.manager.obj_exists('test/del.txt'))
         self.manager.delete_obj('test/del.txt')
         self.assertFalse(self.manager.obj_exists('test/del.txt'))
+        self.manager.delete_obj('test/del.txt')  # already deleted
 
     def test_copy_obj(self):
         self.manager.upload_obj('test/src.txt', b'copy me')
@@ -142,6 +198,42 @@ class SwiftManagerPathOpsTests(TestCase):
         self.assertTrue(self.manager.obj_exists('test/mv2/a.txt'))
         self.assertEqual(self.manager.download_obj('test/mv2/sub/b.txt'), b'b')
 
+    def _upload_chunked(self, path):
+        upload_id = self.manager.start_chunked_upload(path)
+        parts = [self.manager.upload_chunk(path, upload_id, 1, 0, b'abc'),
+                 self.manager.upload_chunk(path, upload_id, 2, 3, b'de')]
+        self.manager.complete_chunked_upload(path, upload_id, parts)
+
+    def _get_segments(self):
+        with self.manager._pool.connection() as conn:
+            _, listing = conn.get_container(self.manager.segments_container_name,
+                                            full_listing=True)
+        return [d_obj['name'] for d_obj in listing]
+
+    def test_move_and_delete_path_with_chunked_upload(self):
+        segments = self._get_segments()
+        self._upload_chunked('test/mvslo/chunked.bin')
+        self.manager.upload_obj('test/mvslo/a.txt', b'a')
+        self.manager.move_path('test/mvslo/', 'test/mvslo2/')
+        self.assertFalse(self.manager.obj_exists('test/mvslo/chunked.bin'))
+        self.assertEqual(self.manager.download_obj('test/mvslo2/chunked.bin'), b'abcde')
+
+        # the segments are deleted along with the moved manifest
+        self.manager.delete_path('test/mvslo2/')
+        self.assertEqual(self.manager.ls('test/mvslo2/'), [])
+        self.assertEqual(self._get_segments(), segments)
+
+    def test_copy_path_and_delete_objs_with_chunked_upload(self):
+        segments = self._get_segments()
+        self._upload_chunked('test/cpslo/chunked.bin')
+        self.manager.copy_path('test/cpslo/', 'test/cpslo2/')
+
+        # the copy doesn't share the segments of the original
+        self.manager.delete_objs(['test/cpslo/chunked.bin'])
+        self.assertEqual(self.manager.download_obj('test/cpslo2/chunked.bin'), b'abcde')
+        self.manager.delete_objs(['test/cpslo2/chunked.bin'])
+        self.assertEqual(self._get_segments(), segments)
+
     def test_delete_path(self):
         self.manager.upload_obj('test/delpath/a.txt', b'a')
         self.manager.upload_obj('test/delpath/b.txt', b'b')
@@ -209,3 +301,16 @@ class SwiftManagerLargeOpsTests(TestCase):
             self.manager.upload_obj(f'test/bulk/{i:04d}.dat', b'x')
         self.manager.delete_path('test/bulk/')
         self.assertEqual(self.manager.ls('test/bulk/'), [])
+
+    def test_delete_objs_without_bulk_delete_support(self):
+        for i in range(3):
+            self.manager.upload_obj(f'test/bulk/{i:04d}.dat', b'x')
+        paths = [f'test/bulk/{i:04d}.dat' for i in range(3)] + ['test/bulk/missing.dat']
+        self.manager._max_bulk_deletes = 0
+        try:
+            with unittest.mock.patch.object(self.manager, 'obj_exists') as exists_mock:
+                self.manager.delete_objs(paths)  # missing objects are ignored
+                exists_mock.assert_not_called()
+        finally:
+            self.manager._max_bulk_deletes = None
+        self.assertEqual(self.manager.ls('test/bulk/'), [])
@@ -0,0 +1,74 @@
+import logging
+import os
+
+from django.test import TestCase, SimpleTestCase
+from django.contrib.auth.models import User
+
+from core.models import ChrisFolder, ChrisFile
+from core.utils import filter_files_by_n_slashes, parse_range_header
+
+
+class FilterFilesByNSlashesTests(TestCase):
+
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+        self.user = User.objects.create_user(username='foo', password='bar')
+        self.paths = ['home/foo/uploads/a.txt',
+                      'home/foo/uploads/b.txt',
+                      'home/foo/uploads/dir1/c.txt',
+                      'home/foo/uploads/dir1/d.txt',
+                      'home/foo/uploads/dir2/e.txt']
+        for path in self.paths:
+            (folder, _) = ChrisFolder.objects.get_or_create(path=os.path.dirname(path),
+                                                            owner=self.user)
+            f = ChrisFile(parent_folder=folder, owner=self.user)
+            f.fname.name = path
+            f.save()
+        self.queryset = ChrisFile.objects.filter(fname__startswith='home/foo/uploads/')
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_fname_depth_is_the_number_of_slashes(self):
+        f = ChrisFile.objects.get(fname='home/foo/uploads/dir1/c.txt')
+        self.assertEqual(f.fname_depth, 4)
+
+    def test_filter_files_by_n_slashes(self):
+        qs = filter_files_by_n_slashes(self.queryset, '4')
+        self.assertEqual(sorted(f.fname.name for f in qs), self.paths[2:])
+
+    def test_filter_files_by_n_slashes_unique_per_folder(self):
+        qs = filter_files_by_n_slashes(self.queryset, '4u')
+        folders = sorted(os.path.dirname(f.fname.name) for f in qs)
+        self.assertEqual(folders, ['home/foo/uploads/dir1', 'home/foo/uploads/dir2'])
+
+    def test_filter_files_by_n_slashes_invalid_value(self):
+        qs = filter_files_by_n_slashes(self.queryset, 'x')
+        self.assertEqual(qs.count(), len(self.paths))
+
+
+class ParseRangeHeaderTests(SimpleTestCase):
+
+    def test_single_ranges(self):
+        self.assertEqual(parse_range_header('bytes=0-499', 1000), [(0, 499)])
+        self.assertEqual(parse_range_header('bytes=500-', 1000), [(500, 999)])
+        self.assertEqual(parse_range_header('bytes=-200', 1000), [(800, 999)])
+        self.assertEqual(parse_range_header('bytes=900-1999', 1000), [(900, 999)])
+        self.assertEqual(parse_range_header('bytes=-2000', 1000), [(0, 999)])
+
+    def test_multiple_ranges_are_sorted_and_coalesced(self):
+        self.assertEqual(parse_range_header('bytes=500-599, 0-99, 50-149, 150-199', 1000),
+                         [(0, 199), (500, 599)])
+
+    def test_unsatisfiable_ranges(self):
+        self.assertEqual(parse_range_header('bytes=1000-1099', 1000), [])
+        self.assertEqual(parse_range_header('bytes=-0', 1000), [])
+        self.assertEqual(parse_range_header('bytes=0-99', 0), [])
+        self.assertEqual(parse_range_header('bytes=1000-, 0-9', 1000), [(0, 9)])
+
+    def test_invalid_headers_are_ignored(self):
+        for header in ('items=0-9', 'bytes=', 'bytes=a-b', 'bytes=-', 'bytes=9-0',
+                       '0-9'):
+            self.assertIsNone(parse_range_header(header, 1000), header)
+        self.assertIsNone(parse_range_header('bytes=0-0,2-2,4-4', 1000, max_ranges=2))
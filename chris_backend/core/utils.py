@@ -1,8 +1,12 @@
 
 import os
+import re
 import json
 import zlib, base64
 
+from asgiref.sync import sync_to_async
+from django.db import connection
+
 
 def get_file_resource_link(file_serializer, obj):
     """
@@ -47,11 +51,7 @@ def filter_files_by_n_slashes(queryset, value):
             val = int(value)
     except Exception:
         return queryset
-    lookup = r'^[^/]+'
-    for i in range(val):
-        lookup += '/[^/]+'
-    lookup += '$'
-    qs = queryset.filter(fname__regex=lookup)
+    qs = queryset.filter(fname_depth=val)
     if value.endswith('u'):
         return unique_files_queryset_by_folder(qs)
     return qs
@@ -62,13 +62,90 @@ def unique_files_queryset_by_folder(queryset):
     Utility function to return only one file per each last "folder" in the path
     (useful to efficiently get the list of immediate folders under the path).
     """
-    ids = []
-    hash_set = set()
-    for f in queryset.all():
-        path = f.fname.name
-        last_slash_ix = path.rindex('/')
-        path = path[:last_slash_ix]
-        if path not in hash_set:
-            ids.append(f.id)
-            hash_set.add(path)
-    return queryset.filter(pk__in=ids)
+    first_file_ids = queryset.order_by('parent_folder_id', 'id').distinct(
+        'parent_folder_id').values('id')
+    return queryset.filter(pk__in=first_file_ids)
+
+
+def reserve_primary_keys(model, count):
+    """
+    Utility function to reserve ``count`` primary keys from the DB sequence of a
+    model's table. This allows bulk creating objects that reference each other
+    (e.g. trees) in a single INSERT query per model.
+    """
+    if count < 1:
+        return []
+    table = model._meta.db_table
+    column = model._meta.pk.column
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                       'FROM generate_series(1, %s)', [table, column, count])
+        return [row[0] for row in cursor.fetchall()]
+
+
+_RANGE_SPEC_RE = re.compile(r'(\d*)\s*-\s*(\d*)')
+
+
+def parse_range_header(header, size, max_ranges=100):
+    """
+    Utility function to parse the value of an HTTP Range header (e.g.
+    "bytes=0-499, -500") for a file of the given size. Returns None if the header
+    is not a valid bytes range set (or has more than ``max_ranges`` ranges) and must
+    be ignored, otherwise the sorted list of satisfiable (start, end) ranges, both
+    inclusive, with overlapping or adjacent ranges coalesced. The list is empty if
+    none of the ranges is satisfiable.
+    """
+    unit, sep, range_set = header.partition('=')
+    if not sep or unit.strip().lower() != 'bytes':
+        return None
+    specs = [spec.strip() for spec in range_set.split(',') if spec.strip()]
+    if not specs or len(specs) > max_ranges:
+        return None
+
+    ranges = []
+    for spec in specs:
+        match = _RANGE_SPEC_RE.fullmatch(spec)
+        if match is None or not any(match.groups()):
+            return None
+        (first, last) = match.groups()
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if end < start and last:
+                return None
+            if start >= size:
+                continue  # unsatisfiable
+            end = min(end, size - 1)
+        else:
+            suffix_length = int(last)
+            if suffix_length == 0 or size == 0:
+                continue  # unsatisfiable
+            start = max(size - suffix_length, 0)
+            end = size - 1
+        ranges.append((start, end))
+
+    coalesced = []
+    for (start, end) in sorted(ranges):
+        if coalesced and start <= coalesced[-1][1] + 1:
+            coalesced[-1] = (coalesced[-1][0], max(end, coalesced[-1][1]))
+        else:
+            coalesced.append((start, end))
+    return coalesced
+
+
+async def aiter_in_thread(iterator, thread_sensitive=True):
+    """
+    Utility function to asynchronously iterate over a synchronous iterator (e.g. a
+    generator of response content) getting every item with ``sync_to_async``. The
+    iterator must be thread sensitive if it makes DB queries.
+    """
+    iterator = iter(iterator)
+    get_next = sync_to_async(next, thread_sensitive=thread_sensitive)
+    end = object()
+    try:
+        while (item := await get_next(iterator, end)) is not end:
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=thread_sensitive)()
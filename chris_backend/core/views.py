@@ -1,9 +1,15 @@
 
 import logging
+import mimetypes
 import uuid
+from pathlib import Path
+from urllib.parse import quote
 import jwt
 
 from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (HttpResponse, HttpResponseNotModified, HttpResponseRedirect,
+                         StreamingHttpResponse)
 from django.utils import timezone
 from django.conf import settings
 from rest_framework import generics, permissions
@@ -11,11 +17,15 @@ from rest_framework.reverse import reverse
 from rest_framework import exceptions
 from rest_framework.authentication import TokenAuthentication
 from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiTypes
 
 from collectionjson import services
 from .models import ChrisInstance, FileDownloadToken, FileDownloadTokenFilter
 from .serializers import ChrisInstanceSerializer, FileDownloadTokenSerializer
 from .permissions import IsOwnerOrChris
+from .renderers import BinaryFileRenderer
+from .storage import connect_storage
+from .utils import parse_range_header, aiter_in_thread
 
 
 logger = logging.getLogger(__name__)
@@ -170,3 +180,185 @@ class TokenAuthSupportQueryStringScheme(OpenApiAuthenticationExtension):
             'in': 'header',
             'name': 'download_token'
         }
+
+
+class FileResourceView(generics.GenericAPIView):
+    """
+    Base view to download the data of a file resource. The data is streamed from the
+    storage service and the view supports conditional requests (If-None-Match and
+    If-Range) with the ETag of the stored file and single and multiple byte-range
+    requests, which only read the requested ranges from storage.
+
+    Depending on the FILE_DOWNLOAD_OFFLOAD setting, the data can instead be served by
+    the storage service (redirect to a signed URL) or the front web server
+    (X-Accel-Redirect/X-Sendfile) once the permission checks have passed.
+    """
+    http_method_names = ['get']
+    renderer_classes = (BinaryFileRenderer,)
+
+    @extend_schema(responses=OpenApiResponse(OpenApiTypes.BINARY))
+    def get(self, request, *args, **kwargs):
+        """
+        Overriden to be able to make a GET request to an actual file resource.
+        """
+        f = self.get_object().fname
+        storage_manager = connect_storage(settings)
+        resp = offload_download_response(storage_manager, f.name)
+        if resp is not None:
+            return resp
+
+        info = storage_manager.obj_info(f.name)
+        etag = f'"{info.etag}"'
+
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            resp = HttpResponseNotModified()
+            resp['ETag'] = etag
+            return resp
+
+        ranges = None
+        if 'Range' in request.headers and if_range_matches(
+                request.headers.get('If-Range'), etag):
+            ranges = parse_range_header(request.headers['Range'], info.size)
+
+        content_type = guess_content_type(f.name)
+        asynchronous = is_async_streaming(request)
+        if ranges is None and not info.size:
+            resp = HttpResponse(content_type=content_type)
+        elif ranges is None:
+            resp = StreamingHttpResponse(
+                stream_obj_range(storage_manager, f.name, 0, info.size - 1,
+                                 asynchronous), content_type=content_type)
+            resp['Content-Length'] = info.size
+        elif not ranges:
+            resp = HttpResponse(status=416)
+            resp['Content-Range'] = f'bytes */{info.size}'
+        elif len(ranges) == 1:
+            (start, end) = ranges[0]
+            resp = StreamingHttpResponse(
+                stream_obj_range(storage_manager, f.name, start, end, asynchronous),
+                status=206, content_type=content_type)
+            resp['Content-Range'] = f'bytes {start}-{end}/{info.size}'
+            resp['Content-Length'] = end - start + 1
+        else:
+            resp = multipart_byteranges_response(storage_manager, f.name, ranges,
+                                                 info.size, content_type, asynchronous)
+        resp['ETag'] = etag
+        resp['Accept-Ranges'] = 'bytes'
+        resp['Content-Disposition'] = f'attachment; filename="{Path(f.name).name}"'
+        return resp
+
+
+def is_async_streaming(request):
+    """
+    Return whether the content of a streaming response to the request must be an
+    asynchronous iterator. Under ASGI, Django reads the whole content of synchronous
+    iterators into memory before sending it, and the asynchronous iterators don't
+    take a thread while waiting for the client to receive the data.
+    """
+    return (settings.FILE_DOWNLOAD_ASYNC_STREAMING and
+            isinstance(getattr(request, '_request', request), ASGIRequest))
+
+
+def stream_obj_range(storage_manager, file_path, start, end, asynchronous=False):
+    """
+    Return a synchronous or asynchronous iterator of the chunks of a byte range of a
+    stored file's data.
+    """
+    chunk_size = settings.FILE_DOWNLOAD_CHUNK_SIZE
+    if asynchronous:
+        return storage_manager.adownload_obj_range(file_path, start, end, chunk_size)
+    return storage_manager.download_obj_range(file_path, start, end, chunk_size)
+
+
+def offload_download_response(storage_manager, file_path):
+    """
+    Return a response that offloads the download of a stored file to the storage
+    service or the front web server according to the FILE_DOWNLOAD_OFFLOAD setting,
+    or None if the file data must be served by the view.
+    """
+    mode = settings.FILE_DOWNLOAD_OFFLOAD
+    filename = Path(file_path).name
+    if mode == 'redirect':
+        url = storage_manager.get_download_url(
+            file_path, settings.FILE_DOWNLOAD_URL_EXPIRATION, filename)
+        if url is None:
+            return None
+        resp = HttpResponseRedirect(url)
+        resp['Cache-Control'] = 'no-store'  # the signed URL expires
+        return resp
+    if mode == 'x-accel-redirect':
+        location = settings.FILE_DOWNLOAD_ACCEL_REDIRECT_LOCATION.rstrip('/')
+        resp = HttpResponse(content_type=guess_content_type(file_path))
+        resp['X-Accel-Redirect'] = f'{location}/{quote(file_path)}'
+    elif mode == 'x-sendfile':
+        resp = HttpResponse(content_type=guess_content_type(file_path))
+        resp['X-Sendfile'] = str(Path(settings.MEDIA_ROOT) / file_path)
+    else:
+        return None
+    resp['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return resp
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Return True if the value of an If-None-Match header matches the given ETag
+    (weak comparison).
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in [tag.removeprefix('W/') for tag in tags]
+
+
+def if_range_matches(if_range, etag):
+    """
+    Return True if a Range header must be honored given the value of the If-Range
+    header. Only strong ETags are compared as stored files have no Last-Modified
+    date validator.
+    """
+    return if_range is None or if_range.strip() == etag
+
+
+def guess_content_type(file_name):
+    """
+    Guess the content type of a file from its name like ``FileResponse`` does.
+    """
+    (content_type, encoding) = mimetypes.guess_type(file_name)
+    content_type = {
+        'br': 'application/x-brotli',
+        'bzip2': 'application/x-bzip',
+        'compress': 'application/x-compress',
+        'gzip': 'application/gzip',
+        'xz': 'application/x-xz',
+    }.get(encoding, content_type)
+    return content_type or 'application/octet-stream'
+
+
+def multipart_byteranges_response(storage_manager, file_path, ranges, size,
+                                  content_type, asynchronous=False):
+    """
+    Return a streaming multipart/byteranges response with the given ranges of a
+    stored file.
+    """
+    boundary = uuid.uuid4().hex
+    part_headers = [(f'--{boundary}\r\nContent-Type: {content_type}\r\n'
+                     f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n').encode()
+                    for (start, end) in ranges]
+    closing = f'--{boundary}--\r\n'.encode()
+
+    def stream_parts():
+        for (headers, (start, end)) in zip(part_headers, ranges):
+            yield headers
+            yield from stream_obj_range(storage_manager, file_path, start, end)
+            yield b'\r\n'
+        yield closing
+
+    parts = stream_parts()
+    if asynchronous:
+        parts = aiter_in_thread(parts, thread_sensitive=False)
+    resp = StreamingHttpResponse(
+        parts, status=206,
+        content_type=f'multipart/byteranges; boundary={boundary}')
+    resp['Content-Length'] = (sum(len(h) + 2 for h in part_headers) + len(closing) +
+                              sum(end - start + 1 for (start, end) in ranges))
+    return resp
@@ -0,0 +1,85 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.models import ChrisFolder, ChrisFile
+from feeds.models import Feed, FeedFilter
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the files_fname_icontains feed filter on a synthetic user space '
+            'with the given number of feeds and files. All the synthetic data is '
+            'rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=1000000,
+                            help='number of files spread across the feeds')
+        parser.add_argument('--feeds', type=int, default=1000,
+                            help='number of feeds')
+        parser.add_argument('--query', default='needle',
+                            help='files_fname_icontains value to search for (1%% of '
+                                 'the files contain "needle" in their name)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create_user(username='benchmark_feed_files_user')
+
+            start = time.perf_counter()
+            folders = self.create_feeds(user, options['feeds'])
+            self.create_files(user, folders, options['files'])
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {ChrisFile._meta.db_table}')
+            self.stdout.write(f'Created {options["feeds"]} feeds and {options["files"]} '
+                              f'files in {time.perf_counter() - start:.3f}s')
+
+            feed_qs = Feed.objects.filter(owner=user)
+            qs = FeedFilter({'files_fname_icontains': options['query']},
+                            queryset=feed_qs).qs
+
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                n_feeds = len(qs)
+                search_time = time.perf_counter() - start
+
+            self.stdout.write(f'{n_feeds} matching feeds in {search_time:.3f}s '
+                              f'({len(ctx.captured_queries)} queries)')
+            self.stdout.write(qs.explain())
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def create_feeds(user, n_feeds):
+        """
+        Create the feeds with their folders and return the feed folders.
+        """
+        folders = []
+        for _ in range(n_feeds):
+            feed = Feed.objects.create(owner=user)
+            folder = ChrisFolder(path=f'home/{user.username}/feeds/feed_{feed.id}',
+                                 owner=user)
+            folder.save()
+            feed.folder = folder
+            feed.save(update_fields=['folder'])
+            folders.append(folder)
+        return folders
+
+    @staticmethod
+    def create_files(user, folders, n_files):
+        """
+        Insert the files round-robin into the feed folders with a single query.
+        """
+        sql = f"""
+        INSERT INTO {ChrisFile._meta.db_table}
+            (creation_date, fname, size, public, parent_folder_id, owner_id)
+        SELECT now(),
+               (%s::text[])[g %% %s + 1] || '/file_' || g ||
+                   CASE WHEN g %% 100 = 0 THEN '_needle' ELSE '' END || '.dcm',
+               0, false, (%s::bigint[])[g %% %s + 1], %s
+        FROM generate_series(0, %s - 1) AS g
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [[f.path for f in folders], len(folders),
+                                 [f.id for f in folders], len(folders), user.id,
+                                 n_files])
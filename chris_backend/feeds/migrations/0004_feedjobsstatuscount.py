@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-17 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0003_feed_deletion_error_feed_deletion_requested_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedJobsStatusCount',
+            fields=[
+                ('feed', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='jobs_status_count', serialize=False, to='feeds.feed')),
+                ('created_jobs', models.IntegerField(db_default=0, default=0)),
+                ('waiting_jobs', models.IntegerField(db_default=0, default=0)),
+                ('copying_jobs', models.IntegerField(db_default=0, default=0)),
+                ('scheduled_jobs', models.IntegerField(db_default=0, default=0)),
+                ('started_jobs', models.IntegerField(db_default=0, default=0)),
+                ('uploading_jobs', models.IntegerField(db_default=0, default=0)),
+                ('registering_jobs', models.IntegerField(db_default=0, default=0)),
+                ('finished_jobs', models.IntegerField(db_default=0, default=0)),
+                ('errored_jobs', models.IntegerField(db_default=0, default=0)),
+                ('cancelled_jobs', models.IntegerField(db_default=0, default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -1,6 +1,8 @@
 
 from django.db import models
-from django.db.models import Count, Case, When, IntegerField
+from django.db.models import (Count, Case, When, IntegerField, F, Value, Exists,
+                              OuterRef)
+from django.db.models.functions import Coalesce, Concat
 from django.db.models.signals import post_delete
 from django.contrib.auth.models import User, Group
 from django.dispatch import receiver
@@ -12,9 +14,39 @@ from core.models import (AsyncDeletableModel, ChrisFolder, ChrisFile, ChrisLinkF
                          FolderGroupPermission, FolderUserPermission, FileGroupPermission,
                          FileUserPermission, LinkFileGroupPermission,
                          LinkFileUserPermission)
+from plugininstances.enums import JOBS_STATUS_FIELDS
 from userfiles.models import UserFile
 
 
+def get_jobs_status_count_annotations(counts_path):
+    """
+    Return the dict of annotations that read the number of plugin instances per
+    execution status from the jobs status counts related through ``counts_path``
+    (0 when there are no counts yet).
+    """
+    return {field: Coalesce(F(f'{counts_path}__{field}'), Value(0))
+            for (field, _) in JOBS_STATUS_FIELDS}
+
+
+class JobsStatusCount(models.Model):
+    """
+    Abstract model for the number of plugin instances per execution status.
+    """
+    created_jobs = models.IntegerField(default=0, db_default=0)
+    waiting_jobs = models.IntegerField(default=0, db_default=0)
+    copying_jobs = models.IntegerField(default=0, db_default=0)
+    scheduled_jobs = models.IntegerField(default=0, db_default=0)
+    started_jobs = models.IntegerField(default=0, db_default=0)
+    uploading_jobs = models.IntegerField(default=0, db_default=0)
+    registering_jobs = models.IntegerField(default=0, db_default=0)
+    finished_jobs = models.IntegerField(default=0, db_default=0)
+    errored_jobs = models.IntegerField(default=0, db_default=0)
+    cancelled_jobs = models.IntegerField(default=0, db_default=0)
+
+    class Meta:
+        abstract = True
+
+
 class Feed(AsyncDeletableModel):
     creation_date = models.DateTimeField(auto_now_add=True)
     modification_date = models.DateTimeField(auto_now_add=True)
@@ -57,26 +89,7 @@ class Feed(AsyncDeletableModel):
         execution status to each element of a Feed queryset.
         """
         return feed_qs.annotate(
-            created_jobs=Count(Case(When(plugin_instances__status='created', then=1),
-                               output_field=IntegerField())),
-            waiting_jobs=Count(Case(When(plugin_instances__status='waiting', then=1),
-                               output_field=IntegerField())),
-            copying_jobs=Count(Case(When(plugin_instances__status='copying', then=1),
-                               output_field=IntegerField())),
-            scheduled_jobs=Count(Case(When(plugin_instances__status='scheduled', then=1),
-                                    output_field=IntegerField())),
-            started_jobs=Count(Case(When(plugin_instances__status='started', then=1),
-                                    output_field=IntegerField())),
-            uploading_jobs=Count(Case(When(plugin_instances__status='uploading', then=1),
-                               output_field=IntegerField())),
-            registering_jobs=Count(Case(When(plugin_instances__status='registeringFiles',
-                                             then=1), output_field=IntegerField())),
-            finished_jobs=Count(Case(When(plugin_instances__status='finishedSuccessfully',
-                                          then=1), output_field=IntegerField())),
-            errored_jobs=Count(Case(When(plugin_instances__status='finishedWithError',
-                                         then=1), output_field=IntegerField())),
-            cancelled_jobs=Count(Case(When(plugin_instances__status='cancelled', then=1),
-                                    output_field=IntegerField()))
+            **get_jobs_status_count_annotations('jobs_status_count')
         ).order_by('-creation_date')
 
     def get_jobs_status_count(self):
@@ -189,6 +202,15 @@ def auto_delete_folder_with_feed(sender, instance, **kwargs):
         pass
 
 
+class FeedJobsStatusCount(JobsStatusCount):
+    """
+    Number of plugin instances of a feed per execution status. The counts are
+    maintained by DB triggers on the plugin instances table.
+    """
+    feed = models.OneToOneField(Feed, on_delete=models.CASCADE, primary_key=True,
+                                related_name='jobs_status_count')
+
+
 class FeedFilter(FilterSet):
     min_id = django_filters.NumberFilter(field_name="id", lookup_expr='gte')
     max_id = django_filters.NumberFilter(field_name="id", lookup_expr='lte')
@@ -218,24 +240,17 @@ class FeedFilter(FilterSet):
         # assume value is a string representing a white-space-separated list
         # of query strings
         value_l = value.split()
-        qs_l = []
-
-        for feed in queryset:
-            qs = UserFile.objects.filter(fname__startswith=feed.folder.path)
-            for val in value_l:
-                qs = qs.filter(fname__icontains=val)
-            qs_l.append(qs)
-
-        files_qs = UserFile.objects.none().union(*qs_l)
 
-        feed_ids = set()
-        for f in files_qs:
-            path = f.fname.name
-            path_tokens = path.split('/', 4)
-            feed_id = int(path_tokens[3].split('_')[1])
-            feed_ids.add(feed_id)
-
-        return queryset.filter(pk__in=list(feed_ids))
+        # single query served by the fname trigram index and the stored feed id, the
+        # files must also be under the feed's folder as any user can create a path
+        # with another user's feed id under their own home
+        files_qs = UserFile.objects.filter(
+            fname_feed_id=OuterRef('pk'),
+            fname__startswith=Concat(OuterRef('folder__path'), Value('/'),
+                                     output_field=models.CharField()))
+        for val in value_l:
+            files_qs = files_qs.filter(fname__icontains=val)
+        return queryset.filter(Exists(files_qs))
 
 
 class FeedGroupPermission(models.Model):
@@ -250,10 +265,10 @@ class FeedGroupPermission(models.Model):
 
     def save(self, *args, **kwargs):
         """
-        Overriden to grant the group write permission to all the folders, files and link
-        files within the feed's folder. In addition, the same permission is applied to
-        all objects pointed by the linked files under the feed's folder if they are owned
-        by the feed's owner.
+        Overriden to grant the group write permission to the feed's folder, which is
+        inherited by all the folders, files and link files within it. In addition, the
+        same permission is applied to all objects pointed by the linked files under the
+        feed's folder if they are owned by the feed's owner.
         """
         super(FeedGroupPermission, self).save(*args, **kwargs)
 
@@ -271,13 +286,8 @@ class FeedGroupPermission(models.Model):
             ).values_list('path', flat=True)
 
             if linked_owned_folder_paths:
-                lookup = models.Q()
-
-                for path in linked_owned_folder_paths:
-                    lookup |= models.Q(path=path)
-                    lookup |= models.Q(path__startswith=path + '/')
-
-                folders = ChrisFolder.objects.filter(lookup)
+                # the folders' contents inherit the permission
+                folders = ChrisFolder.objects.filter(path__in=linked_owned_folder_paths)
                 objs = []
                 for folder in folders:
                     perm = FolderGroupPermission(folder=folder, group=self.group,
@@ -289,8 +299,6 @@ class FeedGroupPermission(models.Model):
                                                                          'group_id'])
 
             lookup = models.Q(fname__in=linked_paths, owner=feed_folder.owner)
-            for path in linked_owned_folder_paths:
-                lookup |= models.Q(fname__startswith=path + '/')
 
             files = ChrisFile.objects.filter(lookup)
             objs = []
@@ -314,10 +322,8 @@ class FeedGroupPermission(models.Model):
 
     def delete(self, *args, **kwargs):
         """
-        Overriden to remove the group's write permission to all the folders, files and
-        link files within the feed's folder. In addition, the same permission is removed
-        for all objects pointed by the linked files under the feed's folder if they are
-        owned by the feed's owner.
+        Overriden to remove the group's write permission to the feed's folder tree and
+        to the feed owner's objects pointed by the link files within it.
         """
         super(FeedGroupPermission, self).delete(*args, **kwargs)
 
@@ -335,13 +341,7 @@ class FeedGroupPermission(models.Model):
             ).values_list('path', flat=True)
 
             if linked_owned_folder_paths:
-                lookup = models.Q()
-
-                for path in linked_owned_folder_paths:
-                    lookup |= models.Q(path=path)
-                    lookup |= models.Q(path__startswith=path + '/')
-
-                folders = ChrisFolder.objects.filter(lookup)
+                folders = ChrisFolder.objects.filter(path__in=linked_owned_folder_paths)
 
                 FolderGroupPermission.objects.filter(folder__in=folders,
                                                      group=self.group,
@@ -351,20 +351,12 @@ class FeedGroupPermission(models.Model):
                               file__owner=feed_folder.owner,
                               group=self.group, permission='w')
 
-            for path in linked_owned_folder_paths:
-                lookup |= models.Q(file__fname__startswith=path + '/',
-                                   group=self.group, permission='w')
-
             FileGroupPermission.objects.filter(lookup).delete()
 
             lookup = models.Q(link_file__fname__in=linked_paths,
                               link_file__owner=feed_folder.owner,
                               group=self.group, permission='w')
 
-            for path in linked_owned_folder_paths:
-                lookup |= models.Q(link_file__fname__startswith=path + '/',
-                                   group=self.group, permission='w')
-
             LinkFileGroupPermission.objects.filter(lookup).delete()
 
 
@@ -388,10 +380,10 @@ class FeedUserPermission(models.Model):
 
     def save(self, *args, **kwargs):
         """
-        Overriden to grant the user write permission to all the folders, files and link
-        files within the feed's folder. In addition, the same permission is applied to
-        all objects pointed by the linked files under the feed's folder if they are owned
-        by the feed's owner.
+        Overriden to grant the user write permission to the feed's folder, which is
+        inherited by all the folders, files and link files within it. In addition, the
+        same permission is applied to all objects pointed by the linked files under the
+        feed's folder if they are owned by the feed's owner.
         """
         super(FeedUserPermission, self).save(*args, **kwargs)
 
@@ -409,13 +401,8 @@ class FeedUserPermission(models.Model):
             ).values_list('path', flat=True)
 
             if linked_owned_folder_paths:
-                lookup = models.Q()
-
-                for path in linked_owned_folder_paths:
-                    lookup |= models.Q(path=path)
-                    lookup |= models.Q(path__startswith=path + '/')
-
-                folders = ChrisFolder.objects.filter(lookup)
+                # the folders' contents inherit the permission
+                folders = ChrisFolder.objects.filter(path__in=linked_owned_folder_paths)
                 objs = []
                 for folder in folders:
                     perm = FolderUserPermission(folder=folder, user=self.user,
@@ -427,8 +414,6 @@ class FeedUserPermission(models.Model):
                                                                          'user_id'])
 
             lookup = models.Q(fname__in=linked_paths, owner=feed_folder.owner)
-            for path in linked_owned_folder_paths:
-                lookup |= models.Q(fname__startswith=path + '/')
 
             files = ChrisFile.objects.filter(lookup)
             objs = []
@@ -451,10 +436,8 @@ class FeedUserPermission(models.Model):
 
     def delete(self, *args, **kwargs):
         """
-        Overriden to remove the user's write permission to all the folders, files and
-        link files within the feed's folder. In addition, the same permission is removed
-        for all objects pointed by the linked files under the feed's folder if they are
-        owned by the feed's owner.
+        Overriden to remove the user's write permission to the feed's folder tree and
+        to the feed owner's objects pointed by the link files within it.
         """
         super(FeedUserPermission, self).delete(*args, **kwargs)
 
@@ -472,13 +455,8 @@ class FeedUserPermission(models.Model):
             ).values_list('path', flat=True)
 
             if linked_owned_folder_paths:
-                lookup = models.Q()
+                folders = ChrisFolder.objects.filter(path__in=linked_owned_folder_paths)
 
-                for path in linked_owned_folder_paths:
-                    lookup |= models.Q(path=path)
-                    lookup |= models.Q(path__startswith=path + '/')
-
-                folders = ChrisFolder.objects.filter(lookup)
                 FolderUserPermission.objects.filter(folder__in=folders,
                                                     user=self.user,
                                                     permission='w').delete()
@@ -487,20 +465,12 @@ class FeedUserPermission(models.Model):
                               file__owner=feed_folder.owner,
                               user=self.user, permission='w')
 
-            for path in linked_owned_folder_paths:
-                lookup |= models.Q(file__fname__startswith=path + '/',
-                                   user=self.user, permission='w')
-
             FileUserPermission.objects.filter(lookup).delete()
 
             lookup = models.Q(link_file__fname__in=linked_paths,
                               link_file__owner=feed_folder.owner,
                               user=self.user, permission='w')
 
-            for path in linked_owned_folder_paths:
-                lookup |= models.Q(link_file__fname__startswith=path + '/',
-                                   user=self.user, permission='w')
-
             LinkFileUserPermission.objects.filter(lookup).delete()
 
 
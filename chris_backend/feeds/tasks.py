@@ -2,6 +2,8 @@
 import logging
 
 from celery import shared_task
+from core.models import deferred_storage_deletion
+
 from .models import Feed
 
 
@@ -16,7 +18,9 @@ def delete_feed(self, feed_id):
         if not feed.is_pending_deletion():
             return # idempotent safety
 
-        feed.delete()
+        # delete the storage data of the whole feed in batches instead of per file
+        with deferred_storage_deletion():
+            feed.delete()
     except Feed.DoesNotExist:
         pass
     except Exception as e:
@@ -0,0 +1,26 @@
+import io
+import logging
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import ChrisFile
+from feeds.models import Feed
+
+
+class BenchmarkFeedFilesSearchCommandTests(TestCase):
+
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_benchmark_reports_matching_feeds_and_rolls_back(self):
+        n_files = ChrisFile.objects.count()
+        n_feeds = Feed.objects.count()
+        out = io.StringIO()
+        call_command('benchmark_feed_files_search', files=300, feeds=3, stdout=out)
+        self.assertIn('3 matching feeds', out.getvalue())
+        self.assertEqual(ChrisFile.objects.count(), n_files)
+        self.assertEqual(Feed.objects.count(), n_feeds)
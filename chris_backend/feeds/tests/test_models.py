@@ -11,7 +11,8 @@ from core.storage import connect_storage
 from plugins.models import PluginMeta, Plugin, PluginParameter, ComputeResource
 from plugininstances.models import PluginInstance
 from userfiles.models import UserFile
-from feeds.models import Note, Feed, FeedGroupPermission, FeedUserPermission
+from feeds.models import (Note, Feed, FeedGroupPermission, FeedUserPermission,
+                          FeedJobsStatusCount, FeedFilter)
 
 
 COMPUTE_RESOURCE_URL = settings.COMPUTE_RESOURCE_URL
@@ -133,6 +134,109 @@ class FeedModelTests(ModelTests):
         count = feed.get_jobs_status_count()['cancelled_jobs']
         self.assertEqual(count, 0)
 
+    def test_jobs_status_count_follows_plugin_instance_status_changes(self):
+        """
+        Test whether the stored jobs status count of a feed is kept up to date when
+        the status of its plugin instances changes, either by saving the instance
+        or by a queryset update.
+        """
+        feed = Feed.objects.get(name=self.feed_name)
+        plg_inst = feed.plugin_instances.first()
+
+        plg_inst.status = 'started'
+        plg_inst.save()
+        counts = FeedJobsStatusCount.objects.get(feed=feed)
+        self.assertEqual(counts.created_jobs, 0)
+        self.assertEqual(counts.started_jobs, 1)
+
+        PluginInstance.objects.filter(id=plg_inst.id).update(status='cancelled')
+        counts.refresh_from_db()
+        self.assertEqual(counts.started_jobs, 0)
+        self.assertEqual(counts.cancelled_jobs, 1)
+
+        plg_inst.delete()
+        counts.refresh_from_db()
+        self.assertEqual(counts.cancelled_jobs, 0)
+
+    def test_add_jobs_status_count_defaults_to_zero_without_stored_counts(self):
+        """
+        Test whether custom add_jobs_status_count method returns zero counts for
+        feeds without a stored jobs status count.
+        """
+        FeedJobsStatusCount.objects.all().delete()
+        feed = Feed.add_jobs_status_count(Feed.objects.all()).get(name=self.feed_name)
+        self.assertEqual(feed.created_jobs, 0)
+        self.assertEqual(feed.finished_jobs, 0)
+
+
+class FeedFilterTests(ModelTests):
+
+    def setUp(self):
+        super(FeedFilterTests, self).setUp()
+        user = User.objects.get(username=self.username)
+        feed = Feed.objects.get(name=self.feed_name)
+        folder = feed.folder.children.first()
+        f = UserFile(owner=user, parent_folder=folder)
+        f.fname.name = f'{folder.path}/brain_T1.nii'
+        f.save()
+
+    def test_files_store_the_id_of_their_feed(self):
+        """
+        Test whether the id of the feed containing a file is computed and stored by
+        the DB.
+        """
+        feed = Feed.objects.get(name=self.feed_name)
+        f = UserFile.objects.get(fname__endswith='brain_T1.nii')
+        self.assertEqual(f.fname_feed_id, feed.id)
+
+    def test_files_with_out_of_range_feed_id_can_be_saved(self):
+        """
+        Test whether a file whose path has a feed id that doesn't fit in a bigint is
+        saved without a feed id.
+        """
+        user = User.objects.get(username=self.username)
+        (folder, _) = ChrisFolder.objects.get_or_create(
+            path=f'home/{self.username}/feeds/feed_99999999999999999999', owner=user)
+        f = UserFile(owner=user, parent_folder=folder)
+        f.fname.name = f'{folder.path}/brain_T1.nii'
+        f.save()
+        f.refresh_from_db()
+        self.assertIsNone(f.fname_feed_id)
+
+    def test_filter_by_fname_icontains(self):
+        """
+        Test whether custom filter_by_fname_icontains method returns the feeds with
+        files containing all the queried substrings in a single query.
+        """
+        feed = Feed.objects.get(name=self.feed_name)
+        with self.assertNumQueries(1):
+            feeds = list(FeedFilter({'files_fname_icontains': 'BRAIN t1'},
+                                    queryset=Feed.objects.all()).qs)
+        self.assertEqual(feeds, [feed])
+
+        feeds = FeedFilter({'files_fname_icontains': 'brain T2'},
+                           queryset=Feed.objects.all()).qs
+        self.assertFalse(feeds.exists())
+
+
+    def test_filter_by_fname_icontains_ignores_other_users_feed_paths(self):
+        """
+        Test whether custom filter_by_fname_icontains method ignores the files of
+        another user's home whose path has the same feed id as the feed.
+        """
+        feed = Feed.objects.get(name=self.feed_name)
+        other_user = User.objects.get(username=self.other_username)
+        (folder, _) = ChrisFolder.objects.get_or_create(
+            path=f'home/{self.other_username}/feeds/feed_{feed.id}/data',
+            owner=other_user)
+        f = UserFile(owner=other_user, parent_folder=folder)
+        f.fname.name = f'{folder.path}/brain_T2.nii'
+        f.save()
+
+        feeds = FeedFilter({'files_fname_icontains': 'brain T2'},
+                           queryset=Feed.objects.all()).qs
+        self.assertFalse(feeds.exists())
+
 
 class FeedGroupPermissionTests(ModelTests):
 
@@ -180,14 +284,11 @@ class FeedGroupPermissionTests(ModelTests):
         grps = folder.shared_groups.values_list('name', flat=True)
         self.assertIn('all_users', grps)
 
-        grps = f.shared_groups.values_list('name', flat=True)
-        self.assertIn('all_users', grps)
+        self.assertTrue(f.has_group_permission(grp))
 
-        grps = lf.shared_groups.values_list('name', flat=True)
-        self.assertIn('all_users', grps)
+        self.assertTrue(lf.has_group_permission(grp))
 
-        grps = pf.shared_groups.values_list('name', flat=True)
-        self.assertIn('all_users', grps)
+        self.assertTrue(pf.has_group_permission(grp))
 
         ChrisFolder.objects.get(path=f'home/{self.username}').delete()
 
@@ -236,14 +337,11 @@ class FeedGroupPermissionTests(ModelTests):
         grps = folder.shared_groups.values_list('name', flat=True)
         self.assertNotIn('all_users', grps)
 
-        grps = f.shared_groups.values_list('name', flat=True)
-        self.assertNotIn('all_users', grps)
+        self.assertFalse(f.has_group_permission(grp))
 
-        grps = lf.shared_groups.values_list('name', flat=True)
-        self.assertNotIn('all_users', grps)
+        self.assertFalse(lf.has_group_permission(grp))
 
-        grps = pf.shared_groups.values_list('name', flat=True)
-        self.assertNotIn('all_users', grps)
+        self.assertFalse(pf.has_group_permission(grp))
 
         ChrisFolder.objects.get(path=f'home/{self.username}').delete()
 
@@ -294,14 +392,11 @@ class FeedUserPermissionTests(ModelTests):
         usernames = folder.shared_users.values_list('username', flat=True)
         self.assertIn(self.other_username, usernames)
 
-        usernames = f.shared_users.values_list('username', flat=True)
-        self.assertIn(self.other_username, usernames)
+        self.assertTrue(f.has_user_permission(other_user))
 
-        usernames = lf.shared_users.values_list('username', flat=True)
-        self.assertIn(self.other_username, usernames)
+        self.assertTrue(lf.has_user_permission(other_user))
 
-        usernames = pf.shared_users.values_list('username', flat=True)
-        self.assertIn(self.other_username, usernames)
+        self.assertTrue(pf.has_user_permission(other_user))
 
         ChrisFolder.objects.get(path=f'home/{self.username}').delete()
 
@@ -350,13 +445,10 @@ class FeedUserPermissionTests(ModelTests):
         usernames = folder.shared_users.values_list('username', flat=True)
         self.assertNotIn(self.other_username, usernames)
 
-        usernames = f.shared_users.values_list('username', flat=True)
-        self.assertNotIn(self.other_username, usernames)
+        self.assertFalse(f.has_user_permission(other_user))
 
-        usernames = lf.shared_users.values_list('username', flat=True)
-        self.assertNotIn(self.other_username, usernames)
+        self.assertFalse(lf.has_user_permission(other_user))
 
-        usernames = pf.shared_users.values_list('username', flat=True)
-        self.assertNotIn(self.other_username, usernames)
+        self.assertFalse(pf.has_user_permission(other_user))
 
         ChrisFolder.objects.get(path=f'home/{self.username}').delete()
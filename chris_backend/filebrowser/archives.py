@@ -0,0 +1,160 @@
+"""
+Streaming zip archives of ChRIS folders.
+"""
+
+import io
+import os
+import zipfile
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import (ChrisFile, ChrisLinkFile, PermissionResolver, PathAccessError,
+                         validate_path_access)
+from core.storage import connect_storage
+
+
+# number of files and link files fetched from the DB with a single query
+ARCHIVE_BATCH_SIZE = 1000
+
+# maximum number of nested link files followed from the archived folder
+ARCHIVE_MAX_LINK_DEPTH = 10
+
+ARCHIVE_COMPRESSION_METHODS = {'store': zipfile.ZIP_STORED,
+                               'deflate': zipfile.ZIP_DEFLATED}
+
+
+class _ZipStream(io.RawIOBase):
+    """
+    Unseekable write-only stream that buffers the bytes written by ``ZipFile`` until
+    they are popped. ``ZipFile`` writes a data descriptor after the data of each
+    entry when the stream is unseekable, so no entry needs to be kept in memory.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._position += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._position
+
+    def pop(self):
+        """
+        Return the list of the non-empty chunks written since the last pop.
+        """
+        chunks = [chunk for chunk in self._chunks if chunk]
+        self._chunks = []
+        return chunks
+
+
+def iter_folder_archive(folder_path, user, compression='store', start_after=''):
+    """
+    Generator of the bytes of a zip archive with the files under a folder that the
+    user can access, read from storage one chunk at a time. Link files are followed
+    with the same access rules as ``validate_path_access``.
+
+    Entries are always generated in the same order (see ``iter_folder_entries``)
+    so an interrupted download can be resumed with another archive of the entries
+    after the last one received, given by ``start_after``.
+    """
+    storage_manager = connect_storage(settings)
+    chunk_size = settings.FILE_DOWNLOAD_CHUNK_SIZE
+    entries = iter_folder_entries(folder_path, user)
+    if start_after:
+        entries = _skip_entries(entries, start_after)
+
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', ARCHIVE_COMPRESSION_METHODS[compression]) as zf:
+        for (name, f) in entries:
+            size = f.size
+            if size is None:
+                size = storage_manager.obj_info(f.fname.name).size
+            zinfo = zipfile.ZipInfo(
+                name, timezone.localtime(f.creation_date).timetuple()[:6])
+            zinfo.compress_type = zf.compression
+            zinfo.file_size = size
+            with zf.open(zinfo, 'w') as entry:
+                if size:
+                    for chunk in storage_manager.download_obj_range(f.fname.name, 0,
+                                                                    size - 1,
+                                                                    chunk_size):
+                        entry.write(chunk)
+                        yield from stream.pop()
+            yield from stream.pop()
+    yield from stream.pop()
+
+
+def iter_folder_entries(folder_path, user, prefix='', visited=()):
+    """
+    Generator of the (archive name, ChrisFile) pairs of the files under a folder that
+    the user can access: the files sorted by path followed by the contents of the
+    link files sorted by path. Links to a folder are archived as a subfolder with the
+    link's name and links pointing into an already archived folder are skipped.
+    """
+    visited = visited + (folder_path,)
+    files_qs = ChrisFile.objects.filter(fname__startswith=folder_path + '/')
+    for f in _iter_accessible(files_qs, user):
+        yield prefix + f.fname.name[len(folder_path) + 1:], f
+
+    if len(visited) > ARCHIVE_MAX_LINK_DEPTH:
+        return
+    link_files_qs = ChrisLinkFile.objects.filter(fname__startswith=folder_path + '/')
+    for link_file in _iter_accessible(link_files_qs, user):
+        name = prefix + link_file.fname.name[len(folder_path) + 1:].removesuffix(
+            '.chrislink')
+        try:
+            target_path = validate_path_access(user, link_file.path)
+        except PathAccessError:
+            continue
+        if any(target_path == p or target_path.startswith(p + '/') or
+               p.startswith(target_path + '/') for p in visited):
+            continue  # link cycle or already archived data
+
+        f = ChrisFile.objects.filter(fname=target_path).first()
+        if f is not None:
+            yield name, f
+        else:
+            yield from iter_folder_entries(target_path, user, name + '/', visited)
+
+
+def _iter_accessible(queryset, user):
+    """
+    Generator of the files or link files of a queryset that the user can access,
+    fetched and permission-checked in batches in the order of their path.
+    """
+    resolver = PermissionResolver.for_user(user)
+    queryset = queryset.order_by('fname')
+    last_fname = None
+    while True:
+        qs = queryset if last_fname is None else queryset.filter(fname__gt=last_fname)
+        batch = list(qs[:ARCHIVE_BATCH_SIZE])
+        if not batch:
+            return
+        yield from resolver.filter_accessible(batch)
+        last_fname = batch[-1].fname.name
+
+
+def _skip_entries(entries, start_after):
+    """
+    Generator of the entries after the one named ``start_after``.
+    """
+    for (name, _) in entries:
+        if name == start_after:
+            break
+    yield from entries
+
+
+def get_archive_name(folder_path):
+    """
+    Return the file name of the zip archive of a folder.
+    """
+    return f'{os.path.basename(folder_path)}.zip'
@@ -1,6 +1,7 @@
 
 import os
 
+from django.conf import settings
 from django.contrib.auth.models import User, Group
 from django.db.utils import IntegrityError
 from rest_framework import serializers
@@ -13,6 +14,8 @@ from core.models import (ChrisFolder, ChrisFile, ChrisLinkFile, FolderGroupPermi
                          LinkFileGroupPermission, LinkFileUserPermission)
 from core.serializers import ChrisFileSerializer
 
+from .tasks import move_folder
+
 
 class FileBrowserFolderSerializer(serializers.HyperlinkedModelSerializer):
     path = serializers.CharField(max_length=1024, required=False)
@@ -24,6 +27,7 @@ class FileBrowserFolderSerializer(serializers.HyperlinkedModelSerializer):
     files = serializers.HyperlinkedIdentityField(view_name='chrisfolder-file-list')
     link_files = serializers.HyperlinkedIdentityField(
         view_name='chrisfolder-linkfile-list')
+    archive = serializers.HyperlinkedIdentityField(view_name='chrisfolder-archive')
     group_permissions = serializers.HyperlinkedIdentityField(
         view_name='foldergrouppermission-list')
     user_permissions = serializers.HyperlinkedIdentityField(
@@ -34,13 +38,15 @@ class FileBrowserFolderSerializer(serializers.HyperlinkedModelSerializer):
         model = ChrisFolder
         fields = ('url', 'id', 'creation_date', 'path', 'public', 'owner_username',
                   'deletion_status', 'deletion_requested_at', 'deletion_error',
-                  'parent', 'children', 'files', 'link_files', 'group_permissions',
-                  'user_permissions', 'owner')
+                  'move_status', 'move_requested_at', 'move_target_path',
+                  'move_progress', 'move_error', 'parent', 'children', 'files',
+                  'link_files', 'archive', 'group_permissions', 'user_permissions',
+                  'owner')
 
     def create(self, validated_data):
         """
         Overriden to set the parent folder. It also creates non-existent ancestors and
-        sets their permissions to be the same as the first existing ancestor.
+        sets their public status to be the same as the first existing ancestor.
         """
         path = validated_data['path']
         parent_path = os.path.dirname(path)
@@ -66,12 +72,7 @@ class FileBrowserFolderSerializer(serializers.HyperlinkedModelSerializer):
             top_created_folder.grant_public_access()
             folder.public = True  # update object before returning it
 
-        for perm in ancestor.get_groups_permissions_queryset():
-            top_created_folder.grant_group_permission(perm.group, perm.permission)
-
-        for perm in ancestor.get_users_permissions_queryset():
-            top_created_folder.grant_user_permission(perm.user, perm.permission)
-
+        # groups and users permissions are inherited from the ancestor folders
         if owner != ancestor.owner:
             top_created_folder.grant_user_permission(ancestor.owner, 'w')
         return folder
@@ -97,16 +98,35 @@ class FileBrowserFolderSerializer(serializers.HyperlinkedModelSerializer):
 
             # folder will be stored at: SWIFT_CONTAINER_NAME/<new_path>
             # where <new_path> must start with home/
-            instance.move(new_path)
+            if self._must_move_async(instance):
+                # the async task recreates the public link after the move if required
+                if instance.mark_move_pending(new_path):
+                    move_folder.delay(instance.id)
+            else:
+                instance.move(new_path)
 
-            if public and ('public' not in validated_data or validated_data['public']):
-                instance.create_public_link()  # recreate public link
+                if public and ('public' not in validated_data or
+                               validated_data['public']):
+                    instance.create_public_link()  # recreate public link
 
         if not public and 'public' in validated_data and validated_data['public']:
             instance.grant_public_access()
-            instance.create_public_link()
+            if not instance.is_pending_move():
+                instance.create_public_link()
         return instance
 
+    @staticmethod
+    def _must_move_async(folder):
+        """
+        Custom method to determine whether a folder's tree is large enough to be
+        moved by an asynchronous task.
+        """
+        min_files = settings.FOLDER_ASYNC_MOVE_MIN_FILES
+        if min_files <= 0:
+            return False
+        return ChrisFile.objects.filter(
+            fname__startswith=folder.path + '/').count() >= min_files
+
     def validate_path(self, path):
         """
         Overriden to check whether the provided path does not contain commas and
@@ -135,6 +155,12 @@ class FileBrowserFolderSerializer(serializers.HyperlinkedModelSerializer):
             raise serializers.ValidationError([f"Invalid path. User do not have write "
                                                f"permission under the folder "
                                                f"'{ancestor.path}'."])
+        if self.instance is None:  # on create
+            moving_folder = ChrisFolder.get_moving_folder(path)
+            if moving_folder:
+                target_path = moving_folder.move_target_path
+                raise serializers.ValidationError([f"Folder '{moving_folder.path}' is "
+                                                   f"being moved to '{target_path}'."])
         return path
 
     def validate_public(self, public):
@@ -155,7 +181,8 @@ class FileBrowserFolderSerializer(serializers.HyperlinkedModelSerializer):
         """
         Overriden to validate that required fields are in data when creating or
         updating a folder. Also to verify that the user's home or feeds folder is not
-        being moved.
+        being moved and that neither the folder nor the target path is part of a tree
+        already being moved asynchronously.
         """
         if self.instance:  # on update
             if 'public' not in data and 'path' not in data:
@@ -163,6 +190,15 @@ class FileBrowserFolderSerializer(serializers.HyperlinkedModelSerializer):
                         {'non_field_errors': ["At least one of the fields 'public' "
                                               "or 'path' must be provided."]})
 
+            # neither this folder's tree nor the target tree can be part of a move
+            for path in (self.instance.path, data.get('path')):
+                moving_folder = ChrisFolder.get_moving_folder(path) if path else None
+                if moving_folder:
+                    raise serializers.ValidationError(
+                        {'non_field_errors':
+                             [f"Folder '{moving_folder.path}' is being moved to "
+                              f"'{moving_folder.move_target_path}'."]})
+
             username = self.context['request'].user.username
 
             if 'path' in data and username != 'chris':
@@ -191,11 +227,12 @@ class FileBrowserFolderGroupPermissionSerializer(serializers.HyperlinkedModelSer
     folder = serializers.HyperlinkedRelatedField(view_name='chrisfolder-detail',
                                                  read_only=True)
     group = serializers.HyperlinkedRelatedField(view_name='group-detail', read_only=True)
+    inherited = serializers.SerializerMethodField()
 
     class Meta:
         model = FolderGroupPermission
         fields = ('url', 'id', 'permission', 'folder_id', 'folder_path', 'group_id',
-                  'group_name', 'folder', 'group', 'grp_name')
+                  'group_name', 'inherited', 'folder', 'group', 'grp_name')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -251,6 +288,15 @@ class FileBrowserFolderGroupPermissionSerializer(serializers.HyperlinkedModelSer
                                                        ['This field is required.']})
         return data
 
+    def get_inherited(self, obj) -> bool:
+        """
+        Get whether the permission is inherited from an ancestor of the folder whose
+        permissions are being listed. Inherited permissions can only be changed from
+        the ancestor folder.
+        """
+        folder_id = self.context.get('folder_id')
+        return folder_id is not None and obj.folder_id != folder_id
+
 
 class FileBrowserFolderUserPermissionSerializer(serializers.HyperlinkedModelSerializer):
     username = serializers.CharField(write_only=True, min_length=4, max_length=32,
@@ -262,11 +308,12 @@ class FileBrowserFolderUserPermissionSerializer(serializers.HyperlinkedModelSeri
     folder = serializers.HyperlinkedRelatedField(view_name='chrisfolder-detail',
                                                  read_only=True)
     user = serializers.HyperlinkedRelatedField(view_name='user-detail', read_only=True)
+    inherited = serializers.SerializerMethodField()
 
     class Meta:
         model = FolderUserPermission
         fields = ('url', 'id', 'permission', 'folder_id', 'folder_path', 'user_id',
-                  'user_username', 'folder', 'user', 'username')
+                  'user_username', 'inherited', 'folder', 'user', 'username')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -322,6 +369,15 @@ class FileBrowserFolderUserPermissionSerializer(serializers.HyperlinkedModelSeri
                                                        ['This field is required.']})
         return data
 
+    def get_inherited(self, obj) -> bool:
+        """
+        Get whether the permission is inherited from an ancestor of the folder whose
+        permissions are being listed. Inherited permissions can only be changed from
+        the ancestor folder.
+        """
+        folder_id = self.context.get('folder_id')
+        return folder_id is not None and obj.folder_id != folder_id
+
 
 class FileBrowserFileSerializer(ChrisFileSerializer):
     new_file_path = serializers.CharField(max_length=1024, write_only=True,
@@ -2,7 +2,7 @@
 
 from django.db import models
 
-from core.models import ChrisFolder, user_can_access_obj
+from core.models import ChrisFolder, PermissionResolver, STRUCTURAL_FOLDER_PATHS
 
 
 def get_folder_queryset(pk_dict, user=None):
@@ -18,7 +18,7 @@ def get_folder_queryset(pk_dict, user=None):
             if not folder.public:
                 return ChrisFolder.objects.none()
         else:
-            if not user_can_access_obj(folder, user):
+            if not PermissionResolver.for_user(user).can_access(folder):
                 return ChrisFolder.objects.none()
     return qs
 
@@ -31,11 +31,13 @@ def get_folder_children_queryset(folder, user=None):
     if user is None:
         return folder.children.filter(public=True)
 
-    if user.username == 'chris':
-        return folder.children.all()
+    resolver = PermissionResolver.for_user(user)
+    if user.username == 'chris' or (folder.path not in STRUCTURAL_FOLDER_PATHS and
+                                    resolver.has_permission(folder)):
+        return folder.children.all()  # permissions are inherited from the folder
 
     lookup = models.Q(owner=user) | models.Q(public=True) | models.Q(
-        shared_users=user) | models.Q(shared_groups__in=user.groups.all())
+        shared_users=user) | models.Q(shared_groups__in=resolver.get_group_ids())
     return folder.children.filter(lookup).distinct()
 
 
@@ -46,11 +48,13 @@ def get_folder_files_queryset(folder, user=None):
     if user is None:
         return folder.chris_files.filter(public=True)
 
-    if user.username == 'chris':
-        return folder.chris_files.all()
+    resolver = PermissionResolver.for_user(user)
+    if user.username == 'chris' or (folder.path not in STRUCTURAL_FOLDER_PATHS and
+                                    resolver.has_permission(folder)):
+        return folder.chris_files.all()  # permissions are inherited from the folder
 
     lookup = models.Q(owner=user) | models.Q(public=True) | models.Q(
-        shared_users=user) | models.Q(shared_groups__in=user.groups.all())
+        shared_users=user) | models.Q(shared_groups__in=resolver.get_group_ids())
     return folder.chris_files.filter(lookup).distinct()
 
 
@@ -61,9 +65,11 @@ def get_folder_link_files_queryset(folder, user=None):
     if user is None:
         return folder.chris_link_files.filter(public=True)
 
-    if user.username == 'chris':
-        return folder.chris_link_files.all()
+    resolver = PermissionResolver.for_user(user)
+    if user.username == 'chris' or (folder.path not in STRUCTURAL_FOLDER_PATHS and
+                                    resolver.has_permission(folder)):
+        return folder.chris_link_files.all()  # permissions are inherited from the folder
 
     lookup = models.Q(owner=user) | models.Q(public=True) | models.Q(
-        shared_users=user) | models.Q(shared_groups__in=user.groups.all())
+        shared_users=user) | models.Q(shared_groups__in=resolver.get_group_ids())
     return folder.chris_link_files.filter(lookup).distinct()
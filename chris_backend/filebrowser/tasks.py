@@ -2,7 +2,7 @@
 import logging
 
 from celery import shared_task
-from core.models import ChrisFolder
+from core.models import ChrisFolder, deferred_storage_deletion
 
 
 logger = logging.getLogger(__name__)
@@ -16,7 +16,9 @@ def delete_folder(self, folder_id):
         if not folder.is_pending_deletion():
             return # idempotent safety
 
-        folder.delete()
+        # delete the storage data of the whole tree in batches instead of per file
+        with deferred_storage_deletion():
+            folder.delete()
     except ChrisFolder.DoesNotExist:
         pass
     except Exception as e:
@@ -25,3 +27,43 @@ def delete_folder(self, folder_id):
             deletion_error=str(e)
         )
         raise
+
+
+# no automatic retries: a failed move is marked as FAILED, so a retry would find the
+# folder is no longer pending and do nothing
+@shared_task
+def move_folder(folder_id):
+    try:
+        folder = ChrisFolder.objects.get(id=folder_id)
+
+        if not folder.is_pending_move():
+            return # idempotent safety
+
+        new_path = folder.move_target_path
+        last_progress = [0]
+
+        def report_progress(done, total):
+            progress = int(100 * done / total) if total else 100
+            if progress > last_progress[0]:  # avoid a DB write for every file
+                last_progress[0] = progress
+                ChrisFolder.objects.filter(id=folder_id).update(move_progress=progress)
+                logger.info(f'Moving folder {folder_id} to {new_path}: {done} of '
+                            f'{total} files moved')
+
+        folder.move(new_path, report_progress)
+
+        if folder.public:
+            folder.create_public_link()  # recreate public link under the new path
+
+        ChrisFolder.objects.filter(id=folder_id).update(  # atomic update
+            move_status=ChrisFolder.MoveStatus.INACTIVE,
+            move_progress=100
+        )
+    except ChrisFolder.DoesNotExist:
+        pass
+    except Exception as e:
+        ChrisFolder.objects.filter(id=folder_id).update(  # atomic update
+            move_status=ChrisFolder.MoveStatus.FAILED,
+            move_error=str(e)
+        )
+        raise
@@ -3,10 +3,10 @@ import logging
 from unittest import mock, skip
 
 from django.test import TestCase
-from django.contrib.auth.models import User
+from django.contrib.auth.models import User, Group
 from django.conf import settings
 
-from core.models import ChrisFolder
+from core.models import ChrisFolder, PermissionResolver
 from users.models import UserProxy
 from filebrowser import services
 
@@ -168,6 +168,53 @@ class ServiceTests(TestCase):
         self.assertEqual(qs.count(), 1)
         self.assertEqual(qs.first().path, pk_dict['path'])
 
+    def test_get_folder_queryset_other_user_home_not_shared_through_home(self):
+        """
+        Test whether the services.get_folder_queryset function doesn't allow a user
+        to see other user's private folders and files through the permission granted
+        to all users on the top-level home folder.
+        """
+        other_user = User.objects.get(username=self.other_username)
+        path = f'home/{self.username}/uploads'
+        folder = ChrisFolder.objects.get(path=path)
+        qs = services.get_folder_queryset({'path': path}, other_user)
+        self.assertEqual(qs.count(), 0)
+        resolver = PermissionResolver(other_user)
+        self.assertFalse(resolver.can_access(folder.chris_files.first()))
+
+        home = ChrisFolder.objects.get(path='home')
+        qs = services.get_folder_children_queryset(home, other_user)
+        self.assertEqual([f.path for f in qs.all()], [f'home/{self.other_username}'])
+
+    def test_get_folder_queryset_pacs_folders_not_shared_through_services(self):
+        """
+        Test whether the services.get_folder_queryset function doesn't allow a user
+        that is not a member of the pacs_users group to see the PACS folders through
+        the permissions granted on the top-level SERVICES and SERVICES/PACS folders.
+        """
+        chris_user = User.objects.get(username=self.chris_username)
+        other_user = User.objects.get(username=self.other_username)
+        pacs_grp = Group.objects.get(name='pacs_users')
+        other_user.groups.remove(pacs_grp)
+
+        path = 'SERVICES/PACS/MyPACS/123456-crazy/brain_crazy_study'
+        folder = ChrisFolder.objects.create(path=path, owner=chris_user)
+        qs = services.get_folder_queryset({'path': path}, other_user)
+        self.assertEqual(qs.count(), 0)
+        qs = services.get_folder_queryset({'path': 'SERVICES/PACS'}, other_user)
+        self.assertEqual(qs.count(), 1)
+
+        user = User.objects.get(username=self.username)
+        pacs_folder = ChrisFolder.objects.get(path='SERVICES/PACS/MyPACS')
+        pacs_folder.grant_group_permission(pacs_grp, 'r')
+        qs = services.get_folder_queryset({'path': path}, user)
+        self.assertEqual(qs.count(), 1)
+        qs = services.get_folder_queryset({'path': path}, other_user)
+        self.assertEqual(qs.count(), 0)
+        folder.delete()
+        pacs_folder.delete()
+        other_user.groups.add(pacs_grp)
+
     def test_get_folder_children_queryset_from_user_success_for_chris_user(self):
         """
         Test whether the services.get_folder_children_queryset function
@@ -4,11 +4,14 @@ import io
 import os
 import json
 import time
+import zipfile
 from unittest import mock
 
-from django.test import TestCase,TransactionTestCase, tag
+from django.test import TestCase,TransactionTestCase, tag, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.conf import settings
 from django.contrib.auth.models import User, Group
+from django.db import connection
 from django.urls import reverse
 from rest_framework import status
 
@@ -24,7 +27,7 @@ from users.models import UserProxy
 from userfiles.models import UserFile
 from plugins.models import PluginMeta, Plugin, ComputeResource
 from plugininstances.models import PluginInstance
-from filebrowser import views
+from filebrowser import views, serializers
 
 
 COMPUTE_RESOURCE_URL = settings.COMPUTE_RESOURCE_URL
@@ -425,6 +428,63 @@ class FileBrowserFolderDetailViewTests(FileBrowserTasksViewTests):
         folder.remove_public_access()
         folder.delete()
 
+    def test_filebrowserfolder_update_async_move_success(self):
+        # create a folder with a file
+        owner = User.objects.get(username=self.username)
+        folder, _ = ChrisFolder.objects.get_or_create(
+            path=f'home/{self.username}/uploads/test_async_move', owner=owner)
+        f = UserFile(owner=owner, parent_folder=folder)
+        f.fname.name = f'home/{self.username}/uploads/test_async_move/file.txt'
+        f.save()
+
+        read_update_delete_url = reverse("chrisfolder-detail",
+                                         kwargs={"pk": folder.id})
+        new_path = f'home/{self.username}/uploads/test_async_moved'
+        put = json.dumps({
+            "template": {"data": [{"name": "path", "value": new_path}]}})
+
+        self.client.login(username=self.username, password=self.password)
+        with mock.patch.object(settings, 'FOLDER_ASYNC_MOVE_MIN_FILES', 1):
+            with mock.patch.object(serializers.move_folder, 'delay',
+                                   return_value=None) as delay_mock:
+                response = self.client.put(read_update_delete_url, data=put,
+                                           content_type=self.content_type)
+                self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+                # check that the move_folder task was called with appropriate args
+                delay_mock.assert_called_with(folder.id)
+
+        self.assertEqual(response.data['move_status'], 'pending')
+        self.assertEqual(response.data['move_target_path'], new_path)
+        folder.refresh_from_db()
+        self.assertEqual(folder.path, f'home/{self.username}/uploads/test_async_move')
+
+        # further updates are rejected while the move is pending
+        response = self.client.put(read_update_delete_url, data=put,
+                                   content_type=self.content_type)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filebrowserfolder_update_failure_descendant_folder_pending_move(self):
+        owner = User.objects.get(username=self.username)
+        folder, _ = ChrisFolder.objects.get_or_create(
+            path=f'home/{self.username}/uploads/test_outer', owner=owner)
+        inner_folder, _ = ChrisFolder.objects.get_or_create(
+            path=f'home/{self.username}/uploads/test_outer/inner', owner=owner)
+        inner_folder.mark_move_pending(f'home/{self.username}/uploads/test_inner')
+
+        read_update_delete_url = reverse("chrisfolder-detail",
+                                         kwargs={"pk": folder.id})
+        new_path = f'home/{self.username}/uploads/test_outer_moved'
+        put = json.dumps({
+            "template": {"data": [{"name": "path", "value": new_path}]}})
+
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.put(read_update_delete_url, data=put,
+                                   content_type=self.content_type)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        folder.refresh_from_db()
+        self.assertEqual(folder.path, f'home/{self.username}/uploads/test_outer')
+
     def test_filebrowserfolder_update_failure_unauthenticated(self):
         response = self.client.put(self.read_update_delete_url, data=self.put,
                                    content_type=self.content_type)
@@ -493,6 +553,24 @@ class FileBrowserFolderDetailViewTests(FileBrowserTasksViewTests):
         response = self.client.delete(read_update_delete_url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_filebrowserfolder_delete_failure_ancestor_folder_pending_move(self):
+        owner = User.objects.get(username=self.username)
+        folder, _ = ChrisFolder.objects.get_or_create(
+            path=f'home/{self.username}/uploads/test_moving', owner=owner)
+        inner_folder, _ = ChrisFolder.objects.get_or_create(
+            path=f'home/{self.username}/uploads/test_moving/inner', owner=owner)
+        folder.mark_move_pending(f'home/{self.username}/uploads/test_moved')
+
+        read_update_delete_url = reverse("chrisfolder-detail",
+                                         kwargs={"pk": inner_folder.id})
+        self.client.login(username=self.username, password=self.password)
+
+        with mock.patch.object(views.delete_folder, 'delay',
+                               return_value=None) as delay_mock:
+            response = self.client.delete(read_update_delete_url)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            delay_mock.assert_not_called()
+
     def test_filebrowserfolder_delete_failure_unauthenticated(self):
         response = self.client.delete(self.read_update_delete_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -657,6 +735,91 @@ class FileBrowserFolderDetailViewTests(FileBrowserTasksViewTests):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
+class FileBrowserFolderArchiveViewTests(FileBrowserViewTests):
+    """
+    Test the 'chrisfolder-archive' view.
+    """
+
+    def setUp(self):
+        super(FileBrowserFolderArchiveViewTests, self).setUp()
+        self.storage_manager = connect_storage(settings)
+        user = User.objects.get(username=self.username)
+        other_user = User.objects.get(username=self.other_username)
+
+        self.folder = self._create_files(
+            user, f'home/{self.username}/uploads/archive',
+            {'a.txt': 'file a', 'sub/b.txt': 'file b'})
+        self.other_folder = self._create_files(
+            other_user, f'home/{self.other_username}/uploads/shared',
+            {'c.txt': 'file c'})
+
+        # link to the other user's folder and link cycle back to the archived folder
+        lf = ChrisLinkFile(path=self.other_folder.path, owner=user,
+                           parent_folder=self.folder)
+        lf.save(name='shared')
+        lf = ChrisLinkFile(path=self.folder.path, owner=user,
+                           parent_folder=self.folder)
+        lf.save(name='cycle')
+
+        self.archive_url = reverse("chrisfolder-archive", kwargs={"pk": self.folder.id})
+
+    def _create_files(self, owner, folder_path, files):
+        for (name, contents) in files.items():
+            path = f'{folder_path}/{name}'
+            self.storage_manager.upload_obj(path, contents, content_type='text/plain')
+            (parent_folder, _) = ChrisFolder.objects.get_or_create(
+                path=os.path.dirname(path), owner=owner)
+            f = UserFile(owner=owner, parent_folder=parent_folder)
+            f.fname.name = path
+            f.save()
+        return ChrisFolder.objects.get(path=folder_path)
+
+    def _get_archive(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        content = b''.join(response.streaming_content)
+        return zipfile.ZipFile(io.BytesIO(content))
+
+    def test_filebrowserfolder_archive_success(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.archive_url)
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename="archive.zip"')
+        zf = self._get_archive(self.archive_url)
+        self.assertEqual(zf.namelist(), ['a.txt', 'sub/b.txt'])
+        self.assertEqual(zf.read('sub/b.txt'), b'file b')
+        self.assertEqual(zf.infolist()[0].compress_type, zipfile.ZIP_STORED)
+
+    def test_filebrowserfolder_archive_success_follows_accessible_links(self):
+        self.other_folder.grant_user_permission(
+            User.objects.get(username=self.username), 'r')
+        self.client.login(username=self.username, password=self.password)
+        zf = self._get_archive(self.archive_url + '?compression=deflate')
+        self.assertEqual(zf.namelist(), ['a.txt', 'sub/b.txt', 'shared/c.txt'])
+        self.assertEqual(zf.read('shared/c.txt'), b'file c')
+        self.assertEqual(zf.infolist()[0].compress_type, zipfile.ZIP_DEFLATED)
+
+    def test_filebrowserfolder_archive_success_start_after(self):
+        self.client.login(username=self.username, password=self.password)
+        zf = self._get_archive(self.archive_url + '?start_after=a.txt')
+        self.assertEqual(zf.namelist(), ['sub/b.txt'])
+
+    def test_filebrowserfolder_archive_failure_invalid_compression(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.archive_url + '?compression=bzip2')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filebrowserfolder_archive_failure_access_denied(self):
+        self.client.login(username=self.other_username, password=self.other_password)
+        response = self.client.get(self.archive_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_filebrowserfolder_archive_failure_unauthenticated(self):
+        response = self.client.get(self.archive_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
 class FileBrowserFolderChildListViewTests(FileBrowserViewTests):
     """
     Test the 'chrisfolder-child-list' view.
@@ -930,10 +1093,12 @@ class FileBrowserFolderGroupPermissionListViewTests(FileBrowserViewTests):
 
         folder = ChrisFolder.objects.get(path=self.path)
 
+        grp = Group.objects.get(name=self.grp_name)
+
         self.assertIn(self.grp_name, [g.name for g in folder.shared_groups.all()])
-        self.assertIn(self.grp_name, [g.name for g in inner_folder.shared_groups.all()])
-        self.assertIn(self.grp_name, [g.name for g in f.shared_groups.all()])
-        self.assertIn(self.grp_name, [g.name for g in lf.shared_groups.all()])
+        self.assertTrue(inner_folder.has_group_permission(grp))
+        self.assertTrue(f.has_group_permission(grp))
+        self.assertTrue(lf.has_group_permission(grp))
 
         folder.remove_shared_link()
 
@@ -967,6 +1132,30 @@ class FileBrowserFolderGroupPermissionListViewTests(FileBrowserViewTests):
         response = self.client.get(self.create_read_url)
         self.assertContains(response, self.grp_name)
 
+    def test_filebrowserfoldergrouppermission_list_success_inherited(self):
+        user = User.objects.get(username=self.username)
+        grp = Group.objects.get(name=self.grp_name)
+        folder = ChrisFolder.objects.get(path=self.path)
+        folder.grant_group_permission(grp, 'r')
+        inner_folder = ChrisFolder.objects.create(path=f'{self.path}/inner', owner=user)
+        read_url = reverse('foldergrouppermission-list', kwargs={"pk": inner_folder.id})
+
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(read_url)
+        self.assertContains(response, self.grp_name)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['folder_path'], self.path)
+        self.assertTrue(response.data['results'][0]['inherited'])
+
+    def test_filebrowserfoldergrouppermission_list_structural_folder_not_inherited(self):
+        home = ChrisFolder.objects.get(path='home')
+        self.assertTrue(home.shared_groups.filter(name=self.grp_name).exists())
+
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.create_read_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['results'])
+
     def test_filebrowserfoldergrouppermission_list_failure_unauthenticated(self):
         response = self.client.get(self.create_read_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1125,9 +1314,14 @@ class FileBrowserFolderGroupPermissionDetailViewTests(FileBrowserViewTests):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["permission"], 'w')
 
-        self.assertEqual(FileGroupPermission.objects.get(file=f).permission, 'w')
-        self.assertEqual(LinkFileGroupPermission.objects.get(link_file=lf).permission,
-                         'w')
+        # the permission is inherited without creating per-object permission rows
+        grp = Group.objects.get(name=self.grp_name)
+        self.assertTrue(inner_folder.has_group_permission(grp, 'w'))
+        self.assertTrue(f.has_group_permission(grp, 'w'))
+        self.assertTrue(lf.has_group_permission(grp, 'w'))
+        self.assertFalse(FolderGroupPermission.objects.filter(folder=inner_folder).exists())
+        self.assertFalse(FileGroupPermission.objects.filter(file=f).exists())
+        self.assertFalse(LinkFileGroupPermission.objects.filter(link_file=lf).exists())
 
     def test_filebrowserfoldergrouppermission_update_failure_unauthenticated(self):
         response = self.client.put(self.read_update_delete_url, data=self.put,
@@ -1223,10 +1417,12 @@ class FileBrowserFolderUserPermissionListViewTests(FileBrowserViewTests):
 
         folder = ChrisFolder.objects.get(path=self.path)
 
+        other_user = User.objects.get(username=self.other_username)
+
         self.assertIn(self.other_username, [u.username for u in folder.shared_users.all()])
-        self.assertIn(self.other_username, [u.username for u in inner_folder.shared_users.all()])
-        self.assertIn(self.other_username, [u.username for u in f.shared_users.all()])
-        self.assertIn(self.other_username, [u.username for u in lf.shared_users.all()])
+        self.assertTrue(inner_folder.has_user_permission(other_user))
+        self.assertTrue(f.has_user_permission(other_user))
+        self.assertTrue(lf.has_user_permission(other_user))
 
         folder.remove_shared_link()
 
@@ -1404,9 +1600,14 @@ class FileBrowserFolderUserPermissionDetailViewTests(FileBrowserViewTests):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["permission"], 'w')
 
-        self.assertEqual(FileUserPermission.objects.get(file=f).permission, 'w')
-        self.assertEqual(LinkFileUserPermission.objects.get(link_file=lf).permission,
-                         'w')
+        # the permission is inherited without creating per-object permission rows
+        other_user = User.objects.get(username=self.other_username)
+        self.assertTrue(inner_folder.has_user_permission(other_user, 'w'))
+        self.assertTrue(f.has_user_permission(other_user, 'w'))
+        self.assertTrue(lf.has_user_permission(other_user, 'w'))
+        self.assertFalse(FolderUserPermission.objects.filter(folder=inner_folder).exists())
+        self.assertFalse(FileUserPermission.objects.filter(file=f).exists())
+        self.assertFalse(LinkFileUserPermission.objects.filter(link_file=lf).exists())
 
     def test_filebrowserfolderuserpermission_update_failure_unauthenticated(self):
         response = self.client.put(self.read_update_delete_url, data=self.put,
@@ -1566,6 +1767,33 @@ class FileBrowserFolderFileListViewTests(FileBrowserViewTests):
 
         userfile.delete()
 
+    def test_filebrowserfolderfile_list_shared_folder_permission_queries(self):
+        user = User.objects.get(username=self.username)
+        other_user = User.objects.get(username=self.other_username)
+        self.client.login(username=self.username, password=self.password)
+
+        n_queries = []
+        for n_files in (2, 8):
+            folder = ChrisFolder.objects.create(
+                path=f'home/{self.other_username}/shared{n_files}', owner=other_user)
+            for i in range(n_files):
+                userfile = UserFile(owner=other_user, parent_folder=folder, size=0)
+                userfile.fname.name = f'{folder.path}/file{i}.txt'
+                userfile.save()
+            folder.grant_user_permission(user, 'r')
+            read_url = reverse("chrisfolder-file-list", kwargs={"pk": folder.id})
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(read_url)
+            self.assertEqual(len(response.data['results']), n_files)
+            n_queries.append(len([q for q in queries.captured_queries
+                                  if 'permission' in q['sql'] or
+                                  'auth_user_groups' in q['sql']]))
+            folder.delete()
+
+        # the permission queries don't depend on the number of listed files
+        self.assertEqual(n_queries[0], n_queries[1])
+
     def test_fileBrowserfile_list_failure_shared_feed_unauthenticated(self):
         other_user = User.objects.get(username=self.other_username)
         plugin = self.plugin
@@ -1843,6 +2071,15 @@ class FileBrowserFileResourceViewTests(FileBrowserViewTests):
         content = [c for c in response.streaming_content][0].decode('utf-8')
         self.assertEqual(content, "test file")
 
+    async def test_fileBrowserfile_resource_success_async_streaming(self):
+        await self.async_client.alogin(username=self.username, password=self.password)
+        response = await self.async_client.get(self.download_url,
+                                               headers={'Range': 'bytes=5-'})
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertTrue(response.is_async)
+        content = b''.join([c async for c in response.streaming_content])
+        self.assertEqual(content, b'file')
+
     def test_fileBrowserfile_resource_success_user_chris(self):
         self.client.login(username=self.chris_username, password=self.chris_password)
         response = self.client.get(self.download_url)
@@ -1850,6 +2087,96 @@ class FileBrowserFileResourceViewTests(FileBrowserViewTests):
         content = [c for c in response.streaming_content][0].decode('utf-8')
         self.assertEqual(content, "test file")
 
+    def test_fileBrowserfile_resource_success_etag_and_accept_ranges(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.download_url)
+        self.assertEqual(response.status_code, 200)
+        info = self.storage_manager.obj_info(self.upload_path)
+        self.assertEqual(response['ETag'], f'"{info.etag}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], '9')
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename="file2.txt"')
+
+    def test_fileBrowserfile_resource_not_modified(self):
+        self.client.login(username=self.username, password=self.password)
+        etag = self.client.get(self.download_url)['ETag']
+        response = self.client.get(self.download_url,
+                                   headers={'If-None-Match': f'"other", W/{etag}'})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_fileBrowserfile_resource_single_range(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.download_url, headers={'Range': 'bytes=5-'})
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], 'bytes 5-8/9')
+        self.assertEqual(b''.join(response.streaming_content), b'file')
+
+    def test_fileBrowserfile_resource_multiple_ranges(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.download_url,
+                                   headers={'Range': 'bytes=0-3, -4'})
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        content_type = response['Content-Type']
+        self.assertTrue(content_type.startswith('multipart/byteranges; boundary='))
+        boundary = content_type.split('boundary=')[1]
+        content = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(content))
+        self.assertEqual(content, (
+            f'--{boundary}\r\nContent-Type: text/plain\r\n'
+            f'Content-Range: bytes 0-3/9\r\n\r\ntest\r\n'
+            f'--{boundary}\r\nContent-Type: text/plain\r\n'
+            f'Content-Range: bytes 5-8/9\r\n\r\nfile\r\n'
+            f'--{boundary}--\r\n').encode())
+
+    def test_fileBrowserfile_resource_range_not_satisfiable(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.download_url, headers={'Range': 'bytes=9-'})
+        self.assertEqual(response.status_code,
+                         status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], 'bytes */9')
+
+    def test_fileBrowserfile_resource_range_ignored_if_range_does_not_match(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.download_url,
+                                   headers={'Range': 'bytes=5-', 'If-Range': '"old"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'test file')
+
+    @override_settings(FILE_DOWNLOAD_OFFLOAD='redirect')
+    def test_fileBrowserfile_resource_offload_redirect(self):
+        url = 'https://storage.example.org/users/file2.txt?signature=abc'
+        with mock.patch.object(self.storage_manager, 'get_download_url',
+                               return_value=url) as get_download_url_mock:
+            self.client.login(username=self.username, password=self.password)
+            response = self.client.get(self.download_url)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(response['Location'], url)
+        get_download_url_mock.assert_called_with(
+            self.upload_path, settings.FILE_DOWNLOAD_URL_EXPIRATION, 'file2.txt')
+
+    @override_settings(FILE_DOWNLOAD_OFFLOAD='redirect')
+    def test_fileBrowserfile_resource_offload_redirect_failure_access_denied(self):
+        with mock.patch.object(self.storage_manager,
+                               'get_download_url') as get_download_url_mock:
+            self.client.login(username=self.other_username,
+                              password=self.other_password)
+            response = self.client.get(self.download_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        get_download_url_mock.assert_not_called()
+
+    @override_settings(FILE_DOWNLOAD_OFFLOAD='x-accel-redirect',
+                       FILE_DOWNLOAD_ACCEL_REDIRECT_LOCATION='/protected-files/')
+    def test_fileBrowserfile_resource_offload_x_accel_redirect(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.download_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         f'/protected-files/{self.upload_path}')
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertEqual(response.content, b'')
+
     def test_fileBrowserfile_resource_failure_access_denied(self):
         self.client.login(username=self.other_username, password=self.other_password)
         response = self.client.get(self.download_url)
@@ -1,14 +1,14 @@
 
 import logging
-from pathlib import Path
 
-from django.http import Http404, FileResponse
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 from rest_framework.authentication import BasicAuthentication, SessionAuthentication
-from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiTypes
+from drf_spectacular.utils import (extend_schema, OpenApiParameter, OpenApiResponse,
+                                   OpenApiTypes)
 
 from core.models import (ChrisFolder, FolderGroupPermission,
                          FolderGroupPermissionFilter, FolderUserPermission,
@@ -16,9 +16,12 @@ from core.models import (ChrisFolder, FolderGroupPermission,
                          FileGroupPermissionFilter, FileUserPermission,
                          FileUserPermissionFilter, ChrisLinkFile,
                          LinkFileGroupPermission, LinkFileGroupPermissionFilter,
-                         LinkFileUserPermission, LinkFileUserPermissionFilter)
+                         LinkFileUserPermission, LinkFileUserPermissionFilter,
+                         get_folder_permission_lineage_paths)
 from core.renderers import BinaryFileRenderer
-from core.views import TokenAuthSupportQueryString
+from core.utils import aiter_in_thread
+from core.views import (TokenAuthSupportQueryString, FileResourceView,
+                        is_async_streaming)
 from collectionjson import services
 
 from .serializers import (FileBrowserFolderSerializer,
@@ -31,6 +34,8 @@ from .serializers import (FileBrowserFolderSerializer,
                           FileBrowserLinkFileGroupPermissionSerializer,
                           FileBrowserLinkFileUserPermissionSerializer)
 from .tasks import delete_folder
+from .archives import (ARCHIVE_COMPRESSION_METHODS, iter_folder_archive,
+                       get_archive_name)
 from .services import (get_folder_queryset,
                        get_folder_children_queryset,
                        get_folder_files_queryset,
@@ -142,10 +147,21 @@ class FileBrowserFolderDetail(generics.RetrieveUpdateDestroyAPIView):
         template_data = {"public": "", "path": ""}
         return services.append_collection_template(response, template_data)
 
+    def update(self, request, *args, **kwargs):
+        """
+        Overriden to return a 202 status when the folder's tree is being moved to the
+        new path by an asynchronous task.
+        """
+        response = super(FileBrowserFolderDetail, self).update(request, *args, **kwargs)
+        if response.data.get('move_status') == ChrisFolder.MoveStatus.PENDING:
+            response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
     def destroy(self, request, *args, **kwargs):
         """
         Overriden to verify that the user's home or feeds folder is not being deleted
-        then asyncronously delete the folder and its folder/files from storage.
+        and that the folder's tree is not being moved then asyncronously delete the
+        folder and its folder/files from storage.
         """
         username = request.user.username
         folder = self.get_object()
@@ -158,6 +174,13 @@ class FileBrowserFolderDetail(generics.RetrieveUpdateDestroyAPIView):
                     {'non_field_errors':
                          [f"Deleting folder '{folder.path}' is not allowed."]})
 
+        moving_folder = ChrisFolder.get_moving_folder(folder.path)
+        if moving_folder:
+            raise serializers.ValidationError(
+                {'non_field_errors':
+                     [f"Folder '{moving_folder.path}' is being moved to "
+                      f"'{moving_folder.move_target_path}'."]})
+
         if folder.mark_deletion_pending():
             delete_folder.delay(folder.id)  # async task
 
@@ -165,6 +188,53 @@ class FileBrowserFolderDetail(generics.RetrieveUpdateDestroyAPIView):
         return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
 
+class FileBrowserFolderArchive(generics.GenericAPIView):
+    """
+    A view to download a folder's tree as a zip archive streamed from storage.
+    """
+    http_method_names = ['get']
+    queryset = ChrisFolder.objects.all()
+    renderer_classes = (BinaryFileRenderer,)
+    permission_classes = (permissions.IsAuthenticatedOrReadOnly,
+                          IsOwnerOrChrisOrCanWriteOrCanReadOnlyOrPublicReadOnly)
+    authentication_classes = (TokenAuthSupportQueryString, BasicAuthentication,
+                              SessionAuthentication)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('compression', enum=list(ARCHIVE_COMPRESSION_METHODS),
+                             default='store'),
+            OpenApiParameter('start_after', description=(
+                'resume an interrupted download with the entries after this one')),
+        ],
+        responses=OpenApiResponse(OpenApiTypes.BINARY),
+    )
+    def get(self, request, *args, **kwargs):
+        """
+        Overriden to stream the zip archive of the files under the folder that the
+        user can access, including the contents of the accessible link files.
+        """
+        folder = self.get_object()
+        if not folder.path:
+            raise serializers.ValidationError(
+                {'non_field_errors': ['The root folder can not be archived.']})
+
+        compression = request.query_params.get('compression', 'store')
+        if compression not in ARCHIVE_COMPRESSION_METHODS:
+            raise serializers.ValidationError(
+                {'compression': [f"Unsupported compression '{compression}'."]})
+        start_after = request.query_params.get('start_after', '')
+
+        content = iter_folder_archive(folder.path, request.user, compression,
+                                      start_after)
+        if is_async_streaming(request):
+            content = aiter_in_thread(content)  # thread sensitive for the DB queries
+        resp = StreamingHttpResponse(content, content_type='application/zip')
+        resp['Content-Disposition'] = (f'attachment; '
+                                       f'filename="{get_archive_name(folder.path)}"')
+        return resp
+
+
 class FileBrowserFolderChildList(generics.ListAPIView):
     """
     A view for the collection of folders that are the children of this folder.
@@ -234,12 +304,23 @@ class FileBrowserFolderGroupPermissionList(generics.ListCreateAPIView):
         template_data = {"grp_name": "", "permission": ""}
         return services.append_collection_template(response, template_data)
 
+    def get_serializer_context(self):
+        """
+        Overriden to flag the permissions inherited from the folder's ancestors.
+        """
+        context = super().get_serializer_context()
+        context['folder_id'] = self.kwargs.get('pk')
+        return context
+
     def get_group_permissions_queryset(self):
         """
-        Custom method to get the actual group permissions queryset for the folder.
+        Custom method to get the actual group permissions queryset for the folder
+        including the read-only permissions inherited from its ancestors.
         """
         folder = self.get_object()
-        return FolderGroupPermission.objects.filter(folder=folder)
+        lineage = get_folder_permission_lineage_paths(folder.path)
+        return FolderGroupPermission.objects.filter(
+            folder__path__in=lineage).order_by('folder__path')
 
 
 class FileBrowserFolderGroupPermissionListQuerySearch(generics.ListAPIView):
@@ -256,12 +337,22 @@ class FileBrowserFolderGroupPermissionListQuerySearch(generics.ListAPIView):
     def get_queryset(self):
         """
         Overriden to return a custom queryset that is comprised by the folder-specific
-        group permissions.
+        group permissions including those inherited from the folder's ancestors.
         """
         if getattr(self, "swagger_fake_view", False):
             return FolderGroupPermission.objects.none()
         folder = get_object_or_404(ChrisFolder, pk=self.kwargs['pk'])
-        return FolderGroupPermission.objects.filter(folder=folder)
+        lineage = get_folder_permission_lineage_paths(folder.path)
+        return FolderGroupPermission.objects.filter(
+            folder__path__in=lineage).order_by('folder__path')
+
+    def get_serializer_context(self):
+        """
+        Overriden to flag the permissions inherited from the folder's ancestors.
+        """
+        context = super().get_serializer_context()
+        context['folder_id'] = self.kwargs.get('pk')
+        return context
 
 
 class FileBrowserFolderGroupPermissionDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -340,12 +431,23 @@ class FileBrowserFolderUserPermissionList(generics.ListCreateAPIView):
         template_data = {"username": "", "permission": ""}
         return services.append_collection_template(response, template_data)
 
+    def get_serializer_context(self):
+        """
+        Overriden to flag the permissions inherited from the folder's ancestors.
+        """
+        context = super().get_serializer_context()
+        context['folder_id'] = self.kwargs.get('pk')
+        return context
+
     def get_user_permissions_queryset(self):
         """
-        Custom method to get the actual user permissions queryset for the folder.
+        Custom method to get the actual user permissions queryset for the folder
+        including the read-only permissions inherited from its ancestors.
         """
         folder = self.get_object()
-        return FolderUserPermission.objects.filter(folder=folder)
+        lineage = get_folder_permission_lineage_paths(folder.path)
+        return FolderUserPermission.objects.filter(
+            folder__path__in=lineage).order_by('folder__path')
 
 
 class FileBrowserFolderUserPermissionListQuerySearch(generics.ListAPIView):
@@ -362,12 +464,22 @@ class FileBrowserFolderUserPermissionListQuerySearch(generics.ListAPIView):
     def get_queryset(self):
         """
         Overriden to return a custom queryset that is comprised by the folder-specific
-        user permissions.
+        user permissions including those inherited from the folder's ancestors.
         """
         if getattr(self, "swagger_fake_view", False):
             return FolderUserPermission.objects.none()
         folder = get_object_or_404(ChrisFolder, pk=self.kwargs['pk'])
-        return FolderUserPermission.objects.filter(folder=folder)
+        lineage = get_folder_permission_lineage_paths(folder.path)
+        return FolderUserPermission.objects.filter(
+            folder__path__in=lineage).order_by('folder__path')
+
+    def get_serializer_context(self):
+        """
+        Overriden to flag the permissions inherited from the folder's ancestors.
+        """
+        context = super().get_serializer_context()
+        context['folder_id'] = self.kwargs.get('pk')
+        return context
 
 
 class FileBrowserFolderUserPermissionDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -456,29 +568,16 @@ class FileBrowserFileDetail(generics.RetrieveUpdateDestroyAPIView):
         return services.append_collection_template(response, template_data)
 
 
-class FileBrowserFileResource(generics.GenericAPIView):
+class FileBrowserFileResource(FileResourceView):
     """
     A view to enable downloading of a file resource.
     """
-    http_method_names = ['get']
     queryset = ChrisFile.get_base_queryset()
-    renderer_classes = (BinaryFileRenderer,)
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,
                           IsOwnerOrChrisOrCanWriteOrCanReadOnlyOrPublicReadOnly)
     authentication_classes = (TokenAuthSupportQueryString, BasicAuthentication,
                               SessionAuthentication)
 
-    @extend_schema(responses=OpenApiResponse(OpenApiTypes.BINARY))
-    def get(self, request, *args, **kwargs):
-        """
-        Overriden to be able to make a GET request to an actual file resource.
-        """
-        chris_file = self.get_object()
-        f = chris_file.fname
-        resp = FileResponse(f)
-        resp['Content-Disposition'] = f'attachment; filename="{Path(f.name).name}"'
-        return resp
-
 
 class FileBrowserFileGroupPermissionList(generics.ListCreateAPIView):
     """
@@ -513,7 +612,10 @@ class FileBrowserFileGroupPermissionList(generics.ListCreateAPIView):
         response = services.append_collection_querylist(response, query_list)
 
         links = {'file': reverse('chrisfile-detail', request=request,
-                                   kwargs={"pk": f.id})}
+                                   kwargs={"pk": f.id}),
+                 'folder_group_permissions': reverse(
+                     'foldergrouppermission-list', request=request,
+                     kwargs={"pk": f.parent_folder_id})}
         response = services.append_collection_links(response, links)
 
         template_data = {"grp_name": "", "permission": ""}
@@ -619,7 +721,10 @@ class FileBrowserFileUserPermissionList(generics.ListCreateAPIView):
         response = services.append_collection_querylist(response, query_list)
 
         links = {'file': reverse('chrisfile-detail', request=request,
-                                 kwargs={"pk": f.id})}
+                                 kwargs={"pk": f.id}),
+                 'folder_user_permissions': reverse(
+                     'folderuserpermission-list', request=request,
+                     kwargs={"pk": f.parent_folder_id})}
         response = services.append_collection_links(response, links)
 
         template_data = {"username": "" , "permission": ""}
@@ -760,29 +865,16 @@ class FileBrowserLinkFileDetail(generics.RetrieveUpdateDestroyAPIView):
         return super(FileBrowserLinkFileDetail, self).destroy(request, *args, **kwargs)
 
 
-class FileBrowserLinkFileResource(generics.GenericAPIView):
+class FileBrowserLinkFileResource(FileResourceView):
     """
     A view to enable downloading of a file resource.
     """
-    http_method_names = ['get']
     queryset = ChrisLinkFile.objects.all()
-    renderer_classes = (BinaryFileRenderer,)
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,
                           IsOwnerOrChrisOrCanWriteOrCanReadOnlyOrPublicReadOnly)
     authentication_classes = (TokenAuthSupportQueryString, BasicAuthentication,
                               SessionAuthentication)
 
-    @extend_schema(responses=OpenApiResponse(OpenApiTypes.BINARY))
-    def get(self, request, *args, **kwargs):
-        """
-        Overriden to be able to make a GET request to an actual file resource.
-        """
-        chris_link_file = self.get_object()
-        f = chris_link_file.fname
-        resp = FileResponse(f)
-        resp['Content-Disposition'] = f'attachment; filename="{Path(f.name).name}"'
-        return resp
-
 
 class FileBrowserLinkFileGroupPermissionList(generics.ListCreateAPIView):
     """
@@ -817,7 +909,10 @@ class FileBrowserLinkFileGroupPermissionList(generics.ListCreateAPIView):
         response = services.append_collection_querylist(response, query_list)
 
         links = {'link_file': reverse('chrislinkfile-detail', request=request,
-                                      kwargs={"pk": lf.id})}
+                                      kwargs={"pk": lf.id}),
+                 'folder_group_permissions': reverse(
+                     'foldergrouppermission-list', request=request,
+                     kwargs={"pk": lf.parent_folder_id})}
         response = services.append_collection_links(response, links)
 
         template_data = {"grp_name": "", "permission": ""}
@@ -923,7 +1018,10 @@ class FileBrowserLinkFileUserPermissionList(generics.ListCreateAPIView):
         response = services.append_collection_querylist(response, query_list)
 
         links = {'link_file': reverse('chrislinkfile-detail', request=request,
-                                      kwargs={"pk": lf.id})}
+                                      kwargs={"pk": lf.id}),
+                 'folder_user_permissions': reverse(
+                     'folderuserpermission-list', request=request,
+                     kwargs={"pk": lf.parent_folder_id})}
         response = services.append_collection_links(response, links)
 
         template_data = {"username": "", "permission": ""}
@@ -16,7 +16,8 @@ import asyncio
 import nats
 from nats.aio.client import Client
 from pacsfiles.lonk import (
-    LonkClient,
+    LonkSubscriber,
+    get_lonk_hub,
     LonkDone,
     LonkError,
     LonkProgress,
@@ -29,7 +30,8 @@ from pacsfiles.lonk import (
 )
 from pacsfiles.permissions import IsChrisOrIsPACSUserReadOnly
 
-_SLEEP_TIME_SECOND = 0.1
+# seconds without messages after which an SSE comment is sent to keep the stream alive
+_HEARTBEAT_TIME_SECOND = 15
 
 
 class PACSFileProgressSSE(View):
@@ -37,6 +39,7 @@ class PACSFileProgressSSE(View):
         permissions.IsAuthenticated,
         IsChrisOrIsPACSUserReadOnly,
     )
+    heartbeat_interval = _HEARTBEAT_TIME_SECOND
 
     async def get(self: Self, request: Request, *args, **kwargs):
         return StreamingHttpResponse(self.pacs_file_progress_sse(request, *args, **kwargs), content_type="text/event-stream")
@@ -47,7 +50,6 @@ class PACSFileProgressSSE(View):
     async def pacs_file_progress_sse(self: Self, request: Request, *args: list, **kwargs: dict):
         pacs_name, series_instance_uids = self._get_info(request)
 
-        queue = asyncio.Queue()
         the_progress = {each: 0 for each in series_instance_uids}
 
         # 1. client
@@ -55,48 +57,48 @@ class PACSFileProgressSSE(View):
         if err is not None:
             yield self._event_response(self._err_msg(f'unable to connect nats: e: {err}'))
             return
+        queue = client.queue
 
         # 2. subscribe
-        err = await self._subscribe(client, pacs_name, series_instance_uids, queue)
+        err = await self._subscribe(client, pacs_name, series_instance_uids)
         if err is not None:
             errmsg = f'unable to subscribe: e: {err}'
             print(f'[ERROR] consumer.pacs_file_progress_sse: pacs_name: {pacs_name} e: {err}')  # noqa
             yield self._event_response(self._err_msg(await self._safe_close_client(client, errmsg)))
             return
 
-        # 3. loop for queue.
-        is_last_iteration_processed = False
+        # 3. loop for queue, waking up only for messages and heartbeats.
+        is_closed = False
         err = None
-        while True:
-            if is_last_iteration_processed and self._is_all_end(the_progress):
-                break
-
-            msg, err = await self._get_msg(queue)
-            if err:
-                break
-
-            if not msg:
-                await asyncio.sleep(_SLEEP_TIME_SECOND)
-                is_last_iteration_processed = False
-                continue
-
-            self._process_msg(msg, the_progress)
-            is_last_iteration_processed = True
-            yield self._event_response(msg)
-
-        # 4. close client
-        errmsg = '' if not err else f'unable to get msg: e: {err}'
-        err = await self._safe_close_client(client, errmsg)
-
-        # 5. final yield.
-        yield self._event_response(self._all_done() if not err else self._err_msg(err))
-
-    async def _get_client(self: Self) -> tuple[Optional[LonkClient], Optional[Exception]]:
-        client: Optional[LonkClient] = None
         try:
-            client = await LonkClient.connect(
-                settings.NATS_ADDRESS
-            )
+            while not self._is_all_end(the_progress):
+                msgs, err = await self._get_msgs(queue)
+                if err:
+                    break
+
+                if not msgs:
+                    yield self._heartbeat_response()
+                    continue
+
+                for msg in msgs:
+                    self._process_msg(msg, the_progress)
+                    yield self._event_response(msg)
+
+            # 4. close client
+            errmsg = '' if not err else f'unable to get msg: e: {err}'
+            err = await self._safe_close_client(client, errmsg)
+            is_closed = True
+
+            # 5. final yield.
+            yield self._event_response(self._all_done() if not err else self._err_msg(err))
+        finally:
+            if not is_closed:  # the client went away in the middle of the stream
+                await self._safe_close_client(client, None)
+
+    async def _get_client(self: Self) -> tuple[Optional[LonkSubscriber], Optional[Exception]]:
+        client: Optional[LonkSubscriber] = None
+        try:
+            client = await get_lonk_hub(settings.NATS_ADDRESS).subscriber()
         except Exception as e:
             return None, e
 
@@ -105,29 +107,57 @@ class PACSFileProgressSSE(View):
 
         return client, None
 
-    async def _subscribe(self: Self, client: LonkClient, pacs_name: str, series_instance_uids: list[str], queue: asyncio.Queue) -> Optional[Exception]:
+    async def _subscribe(self: Self, client: LonkSubscriber, pacs_name: str, series_instance_uids: list[str]) -> Optional[Exception]:
         try:
             for each_series_uid in series_instance_uids:
-                await client.subscribe(pacs_name, each_series_uid, lambda msg: queue.put(msg))
+                await client.subscribe(pacs_name, each_series_uid)
         except Exception as e:
             return e
 
         return None
 
-    async def _get_msg(self: Self, queue: asyncio.Queue) -> tuple[Optional[Lonk], Optional[Exception]]:
+    async def _get_msgs(self: Self, queue: asyncio.Queue) -> tuple[list[Lonk], Optional[Exception]]:
+        """
+        Wait up to the heartbeat interval for the next message and return it along
+        with all the messages already queued behind it, coalescing the progress
+        messages of each series. An empty list is returned on timeout.
+        """
         try:
-            msg: Lonk = queue.get_nowait()
-            if not msg:
-                return None, None
-            return msg, None
-        except asyncio.QueueEmpty as e:
-            return None, None
+            msgs: list[Lonk] = [await asyncio.wait_for(queue.get(), self.heartbeat_interval)]
+            while not queue.empty():
+                msgs.append(queue.get_nowait())
+        except asyncio.TimeoutError:
+            return [], None
         except Exception as e:
-            return None, e
+            return [], e
+
+        return self._coalesce_msgs(msgs), None
+
+    def _coalesce_msgs(self: Self, msgs: list[Lonk]) -> list[Lonk]:
+        """
+        Keep only the latest of consecutive progress messages of a series (the number
+        of received DICOM files is cumulative). Every other message is kept in order.
+        """
+        coalesced: list[Lonk] = []
+        progress_idx: dict[str, int] = {}
+        for msg in msgs:
+            series_uid = msg['SeriesInstanceUID']
+            if 'ndicom' in msg['message']:
+                if series_uid in progress_idx:
+                    coalesced[progress_idx[series_uid]] = msg
+                    continue
+                progress_idx[series_uid] = len(coalesced)
+            else:
+                progress_idx.pop(series_uid, None)
+            coalesced.append(msg)
+        return coalesced
 
     def _event_response(self: Self, data: dict):
         return f'event: message\ndata: {json.dumps(data)}\n\n'
 
+    def _heartbeat_response(self: Self):
+        return ': heartbeat\n\n'
+
     def _all_done(self: Self):
         return {'pacs_name': '', 'SeriesInstanceUID': '', 'message': {'done': True}}
 
@@ -151,7 +181,7 @@ class PACSFileProgressSSE(View):
         elif 'ndicom' in message:
             the_progress[series_uid] = message['ndicom']
 
-    async def _safe_close_client(self: Self, client: Optional[LonkClient], err: Optional[Exception]) -> Optional[Exception]:
+    async def _safe_close_client(self: Self, client: Optional[LonkSubscriber], err: Optional[Exception]) -> Optional[Exception]:
         if client is None:
             return err
 
@@ -206,9 +236,11 @@ class PACSFileProgress(AsyncJsonWebsocketConsumer):
     async def connect(self):
         if not await self._has_permission():
             return await self.close()
-        self.client: LonkClient = await LonkClient.connect(
+        # all the consumers of the process share the hub's NATS connection
+        self.client: LonkSubscriber = await get_lonk_hub(
             settings.NATS_ADDRESS
-        )
+        ).subscriber()
+        self._relay_task = asyncio.create_task(self._relay_messages())
         await self.accept()
 
     async def receive_json(self, content, **kwargs):
@@ -227,9 +259,7 @@ class PACSFileProgress(AsyncJsonWebsocketConsumer):
         Subscribe to progress notifications about the reception of a DICOM series.
         """
         try:
-            await self.client.subscribe(
-                pacs_name, series_instance_uid, lambda msg: self.send_json(msg)
-            )
+            await self.client.subscribe(pacs_name, series_instance_uid)
             response = Lonk(
                 pacs_name=pacs_name,
                 SeriesInstanceUID=series_instance_uid,
@@ -257,8 +287,19 @@ class PACSFileProgress(AsyncJsonWebsocketConsumer):
             await self.close(code=500)
             raise e
 
+    async def _relay_messages(self):
+        """
+        Send the messages fanned out by the hub to the websocket client.
+        """
+        while True:
+            msg = await self.client.get()
+            await self.send_json(msg)
+
     async def disconnect(self, code):
         await super().disconnect(code)
+        if getattr(self, 'client', None) is None:
+            return
+        self._relay_task.cancel()
         await self.client.close()
 
     @database_sync_to_async
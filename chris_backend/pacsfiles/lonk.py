@@ -6,6 +6,7 @@ See https://chrisproject.org/docs/oxidicom/lonk
 import asyncio
 import enum
 import logging
+import weakref
 from typing import (
     Self,
     Callable,
@@ -161,6 +162,170 @@ class LonkClient:
         await self._nc.close()
 
 
+class LonkSubscriber:
+    """
+    A local subscriber of a :class:`LonkHub`. The LONK messages of the series it is
+    subscribed to are put in its asyncio ``queue``.
+    """
+
+    def __init__(self, hub: 'LonkHub', maxsize: int):
+        self._hub = hub
+        self.queue: asyncio.Queue[Lonk] = asyncio.Queue(maxsize)
+        self.subjects: set[str] = set()
+
+    async def subscribe(self, pacs_name: str, series_instance_uid: str):
+        await self._hub._subscribe(self, pacs_name, series_instance_uid)
+
+    async def unsubscribe_all(self):
+        await self._hub._unsubscribe_all(self)
+
+    async def get(self) -> Lonk:
+        return await self.queue.get()
+
+    async def close(self):
+        await self.unsubscribe_all()
+        self._hub._subscribers.discard(self)
+
+    def _put(self, lonk: Lonk):
+        if self.queue.full():
+            # progress messages are cumulative, a slow subscriber only loses
+            # intermediate counts
+            self.queue.get_nowait()
+            logger.warning('LONK subscriber queue full, dropped oldest message')
+        self.queue.put_nowait(lonk)
+
+
+class LonkHub:
+    """
+    Multiplexer of the LONK messages sent by *oxidicom* over a single NATS
+    connection. Every NATS subject is subscribed to once, no matter how many local
+    subscribers are interested in it, and the messages are fanned out to the queues
+    of the local subscribers. The NATS subscription to a subject is removed when its
+    last local subscriber unsubscribes.
+    """
+
+    def __init__(
+        self,
+        servers: str | list[str],
+        connect: Callable[..., Awaitable[NATS]] = nats.connect,
+        queue_maxsize: int = 1000,
+    ):
+        self._servers = servers
+        self._connect = connect
+        self._queue_maxsize = queue_maxsize
+        self._nc: NATS | None = None
+        self._lock = asyncio.Lock()
+        self._subscribers: set[LonkSubscriber] = set()
+        self._subscriptions: dict[str, Subscription] = {}
+        self._subject_subscribers: dict[str, set[LonkSubscriber]] = {}
+        self._subject_series: dict[str, tuple[str, str]] = {}
+
+    async def subscriber(self) -> LonkSubscriber:
+        """
+        Create a new local subscriber, connecting to NATS if not connected yet.
+        """
+        async with self._lock:
+            await self._get_connection()
+        subscriber = LonkSubscriber(self, self._queue_maxsize)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Return the number of local subscribers and of subscribed NATS subjects.
+        """
+        return {
+            'subscribers': len(self._subscribers),
+            'subjects': len(self._subscriptions),
+        }
+
+    async def close(self):
+        async with self._lock:
+            await asyncio.gather(
+                *(s.unsubscribe() for s in self._subscriptions.values())
+            )
+            self._subscriptions = {}
+            self._subject_subscribers = {}
+            self._subject_series = {}
+            self._subscribers = set()
+            if self._nc is not None:
+                await self._nc.close()
+                self._nc = None
+
+    async def _get_connection(self) -> NATS:
+        """
+        Return the NATS connection, (re)connecting and re-subscribing to the current
+        subjects if it was never opened or has been closed. Must hold the lock.
+        """
+        if self._nc is None or self._nc.is_closed:
+            self._nc = await self._connect(self._servers)
+            for subject in self._subscriptions:
+                self._subscriptions[subject] = await self._nc.subscribe(
+                    subject, cb=self._fan_out_callback(subject)
+                )
+        return self._nc
+
+    async def _subscribe(
+        self,
+        subscriber: LonkSubscriber,
+        pacs_name: str,
+        series_instance_uid: str,
+    ):
+        subject = subject_of(pacs_name, series_instance_uid)
+        async with self._lock:
+            if subject not in self._subscriptions:
+                nc = await self._get_connection()
+                self._subject_series[subject] = (pacs_name, series_instance_uid)
+                self._subscriptions[subject] = await nc.subscribe(
+                    subject, cb=self._fan_out_callback(subject)
+                )
+            self._subject_subscribers.setdefault(subject, set()).add(subscriber)
+            subscriber.subjects.add(subject)
+
+    async def _unsubscribe_all(self, subscriber: LonkSubscriber):
+        async with self._lock:
+            for subject in subscriber.subjects:
+                subscribers = self._subject_subscribers.get(subject, set())
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    self._subject_subscribers.pop(subject, None)
+                    self._subject_series.pop(subject, None)
+                    subscription = self._subscriptions.pop(subject, None)
+                    if subscription is not None:
+                        await subscription.unsubscribe()
+            subscriber.subjects = set()
+
+    def _fan_out_callback(self, subject: str):
+        async def nats_callback(message: Msg):
+            pacs_name, series_instance_uid = self._subject_series[subject]
+            try:
+                lonk = _message2json(pacs_name, series_instance_uid, message)
+            except ValueError as e:
+                logger.error(f'Invalid LONK message on {subject}: {e}')
+                return
+            for subscriber in self._subject_subscribers.get(subject, ()):
+                subscriber._put(lonk)
+
+        return nats_callback
+
+
+_hubs: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LonkHub]' = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_lonk_hub(servers: str | list[str]) -> LonkHub:
+    """
+    Get the LONK hub of the running event loop, i.e. of the process when running
+    under an ASGI server. NATS connections can't be shared across event loops.
+    """
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = LonkHub(servers)
+    return hub
+
+
 def subject_of(pacs_name: str, series_instance_uid: str) -> str:
     """
     Get the NATS subject for a series.
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from pacsfiles.consumers import PACSFileProgressSSE
+from pacsfiles.lonk import get_lonk_hub
+
+
+class Command(BaseCommand):
+    help = ('Open the given number of idle PACS progress SSE streams in this process '
+            '(subscribed to series that never receive messages) and report the CPU '
+            'time used by the process while they are open. Requires NATS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--streams', type=int, default=1000,
+                            help='number of concurrent SSE streams')
+        parser.add_argument('--duration', type=float, default=30,
+                            help='seconds during which the CPU usage is measured')
+        parser.add_argument('--heartbeat', type=float,
+                            default=PACSFileProgressSSE.heartbeat_interval,
+                            help='seconds between the heartbeats of idle streams')
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options['streams'], options['duration'],
+                             options['heartbeat']))
+
+    async def run(self, n_streams, duration, heartbeat):
+        view = PACSFileProgressSSE()
+        view.heartbeat_interval = heartbeat
+        factory = RequestFactory()
+        hub = get_lonk_hub(settings.NATS_ADDRESS)
+        n_events = 0
+
+        async def consume(i):
+            nonlocal n_events
+            request = factory.get('/', {'pacs_name': 'loadtest',
+                                        'series_uids': f'1.2.840.{i}'})
+            async for _ in view.pacs_file_progress_sse(request):
+                n_events += 1
+
+        tasks = [asyncio.create_task(consume(i)) for i in range(n_streams)]
+        while hub.get_stats()['subjects'] < n_streams:
+            if any(task.done() for task in tasks):
+                break  # a stream failed to connect or subscribe
+            await asyncio.sleep(0.1)
+        stats = hub.get_stats()
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        await asyncio.sleep(duration)
+        cpu_time = time.process_time() - cpu_start
+        wall_time = time.perf_counter() - wall_start
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await hub.close()
+
+        self.stdout.write(f'{n_streams} idle streams ({stats["subscribers"]} hub '
+                          f'subscribers, {stats["subjects"]} subjects): '
+                          f'{cpu_time:.3f}s CPU in {wall_time:.1f}s '
+                          f'({100 * cpu_time / wall_time:.2f}%), {n_events} events sent')
@@ -9,7 +9,7 @@ from django.conf import settings
 import django_filters
 from django_filters.rest_framework import FilterSet
 
-from core.models import AsyncDeletableModel, ChrisFolder, ChrisFile
+from core.models import AsyncDeletableModel, ChrisFolder, ChrisFile, defer_file_deletion
 from core.utils import filter_files_by_n_slashes, json_zip2str
 from core.storage import connect_storage
 from .services import PfdcmClient
@@ -244,6 +244,8 @@ class PACSFile(ChrisFile):
 @receiver(post_delete, sender=PACSFile)
 def auto_delete_file_from_storage(sender, instance, **kwargs):
     storage_path = instance.fname.name
+    if defer_file_deletion(storage_path):
+        return
     storage_manager = connect_storage(settings)
     try:
         if storage_manager.obj_exists(storage_path):
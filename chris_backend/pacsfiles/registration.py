@@ -0,0 +1,226 @@
+"""
+Bulk registration of many PACS series (directories of DICOM files) at once.
+"""
+
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+from django.contrib.auth.models import User, Group
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from rest_framework import serializers
+
+from core.models import (ChrisFolder, FolderGroupPermission, get_folder_lineage_paths,
+                         get_folder_permission_lineage_paths)
+from core.storage import connect_storage
+from core.storage.storagemanager import ObjectInfo
+from .models import PACS, PACSSeries, PACSFile
+from .serializers import PACSSeriesSerializer, PACSSeriesFilesPending
+
+
+def list_series_files(storage_manager,
+                      series_paths: List[str]) -> Dict[str, List[ObjectInfo]]:
+    """
+    Return a series-path -> files-info map. The storage is listed once per parent
+    folder of the series (e.g. once per study) instead of once per series.
+    """
+    series_paths = set(series_paths)
+    prefixes = {os.path.dirname(path) for path in series_paths}
+    listings = defaultdict(list)
+
+    for prefix in prefixes:
+        for info in storage_manager.ls_info(prefix + '/'):
+            series_name = info.path[len(prefix) + 1:].split('/', 1)[0]
+            series_path = f'{prefix}/{series_name}'
+            if series_path in series_paths:
+                listings[series_path].append(info)
+    return listings
+
+
+def register_pacs_series_list(
+        series_list: List[Dict[str, Any]],
+        owner: User) -> Tuple[List[PACSSeries], List[Dict[str, Any]], List[str]]:
+    """
+    Register many DICOM series with a number of storage listings that only depends on
+    the number of distinct study folders and a number of DB queries that doesn't
+    depend on the number of series or files.
+
+    Returns a tuple with the list of registered series, the list of the series data
+    whose DICOM files are not all in storage yet and the list of error messages of
+    the series that couldn't be registered.
+    """
+    storage_manager = connect_storage(settings)
+    paths = [str(data.get('path', '')).strip().strip('/') for data in series_list]
+    listings = list_series_files(storage_manager, [p for p in paths if p])
+
+    validated = []
+    pending = []
+    errors = []
+    for (data, path) in zip(series_list, paths):
+        serializer = PACSSeriesSerializer(data=data, context={
+            'wait_for_files': False, 'files_info': listings.get(path, [])})
+        try:
+            serializer.is_valid(raise_exception=True)
+        except PACSSeriesFilesPending:
+            pending.append(data)
+        except serializers.ValidationError as e:
+            errors.append(f'Series {data.get("SeriesInstanceUID")}: {e.detail}')
+        else:
+            validated.append(serializer.validated_data)
+
+    registered = _create_pacs_series(validated, owner, storage_manager, errors)
+    return registered, pending, errors
+
+
+@transaction.atomic
+def _create_pacs_series(validated: List[Dict[str, Any]], owner: User,
+                        storage_manager, errors: List[str]) -> List[PACSSeries]:
+    """
+    Bulk create the PACS series from their validated data along with their folders
+    and PACS files. The messages of the series that are already registered are
+    appended to ``errors``. Batches registering overlapping series or folders can
+    run concurrently.
+    """
+    if not validated:
+        return []
+    (pacs_grp, _) = Group.objects.get_or_create(name='pacs_users')
+
+    pacs_by_name = PACS.objects.select_related('folder').in_bulk(
+        {data['pacs_name'] for data in validated}, field_name='identifier')
+    for pacs_name in {data['pacs_name'] for data in validated} - set(pacs_by_name):
+        (pacs_folder, tf) = ChrisFolder.objects.get_or_create(
+            path=f'SERVICES/PACS/{pacs_name}', owner=owner)
+        if tf:
+            pacs_folder.grant_group_permission(pacs_grp, 'r')
+        pacs_by_name[pacs_name] = PACS.objects.create(folder=pacs_folder,
+                                                      identifier=pacs_name)
+
+    existing = _get_registered_series(pacs_by_name.values(), validated)
+
+    new_series = []
+    for data in validated:
+        key = (data['pacs_name'], data['SeriesInstanceUID'])
+        if key in existing:
+            errors.append(f'A DICOM series with SeriesInstanceUID={key[1]} already '
+                          f'registered for pacs {key[0]}')
+            continue
+        existing.add(key)  # also skip duplicates within the batch
+        new_series.append(dict(data))
+
+    # remove commas from the existing files/folders names reusing the listings
+    files = defaultdict(list)  # series path -> (file path, file size) tuples
+    for data in new_series:
+        path = data['path']
+        files_in_storage = data.pop('files_in_storage')
+        file_sizes = data.pop('file_sizes')
+        changed_file_paths = storage_manager.sanitize_obj_names(path, files_in_storage)
+        for obj_path in files_in_storage:
+            new_path = changed_file_paths.get(obj_path, obj_path)
+            if new_path:
+                files[path].append((new_path, file_sizes.get(obj_path)))
+
+    folder_paths = {data['path'] for data in new_series}
+    folder_paths.update(os.path.dirname(obj_path) for series_files in files.values()
+                        for (obj_path, _) in series_files)
+    folder_ids = _create_folders(folder_paths, owner)
+
+    pacs_series = []
+    paths_by_folder_id = {}
+    for data in new_series:
+        path = data.pop('path')
+        pacs = pacs_by_name[data.pop('pacs_name')]
+        pacs_series.append(PACSSeries(pacs=pacs, folder_id=folder_ids[path], **data))
+        paths_by_folder_id[folder_ids[path]] = path
+    pacs_series = _bulk_create_series(pacs_series, errors)
+
+    series_paths = [paths_by_folder_id[series.folder_id] for series in pacs_series]
+    pacs_files = []
+    for path in series_paths:
+        for (obj_path, size) in files[path]:
+            pacs_file = PACSFile(owner=owner, size=size,
+                                 parent_folder_id=folder_ids[os.path.dirname(obj_path)])
+            pacs_file.fname.name = obj_path
+            pacs_files.append(pacs_file)
+    PACSFile.objects.bulk_create(pacs_files, batch_size=1000)
+
+    # grant the group permission once per PACS folder to the series that don't
+    # inherit it from an ancestor folder yet
+    lineages = [get_folder_permission_lineage_paths(path) for path in series_paths]
+    granted = set(FolderGroupPermission.objects.filter(
+        group=pacs_grp, folder__path__in={p for lineage in lineages for p in lineage}
+    ).values_list('folder__path', flat=True))
+    pacs_to_grant = {series.pacs.identifier: series.pacs
+                     for (series, lineage) in zip(pacs_series, lineages)
+                     if granted.isdisjoint(lineage)}
+    for pacs in pacs_to_grant.values():
+        pacs.folder.grant_group_permission(pacs_grp, 'r')
+    return pacs_series
+
+
+def _get_registered_series(pacs_list, series_data: List[Dict[str, Any]]):
+    """
+    Return the set of (pacs identifier, SeriesInstanceUID) tuples of the given series
+    that are already registered.
+    """
+    return set(PACSSeries.objects.filter(
+        pacs__in=pacs_list,
+        SeriesInstanceUID__in={data['SeriesInstanceUID'] for data in series_data}
+    ).values_list('pacs__identifier', 'SeriesInstanceUID'))
+
+
+def _create_folders(folder_paths, owner: User) -> Dict[str, int]:
+    """
+    Create the given folders and all their missing ancestors with a query per tree
+    level and return a path -> id map. Folders created in the meantime by another
+    batch are skipped and their ids read back from the DB.
+    """
+    all_paths = set()
+    for folder_path in folder_paths:
+        all_paths.update(get_folder_lineage_paths(folder_path))
+    folder_ids = dict(ChrisFolder.objects.filter(
+        path__in=all_paths | {''}).values_list('path', 'id'))
+
+    levels = defaultdict(list)
+    for path in all_paths - set(folder_ids):
+        levels[path.count('/')].append(path)
+
+    for depth in sorted(levels):
+        paths = levels[depth]
+        ChrisFolder.objects.bulk_create(
+            [ChrisFolder(path=p, owner=owner, parent_id=folder_ids[os.path.dirname(p)])
+             for p in paths], ignore_conflicts=True)
+        folder_ids.update(ChrisFolder.objects.filter(path__in=paths).values_list(
+            'path', 'id'))
+    return folder_ids
+
+
+def _bulk_create_series(pacs_series: List[PACSSeries],
+                        errors: List[str]) -> List[PACSSeries]:
+    """
+    Bulk create the given PACS series. The series registered by another batch since
+    they were checked are dropped and their messages appended to ``errors`` so only
+    the remaining series are retried.
+    """
+    while pacs_series:
+        try:
+            with transaction.atomic():
+                return PACSSeries.objects.bulk_create(pacs_series)
+        except IntegrityError:
+            registered = set(PACSSeries.objects.filter(
+                pacs__in={series.pacs for series in pacs_series},
+                SeriesInstanceUID__in={series.SeriesInstanceUID
+                                       for series in pacs_series}
+            ).values_list('pacs_id', 'SeriesInstanceUID'))
+            remaining = []
+            for series in pacs_series:
+                if (series.pacs.id, series.SeriesInstanceUID) in registered:
+                    errors.append(f'A DICOM series with SeriesInstanceUID='
+                                  f'{series.SeriesInstanceUID} already registered for '
+                                  f'pacs {series.pacs.identifier}')
+                else:
+                    remaining.append(series)
+            if len(remaining) == len(pacs_series):
+                raise  # the conflict isn't with an already registered series
+            pacs_series = remaining
+    return []
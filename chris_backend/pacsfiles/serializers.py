@@ -17,6 +17,14 @@ from .models import PACS, PACSQuery, PACSRetrieve, PACSSeries, PACSFile
 logger = logging.getLogger(__name__)
 
 
+class PACSSeriesFilesPending(Exception):
+    """
+    Raised when validating a PACS series without waiting for its files and fewer
+    DICOM files than expected are in storage yet.
+    """
+    pass
+
+
 class PACSSerializer(serializers.HyperlinkedModelSerializer):
     active = serializers.BooleanField(required=False, default=True)
     folder_path = serializers.ReadOnlyField(source='folder.path')
@@ -185,14 +193,20 @@ class PACSSeriesSerializer(serializers.HyperlinkedModelSerializer):
             validated_data['pacs'] = pacs
             validated_data['folder'] = series_folder
 
-            # remove commas from the existing files/folders names and handle the
-            # special cases
+            files_in_storage = validated_data.pop('files_in_storage')
             storage_manager = connect_storage(settings)
-            changed_file_paths = storage_manager.sanitize_obj_names(path)
+            file_sizes = validated_data.pop('file_sizes', None)
+            if file_sizes is None:
+                file_sizes = {info.path: info.size for info in
+                              storage_manager.ls_info(path)}
 
-            files_in_storage = validated_data.pop('files_in_storage')
+            # remove commas from the existing files/folders names and handle the
+            # special cases (reusing the listing done by the validation)
+            changed_file_paths = storage_manager.sanitize_obj_names(path,
+                                                                    files_in_storage)
             files = []
             for obj_path in files_in_storage:
+                size = file_sizes.get(obj_path)
                 if obj_path in changed_file_paths:
                     obj_path = changed_file_paths[obj_path]
 
@@ -204,17 +218,20 @@ class PACSSeriesSerializer(serializers.HyperlinkedModelSerializer):
                         (parent_folder, _) = ChrisFolder.objects.get_or_create(
                             path=folder_path, owner=owner)
 
-                    pacs_file = PACSFile(owner=owner, parent_folder=parent_folder)
+                    pacs_file = PACSFile(owner=owner, parent_folder=parent_folder,
+                                         size=size)
                     pacs_file.fname.name = obj_path
                     files.append(pacs_file)
 
             PACSFile.objects.bulk_create(files)
 
             # grant the group permission from the highest folder ancestor without it
-            current = series_folder
-            while not current.parent.has_group_permission(pacs_grp):
-                current = current.parent
-            current.grant_group_permission(pacs_grp, 'r')
+            # (the permission is inherited by the folder's descendants)
+            if not series_folder.has_group_permission(pacs_grp):
+                current = series_folder
+                while not current.parent.has_group_permission(pacs_grp):
+                    current = current.parent
+                current.grant_group_permission(pacs_grp, 'r')
         else:
             error_msg = (f'A DICOM series with SeriesInstanceUID={SeriesInstanceUID} '
                          f'already registered for pacs {pacs_name}')
@@ -259,7 +276,10 @@ class PACSSeriesSerializer(serializers.HyperlinkedModelSerializer):
         """
         Overriden to validate whether the provided path starts with
         'SERVICES/PACS/<pacs_name>' and whether all expected DICOM files are already
-        in storage.
+        in storage. Unless the serializer context sets 'wait_for_files' to False, the
+        files are waited for up to 30 seconds. Otherwise PACSSeriesFilesPending is
+        raised right away if some files are still missing. A listing of the path
+        already done by the caller can be passed as 'files_info' in the context.
         """
         pacs_name = data.get('pacs_name')
         path = data.get('path')
@@ -272,33 +292,37 @@ class PACSSeriesSerializer(serializers.HyperlinkedModelSerializer):
         # verify files are already in storage
         ndicom = data.pop('ndicom')
         nfiles = 0
-        files_in_storage = []
         storage_manager = connect_storage(settings)
+        listing = self.context.get('files_info')
+        wait_for_files = self.context.get('wait_for_files', True) and listing is None
+        n_checks = 30 if wait_for_files else 1
 
-        for i in range(30):  # check for 30 seconds at 1-sec intervals
+        for i in range(n_checks):  # check at 1-sec intervals
             try:
-                files_in_storage = storage_manager.ls(path)
+                files_info = storage_manager.ls_info(path) if listing is None else listing
             except Exception as e:
                 logger.error(f'[Error while listing storage files in {path}, '
                              f'detail: {str(e)}')
             else:
-                nfiles = len([f for f in files_in_storage if f.endswith('.dcm')])
+                nfiles = len([f for f in files_info if f.path.endswith('.dcm')])
 
             if nfiles == ndicom:
-                data['files_in_storage'] = files_in_storage
-                break
+                # the listing is reused when creating the series
+                data['files_in_storage'] = [f.path for f in files_info]
+                data['file_sizes'] = {f.path: f.size for f in files_info}
+                return data
 
             if nfiles > ndicom:
-                error_msg = (f'The number of DICOM files found under {path}({nfiles})'
-                             f' was different from the ndicom({ndicom}) field')
-                raise serializers.ValidationError([error_msg])
-
-            if i == 29:
-                error_msg = (f'The number of DICOM files found under {path}({nfiles})'
-                             f' was different from the ndicom({ndicom}) field')
-                raise serializers.ValidationError([error_msg])
-            time.sleep(1)
-        return data
+                break
+
+            if i < n_checks - 1:
+                time.sleep(1)
+
+        error_msg = (f'The number of DICOM files found under {path}({nfiles})'
+                     f' was different from the ndicom({ndicom}) field')
+        if nfiles < ndicom and n_checks == 1:
+            raise PACSSeriesFilesPending(error_msg)
+        raise serializers.ValidationError([error_msg])
 
 
 class PACSFileSerializer(ChrisFileSerializer):
@@ -4,13 +4,21 @@ from typing import Optional
 
 from django.contrib.auth.models import User
 
+from rest_framework import serializers
+
 from celery import shared_task
 from .models import PACSQuery, PACSSeries
-from .serializers import PACSSeriesSerializer
+from .serializers import PACSSeriesSerializer, PACSSeriesFilesPending
+from .registration import register_pacs_series_list
 
 
 logger = logging.getLogger(__name__)
 
+# retries of the registration of a PACS series while its DICOM files are still being
+# written to storage (exponential backoff of 1, 2, 4... seconds up to the max backoff)
+PACS_SERIES_REGISTRATION_MAX_RETRIES = 10
+PACS_SERIES_REGISTRATION_MAX_BACKOFF = 60
+
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3})
 def delete_pacs_series(self, pacs_series_id):
@@ -45,8 +53,9 @@ def send_pacs_query(pacs_query_id):
         pacs_query.send()
 
 
-@shared_task
+@shared_task(bind=True, max_retries=PACS_SERIES_REGISTRATION_MAX_RETRIES)
 def register_pacs_series(
+    self,
     PatientID: str,
     StudyDate: str,
     StudyInstanceUID: str,
@@ -68,6 +77,8 @@ def register_pacs_series(
     Register a DICOM series (directory of DICOM files) to the database.
 
     Pre-condition: DICOM files *must* exist in storage before running this task.
+    If fewer than ``ndicom`` files are in storage yet, the task is re-scheduled with
+    an exponential backoff rather than waiting for them in the worker.
     """
     data = {
         'PatientID': PatientID,
@@ -87,12 +98,48 @@ def register_pacs_series(
         'path': path,
         'ndicom': ndicom,
     }
-    serializer = PACSSeriesSerializer(data=_filter_some_values(data))
-    serializer.is_valid(raise_exception=True)
+    serializer = PACSSeriesSerializer(data=_filter_some_values(data),
+                                      context={'wait_for_files': False})
+    try:
+        serializer.is_valid(raise_exception=True)
+    except PACSSeriesFilesPending as e:
+        if self.request.retries >= self.max_retries:
+            raise serializers.ValidationError([str(e)])
+        countdown = min(2 ** self.request.retries, PACS_SERIES_REGISTRATION_MAX_BACKOFF)
+        raise self.retry(exc=e, countdown=countdown)
     owner = User.objects.get(username='chris')
     serializer.save(owner=owner)
 
 
+@shared_task(bind=True, max_retries=PACS_SERIES_REGISTRATION_MAX_RETRIES)
+def register_pacs_series_batch(self, series_list: list[dict[str, any]]):
+    """
+    Register many DICOM series at once. Each element of ``series_list`` has the
+    keyword arguments of ``register_pacs_series``.
+
+    The series whose DICOM files are not all in storage yet are re-scheduled together
+    in a new batch with an exponential backoff. The series that can't be registered
+    are logged and skipped.
+    """
+    owner = User.objects.get(username='chris')
+    registered, pending, errors = register_pacs_series_list(
+        [_filter_some_values(data) for data in series_list], owner)
+
+    for error in errors:
+        logger.error(f'Could not register PACS series, detail: {error}')
+
+    if pending:
+        if self.request.retries < self.max_retries:
+            countdown = min(2 ** self.request.retries,
+                            PACS_SERIES_REGISTRATION_MAX_BACKOFF)
+            raise self.retry(args=(pending,), kwargs={}, countdown=countdown)
+        for data in pending:
+            logger.error(f'Gave up waiting for the DICOM files of PACS series '
+                         f'{data.get("SeriesInstanceUID")} under {data.get("path")}')
+    return {'registered': len(registered), 'pending': len(pending),
+            'errors': len(errors)}
+
+
 def _filter_some_values(x: dict[str, any]) -> dict[str, any]:
     """
     Remove entries where the value is ``None``.`
@@ -1,3 +1,4 @@
+from types import SimpleNamespace
 from typing import Self
 
 import nats
@@ -45,3 +46,35 @@ class Mockidicom:
 
     async def close(self):
         self._nc.close()
+
+
+class FakeSubscription:
+    def __init__(self, nc: 'FakeNats', subject: str, cb):
+        self._nc = nc
+        self.subject = subject
+        self.cb = cb
+
+    async def unsubscribe(self):
+        del self._nc.subscriptions[self.subject]
+
+
+class FakeNats:
+    """
+    In-memory stand-in for a NATS connection.
+    """
+
+    def __init__(self):
+        self.subscriptions: dict[str, FakeSubscription] = {}
+        self.is_closed = False
+
+    async def subscribe(self, subject: str, cb):
+        subscription = FakeSubscription(self, subject, cb)
+        self.subscriptions[subject] = subscription
+        return subscription
+
+    async def publish(self, subject: str, data: bytes):
+        if subject in self.subscriptions:
+            await self.subscriptions[subject].cb(SimpleNamespace(data=data))
+
+    async def close(self):
+        self.is_closed = True
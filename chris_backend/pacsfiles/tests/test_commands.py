@@ -0,0 +1,15 @@
+import io
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, tag
+
+
+class LoadtestPACSProgressSSECommandTests(SimpleTestCase):
+
+    @tag('integration')
+    def test_loadtest_reports_cpu_usage_of_idle_streams(self):
+        out = io.StringIO()
+        call_command('loadtest_pacs_progress_sse', streams=5, duration=0.2,
+                     stdout=out)
+        self.assertIn('5 idle streams (5 hub subscribers, 5 subjects)',
+                      out.getvalue())
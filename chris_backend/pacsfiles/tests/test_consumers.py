@@ -1,4 +1,8 @@
 
+import asyncio
+import json
+from unittest import mock
+
 import jwt
 
 from channels.db import database_sync_to_async
@@ -7,7 +11,7 @@ from django.contrib.auth.models import User, Group
 
 # note: use TransactionTestCase instead of TestCase for async tests that speak to DB.
 # See https://stackoverflow.com/a/71763849
-from django.test import TransactionTestCase, tag
+from django.test import TransactionTestCase, SimpleTestCase, RequestFactory, tag
 
 from channels.testing import WebsocketCommunicator
 from django.utils import timezone
@@ -23,9 +27,12 @@ from pacsfiles.lonk import (
     LonkDone,
     LonkError,
     UnsubscriptionRequest,
+    LonkHub,
+    LonkMagicByte,
+    subject_of,
 )
-from pacsfiles.consumers import PACSFileProgress
-from pacsfiles.tests.mocks import Mockidicom
+from pacsfiles.consumers import PACSFileProgress, PACSFileProgressSSE
+from pacsfiles.tests.mocks import Mockidicom, FakeNats
 
 
 class PACSFileProgressTests(TransactionTestCase):
@@ -189,3 +196,57 @@ class PACSFileProgressTests(TransactionTestCase):
             algorithm='HS512',
         )
         return FileDownloadToken.objects.create(token=token, owner=self.user)
+
+
+class PACSFileProgressSSETests(SimpleTestCase):
+
+    def setUp(self):
+        self.nc = FakeNats()
+        self.hub = LonkHub('nats://nats:4222', connect=self.connect)
+        self.view = PACSFileProgressSSE()
+        request = RequestFactory().get('/', {'pacs_name': 'MyPACS',
+                                             'series_uids': '1.234,5.678'})
+        self.stream = self.view.pacs_file_progress_sse(request)
+        patcher = mock.patch('pacsfiles.consumers.get_lonk_hub', return_value=self.hub)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def connect(self, servers):
+        return self.nc
+
+    async def start_stream(self) -> asyncio.Task:
+        """
+        Start iterating the stream and wait until it has subscribed to all the series.
+        """
+        task = asyncio.ensure_future(anext(self.stream))
+        while self.hub.get_stats()['subjects'] < 2:
+            await asyncio.sleep(0)
+        return task
+
+    @staticmethod
+    def event_data(event: str) -> dict:
+        return json.loads(event.split('data: ', 1)[1])
+
+    async def test_progress_messages_are_coalesced(self):
+        first = await self.start_stream()
+        subject = subject_of('MyPACS', '1.234')
+        for ndicom in (1, 2, 3):
+            data = LonkMagicByte.PROGRESS.value.to_bytes() + ndicom.to_bytes(4, 'little')
+            await self.nc.publish(subject, data)
+        await self.nc.publish(subject, LonkMagicByte.DONE.value.to_bytes())
+        await self.nc.publish(subject_of('MyPACS', '5.678'),
+                              LonkMagicByte.DONE.value.to_bytes())
+
+        events = [await first] + [event async for event in self.stream]
+        messages = [self.event_data(event)['message'] for event in events]
+        self.assertEqual(messages, [{'ndicom': 3}, {'done': True}, {'done': True},
+                                    {'done': True}])
+        self.assertEqual(self.hub.get_stats(), {'subscribers': 0, 'subjects': 0})
+
+    async def test_idle_stream_sends_heartbeats(self):
+        self.view.heartbeat_interval = 0.01
+        first = await self.start_stream()
+        self.assertEqual(await first, ': heartbeat\n\n')
+
+        await self.stream.aclose()  # client disconnected
+        self.assertEqual(self.hub.get_stats(), {'subscribers': 0, 'subjects': 0})
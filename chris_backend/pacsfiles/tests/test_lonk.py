@@ -0,0 +1,77 @@
+from django.test import SimpleTestCase
+
+from pacsfiles.lonk import (
+    LonkHub,
+    Lonk,
+    LonkProgress,
+    LonkDone,
+    LonkMagicByte,
+    subject_of,
+)
+from pacsfiles.tests.mocks import FakeNats
+
+
+class LonkHubTests(SimpleTestCase):
+
+    def setUp(self):
+        self.connections = []
+        self.series = {'pacs_name': 'MyPACS', 'SeriesInstanceUID': '1.234.567890'}
+        self.subject = subject_of('MyPACS', '1.234.567890')
+
+    async def connect(self, servers):
+        nc = FakeNats()
+        self.connections.append(nc)
+        return nc
+
+    async def test_subscribers_share_one_connection_and_subscription(self):
+        hub = LonkHub('nats://nats:4222', connect=self.connect)
+        subscribers = [await hub.subscriber() for _ in range(3)]
+        for subscriber in subscribers:
+            await subscriber.subscribe('MyPACS', '1.234.567890')
+
+        self.assertEqual(len(self.connections), 1)
+        self.assertEqual(hub.get_stats(), {'subscribers': 3, 'subjects': 1})
+
+        data = LonkMagicByte.PROGRESS.value.to_bytes() + (5).to_bytes(4, 'little')
+        await self.connections[0].publish(self.subject, data)
+        for subscriber in subscribers:
+            self.assertEqual(subscriber.queue.get_nowait(),
+                             Lonk(message=LonkProgress(ndicom=5), **self.series))
+
+    async def test_subject_unsubscribed_with_its_last_subscriber(self):
+        hub = LonkHub('nats://nats:4222', connect=self.connect)
+        subscriber1 = await hub.subscriber()
+        subscriber2 = await hub.subscriber()
+        await subscriber1.subscribe('MyPACS', '1.234.567890')
+        await subscriber2.subscribe('MyPACS', '1.234.567890')
+
+        await subscriber1.close()
+        self.assertIn(self.subject, self.connections[0].subscriptions)
+        self.assertEqual(hub.get_stats(), {'subscribers': 1, 'subjects': 1})
+
+        await subscriber2.close()
+        self.assertNotIn(self.subject, self.connections[0].subscriptions)
+        self.assertEqual(hub.get_stats(), {'subscribers': 0, 'subjects': 0})
+
+    async def test_full_queue_drops_oldest_message(self):
+        hub = LonkHub('nats://nats:4222', connect=self.connect, queue_maxsize=1)
+        subscriber = await hub.subscriber()
+        await subscriber.subscribe('MyPACS', '1.234.567890')
+
+        data = LonkMagicByte.PROGRESS.value.to_bytes() + (5).to_bytes(4, 'little')
+        await self.connections[0].publish(self.subject, data)
+        with self.assertLogs('pacsfiles.lonk', level='WARNING'):
+            await self.connections[0].publish(self.subject,
+                                              LonkMagicByte.DONE.value.to_bytes())
+        self.assertEqual(await subscriber.get(),
+                         Lonk(message=LonkDone(done=True), **self.series))
+
+    async def test_reconnects_and_resubscribes_closed_connection(self):
+        hub = LonkHub('nats://nats:4222', connect=self.connect)
+        subscriber = await hub.subscriber()
+        await subscriber.subscribe('MyPACS', '1.234.567890')
+
+        self.connections[0].is_closed = True
+        await hub.subscriber()
+        self.assertEqual(len(self.connections), 2)
+        self.assertIn(self.subject, self.connections[1].subscriptions)
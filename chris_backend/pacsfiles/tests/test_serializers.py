@@ -10,9 +10,10 @@ from rest_framework import serializers
 
 from core.models import ChrisFolder
 from core.storage import connect_storage
+from core.storage.storagemanager import ObjectInfo
 from pacsfiles.models import PACS, PACSQuery
 from pacsfiles.serializers import (PACSQuerySerializer, PACSRetrieveSerializer,
-                                   PACSSeriesSerializer)
+                                   PACSSeriesSerializer, PACSSeriesFilesPending)
 
 
 CHRIS_SUPERUSER_PASSWORD = settings.CHRIS_SUPERUSER_PASSWORD
@@ -286,7 +287,9 @@ class PACSSeriesSerializerTests(SerializerTests):
 
 
         storage_manager_mock = mock.Mock()
-        storage_manager_mock.ls = mock.Mock(return_value=['file1'])
+        storage_manager_mock.ls_info = mock.Mock(return_value=[
+            ObjectInfo(f'{path}/file1.dcm', 10), ObjectInfo(f'{path}/file2.dcm', 10),
+            ObjectInfo(f'{path}/file3.dcm', 10)])
 
         with mock.patch('pacsfiles.serializers.connect_storage') as connect_storage_mock:
             connect_storage_mock.return_value = storage_manager_mock
@@ -310,11 +313,38 @@ class PACSSeriesSerializerTests(SerializerTests):
 
 
         storage_manager_mock = mock.Mock()
-        storage_manager_mock.ls = mock.Mock(return_value=[
-            'SERVICES/PACS/MyPACS/123456-crazy/brain_crazy_study/SAG_T1_MPRAGE/file1.dcm'])
+        storage_manager_mock.ls_info = mock.Mock(return_value=[ObjectInfo(
+            'SERVICES/PACS/MyPACS/123456-crazy/brain_crazy_study/SAG_T1_MPRAGE/file1.dcm',
+            10)])
 
         with mock.patch('pacsfiles.serializers.connect_storage') as connect_storage_mock:
             connect_storage_mock.return_value = storage_manager_mock
             pacs_series_serializer = PACSSeriesSerializer()
-            pacs_series_serializer.validate(data)
-            storage_manager_mock.ls.assert_called_with(path)
+            validated = pacs_series_serializer.validate(data)
+            storage_manager_mock.ls_info.assert_called_with(path)
+            self.assertEqual(validated['file_sizes'], {f'{path}/file1.dcm': 10})
+
+    def test_validate_failure_files_pending_without_waiting(self):
+        """
+        Test whether overriden validate method raises PACSSeriesFilesPending after a
+        single check of the storage when told not to wait for the DICOM files.
+        """
+        path = 'SERVICES/PACS/MyPACS/123456-crazy/brain_crazy_study/SAG_T1_MPRAGE'
+        data = {'PatientID': '123456', 'StudyDate': '2020-07-15',
+                'StudyInstanceUID': '1.1.3432.54.6545674765.765434',
+                'SeriesInstanceUID': '2.4.3432.54.845674765.763345',
+                'pacs_name': 'MyPACS', 'path': path, 'ndicom': 2}
+
+        storage_manager_mock = mock.Mock()
+        storage_manager_mock.ls_info = mock.Mock(return_value=[
+            ObjectInfo(f'{path}/file1.dcm', 10)])
+
+        with mock.patch('pacsfiles.serializers.connect_storage') as connect_storage_mock:
+            connect_storage_mock.return_value = storage_manager_mock
+            pacs_series_serializer = PACSSeriesSerializer(
+                context={'wait_for_files': False})
+            with mock.patch('pacsfiles.serializers.time.sleep') as sleep_mock:
+                with self.assertRaises(PACSSeriesFilesPending):
+                    pacs_series_serializer.validate(data)
+            sleep_mock.assert_not_called()
+            storage_manager_mock.ls_info.assert_called_once_with(path)
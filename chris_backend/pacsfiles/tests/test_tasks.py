@@ -15,7 +15,9 @@ from celery.exceptions import Retry
 from core.models import ChrisFolder
 from core.storage import connect_storage
 from pacsfiles.models import PACS, PACSSeries, PACSFile
-from pacsfiles.tasks import register_pacs_series, delete_pacs_series
+from pacsfiles.serializers import PACSSeriesFilesPending
+from pacsfiles.tasks import (register_pacs_series, register_pacs_series_batch,
+                             delete_pacs_series)
 
 
 class DeletePacSSeriesTaskTests(TestCase):
@@ -167,3 +169,102 @@ class PACSSeriesCreateTests(TestCase):
                 StudyDescription='brain_crazy_study',
                 SeriesDescription='SAG T1 MPRAGE',
             )
+
+    def test_pacs_series_create_retries_while_files_pending(self):
+        series_path = 'SERVICES/PACS/MyPACS/123456-crazy/brain_crazy_study/SAG_T1_MPRAGE'
+        kwargs = {'PatientID': '12345', 'StudyDate': '2020-07-15',
+                  'StudyInstanceUID': '1.1.3432.54.6545674765.765434',
+                  'SeriesInstanceUID': '2.4.3432.54.845674765.763345',
+                  'pacs_name': 'MyPACS', 'path': series_path, 'ndicom': 2}
+
+        with patch('pacsfiles.tasks.PACSSeriesSerializer.validate',
+                   side_effect=PACSSeriesFilesPending('files pending')), \
+                patch.object(register_pacs_series, 'retry',
+                             side_effect=Retry()) as retry_mock:
+            with self.assertRaises(Retry):
+                register_pacs_series(**kwargs)
+            _, retry_kwargs = retry_mock.call_args
+            self.assertEqual(retry_kwargs['countdown'], 1)
+            self.assertIsInstance(retry_kwargs['exc'], PACSSeriesFilesPending)
+        self.assertFalse(PACSSeries.objects.filter(
+            SeriesInstanceUID='2.4.3432.54.845674765.763345').exists())
+
+
+class PACSSeriesBatchCreateTests(TestCase):
+    """
+    Test creating many PACS series at once using the batch task function.
+    """
+
+    def setUp(self):
+        self.storage_manager = connect_storage(settings)
+        self.study_path = 'SERVICES/PACS/MyPACS/123456-crazy/brain_crazy_study'
+
+    def tearDown(self):
+        super().tearDown()
+        test_data_dir = 'SERVICES/PACS/MyPACS/123456-crazy'
+        if self.storage_manager.path_exists(test_data_dir):
+            self.storage_manager.delete_path(test_data_dir)
+
+    def series_data(self, series_name, ndicom):
+        return {'PatientID': '123456', 'StudyDate': '2020-07-15',
+                'StudyInstanceUID': '1.1.3432.54.6545674765.765434',
+                'SeriesInstanceUID': f'2.4.3432.{series_name}',
+                'SeriesDescription': series_name, 'pacs_name': 'MyPACS',
+                'path': f'{self.study_path}/{series_name}', 'ndicom': ndicom}
+
+    def test_pacs_series_batch_create_registers_ready_series(self):
+        self.storage_manager.upload_obj(f'{self.study_path}/SAG_T1/fi,le1.dcm', b'1')
+        self.storage_manager.upload_obj(f'{self.study_path}/SAG_T1/file2.dcm', b'22')
+        self.storage_manager.upload_obj(f'{self.study_path}/AX_T2/file1.dcm', b'333')
+        self.storage_manager.upload_obj(f'{self.study_path}/COR_T2/file1.dcm', b'4')
+        series_list = [self.series_data('SAG_T1', 2), self.series_data('AX_T2', 1),
+                       self.series_data('COR_T2', 2)]  # COR_T2 is still incomplete
+
+        with patch.object(register_pacs_series_batch, 'retry',
+                          side_effect=Retry()) as retry_mock:
+            with self.assertRaises(Retry):
+                register_pacs_series_batch(series_list)
+            _, retry_kwargs = retry_mock.call_args
+            self.assertEqual(retry_kwargs['args'], ([series_list[2]],))
+
+        series = PACSSeries.objects.get(SeriesInstanceUID='2.4.3432.SAG_T1')
+        fnames = sorted(f.fname.name for f in series.folder.chris_files.all())
+        self.assertEqual(fnames, [f'{self.study_path}/SAG_T1/file1.dcm',
+                                  f'{self.study_path}/SAG_T1/file2.dcm'])
+        series = PACSSeries.objects.get(SeriesInstanceUID='2.4.3432.AX_T2')
+        self.assertEqual(series.folder.chris_files.get().size, 3)
+        self.assertFalse(PACSSeries.objects.filter(
+            SeriesInstanceUID='2.4.3432.COR_T2').exists())
+
+        pacs_grp = Group.objects.get(name='pacs_users')
+        self.assertTrue(series.folder.has_group_permission(pacs_grp))
+
+    def test_pacs_series_batch_create_skips_already_registered_series(self):
+        self.storage_manager.upload_obj(f'{self.study_path}/AX_T2/file1.dcm', b'1')
+        series_list = [self.series_data('AX_T2', 1)]
+        result = register_pacs_series_batch(series_list)
+        self.assertEqual(result, {'registered': 1, 'pending': 0, 'errors': 0})
+
+        result = register_pacs_series_batch(series_list)
+        self.assertEqual(result, {'registered': 0, 'pending': 0, 'errors': 1})
+        self.assertEqual(PACSSeries.objects.filter(
+            SeriesInstanceUID='2.4.3432.AX_T2').count(), 1)
+
+    def test_pacs_series_batch_create_overlapping_batches(self):
+        for series_name in ('SAG_T1', 'AX_T2', 'COR_T2'):
+            self.storage_manager.upload_obj(f'{self.study_path}/{series_name}/file1.dcm',
+                                            b'1')
+        result = register_pacs_series_batch([self.series_data('SAG_T1', 1),
+                                             self.series_data('AX_T2', 1)])
+        self.assertEqual(result, {'registered': 2, 'pending': 0, 'errors': 0})
+
+        # a concurrent batch checked the registered series before AX_T2 was committed
+        with patch('pacsfiles.registration._get_registered_series',
+                   return_value=set()):
+            result = register_pacs_series_batch([self.series_data('AX_T2', 1),
+                                                 self.series_data('COR_T2', 1)])
+        self.assertEqual(result, {'registered': 1, 'pending': 0, 'errors': 1})
+
+        for series_name in ('SAG_T1', 'AX_T2', 'COR_T2'):
+            series = PACSSeries.objects.get(SeriesInstanceUID=f'2.4.3432.{series_name}')
+            self.assertEqual(series.folder.chris_files.count(), 1)
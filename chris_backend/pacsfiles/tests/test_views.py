@@ -16,7 +16,7 @@ from core.celery import app as celery_app
 from core.celery import task_routes
 
 from core.models import ChrisFolder
-from core.storage import connect_storage
+from core.storage import connect_storage, ObjectInfo
 from pacsfiles.models import PACS, PACSQuery, PACSRetrieve, PACSSeries, PACSFile
 from pacsfiles import views
 
@@ -937,10 +937,16 @@ class PACSFileResourceViewTests(PACSViewTests):
         pacs_file = PACSFile.objects.get(fname=self.path + '/file1.dcm')
         fileresource_view_inst = mock.Mock()
         fileresource_view_inst.get_object = mock.Mock(return_value=pacs_file)
-        request_mock = mock.Mock()
-        with mock.patch('pacsfiles.views.FileResponse') as response_mock:
-            views.PACSFileResource.get(fileresource_view_inst, request_mock)
-            response_mock.assert_called_with(pacs_file.fname)
+        request_mock = mock.Mock(headers={})
+        storage_manager_mock = mock.Mock()
+        storage_manager_mock.obj_info.return_value = ObjectInfo(pacs_file.fname.name, 9,
+                                                                'etag')
+        with mock.patch('core.views.connect_storage',
+                        return_value=storage_manager_mock):
+            response = views.PACSFileResource.get(fileresource_view_inst, request_mock)
+        storage_manager_mock.download_obj_range.assert_called_with(
+            pacs_file.fname.name, 0, 8, settings.FILE_DOWNLOAD_CHUNK_SIZE)
+        self.assertEqual(response['ETag'], '"etag"')
 
     @tag('integration')
     def test_integration_pacsfileresource_download_success(self):
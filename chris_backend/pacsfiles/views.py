@@ -1,19 +1,15 @@
 
-from pathlib import Path
-
-from django.http import FileResponse
 from django.contrib.auth.models import User, Group
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 from rest_framework.authentication import BasicAuthentication, SessionAuthentication
-from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiResponse, OpenApiTypes
+from drf_spectacular.utils import extend_schema, extend_schema_view
 
 from collectionjson import services
-from core.renderers import BinaryFileRenderer
 from core.models import ChrisFolder
-from core.views import TokenAuthSupportQueryString
+from core.views import TokenAuthSupportQueryString, FileResourceView
 
 from .models import (PACS, PACSFilter, PACSQuery, PACSQueryFilter, PACSRetrieve,
                      PACSRetrieveFilter, PACSSeries, PACSSeriesFilter, PACSFile,
@@ -480,24 +476,11 @@ class PACSFileDetail(generics.RetrieveAPIView):
     permission_classes = (permissions.IsAuthenticated, IsChrisOrIsPACSUserReadOnly)
 
 
-class PACSFileResource(generics.GenericAPIView):
+class PACSFileResource(FileResourceView):
     """
     A view to enable downloading of a file resource .
     """
-    http_method_names = ['get']
     queryset = PACSFile.get_base_queryset()
-    renderer_classes = (BinaryFileRenderer,)
     permission_classes = (permissions.IsAuthenticated, IsChrisOrIsPACSUserReadOnly)
     authentication_classes = (TokenAuthSupportQueryString, BasicAuthentication,
                               SessionAuthentication)
-
-    @extend_schema(responses=OpenApiResponse(OpenApiTypes.BINARY))
-    def get(self, request, *args, **kwargs):
-        """
-        Overriden to be able to make a GET request to an actual file resource.
-        """
-        pacs_file = self.get_object()
-        f = pacs_file.fname
-        resp = FileResponse(f)
-        resp['Content-Disposition'] = f'attachment; filename="{Path(f.name).name}"'
-        return resp
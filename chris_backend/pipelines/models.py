@@ -11,7 +11,7 @@ from django.core.exceptions import ObjectDoesNotExist
 import django_filters
 from django_filters.rest_framework import FilterSet
 
-from core.models import ChrisFile
+from core.models import ChrisFile, defer_file_deletion
 from core.storage import connect_storage
 from plugins.models import Plugin, PluginParameter
 from plugins.fields import CPUField, MemoryField
@@ -274,6 +274,8 @@ class PipelineSourceFile(ChrisFile):
 @receiver(post_delete, sender=PipelineSourceFile)
 def auto_delete_file_from_storage(sender, instance, **kwargs):
     storage_path = instance.fname.name
+    if defer_file_deletion(storage_path):
+        return
     storage_manager = connect_storage(settings)
 
     try:
@@ -1,15 +1,12 @@
 
 import logging
-from pathlib import Path
 
-from django.http import FileResponse
 from django.contrib.auth.models import User
 
 from rest_framework import generics, permissions
 from rest_framework.reverse import reverse
-from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiTypes
 
-from core.renderers import BinaryFileRenderer
+from core.views import FileResourceView
 from collectionjson import services
 from plugins.serializers import PluginSerializer
 
@@ -179,24 +176,11 @@ class PipelineSourceFileDetail(generics.RetrieveAPIView):
     serializer_class = PipelineSourceFileSerializer
 
 
-class PipelineSourceFileResource(generics.GenericAPIView):
+class PipelineSourceFileResource(FileResourceView):
     """
     A view to enable downloading of a pipeline's source file resource.
     """
-    http_method_names = ['get']
     queryset = PipelineSourceFile.get_base_queryset()
-    renderer_classes = (BinaryFileRenderer,)
-
-    @extend_schema(responses=OpenApiResponse(OpenApiTypes.BINARY))
-    def get(self, request, *args, **kwargs):
-        """
-        Overriden to be able to make a GET request to an actual file resource.
-        """
-        source_file = self.get_object()
-        f = source_file.fname
-        resp = FileResponse(f)
-        resp['Content-Disposition'] = f'attachment; filename="{Path(f.name).name}"'
-        return resp
 
 
 class PipelinePluginList(generics.ListAPIView):
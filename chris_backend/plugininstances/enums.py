@@ -14,6 +14,22 @@ ACTIVE_STATUSES = ['created', 'waiting', 'copying', 'scheduled', 'started', 'upl
 
 INACTIVE_STATUSES = ['finishedSuccessfully', 'finishedWithError', 'cancelled']
 
+# Mapping of (jobs status count field name) -> (plugin-instance status string) used by
+# the feeds' and workflows' jobs status counts (e.g. 'registeringFiles' is surfaced as
+# 'registering_jobs', 'finishedSuccessfully' as 'finished_jobs').
+JOBS_STATUS_FIELDS = (
+    ('created_jobs',     'created'),
+    ('waiting_jobs',     'waiting'),
+    ('copying_jobs',     'copying'),
+    ('scheduled_jobs',   'scheduled'),
+    ('started_jobs',     'started'),
+    ('uploading_jobs',   'uploading'),
+    ('registering_jobs', 'registeringFiles'),
+    ('finished_jobs',    'finishedSuccessfully'),
+    ('errored_jobs',     'finishedWithError'),
+    ('cancelled_jobs',   'cancelled'),
+)
+
 REMOTE_CLEANUP_STATUS_CHOICES = [
     ('notStarted', 'Not started'),
     ('deletingData', 'Deleting remote data'),
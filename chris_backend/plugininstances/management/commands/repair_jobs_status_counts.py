@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from feeds.models import Feed, FeedJobsStatusCount
+from plugininstances.enums import JOBS_STATUS_FIELDS
+from plugininstances.models import PluginInstance
+from workflows.models import Workflow, WorkflowJobsStatusCount
+
+
+class Command(BaseCommand):
+    help = ('Recompute from scratch the per-feed and per-workflow jobs status counts '
+            'from the plugin instances. Changes to the plugin instances are blocked '
+            'while the counts are recomputed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='only report the number of wrong counts')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # block concurrent changes to the plugin instances (and so to the counts)
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {PluginInstance._meta.db_table} '
+                               f'IN SHARE MODE')
+
+            for (model, counts_model, key) in (
+                    (Feed, FeedJobsStatusCount, 'feed'),
+                    (Workflow, WorkflowJobsStatusCount, 'workflow')):
+                n_wrong = self.repair_counts(model, counts_model, key,
+                                             options['dry_run'])
+                self.stdout.write(f'{n_wrong} wrong {model._meta.verbose_name} jobs '
+                                  f'status counts')
+
+            if options['dry_run']:
+                transaction.set_rollback(True)
+            else:
+                self.stdout.write(self.style.SUCCESS('Jobs status counts repaired.'))
+
+    @staticmethod
+    def repair_counts(model, counts_model, key, dry_run=False):
+        """
+        Recompute the jobs status counts of every object of the model (feed or
+        workflow) and return the number of objects whose stored counts were wrong.
+        """
+        fields = [field for (field, _) in JOBS_STATUS_FIELDS]
+        stored = {row[0]: row[1:] for row in
+                  counts_model.objects.values_list(f'{key}_id', *fields)}
+
+        counts = model.objects.annotate(**{
+            field: Count('plugin_instances',
+                         filter=Q(plugin_instances__status=status))
+            for (field, status) in JOBS_STATUS_FIELDS
+        }).values_list('id', *fields)
+
+        wrong = []
+        for row in counts.iterator(chunk_size=2000):
+            (obj_id, values) = (row[0], row[1:])
+            if stored.get(obj_id, (0,) * len(fields)) != values:
+                wrong.append(counts_model(**{f'{key}_id': obj_id},
+                                          **dict(zip(fields, values))))
+        if wrong and not dry_run:
+            counts_model.objects.bulk_create(wrong, batch_size=2000,
+                                             update_conflicts=True,
+                                             unique_fields=[key],
+                                             update_fields=fields)
+        return len(wrong)
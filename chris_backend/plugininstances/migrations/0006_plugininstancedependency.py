@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-17 14:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugininstances', '0005_plugininstance_copy_retry_count_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PluginInstanceDependency',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('child', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dependency_edges', to='plugininstances.plugininstance')),
+                ('parent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dependent_edges', to='plugininstances.plugininstance')),
+            ],
+            options={
+                'unique_together': {('parent', 'child')},
+            },
+        ),
+    ]
@@ -0,0 +1,122 @@
+from django.db import migrations
+
+
+# (jobs status count column, plugin instance status) pairs at the time of this migration
+JOBS_STATUS_FIELDS = (
+    ('created_jobs', 'created'),
+    ('waiting_jobs', 'waiting'),
+    ('copying_jobs', 'copying'),
+    ('scheduled_jobs', 'scheduled'),
+    ('started_jobs', 'started'),
+    ('uploading_jobs', 'uploading'),
+    ('registering_jobs', 'registeringFiles'),
+    ('finished_jobs', 'finishedSuccessfully'),
+    ('errored_jobs', 'finishedWithError'),
+    ('cancelled_jobs', 'cancelled'),
+)
+
+STATUS_COLUMN_CASES = ' '.join(f"WHEN '{status}' THEN '{column}'"
+                               for (column, status) in JOBS_STATUS_FIELDS)
+
+CREATE_TRIGGERS_SQL = [f"""
+CREATE FUNCTION plugininstances_add_jobs_status_count(
+    counts_table text, key_column text, key_value bigint, status text, delta integer
+) RETURNS void AS $$
+DECLARE
+    count_column text := CASE status {STATUS_COLUMN_CASES} END;
+BEGIN
+    IF key_value IS NULL OR count_column IS NULL THEN
+        RETURN;
+    END IF;
+    IF delta > 0 THEN
+        EXECUTE format('INSERT INTO %1$I AS c (%2$I, %3$I) VALUES ($1, $2) '
+                       'ON CONFLICT (%2$I) DO UPDATE SET %3$I = c.%3$I + EXCLUDED.%3$I',
+                       counts_table, key_column, count_column)
+        USING key_value, delta;
+    ELSE
+        -- never create counts while decrementing, the feed or workflow could be in
+        -- the process of being deleted
+        EXECUTE format('UPDATE %1$I SET %3$I = %3$I + $2 WHERE %2$I = $1',
+                       counts_table, key_column, count_column)
+        USING key_value, delta;
+    END IF;
+END;
+$$ LANGUAGE plpgsql
+""", """
+CREATE FUNCTION plugininstances_update_jobs_status_counts() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND (OLD.status IS DISTINCT FROM NEW.status
+            OR OLD.feed_id IS DISTINCT FROM NEW.feed_id)) THEN
+        PERFORM plugininstances_add_jobs_status_count(
+            'feeds_feedjobsstatuscount', 'feed_id', OLD.feed_id, OLD.status, -1);
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND (OLD.status IS DISTINCT FROM NEW.status
+            OR OLD.workflow_id IS DISTINCT FROM NEW.workflow_id)) THEN
+        PERFORM plugininstances_add_jobs_status_count(
+            'workflows_workflowjobsstatuscount', 'workflow_id', OLD.workflow_id,
+            OLD.status, -1);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND (OLD.status IS DISTINCT FROM NEW.status
+            OR OLD.feed_id IS DISTINCT FROM NEW.feed_id)) THEN
+        PERFORM plugininstances_add_jobs_status_count(
+            'feeds_feedjobsstatuscount', 'feed_id', NEW.feed_id, NEW.status, 1);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND (OLD.status IS DISTINCT FROM NEW.status
+            OR OLD.workflow_id IS DISTINCT FROM NEW.workflow_id)) THEN
+        PERFORM plugininstances_add_jobs_status_count(
+            'workflows_workflowjobsstatuscount', 'workflow_id', NEW.workflow_id,
+            NEW.status, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""", """
+CREATE TRIGGER plugininstances_jobs_status_counts_insert_delete
+AFTER INSERT OR DELETE ON plugininstances_plugininstance
+FOR EACH ROW EXECUTE FUNCTION plugininstances_update_jobs_status_counts()
+""", """
+CREATE TRIGGER plugininstances_jobs_status_counts_update
+AFTER UPDATE OF status, feed_id, workflow_id ON plugininstances_plugininstance
+FOR EACH ROW
+WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.feed_id IS DISTINCT FROM NEW.feed_id
+      OR OLD.workflow_id IS DISTINCT FROM NEW.workflow_id)
+EXECUTE FUNCTION plugininstances_update_jobs_status_counts()
+"""]
+
+DROP_TRIGGERS_SQL = [
+    'DROP TRIGGER IF EXISTS plugininstances_jobs_status_counts_update '
+    'ON plugininstances_plugininstance',
+    'DROP TRIGGER IF EXISTS plugininstances_jobs_status_counts_insert_delete '
+    'ON plugininstances_plugininstance',
+    'DROP FUNCTION IF EXISTS plugininstances_update_jobs_status_counts()',
+    'DROP FUNCTION IF EXISTS plugininstances_add_jobs_status_count(text, text, bigint, '
+    'text, integer)',
+]
+
+COUNT_COLUMNS = ', '.join(column for (column, _) in JOBS_STATUS_FIELDS)
+COUNT_FILTERS = ', '.join(f"count(*) FILTER (WHERE status = '{status}')"
+                          for (_, status) in JOBS_STATUS_FIELDS)
+
+POPULATE_COUNTS_SQL = [f"""
+INSERT INTO feeds_feedjobsstatuscount (feed_id, {COUNT_COLUMNS})
+SELECT feed_id, {COUNT_FILTERS} FROM plugininstances_plugininstance
+GROUP BY feed_id
+""", f"""
+INSERT INTO workflows_workflowjobsstatuscount (workflow_id, {COUNT_COLUMNS})
+SELECT workflow_id, {COUNT_FILTERS} FROM plugininstances_plugininstance
+WHERE workflow_id IS NOT NULL GROUP BY workflow_id
+"""]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugininstances', '0006_plugininstancedependency'),
+        ('feeds', '0004_feedjobsstatuscount'),
+        ('workflows', '0003_workflowjobsstatuscount'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+        migrations.RunSQL(POPULATE_COUNTS_SQL, migrations.RunSQL.noop),
+    ]
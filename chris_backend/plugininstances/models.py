@@ -1,8 +1,9 @@
 
 import logging
 
-from django.db import models
-from django.db.models.signals import post_delete
+from django.db import connection, models, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
@@ -166,23 +167,79 @@ class PluginInstance(AsyncDeletableModel):
         """
         Custom method to return the root plugin instance for this plugin instance.
         """
-        current = self
-        while not current.plugin.meta.type == 'fs':
-            current = current.previous
-        return current
+        return self.get_ancestors_queryset().get(previous__isnull=True)
 
     def get_descendant_instances(self):
         """
         Custom method to return all the plugin instances that are a descendant of this
-        plugin instance.
+        plugin instance (including itself) ordered by depth.
+        """
+        sql = (f'{self._get_descendants_cte()} SELECT p.* FROM {self._meta.db_table} p '
+               f'JOIN tree ON p.id = tree.id ORDER BY tree.depth, p.id')
+        return list(PluginInstance.objects.raw(sql, [self.id]))
+
+    def get_descendants_queryset(self):
+        """
+        Custom method to return a queryset with all the plugin instances that are a
+        descendant of this plugin instance (including itself).
+        """
+        return PluginInstance.filter_descendants(PluginInstance.objects.all(), self.id)
+
+    def get_ancestors_queryset(self):
+        """
+        Custom method to return a queryset with all the plugin instances that are an
+        ancestor of this plugin instance (including itself).
+        """
+        sql = f'{self._get_ancestors_cte()} SELECT id FROM tree'
+        return PluginInstance.objects.filter(pk__in=RawSQL(sql, [self.id]))
+
+    def get_depth(self):
+        """
+        Custom method to return the number of ancestors of this plugin instance (the
+        depth of the instance in its tree, 0 for the root instance).
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'{self._get_ancestors_cte()} SELECT max(depth) FROM tree',
+                           [self.id])
+            return cursor.fetchone()[0]
+
+    @classmethod
+    def filter_descendants(cls, queryset, plg_inst_id):
+        """
+        Custom method to filter a queryset to the plugin instances that are a
+        descendant of the plugin instance with the given id (including itself).
+        """
+        sql = f'{cls._get_descendants_cte()} SELECT id FROM tree'
+        return queryset.filter(pk__in=RawSQL(sql, [plg_inst_id]))
+
+    @classmethod
+    def _get_descendants_cte(cls):
+        """
+        Custom internal method to return a recursive CTE named 'tree' that walks the
+        tree of plugin instances down from the instance with the id given as
+        parameter. Each row has the id of a descendant and its distance to the
+        instance.
+        """
+        table = cls._meta.db_table
+        return (f'WITH RECURSIVE tree(id, depth) AS ('
+                f'SELECT id, 0 FROM {table} WHERE id = %s '
+                f'UNION ALL '
+                f'SELECT p.id, tree.depth + 1 FROM {table} p '
+                f'JOIN tree ON p.previous_id = tree.id)')
+
+    @classmethod
+    def _get_ancestors_cte(cls):
         """
-        descendant_instances = []
-        queue = [self]
-        while len(queue) > 0:
-            visited = queue.pop()
-            queue.extend(list(visited.next.all()))
-            descendant_instances.append(visited)
-        return descendant_instances
+        Custom internal method to return a recursive CTE named 'tree' that walks the
+        tree of plugin instances up from the instance with the id given as parameter.
+        Each row has the id of an ancestor and its distance to the instance.
+        """
+        table = cls._meta.db_table
+        return (f'WITH RECURSIVE tree(id, previous_id, depth) AS ('
+                f'SELECT id, previous_id, 0 FROM {table} WHERE id = %s '
+                f'UNION ALL '
+                f'SELECT p.id, p.previous_id, tree.depth + 1 FROM {table} p '
+                f'JOIN tree ON p.id = tree.previous_id)')
 
     def get_parameter_instances(self):
         """
@@ -216,15 +273,58 @@ class PluginInstance(AsyncDeletableModel):
         else:
             self.save(update_fields=['status'])
 
+    def release_from_waiting(self, status):
+        """
+        Custom method to atomically change the status of the instance from 'waiting'
+        to the given status. Return whether the status was changed by this call so
+        that concurrent callers release a waiting instance only once.
+        """
+        fields = {'status': status}
+        if status == 'scheduled':
+            now = timezone.now()
+            fields.update(start_date=now, end_date=now)  # save scheduling date
+
+        released = PluginInstance.objects.filter(pk=self.pk, status='waiting').update(
+            **fields) == 1
+        if released:
+            for (name, value) in fields.items():
+                setattr(self, name, value)
+        return released
+
 
 @receiver(post_delete, sender=PluginInstance)
-def auto_delete_output_folder_with_plugin_instance(sender, instance, **kwargs):
+def auto_delete_output_folder_with_plugin_instance(sender, instance, origin=None,
+                                                   **kwargs):
+    if isinstance(origin, PluginInstance) and origin.pk != instance.pk:
+        # descendant deleted by cascade, its output data folder is within the output
+        # data folder's parent of the deleted instance
+        return
     try:
         instance.output_folder.parent.delete()  # delete parent of the output data folder
     except Exception:
         pass
 
 
+@receiver(post_save, sender=PluginInstance)
+def schedule_dependent_plugin_instances_on_finish(sender, instance, created,
+                                                  update_fields=None, **kwargs):
+    """
+    Handler to release the plugin instances waiting for a plugin instance as soon as
+    the plugin instance finishes (once the transaction saving it is committed).
+    """
+    if created or instance.status not in INACTIVE_STATUSES:
+        return
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    if instance.dependent_edges.filter(child__status='waiting').exists():
+        from .tasks import schedule_dependent_plugin_instances  # avoid circular import
+
+        # the task must see the committed status of the finished plugin instance
+        instance_id = instance.id
+        transaction.on_commit(
+            lambda: schedule_dependent_plugin_instances.delay(instance_id))
+
+
 class PluginInstanceFilter(FilterSet):
     min_start_date = django_filters.IsoDateTimeFilter(field_name='start_date',
                                                       lookup_expr='gte')
@@ -265,17 +365,11 @@ class PluginInstanceFilter(FilterSet):
         Custom method to return the plugin instances in a queryset with a common root
         plugin instance.
         """
-        filtered_list = []
         root_queryset = queryset.filter(pk=value)
         # check whether the root id value is in the DB
         if not root_queryset.exists():
             return root_queryset
-        queue = [root_queryset[0]]
-        while len(queue) > 0:
-            visited = queue.pop()
-            queue.extend(list(visited.next.all()))
-            filtered_list.append(visited.id)
-        return PluginInstance.objects.filter(pk__in=filtered_list)
+        return PluginInstance.filter_descendants(PluginInstance.objects.all(), value)
 
     def filter_by_previous_id(self, queryset, name, value):
         """
@@ -321,6 +415,23 @@ class PluginInstanceSplit(models.Model):
         return self.created_plugin_inst_ids
 
 
+class PluginInstanceDependency(models.Model):
+    """
+    Edge of the plugin instances' dependency graph. The child plugin instance waits in
+    'waiting' status until the parent plugin instance finishes.
+    """
+    parent = models.ForeignKey(PluginInstance, on_delete=models.CASCADE,
+                               related_name='dependent_edges')
+    child = models.ForeignKey(PluginInstance, on_delete=models.CASCADE,
+                              related_name='dependency_edges')
+
+    class Meta:
+        unique_together = ('parent', 'child',)
+
+    def __str__(self):
+        return f'{self.parent_id} -> {self.child_id}'
+
+
 class StrParameter(models.Model):
     value = models.CharField(max_length=600, blank=True)
     plugin_inst = models.ForeignKey(PluginInstance, on_delete=models.CASCADE,
@@ -23,6 +23,35 @@ from core.models import ChrisInstance
 logger = logging.getLogger(__name__)
 
 
+def update_job_status_summary(d_jobStatusSummary: dict, d_resp: dict | None = None,
+                              push_path_status: bool | None = None,
+                              pull_path_status: bool | None = None) -> dict:
+    """
+    Update a job status JSON summary from pfcon response.
+    """
+    if push_path_status is not None:
+        d_jobStatusSummary['pushPath']['status'] = push_path_status
+
+    if pull_path_status is not None:
+        d_jobStatusSummary['pullPath']['status'] = pull_path_status
+
+    if d_resp is not None:
+        d_c = d_resp['compute']
+
+        if d_c['status'] in ('undefined', 'finishedSuccessfully',
+                            'finishedWithError'):
+            d_jobStatusSummary['compute']['return']['status'] = True
+
+        d_jobStatusSummary['compute']['return']['job_status'] = d_c['status']
+        logs = d_jobStatusSummary['compute']['return']['job_logs'] = d_c['logs']
+
+        # truncate logs, assuming worst case where every character needs
+        # to be escaped
+        if len(logs) > 1800:
+            d_jobStatusSummary['compute']['return']['job_logs'] = logs[-1800:]
+    return d_jobStatusSummary
+
+
 class PluginInstanceJob(abc.ABC):
     """
     ``PluginInstanceJob`` provides an interface for managing remote jobs related to a 
@@ -108,29 +137,8 @@ class PluginInstanceJob(abc.ABC):
         """
         Get a job status JSON summary from pfcon response.
         """
-        d_jobStatusSummary = self.c_plugin_inst.summary
-
-        if push_path_status is not None:
-            d_jobStatusSummary['pushPath']['status'] = push_path_status
-
-        if pull_path_status is not None:
-            d_jobStatusSummary['pullPath']['status'] = pull_path_status
-
-        if d_resp is not None:
-            d_c = d_resp['compute']
-
-            if d_c['status'] in ('undefined', 'finishedSuccessfully',
-                                'finishedWithError'):
-                d_jobStatusSummary['compute']['return']['status'] = True
-
-            d_jobStatusSummary['compute']['return']['job_status'] = d_c['status']
-            logs = d_jobStatusSummary['compute']['return']['job_logs'] = d_c['logs']
-
-            # truncate logs, assuming worst case where every character needs
-            # to be escaped
-            if len(logs) > 1800:
-                d_jobStatusSummary['compute']['return']['job_logs'] = logs[-1800:]
-        return d_jobStatusSummary
+        return update_job_status_summary(self.c_plugin_inst.summary, d_resp,
+                                         push_path_status, pull_path_status)
 
     def schedule_remote_cleanup(self):
         """
@@ -192,7 +200,7 @@ class PluginInstanceJob(abc.ABC):
         cr.save()
 
     def _submit(self, job_type: JobType, job_id: str, job_descriptors: dict, 
-                dfile: io.BytesIO | None = None, timeout: int = 200) -> dict:
+                dfile: io.IOBase | None = None, timeout: int = 200) -> dict:
         """
         Submit job to a remote pfcon service.
         """
@@ -203,6 +211,7 @@ class PluginInstanceJob(abc.ABC):
             logger.info(f'Auth token has expired while submitting {job_type} job '
                         f'{job_id} to pfcon url -->{self.pfcon_client.url}<--')
             self._refresh_compute_resource_auth_token()
+            self._rewind(dfile)
             d_resp = self.pfcon_client.submit_job(job_type, job_id, job_descriptors, 
                                                   dfile, timeout)
         except PfconRequestException:
@@ -222,10 +231,20 @@ class PluginInstanceJob(abc.ABC):
                                 f'url -->{self.pfcon_client.url}<--, auth token might have '
                                 f'expired, will try refreshing token and resubmitting job')
                 self._refresh_compute_resource_auth_token()
+                self._rewind(dfile)
                 d_resp = self.pfcon_client.submit_job(job_type, job_id, job_descriptors, 
                                                     dfile, timeout)
         return d_resp
 
+    @staticmethod
+    def _rewind(dfile: io.IOBase | None):
+        """
+        Rewind the job data file read by a previous submission so that it can be
+        resent in full.
+        """
+        if dfile is not None:
+            dfile.seek(0)
+
     def _get_status(self, job_type: JobType, job_id: str, timeout: int = 100) -> dict:
         """
         Get job status from a remote pfcon service.
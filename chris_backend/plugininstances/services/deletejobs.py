@@ -177,19 +177,14 @@ class PluginInstanceDeleteJob(PluginInstanceJob):
 
     def save_plugin_instance_final_status(self):
         """
-        Set the plugin instance's output folder permissions recursively and log and
-        save the instance's final status to the DB.
+        Set the plugin instance's output folder public access recursively and log and
+        save the instance's final status to the DB. The feed's shared groups and users
+        permissions are inherited from the feed's folder.
         """
         job_id = self.str_job_id
-        logger.info(f"Setting output folder's permissions for job {job_id} ...")
-
-        for group in self.c_plugin_inst.feed.shared_groups.all():
-            self.c_plugin_inst.output_folder.parent.grant_group_permission(group, 'w')
-
-        for user in self.c_plugin_inst.feed.shared_users.all():
-            self.c_plugin_inst.output_folder.parent.grant_user_permission(user, 'w')
 
         if self.c_plugin_inst.feed.public:
+            logger.info(f"Setting output folder's public access for job {job_id} ...")
             self.c_plugin_inst.output_folder.parent.grant_public_access()
 
         logger.info(f"Saving plugin instance final status for job {job_id} as "
@@ -11,6 +11,9 @@ import io
 import time
 import json
 import zipfile
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 
 from pfconclient.client import JobType
@@ -90,7 +93,7 @@ class PluginInstanceAppJob(PluginInstanceJob):
             'env': self._compute_env_vars()
         }
 
-        job_zip_file_content = None
+        job_zip_file = None
         job_timeout = 200
 
         if self.pfcon_client.pfcon_innetwork:
@@ -112,7 +115,6 @@ class PluginInstanceAppJob(PluginInstanceJob):
                 self.c_plugin_inst.save(update_fields=['status', 'error_code'])
                 self.schedule_remote_cleanup()
                 return
-            job_zip_file_content = job_zip_file.getvalue()
             job_timeout = 9000
 
         pfcon_url = self.pfcon_client.url
@@ -120,32 +122,36 @@ class PluginInstanceAppJob(PluginInstanceJob):
                     f'description: {json.dumps(job_descriptors, indent=4)}')
         try:
             d_resp = self._submit(JobType.PLUGIN, job_id, job_descriptors, 
-                                  job_zip_file_content, job_timeout)
+                                  job_zip_file, job_timeout)
         except PfconRequestException as e:
             logger.error(f'[CODE01,{job_id}]: Error submitting plugin job to pfcon url '
                          f'-->{pfcon_url}<--, detail: {str(e)}')
-            
+
             self.c_plugin_inst.error_code = 'CODE01'
             self.c_plugin_inst.status = 'cancelled'  # giving up
             self.c_plugin_inst.save(update_fields=['status', 'error_code'])
             self.schedule_remote_cleanup()
-        else:
-            logger.info(f'Successfully submitted plugin job {job_id} to pfcon url '
-                        f'-->{pfcon_url}<--, response: {json.dumps(d_resp, indent=4)}')
-            # update the job status and summary
-            self.c_plugin_inst.status = 'started'
-
-            if not self.pfcon_client.requires_copy_job:
-                # initial status
-                self.c_plugin_inst.summary = self.get_job_status_summary(
-                    d_resp=d_resp, push_path_status=True)  
-            self.c_plugin_inst.raw = json_zip2str(d_resp)
-
-            # https://github.com/FNNDSC/ChRIS_ultron_backEnd/issues/408
-            now = timezone.now()
-            self.c_plugin_inst.start_date = now
-            self.c_plugin_inst.end_date = now
-            self.c_plugin_inst.save()
+            return
+        finally:
+            if job_zip_file is not None:
+                job_zip_file.close()  # release the spooled memory/disk space
+
+        logger.info(f'Successfully submitted plugin job {job_id} to pfcon url '
+                    f'-->{pfcon_url}<--, response: {json.dumps(d_resp, indent=4)}')
+        # update the job status and summary
+        self.c_plugin_inst.status = 'started'
+
+        if not self.pfcon_client.requires_copy_job:
+            # initial status
+            self.c_plugin_inst.summary = self.get_job_status_summary(
+                d_resp=d_resp, push_path_status=True)  
+        self.c_plugin_inst.raw = json_zip2str(d_resp)
+
+        # https://github.com/FNNDSC/ChRIS_ultron_backEnd/issues/408
+        now = timezone.now()
+        self.c_plugin_inst.start_date = now
+        self.c_plugin_inst.end_date = now
+        self.c_plugin_inst.save()
 
     @staticmethod
     def _assemble_exec(selfpath: Optional[str], selfexec: str, execshell: Optional[str]) -> List[str]:
@@ -489,58 +495,109 @@ class PluginInstanceAppJob(PluginInstanceJob):
         """
         Create job zip file ready for transmission to the remote from a list of storage
         paths (prefixes).
+
+        The storage objects are downloaded concurrently and written into a spooled
+        temporary file that is only kept in memory while its size is below
+        settings.PLUGIN_JOB_ZIP_MAX_MEMORY_SIZE. The number of packed bytes and the
+        time spent packing them are recorded in the ``zip_packing_stats`` attribute.
         """
         job_id = self.str_job_id
-        memory_zip_file = io.BytesIO()
-        all_obj_paths = set()
-
-        with zipfile.ZipFile(memory_zip_file, 'w', zipfile.ZIP_DEFLATED) as job_data_zip:
-            for storage_path in storage_paths:
-                obj_paths = set()
-                visited_paths = set()
-
-                self.find_all_storage_object_paths(storage_path, obj_paths,
-                                                   visited_paths)
-                for obj_path in obj_paths:
-                    if obj_path not in all_obj_paths:  # add a file to the zip only once
-                        try:
-                            contents = self.storage_manager.download_obj(obj_path)
-                        except Exception as e:
-                            logger.error(f'[CODE08,{job_id}]: Error while downloading file '
-                                         f'{obj_path} from storage, detail: {str(e)}')
-                            self.c_plugin_inst.error_code = 'CODE08'
-                            raise
-                        
-                        zip_path = obj_path.replace(storage_path, '', 1).lstrip('/')
-                        job_data_zip.writestr(zip_path, contents)
-                        all_obj_paths.add(obj_path)
+        start_time = time.monotonic()
+        zip_paths = {}  # add a file to the zip only once
+
+        for storage_path in storage_paths:
+            obj_paths = set()
+            visited_paths = set()
 
-        memory_zip_file.seek(0)
-        return memory_zip_file
+            self.find_all_storage_object_paths(storage_path, obj_paths, visited_paths)
+            for obj_path in obj_paths:
+                if obj_path not in zip_paths:
+                    zip_path = obj_path.replace(storage_path, '', 1).lstrip('/')
+                    zip_paths[obj_path] = zip_path
+
+        spooled_zip_file = tempfile.SpooledTemporaryFile(
+            max_size=settings.PLUGIN_JOB_ZIP_MAX_MEMORY_SIZE)
+        nbytes = 0
+        try:
+            with zipfile.ZipFile(spooled_zip_file, 'w',
+                                 zipfile.ZIP_DEFLATED) as job_data_zip:
+                for obj_path, contents in self._download_objs(list(zip_paths)):
+                    job_data_zip.writestr(zip_paths[obj_path], contents)
+                    nbytes += len(contents)
+        except Exception:
+            spooled_zip_file.close()
+            raise
+
+        spooled_zip_file.seek(0)
+        self.zip_packing_stats = {'files': len(zip_paths), 'bytes': nbytes,
+                                  'seconds': round(time.monotonic() - start_time, 3)}
+        logger.info(f'Packed {nbytes} bytes from {len(zip_paths)} files into zip '
+                    f'file for job {job_id} in '
+                    f'{self.zip_packing_stats["seconds"]} seconds')
+        return spooled_zip_file
+
+    def _download_objs(self, obj_paths):
+        """
+        Internal generator that downloads the passed storage objects using a pool of
+        settings.PLUGIN_JOB_ZIP_STORAGE_WORKERS threads and yields (obj_path, contents)
+        tuples in the same order as the passed object paths. At most two downloads per
+        thread are in flight at any time to bound the memory used by the contents.
+        """
+        max_workers = max(1, settings.PLUGIN_JOB_ZIP_STORAGE_WORKERS)
+        obj_paths_iter = iter(obj_paths)
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                for obj_path in obj_paths_iter:
+                    pending.append((obj_path, executor.submit(
+                        self.storage_manager.download_obj, obj_path)))
+
+                    if len(pending) >= 2 * max_workers:
+                        yield self._get_downloaded_obj(*pending.popleft())
+
+                while pending:
+                    yield self._get_downloaded_obj(*pending.popleft())
+            except BaseException:
+                for _, future in pending:
+                    future.cancel()
+                raise
+
+    def _get_downloaded_obj(self, obj_path, future):
+        """
+        Internal method to wait for a storage download to finish and return a tuple
+        (obj_path, contents).
+        """
+        try:
+            contents = future.result()
+        except Exception as e:
+            job_id = self.str_job_id
+            logger.error(f'[CODE08,{job_id}]: Error while downloading file '
+                         f'{obj_path} from storage, detail: {str(e)}')
+            self.c_plugin_inst.error_code = 'CODE08'
+            raise
+        return obj_path, contents
 
     def unpack_zip_file(self, zip_file_content):
         """
         Unpack job zip file from the remote into storage.
+
+        The zip file can be given either as bytes or as a seekable file object. Its
+        members are read and uploaded by a pool of
+        settings.PLUGIN_JOB_ZIP_STORAGE_WORKERS threads so that peak memory stays at
+        roughly one member per thread. The number of unpacked files and bytes and the
+        upload throughput are recorded in the ``zip_unpacking_stats`` attribute.
         """
         job_id = self.str_job_id
+        start_time = time.monotonic()
+        if isinstance(zip_file_content, (bytes, bytearray)):
+            zip_file_content = io.BytesIO(zip_file_content)
         try:
-            memory_zip_file = io.BytesIO(zip_file_content)
-            with zipfile.ZipFile(memory_zip_file, 'r', zipfile.ZIP_DEFLATED) as job_zip:
+            with zipfile.ZipFile(zip_file_content, 'r', zipfile.ZIP_DEFLATED) as job_zip:
                 filenames = job_zip.namelist()
                 logger.info(f'{len(filenames)} files to decompress for job {job_id}')
                 output_path = self.c_plugin_inst.get_output_path() + '/'
-
-                for fname in filenames:
-                    content = job_zip.read(fname)
-                    storage_fname = output_path + fname.lstrip('/')
-                    try:
-                        self.storage_manager.upload_obj(storage_fname, content)
-                    except Exception as e:
-                        logger.error(f'[CODE07,{job_id}]: Error while uploading file '
-                                     f'{storage_fname} to storage, detail: {str(e)}')
-                        self.c_plugin_inst.error_code = 'CODE07'
-                        raise ValueError(str(e))
-                    self.plugin_inst_output_files.add(storage_fname)
+                nbytes = self._upload_zip_members(job_zip, filenames, output_path)
         except ValueError:
             raise
         except Exception as e:
@@ -549,6 +606,68 @@ class PluginInstanceAppJob(PluginInstanceJob):
             self.c_plugin_inst.error_code = 'CODE04'
             raise
 
+        seconds = time.monotonic() - start_time
+        self.zip_unpacking_stats = {
+            'files': len(filenames), 'bytes': nbytes, 'seconds': round(seconds, 3),
+            'bytes_per_second': round(nbytes / seconds) if seconds else nbytes}
+        logger.info(f'Unpacked {nbytes} bytes from {len(filenames)} files into storage '
+                    f'for job {job_id} in {self.zip_unpacking_stats["seconds"]} '
+                    f'seconds ({self.zip_unpacking_stats["bytes_per_second"]} '
+                    f'bytes/second)')
+
+    def _upload_zip_members(self, job_zip, filenames, output_path):
+        """
+        Internal method to concurrently upload the passed zip file members into
+        storage under the passed output path. Returns the total number of uploaded
+        bytes.
+        """
+        max_workers = max(1, settings.PLUGIN_JOB_ZIP_STORAGE_WORKERS)
+        nbytes = 0
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                for fname in filenames:
+                    storage_fname = output_path + fname.lstrip('/')
+                    pending.append((storage_fname, executor.submit(
+                        self._upload_zip_member, job_zip, fname, storage_fname)))
+
+                    if len(pending) >= 2 * max_workers:
+                        nbytes += self._get_uploaded_zip_member(*pending.popleft())
+
+                while pending:
+                    nbytes += self._get_uploaded_zip_member(*pending.popleft())
+            except BaseException:
+                for _, future in pending:
+                    future.cancel()
+                raise
+        return nbytes
+
+    def _upload_zip_member(self, job_zip, fname, storage_fname):
+        """
+        Internal method to read a single zip file member and upload it into storage.
+        Returns the number of uploaded bytes.
+        """
+        content = job_zip.read(fname)
+        try:
+            self.storage_manager.upload_obj(storage_fname, content)
+        except Exception as e:
+            job_id = self.str_job_id
+            logger.error(f'[CODE07,{job_id}]: Error while uploading file '
+                         f'{storage_fname} to storage, detail: {str(e)}')
+            self.c_plugin_inst.error_code = 'CODE07'
+            raise ValueError(str(e))
+        return len(content)
+
+    def _get_uploaded_zip_member(self, storage_fname, future):
+        """
+        Internal method to wait for a zip file member upload to finish and return the
+        number of uploaded bytes.
+        """
+        size = future.result()
+        self.plugin_inst_output_files.add(storage_fname)
+        return size
+
     def check_files_from_json_exist(self, json_file_content):
         """
         Check whether all files listed in the job json file from the remote indeed
@@ -1010,6 +1129,16 @@ class PluginInstanceAppJob(PluginInstanceJob):
         # remove commas from the existing files/folders names and handle the special cases
         changed_file_paths = self.storage_manager.sanitize_obj_names(outputdir)
 
+        # get all the file sizes from a single storage listing
+        try:
+            file_sizes = {info.path: info.size for info in
+                          self.storage_manager.ls_info(outputdir)}
+        except Exception as e:
+            logger.error(f'[CODE06,{job_id}]: Error while listing storage files '
+                         f'in {outputdir}, detail: {str(e)}')
+            self.c_plugin_inst.error_code = 'CODE06'
+            raise
+
         for obj_path in self.plugin_inst_output_files:
             if obj_path in changed_file_paths:
                 obj_path = changed_file_paths[obj_path]
@@ -1047,7 +1176,8 @@ class PluginInstanceAppJob(PluginInstanceJob):
                         path=folder_path, owner=owner)
                     folders[folder_path] = parent_folder
 
-                plg_inst_file = UserFile(owner=owner, parent_folder=parent_folder)
+                plg_inst_file = UserFile(owner=owner, parent_folder=parent_folder,
+                                         size=file_sizes.get(obj_path))
                 plg_inst_file.fname.name = obj_path
                 files.append(plg_inst_file)
 
@@ -1056,5 +1186,5 @@ class PluginInstanceAppJob(PluginInstanceJob):
 
         total_size = 0
         for plg_inst_file in db_files:
-            total_size += plg_inst_file.fname.size
+            total_size += plg_inst_file.get_size()
         self.c_plugin_inst.size += total_size
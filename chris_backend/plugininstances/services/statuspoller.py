@@ -0,0 +1,233 @@
+"""
+Batched job status poller module that checks the execution status of all the running
+plugin instance jobs by concurrently requesting their status from the remote compute
+environments (pfcon services) they were scheduled on.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pfconclient import client as pfcon
+from pfconclient.client import JobType
+from pfconclient.exceptions import (PfconRequestException,
+                                    PfconRequestInvalidTokenException)
+
+from django.utils import timezone
+
+from core.models import ChrisInstance
+from core.utils import json_zip2str
+from plugins.models import ComputeResource
+
+from plugininstances.models import PluginInstance
+from .abstractjobs import update_job_status_summary
+
+
+logger = logging.getLogger(__name__)
+
+
+# plugin instance status -> (pfcon job type, job class name)
+STATUS_JOB_TYPES = {
+    'copying': (JobType.COPY, 'PluginInstanceCopyJob'),
+    'started': (JobType.PLUGIN, 'PluginInstanceAppJob'),
+    'uploading': (JobType.UPLOAD, 'PluginInstanceUploadJob'),
+}
+
+# remote job statuses that require the job class to handle the plugin instance
+REMOTE_FINAL_STATUSES = ('finishedSuccessfully', 'finishedWithError', 'undefined')
+
+
+class ComputeResourceStatusClient(object):
+    """
+    Thread-safe client to get job statuses from a compute resource's pfcon service.
+    The auth token is refreshed at most once per expired token regardless of the
+    number of threads concurrently using the client.
+    """
+
+    def __init__(self, compute_resource: ComputeResource):
+        self.compute_resource = compute_resource
+        self.token = compute_resource.compute_auth_token
+        self.token_refreshed = False
+        self.pfcon_client = pfcon.Client(compute_resource.compute_url, self.token)
+        self._lock = threading.Lock()
+        self.latencies = []  # duration in seconds of each status request
+
+    def get_job_status(self, job_type: JobType, job_id: str, timeout: int = 100) -> dict:
+        """
+        Get job status from the remote pfcon service.
+        """
+        token = self.token
+        try:
+            return self._timed_get_job_status(job_type, job_id, timeout)
+        except PfconRequestInvalidTokenException:
+            logger.info(f'Auth token has expired while getting status for {job_type} job '
+                        f'{job_id} from pfcon url -->{self.pfcon_client.url}<--')
+        except PfconRequestException:
+            if self.compute_resource.compute_requires_copy_job:
+                raise
+            # legacy behavior, see PluginInstanceJob._get_status
+            logger.exception(f'Error while getting status for {job_type} job {job_id} '
+                             f'from pfcon url -->{self.pfcon_client.url}<--, auth token '
+                             f'might have expired, will try refreshing token and '
+                             f'resubmitting job status request')
+        self._refresh_auth_token(token)
+        return self._timed_get_job_status(job_type, job_id, timeout)
+
+    def get_latency_stats(self) -> dict:
+        """
+        Return the number, average and maximum duration of the status requests.
+        """
+        with self._lock:
+            latencies = list(self.latencies)
+        n = len(latencies)
+        return {'requests': n,
+                'avg_latency': sum(latencies) / n if n else 0.0,
+                'max_latency': max(latencies, default=0.0)}
+
+    def _timed_get_job_status(self, job_type: JobType, job_id: str,
+                              timeout: int) -> dict:
+        start = time.monotonic()
+        try:
+            return self.pfcon_client.get_job_status(job_type, job_id, timeout)
+        finally:
+            with self._lock:
+                self.latencies.append(time.monotonic() - start)
+
+    def _refresh_auth_token(self, expired_token: str):
+        """
+        Get a new auth token from the remote pfcon service unless another thread
+        already replaced the expired token.
+        """
+        with self._lock:
+            if self.token != expired_token:
+                return
+            cr = self.compute_resource
+            token = pfcon.Client.get_auth_token(cr.compute_auth_url, cr.compute_user,
+                                                cr.compute_password)
+            self.pfcon_client.set_auth_token(token)
+            self.token = token
+            self.token_refreshed = True
+
+
+class JobStatusPoller(object):
+    """
+    Poll the execution status of running plugin instances' jobs in a single cycle.
+
+    Plugin instances are grouped by compute resource and their job statuses are
+    fetched concurrently. Only the plugin instances that need to be handled by their
+    job class (remote job finished or timed out) are returned by ``poll``, the
+    summary of the other ones is updated in the DB only if their status changed.
+    """
+
+    def __init__(self, max_workers: int = 20):
+        self.max_workers = max_workers
+        self.metrics = {}
+
+    def poll(self, instances) -> list:
+        """
+        Poll the job status of the given running plugin instances. Return the list of
+        (plugin instance id, job class name) pairs that need a follow-up status check.
+        """
+        start = time.monotonic()
+        job_id_prefix = ChrisInstance.load().job_id_prefix
+        n_instances = 0
+        follow_up = []
+        to_poll = []
+        clients = {}
+
+        for plg_inst in instances:
+            n_instances += 1
+            job_type, job_class_name = STATUS_JOB_TYPES[plg_inst.status]
+            cr = plg_inst.compute_resource
+
+            if cr is None or self._job_has_timeout(plg_inst, cr):
+                follow_up.append((plg_inst.id, job_class_name))
+                continue
+
+            if cr.id not in clients:
+                clients[cr.id] = ComputeResourceStatusClient(cr)
+            job_id = job_id_prefix + str(plg_inst.id)
+            to_poll.append((plg_inst, clients[cr.id], job_type, job_id))
+
+        # only the remote requests are made from the worker threads, the DB is always
+        # accessed from the calling thread
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(lambda args: self._get_status(*args[1:]),
+                                        to_poll))
+        errors = changed = 0
+
+        for ((plg_inst, client, job_type, job_id), d_resp) in zip(to_poll, results):
+            if d_resp is None:
+                errors += 1
+                continue
+            job_class_name = STATUS_JOB_TYPES[plg_inst.status][1]
+            remote_status = d_resp['compute']['status']
+
+            if remote_status in REMOTE_FINAL_STATUSES:
+                follow_up.append((plg_inst.id, job_class_name))
+            elif self._update_summary(plg_inst, d_resp):
+                changed += 1
+
+        for client in clients.values():
+            if client.token_refreshed:
+                ComputeResource.objects.filter(id=client.compute_resource.id).update(
+                    compute_auth_token=client.token)
+
+        self.metrics = {
+            'instances': n_instances,
+            'requests': len(to_poll),
+            'errors': errors,
+            'changed': changed,
+            'follow_up': len(follow_up),
+            'duration': time.monotonic() - start,
+            'compute_resources': {client.compute_resource.name:
+                                      client.get_latency_stats()
+                                  for client in clients.values()},
+        }
+        logger.info(f'Job status poll cycle finished: {self.metrics}')
+        return follow_up
+
+    @staticmethod
+    def _get_status(client: ComputeResourceStatusClient, job_type: JobType,
+                    job_id: str) -> dict | None:
+        """
+        Get a job status from a pfcon service. Return None on error, the job status
+        will be requested again in the next poll cycle.
+        """
+        try:
+            return client.get_job_status(job_type, job_id)
+        except PfconRequestException as e:
+            logger.error(f'[CODE02,{job_id}]: Error getting {job_type} job status at '
+                         f'pfcon url -->{client.pfcon_client.url}<--, detail: {str(e)}')
+
+    @staticmethod
+    def _update_summary(plg_inst: PluginInstance, d_resp: dict) -> bool:
+        """
+        Update a plugin instance's job status summary in the DB if the remote status
+        or logs changed since the last poll cycle. Return whether it was updated.
+        """
+        d_ret = plg_inst.summary['compute']['return']
+        d_c = d_resp['compute']
+        if (d_ret.get('job_status') == d_c['status'] and
+                d_ret.get('job_logs') == d_c['logs'][-1800:]):
+            return False
+
+        summary = update_job_status_summary(plg_inst.summary, d_resp)
+        # only update (atomically) if still in the same status to avoid concurrency
+        # problems
+        PluginInstance.objects.filter(id=plg_inst.id, status=plg_inst.status).update(
+            summary=summary, raw=json_zip2str(d_resp))
+        return True
+
+    @staticmethod
+    def _job_has_timeout(plg_inst: PluginInstance, cr: ComputeResource) -> bool:
+        """
+        Check if a job has exceeded the maximum execution time set for its remote
+        compute environment.
+        """
+        max_job_exec_sec = cr.max_job_exec_seconds
+        if max_job_exec_sec >= 0:
+            delta_seconds = (timezone.now() - plg_inst.start_date).total_seconds()
+            return delta_seconds > max_job_exec_sec
+        return False
@@ -3,7 +3,7 @@ import logging
 from functools import wraps
 from datetime import timedelta
 
-from django.db.models import Q
+from django.db.models import Q, Count
 from django.utils import timezone
 from django.conf import settings
 
@@ -15,6 +15,7 @@ from .services.pluginjobs import PluginInstanceAppJob
 from .services.copyjobs import PluginInstanceCopyJob
 from .services.uploadjobs import PluginInstanceUploadJob
 from .services.deletejobs import PluginInstanceDeleteJob
+from .services.statuspoller import JobStatusPoller
 
 
 logger = logging.getLogger(__name__)
@@ -163,6 +164,28 @@ def delete_plugin_instance_containers_from_remote(plg_inst_id):
                                      'remote_cleanup_retry_count'])
 
 
+@shared_task
+def schedule_dependent_plugin_instances(plg_inst_id):
+    """
+    Schedule the jobs corresponding to the plugin instances in 'waiting' DB status
+    that depend on this plugin instance once all their parent plugin instances are in
+    'finishedSuccessfully' DB status. The waiting instances are cancelled instead if
+    any of their parents is in 'finishedWithError' or 'cancelled' DB status.
+    """
+    children = PluginInstance.objects.filter(
+        status='waiting', dependency_edges__parent_id=plg_inst_id
+    ).select_related('compute_resource')
+
+    for child in children:
+        parent_statuses = set(child.dependency_edges.values_list('parent__status',
+                                                                 flat=True))
+        if parent_statuses & {'finishedWithError', 'cancelled'}:
+            if child.release_from_waiting('cancelled'):
+                schedule_dependent_plugin_instances.delay(child.id)
+        elif parent_statuses == {'finishedSuccessfully'}:
+            _schedule_plugin_instance(child)
+
+
 @shared_task(bind=True)
 @skip_if_running
 def schedule_waiting_plugin_instances(self):  # task is passed info about itself
@@ -171,10 +194,25 @@ def schedule_waiting_plugin_instances(self):  # task is passed info about itself
     and whose previous plugin instance is in 'finishedSuccessfully' DB status.
     However, if the plugin instance is of type 'ts' all the ancestor plugin instances
     with id in the list given by the plugininstances parameter must also be in
-    'finishedSuccessfully' DB status.
+    'finishedSuccessfully' DB status. Waiting instances are normally released by the
+    schedule_dependent_plugin_instances task as soon as their parents finish. This
+    periodic task is only a safety net (e.g. for a lost task message).
     """
-    all_instances = PluginInstance.objects.filter(status='waiting',
-                                                  previous__status='finishedSuccessfully')
+    waiting_instances = PluginInstance.objects.filter(status='waiting')
+
+    # instances with recorded dependency edges are checked with a single query
+    unfinished = ~Q(dependency_edges__parent__status='finishedSuccessfully')
+    ready_instances = waiting_instances.annotate(
+        n_parents=Count('dependency_edges'),
+        n_unfinished_parents=Count('dependency_edges', filter=unfinished)
+    ).filter(n_parents__gt=0, n_unfinished_parents=0).select_related('compute_resource')
+
+    for plg_inst in ready_instances:
+        _schedule_plugin_instance(plg_inst)
+
+    # instances without dependency edges (created before the edges were recorded)
+    all_instances = waiting_instances.filter(dependency_edges__isnull=True,
+                                             previous__status='finishedSuccessfully')
     ts_instances = all_instances.filter(plugin__meta__type='ts')
 
     for plg_inst in ts_instances:
@@ -197,17 +235,18 @@ def schedule_waiting_plugin_instances(self):  # task is passed info about itself
 def _schedule_plugin_instance(plg_inst):
     """
     Schedule the appropriate job for a waiting plugin instance based on its compute
-    resource configuration.
+    resource configuration. The job is only scheduled by the first caller that
+    releases the instance from its 'waiting' status.
     """
     cr = plg_inst.compute_resource
 
     if cr.compute_requires_copy_job:
-        plg_inst.set_status('copying')
-        run_plugin_instance_job.delay(plg_inst.id, 'PluginInstanceCopyJob')
+        if plg_inst.release_from_waiting('copying'):
+            run_plugin_instance_job.delay(plg_inst.id, 'PluginInstanceCopyJob')
     else:
-        plg_inst.set_status('scheduled')
-        run_plugin_instance_job.delay(plg_inst.id, 'PluginInstanceAppJob')
-        
+        if plg_inst.release_from_waiting('scheduled'):
+            run_plugin_instance_job.delay(plg_inst.id, 'PluginInstanceAppJob')
+
 
 @shared_task
 def check_running_plugin_instances_exec_status():
@@ -224,6 +263,13 @@ def check_running_plugin_instances_exec_status():
     
     instances = PluginInstance.objects.filter(lookup)
 
+    if settings.PFCON_BATCH_STATUS_POLLING:
+        poller = JobStatusPoller(settings.PFCON_STATUS_POLL_WORKERS)
+        follow_up = poller.poll(instances.select_related('compute_resource'))
+        for (plg_inst_id, job_class_name) in follow_up:
+            check_plugin_instance_job_exec_status.delay(plg_inst_id, job_class_name)
+        return poller.metrics
+
     for plg_inst in instances:
         if plg_inst.status == 'copying':
             check_plugin_instance_job_exec_status.delay(plg_inst.id, 
@@ -0,0 +1,61 @@
+
+import io
+import logging
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.conf import settings
+
+from plugins.models import PluginMeta, Plugin, ComputeResource
+from plugininstances.models import PluginInstance
+from feeds.models import FeedJobsStatusCount
+
+
+COMPUTE_RESOURCE_URL = settings.COMPUTE_RESOURCE_URL
+
+
+class RepairJobsStatusCountsCommandTests(TestCase):
+
+    def setUp(self):
+        # avoid cluttered console output (for instance logging all the http requests)
+        logging.disable(logging.WARNING)
+
+        (compute_resource, tf) = ComputeResource.objects.get_or_create(
+            name="host", compute_url=COMPUTE_RESOURCE_URL)
+        (pl_meta, tf) = PluginMeta.objects.get_or_create(name='pacspull', type='fs')
+        (plugin, tf) = Plugin.objects.get_or_create(meta=pl_meta, version='0.1')
+        plugin.compute_resources.set([compute_resource])
+
+        user = User.objects.create_user(username='foo', password='bar')
+        self.plg_inst = PluginInstance.objects.create(plugin=plugin, owner=user,
+                                                      compute_resource=compute_resource)
+
+    def tearDown(self):
+        # re-enable logging
+        logging.disable(logging.NOTSET)
+
+    def test_repair_fixes_wrong_counts(self):
+        FeedJobsStatusCount.objects.filter(feed=self.plg_inst.feed).update(
+            created_jobs=5, finished_jobs=2)
+        out = io.StringIO()
+        call_command('repair_jobs_status_counts', stdout=out)
+        self.assertIn('1 wrong feed jobs status counts', out.getvalue())
+        counts = FeedJobsStatusCount.objects.get(feed=self.plg_inst.feed)
+        self.assertEqual(counts.created_jobs, 1)
+        self.assertEqual(counts.finished_jobs, 0)
+
+    def test_repair_creates_missing_counts(self):
+        FeedJobsStatusCount.objects.all().delete()
+        call_command('repair_jobs_status_counts', stdout=io.StringIO())
+        counts = FeedJobsStatusCount.objects.get(feed=self.plg_inst.feed)
+        self.assertEqual(counts.created_jobs, 1)
+
+    def test_dry_run_does_not_change_counts(self):
+        FeedJobsStatusCount.objects.filter(feed=self.plg_inst.feed).update(
+            created_jobs=5)
+        out = io.StringIO()
+        call_command('repair_jobs_status_counts', dry_run=True, stdout=out)
+        self.assertIn('1 wrong feed jobs status counts', out.getvalue())
+        counts = FeedJobsStatusCount.objects.get(feed=self.plg_inst.feed)
+        self.assertEqual(counts.created_jobs, 5)
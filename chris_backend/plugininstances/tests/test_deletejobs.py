@@ -443,8 +443,8 @@ class PluginInstanceDeleteJobTests(TestCase):
              mock.patch.object(ChrisFolder, 'grant_public_access') as mock_gpa:
             delete_job.save_plugin_instance_final_status()
 
-            mock_ggp.assert_called_once_with(group, 'w')
-            mock_gup.assert_called_once_with(other_user, 'w')
+            mock_ggp.assert_not_called()  # inherited from the feed's folder
+            mock_gup.assert_not_called()
             mock_gpa.assert_not_called()  # feed.public is False by default
 
     def test_cleanup_plugin_instance_output_dir(self):
@@ -460,13 +460,12 @@ class PluginInstanceDeleteJobTests(TestCase):
         child_folder.save()
 
         delete_job = deletejobs.PluginInstanceDeleteJob(pl_inst)
-        delete_job.storage_manager.delete_path = mock.Mock()
+        with mock.patch.object(delete_job.storage_manager,
+                               'delete_path') as delete_path_mock:
+            delete_job._cleanup_plugin_instance_output_dir()
 
-        delete_job._cleanup_plugin_instance_output_dir()
-
-        self.assertFalse(ChrisFolder.objects.filter(pk=child_folder.pk).exists())
-        delete_job.storage_manager.delete_path.assert_called_once_with(
-            pl_inst.output_folder.path)
+            self.assertFalse(ChrisFolder.objects.filter(pk=child_folder.pk).exists())
+            delete_path_mock.assert_called_once_with(pl_inst.output_folder.path)
 
     @tag('integration')
     def test_integration_cleanup_plugin_instance_output_dir(self):
@@ -88,6 +88,28 @@ class ModelTests(TestCase):
         # re-enable logging
         logging.disable(logging.NOTSET)
 
+    def _create_tree(self, depth, branching):
+        """
+        Create an 'fs' plugin instance with a complete tree of 'ds' descendants of the
+        given depth and branching factor. Return the root and the list of all the
+        instances in the tree.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name=self.plugin_fs_name)
+        plg_inst_root = PluginInstance.objects.create(
+            plugin=plugin, owner=user, compute_resource=self.compute_resource)
+
+        plugin = Plugin.objects.get(meta__name=self.plugin_ds_name)
+        tree = [plg_inst_root]
+        level = [plg_inst_root]
+        for _ in range(depth):
+            level = [PluginInstance.objects.create(plugin=plugin, owner=user,
+                                                   previous=previous,
+                                                   compute_resource=self.compute_resource)
+                     for previous in level for _ in range(branching)]
+            tree.extend(level)
+        return plg_inst_root, tree
+
 
 class PluginInstanceModelTests(ModelTests):
 
@@ -270,6 +292,60 @@ class PluginInstanceModelTests(ModelTests):
             ChrisFolder.objects.get(path=output_folder_path)
 
 
+    def test_auto_delete_output_folder_with_descendant_plugin_instances(self):
+        """
+        Test whether deleting a plugin instance also deletes its descendants and their
+        output folders.
+        """
+        (plg_inst_root, tree) = self._create_tree(depth=3, branching=2)
+        descendant_ids = [plg_inst.id for plg_inst in tree]
+        output_paths = [plg_inst.output_folder.path for plg_inst in tree]
+
+        plg_inst_root.delete()
+
+        self.assertFalse(PluginInstance.objects.filter(pk__in=descendant_ids).exists())
+        self.assertFalse(ChrisFolder.objects.filter(path__in=output_paths).exists())
+
+
+class PluginInstanceTreeQueriesTests(ModelTests):
+    """
+    Test that the recursive tree queries use a constant number of DB queries
+    regardless of the size of the tree.
+    """
+
+    def test_get_descendant_instances_single_query(self):
+        (plg_inst_root, tree) = self._create_tree(depth=3, branching=2)
+        with self.assertNumQueries(1):
+            descendants = plg_inst_root.get_descendant_instances()
+        self.assertEqual(len(descendants), len(tree))
+        self.assertEqual(descendants[0], plg_inst_root)
+        self.assertEqual({inst.id for inst in descendants}, {inst.id for inst in tree})
+
+    def test_get_descendants_queryset_single_query(self):
+        (plg_inst_root, tree) = self._create_tree(depth=3, branching=2)
+        with self.assertNumQueries(1):
+            descendants = list(tree[1].get_descendants_queryset())
+        # the first child of the root and its two levels of descendants
+        self.assertEqual(len(descendants), 1 + 2 + 4)
+
+    def test_get_root_instance_and_depth_single_query(self):
+        (plg_inst_root, tree) = self._create_tree(depth=4, branching=1)
+        leaf = tree[-1]
+        with self.assertNumQueries(1):
+            self.assertEqual(leaf.get_root_instance(), plg_inst_root)
+        with self.assertNumQueries(1):
+            self.assertEqual(leaf.get_depth(), 4)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(leaf.get_ancestors_queryset()), 5)
+
+    def test_filter_by_root_id_constant_queries(self):
+        (plg_inst_root, tree) = self._create_tree(depth=3, branching=2)
+        with self.assertNumQueries(2):
+            filtered = PluginInstanceFilter().filter_by_root_id(
+                PluginInstance.objects.all(), '', plg_inst_root.id)
+            self.assertEqual(len(filtered), len(tree))
+
+
 class PluginInstanceFilterModelTests(ModelTests):
 
     def test_filter_by_root_id(self):
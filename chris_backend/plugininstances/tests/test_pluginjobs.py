@@ -4,6 +4,7 @@ import os
 import io
 import time
 import uuid
+import zipfile
 from unittest import mock
 
 from django.test import TestCase, tag
@@ -11,6 +12,7 @@ from django.contrib.auth.models import User
 from django.conf import settings
 
 from pfconclient import client as pfcon
+from pfconclient.exceptions import PfconRequestInvalidTokenException
 
 from core.models import ChrisInstance, ChrisFolder, ChrisLinkFile
 from core.storage import connect_storage
@@ -153,6 +155,35 @@ class PluginInstanceAppJobTests(TestCase):
             plg_inst_app_job.get_job_status_summary.assert_called_once()
             json_zip2str_mock.assert_called_once()
 
+    def test_submit_resends_full_zip_file_after_auth_token_refresh(self):
+        """
+        Test whether the job zip file is sent in full again when the job is resubmitted
+        after refreshing an expired auth token.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(meta__name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(
+            plugin=plugin, owner=user, status='scheduled',
+            compute_resource=plugin.compute_resources.all()[0])
+        plg_inst_app_job = pluginjobs.PluginInstanceAppJob(pl_inst)
+        plg_inst_app_job._refresh_compute_resource_auth_token = mock.Mock()
+
+        uploads = []
+
+        def submit_job(job_type, job_id, job_descriptors, dfile, timeout):
+            uploads.append(dfile.read())
+            if len(uploads) == 1:
+                raise PfconRequestInvalidTokenException('expired token')
+            return 'dictionary'
+
+        plg_inst_app_job.pfcon_client.submit_job = mock.Mock(side_effect=submit_job)
+        with io.BytesIO(b'zip file contents') as dfile:
+            d_resp = plg_inst_app_job._submit(pfcon.JobType.PLUGIN, 'job1', {}, dfile)
+
+        self.assertEqual(d_resp, 'dictionary')
+        self.assertEqual(uploads, [b'zip file contents', b'zip file contents'])
+        plg_inst_app_job._refresh_compute_resource_auth_token.assert_called_once()
+
     @tag('integration', 'error-pfcon')
     def test_integration_plugin_job_can_run_and_check_exec_status(self):
         """
@@ -285,6 +316,10 @@ class PluginInstanceAppJobTests(TestCase):
         self.assertIn(outputdir + '/SAGT1MPRAGE/test1.txt', fnames)
         self.assertIn(outputdir + '/SAGT1MPRAGE/test2.txt', fnames)
 
+        # file sizes are stored in the DB from the storage listing
+        self.assertEqual([f.size for f in folder.chris_files.all()], [9, 9])
+        self.assertEqual(pl_inst.size, 18)
+
         self.assertEqual(len(plg_inst_app_job.plugin_inst_output_files), 2)
         self.assertIn(outputdir + '/SAGT1MPRAGE/test1.txt',
                       plg_inst_app_job.plugin_inst_output_files)
@@ -395,6 +430,99 @@ class PluginInstanceAppJobTests(TestCase):
         self.assertIn(linked_file, obj_paths)
         self.assertEqual(pl_inst.error_code, '')
 
+    def test_create_zip_file(self):
+        """
+        Test whether create_zip_file packs every storage object under the passed
+        paths exactly once and records the packing stats.
+        """
+        pl_inst = self._create_started_plugin_inst()
+        job = pluginjobs.PluginInstanceAppJob(pl_inst)
+
+        storage_path = 'home/%s/uploads' % self.username
+        objs = {storage_path + '/a.txt': b'aaa',
+                storage_path + '/sub/b.txt': b'bbbb'}
+
+        job.storage_manager = mock.Mock()
+        job.storage_manager.ls = mock.Mock(return_value=list(objs))
+        job.storage_manager.download_obj = mock.Mock(side_effect=lambda p: objs[p])
+
+        with mock.patch.object(pluginjobs.settings, 'PLUGIN_JOB_ZIP_MAX_MEMORY_SIZE',
+                               1):
+            job_zip_file = job.create_zip_file([storage_path, storage_path])
+
+        with zipfile.ZipFile(job_zip_file) as job_zip:
+            self.assertEqual(sorted(job_zip.namelist()), ['a.txt', 'sub/b.txt'])
+            self.assertEqual(job_zip.read('sub/b.txt'), b'bbbb')
+        job_zip_file.close()
+
+        self.assertEqual(job.storage_manager.download_obj.call_count, 2)
+        self.assertEqual(job.zip_packing_stats['files'], 2)
+        self.assertEqual(job.zip_packing_stats['bytes'], 7)
+
+    def test_create_zip_file_fails_when_download_fails(self):
+        """
+        Test whether create_zip_file sets the CODE08 error code and propagates the
+        exception when a storage object cannot be downloaded.
+        """
+        pl_inst = self._create_started_plugin_inst()
+        job = pluginjobs.PluginInstanceAppJob(pl_inst)
+
+        storage_path = 'home/%s/uploads' % self.username
+        job.storage_manager = mock.Mock()
+        job.storage_manager.ls = mock.Mock(return_value=[storage_path + '/a.txt'])
+        job.storage_manager.download_obj = mock.Mock(side_effect=Exception('boom'))
+
+        with self.assertLogs('plugininstances.services.pluginjobs', level='ERROR'):
+            with self.assertRaises(Exception):
+                job.create_zip_file([storage_path])
+        self.assertEqual(pl_inst.error_code, 'CODE08')
+
+    def test_unpack_zip_file(self):
+        """
+        Test whether unpack_zip_file uploads every zip member into the plugin
+        instance's output dir and records the unpacking stats.
+        """
+        pl_inst = self._create_started_plugin_inst()
+        job = pluginjobs.PluginInstanceAppJob(pl_inst)
+        outputdir = pl_inst.get_output_path()
+
+        memory_zip_file = io.BytesIO()
+        with zipfile.ZipFile(memory_zip_file, 'w') as job_zip:
+            job_zip.writestr('out.txt', b'out')
+            job_zip.writestr('sub/out2.txt', b'out2')
+
+        job.storage_manager = mock.Mock()
+        job.unpack_zip_file(memory_zip_file.getvalue())
+
+        self.assertEqual(job.storage_manager.upload_obj.call_count, 2)
+        job.storage_manager.upload_obj.assert_any_call(outputdir + '/sub/out2.txt',
+                                                       b'out2')
+        self.assertEqual(job.plugin_inst_output_files,
+                         {outputdir + '/out.txt', outputdir + '/sub/out2.txt'})
+        self.assertEqual(job.zip_unpacking_stats['files'], 2)
+        self.assertEqual(job.zip_unpacking_stats['bytes'], 7)
+
+    def test_unpack_zip_file_fails_when_upload_fails(self):
+        """
+        Test whether unpack_zip_file sets the CODE07 error code and raises a
+        ValueError when a zip member cannot be uploaded into storage.
+        """
+        pl_inst = self._create_started_plugin_inst()
+        job = pluginjobs.PluginInstanceAppJob(pl_inst)
+
+        memory_zip_file = io.BytesIO()
+        with zipfile.ZipFile(memory_zip_file, 'w') as job_zip:
+            job_zip.writestr('out.txt', b'out')
+
+        job.storage_manager = mock.Mock()
+        job.storage_manager.upload_obj = mock.Mock(side_effect=Exception('boom'))
+
+        with self.assertLogs('plugininstances.services.pluginjobs', level='ERROR'):
+            with self.assertRaises(ValueError):
+                job.unpack_zip_file(memory_zip_file)
+        self.assertEqual(pl_inst.error_code, 'CODE07')
+        self.assertEqual(job.plugin_inst_output_files, set())
+
     @tag('integration')
     def test_integration_register_output_files_refuses_remote_link_file(self):
         """
@@ -450,6 +578,7 @@ class PluginInstanceAppJobTests(TestCase):
 
         job.storage_manager = mock.Mock()
         job.storage_manager.sanitize_obj_names = mock.Mock(return_value={})
+        job.storage_manager.ls_info = mock.Mock(return_value=[])
         job.storage_manager.delete_obj = mock.Mock(
             side_effect=Exception('boom'))
         job.plugin_inst_output_files = {outputdir + '/evil.chrislink'}
@@ -14,7 +14,8 @@ from core.celery import app as celery_app
 from core.celery import task_routes
 
 from plugins.models import PluginMeta, Plugin, ComputeResource
-from plugininstances.models import PluginInstance, PluginInstanceLock
+from plugininstances.models import (PluginInstance, PluginInstanceLock,
+                                    PluginInstanceDependency)
 
 from plugininstances import tasks
 
@@ -106,6 +107,96 @@ class PluginInstanceTasksTests(TasksTests):
             delay_mock.assert_called_with(self.plg_inst.id, 'PluginInstanceAppJob')
             self.assertEqual(self.plg_inst.status, 'started')
 
+    def _create_waiting_child(self):
+        plugin = Plugin.objects.get(meta__name="mri_convert")
+        user = User.objects.get(username=self.username)
+        child = PluginInstance.objects.create(
+            plugin=plugin, owner=user, previous=self.plg_inst,
+            compute_resource=plugin.compute_resources.all()[0])
+        child.status = 'waiting'
+        child.save()
+        PluginInstanceDependency.objects.create(parent=self.plg_inst, child=child)
+        return child
+
+    def test_finishing_plugin_instance_triggers_dependents_scheduling(self):
+        self._create_waiting_child()
+        with mock.patch.object(tasks.schedule_dependent_plugin_instances, 'delay',
+                               return_value=None) as delay_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.plg_inst.status = 'finishedSuccessfully'
+                self.plg_inst.save(update_fields=['status'])
+                # the task is only scheduled once the transaction is committed
+                delay_mock.assert_not_called()
+            delay_mock.assert_called_once_with(self.plg_inst.id)
+
+    def test_task_schedule_dependent_plugin_instances(self):
+        child = self._create_waiting_child()
+        PluginInstance.objects.filter(pk=self.plg_inst.pk).update(
+            status='finishedSuccessfully')
+
+        with mock.patch.object(tasks.run_plugin_instance_job, 'delay',
+                               return_value=None) as delay_mock:
+            tasks.schedule_dependent_plugin_instances(self.plg_inst.id)
+            delay_mock.assert_called_once_with(child.id, 'PluginInstanceCopyJob')
+
+            # a second release attempt does not schedule the job again
+            tasks.schedule_dependent_plugin_instances(self.plg_inst.id)
+            delay_mock.assert_called_once()
+
+        child.refresh_from_db()
+        self.assertEqual(child.status, 'copying')
+
+    def test_task_schedule_dependent_plugin_instances_cancels_on_parent_error(self):
+        child = self._create_waiting_child()
+        PluginInstance.objects.filter(pk=self.plg_inst.pk).update(
+            status='finishedWithError')
+
+        with mock.patch.object(tasks.schedule_dependent_plugin_instances, 'delay',
+                               return_value=None) as delay_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                tasks.schedule_dependent_plugin_instances(self.plg_inst.id)
+            delay_mock.assert_called_once_with(child.id)
+
+        child.refresh_from_db()
+        self.assertEqual(child.status, 'cancelled')
+
+    def test_task_check_running_plugin_instances_exec_status_batch_polling(self):
+        plugin = Plugin.objects.get(meta__name="mri_convert")
+        user = User.objects.get(username=self.username)
+        finished_inst = PluginInstance.objects.create(
+            plugin=plugin, owner=user, previous=self.plg_inst,
+            compute_resource=self.compute_resource)
+        finished_inst.status = 'started'
+        finished_inst.save()
+
+        def get_job_status(job_type, job_id, timeout):
+            status = 'finishedSuccessfully' if job_id.endswith(
+                str(finished_inst.id)) else 'started'
+            return {'compute': {'status': status, 'logs': 'running'}}
+
+        client_mock = mock.Mock()
+        client_mock.get_job_status = mock.Mock(side_effect=get_job_status)
+
+        with self.settings(PFCON_BATCH_STATUS_POLLING=True), \
+                mock.patch('plugininstances.services.statuspoller.pfcon.Client',
+                           return_value=client_mock), \
+                mock.patch.object(tasks.check_plugin_instance_job_exec_status, 'delay',
+                                  return_value=None) as delay_mock:
+            metrics = tasks.check_running_plugin_instances_exec_status()
+
+            # only the finished job is checked by its job class
+            delay_mock.assert_called_once_with(finished_inst.id, 'PluginInstanceAppJob')
+            self.assertEqual(client_mock.get_job_status.call_count, 2)
+            self.assertEqual(metrics['requests'], 2)
+            self.assertEqual(metrics['changed'], 1)
+
+            # the running job's summary is not written again when unchanged
+            self.plg_inst.refresh_from_db()
+            self.assertEqual(
+                self.plg_inst.summary['compute']['return']['job_logs'], 'running')
+            metrics = tasks.check_running_plugin_instances_exec_status()
+            self.assertEqual(metrics['changed'], 0)
+
 
 class TasksAsyncTests(TransactionTestCase):
 
@@ -1,6 +1,8 @@
+from django.db import transaction
 
-from .tasks import run_plugin_instance_job
-from .models import PluginInstance, ACTIVE_STATUSES
+
+from .tasks import run_plugin_instance_job, schedule_dependent_plugin_instances
+from .models import PluginInstance, PluginInstanceDependency, ACTIVE_STATUSES
 
 
 def run_if_ready(plg_inst, previous):
@@ -21,7 +23,10 @@ def run_if_ready(plg_inst, previous):
 
         for parent in parents:
             if parent.status in ACTIVE_STATUSES:
-                plg_inst.set_status('waiting')
+                dependency_ids = set(parent_ids)
+                if previous is not None:
+                    dependency_ids.add(previous.id)
+                wait_for_parents(plg_inst, list(dependency_ids))
                 all_parents_finished = False
                 break
             if parent.status in ('finishedWithError', 'cancelled'):
@@ -46,7 +51,26 @@ def run_if_ready(plg_inst, previous):
             run_plugin_instance_job.delay(plg_inst.id, 'PluginInstanceAppJob')
 
     elif previous.status in ACTIVE_STATUSES:
-        plg_inst.set_status('waiting')
+        wait_for_parents(plg_inst, [previous.id])
 
     elif previous.status in ('finishedWithError', 'cancelled'):
         plg_inst.set_status('cancelled')
+
+
+def wait_for_parents(plg_inst, parent_ids):
+    """
+    Set the status of ``plg_inst`` to 'waiting' and record its dependency edges so
+    that it is released as soon as the last of its parents finishes.
+    """
+    plg_inst.set_status('waiting')
+
+    edges = [PluginInstanceDependency(parent_id=parent_id, child=plg_inst)
+             for parent_id in parent_ids]
+    PluginInstanceDependency.objects.bulk_create(edges, ignore_conflicts=True)
+
+    # the parents could have finished before the edges were recorded
+    if not PluginInstance.objects.filter(pk__in=parent_ids,
+                                         status__in=ACTIVE_STATUSES).exists():
+        parent_id = parent_ids[0]
+        transaction.on_commit(
+            lambda: schedule_dependent_plugin_instances.delay(parent_id))
@@ -216,14 +216,10 @@ class PluginInstanceDetail(generics.RetrieveUpdateDestroyAPIView):
             instance = self.get_object()
 
             if instance.status != 'cancelled':
-                descendants = instance.get_descendant_instances()
-
                 if instance.status in ACTIVE_STATUSES:
                     cancel_plugin_instance_job.delay(instance.id)  # call async task
 
-                PluginInstance.objects.filter(
-                    pk__in=[inst.id for inst in descendants]
-                ).update(status='cancelled')
+                instance.get_descendants_queryset().update(status='cancelled')
 
         super(PluginInstanceDetail, self).perform_update(serializer)
 
@@ -235,17 +231,12 @@ class PluginInstanceDetail(generics.RetrieveUpdateDestroyAPIView):
         from storage.
         """
         instance = self.get_object()
-        descendants = instance.get_descendant_instances()
 
         if instance.status in ACTIVE_STATUSES:
             cancel_plugin_instance_job(instance.id)
 
-        plg_inst_ids = []
-        for plg_inst in descendants:
-            if plg_inst.status in ACTIVE_STATUSES:
-                plg_inst_ids.append(plg_inst.id)
-
-        PluginInstance.objects.filter(pk__in=plg_inst_ids).update(status='cancelled')
+        instance.get_descendants_queryset().filter(
+            status__in=ACTIVE_STATUSES).update(status='cancelled')
 
         if instance.mark_deletion_pending():
             delete_plugin_instance.delay(instance.id)  # async task
@@ -276,7 +267,7 @@ class PluginInstanceDescendantList(generics.ListAPIView):
         Custom method to get the actual descendants queryset.
         """
         instance = self.get_object()
-        return self.filter_queryset(instance.get_descendant_instances())
+        return self.filter_queryset(instance.get_descendants_queryset())
 
 
 class PluginInstanceSplitList(generics.ListCreateAPIView):
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userfiles', '0002_userfileupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userfileupload',
+            name='chunk_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,6 +1,7 @@
 
 import logging
 
+from django.db import models
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
 from django.conf import settings
@@ -8,7 +9,7 @@ from django.conf import settings
 import django_filters
 from django_filters.rest_framework import FilterSet
 
-from core.models import ChrisFolder, ChrisFile
+from core.models import ChrisFolder, ChrisFile, defer_file_deletion
 from core.utils import filter_files_by_n_slashes
 from core.storage import connect_storage
 
@@ -34,6 +35,8 @@ class UserFile(ChrisFile):
 @receiver(post_delete, sender=UserFile)
 def auto_delete_file_from_storage(sender, instance, **kwargs):
     storage_path = instance.fname.name
+    if defer_file_deletion(storage_path):
+        return
     storage_manager = connect_storage(settings)
     try:
         if storage_manager.obj_exists(storage_path):
@@ -42,6 +45,41 @@ def auto_delete_file_from_storage(sender, instance, **kwargs):
         logger.error('Storage error, detail: %s' % str(e))
 
 
+class UserFileUpload(models.Model):
+    """
+    A resumable upload of a user file whose data is sent in chunks. The chunks are
+    uploaded straight to the storage service and the user file is only registered
+    in the DB when the upload is finalized.
+    """
+    creation_date = models.DateTimeField(auto_now_add=True)
+    modification_date = models.DateTimeField(auto_now=True)
+    upload_path = models.CharField(max_length=1024, unique=True)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    storage_upload_id = models.CharField(max_length=1024)
+    parts = models.JSONField(default=list)  # storage tags of the uploaded chunks
+    chunk_started_at = models.DateTimeField(null=True, blank=True)  # chunk in flight
+    owner = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+
+    class Meta:
+        ordering = ('-creation_date',)
+
+    def __str__(self):
+        return self.upload_path
+
+
+@receiver(post_delete, sender=UserFileUpload)
+def auto_abort_storage_upload(sender, instance, **kwargs):
+    if not instance.storage_upload_id:
+        return
+    storage_manager = connect_storage(settings)
+    try:
+        storage_manager.abort_chunked_upload(instance.upload_path,
+                                             instance.storage_upload_id)
+    except Exception as e:
+        logger.error('Storage error, detail: %s' % str(e))
+
+
 class UserFileFilter(FilterSet):
     min_creation_date = django_filters.IsoDateTimeFilter(field_name='creation_date',
                                                          lookup_expr='gte')
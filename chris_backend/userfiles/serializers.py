@@ -1,11 +1,49 @@
 
 import os
 
+from django.conf import settings
 from rest_framework import serializers
 
-from core.models import ChrisFolder
+from core.models import ChrisFolder, ChrisFile
 from core.serializers import ChrisFileSerializer
-from .models import UserFile
+from core.storage import connect_storage
+from .models import UserFile, UserFileUpload
+
+
+def validate_upload_path(upload_path, user):
+    """
+    Check whether the provided path does not contain commas and is under a home/'s
+    subdirectory for which the user has write permission and that is not part of a
+    folder tree being moved.
+    """
+    if ',' in upload_path:
+        raise serializers.ValidationError([f"Invalid path. Cannot contain commas."])
+
+    upload_path = upload_path.strip().strip('/')
+
+    if upload_path.endswith('.chrislink'):
+        raise serializers.ValidationError(["Invalid path. Uploading ChRIS link "
+                                           "files is not allowed."])
+    if not upload_path.startswith('home/'):
+        raise serializers.ValidationError(["Invalid path. Path must start with "
+                                           "'home/'."])
+
+    ancestor_folder = ChrisFolder.get_first_existing_folder_ancestor(upload_path)
+
+    if ancestor_folder.path == upload_path:
+        raise serializers.ValidationError([f"A folder with path '{upload_path}' "
+                                           f"already exists."])
+    if not (ancestor_folder.owner == user or ancestor_folder.public or
+            ancestor_folder.has_user_permission(user, 'w')):
+        raise serializers.ValidationError([f"Invalid path. User does not have write "
+                                           f"permission under the folder "
+                                           f"'{ancestor_folder.path}'."])
+    moving_folder = ChrisFolder.get_moving_folder(upload_path)
+    if moving_folder:
+        raise serializers.ValidationError([f"Invalid path. Folder "
+                                           f"'{moving_folder.path}' is being moved to "
+                                           f"'{moving_folder.move_target_path}'."])
+    return upload_path
 
 
 class UserFileSerializer(ChrisFileSerializer):
@@ -30,8 +68,8 @@ class UserFileSerializer(ChrisFileSerializer):
     def create(self, validated_data):
         """
         Overriden to set the file's saving path and parent folder. It also creates
-        non-existent ancestor folders and sets their permissions to be the same as the
-        first existing ancestor folder.
+        non-existent ancestor folders and sets their public status to be the same as
+        the first existing ancestor folder.
         """
         # user file will be stored at: SWIFT_CONTAINER_NAME/<upload_path>
         # where <upload_path> must start with home/<username>/
@@ -66,12 +104,7 @@ class UserFileSerializer(ChrisFileSerializer):
             top_created_obj.grant_public_access()
             user_file.public = True  # update object before returning it
 
-        for perm in ancestor_folder.get_groups_permissions_queryset():
-            top_created_obj.grant_group_permission(perm.group, perm.permission)
-
-        for perm in ancestor_folder.get_users_permissions_queryset():
-            top_created_obj.grant_user_permission(perm.user, perm.permission)
-
+        # groups and users permissions are inherited from the ancestor folders
         if owner != ancestor_folder.owner:
             top_created_obj.grant_user_permission(ancestor_folder.owner, 'w')
         return user_file
@@ -110,30 +143,7 @@ class UserFileSerializer(ChrisFileSerializer):
         Overriden to check whether the provided path does not contain commas and is
         under a home/'s subdirectory for which the user has write permission.
         """
-        if ',' in upload_path:
-            raise serializers.ValidationError([f"Invalid path. Cannot contain commas."])
-
-        upload_path = upload_path.strip().strip('/')
-
-        if upload_path.endswith('.chrislink'):
-            raise serializers.ValidationError(["Invalid path. Uploading ChRIS link "
-                                               "files is not allowed."])
-        if not upload_path.startswith('home/'):
-            raise serializers.ValidationError(["Invalid path. Path must start with "
-                                               "'home/'."])
-
-        ancestor_folder = ChrisFolder.get_first_existing_folder_ancestor(upload_path)
-
-        if ancestor_folder.path == upload_path:
-            raise serializers.ValidationError([f"A folder with path '{upload_path}' "
-                                               f"already exists."])
-        user = self.context['request'].user
-        if not (ancestor_folder.owner == user or ancestor_folder.public or
-                ancestor_folder.has_user_permission(user, 'w')):
-            raise serializers.ValidationError([f"Invalid path. User does not have write "
-                                               f"permission under the folder "
-                                               f"'{ancestor_folder.path}'."])
-        return upload_path
+        return validate_upload_path(upload_path, self.context['request'].user)
 
     def validate(self, data):
         """
@@ -156,3 +166,61 @@ class UserFileSerializer(ChrisFileSerializer):
 
             data.pop('public', None)  # can only be set to public on update
         return data
+
+
+class UserFileUploadSerializer(serializers.HyperlinkedModelSerializer):
+    upload_path = serializers.CharField(max_length=1024)
+    size = serializers.IntegerField(min_value=1)
+    min_chunk_size = serializers.SerializerMethodField()
+    max_chunk_size = serializers.SerializerMethodField()
+    owner_username = serializers.ReadOnlyField(source='owner.username')
+    finalize = serializers.HyperlinkedIdentityField(view_name='userfileupload-finalize')
+    owner = serializers.HyperlinkedRelatedField(view_name='user-detail', read_only=True)
+
+    class Meta:
+        model = UserFileUpload
+        fields = ('url', 'id', 'creation_date', 'modification_date', 'upload_path',
+                  'size', 'offset', 'min_chunk_size', 'max_chunk_size', 'owner_username',
+                  'finalize', 'owner')
+        read_only_fields = ('offset',)
+
+    def create(self, validated_data):
+        """
+        Overriden to start the chunked upload in storage.
+        """
+        storage_manager = connect_storage(settings)
+        upload_path = validated_data['upload_path']
+        upload_id = storage_manager.start_chunked_upload(upload_path)
+        try:
+            return UserFileUpload.objects.create(storage_upload_id=upload_id,
+                                                 **validated_data)
+        except Exception:
+            storage_manager.abort_chunked_upload(upload_path, upload_id)
+            raise
+
+    def get_min_chunk_size(self, obj) -> int:
+        """
+        Get the minimum size in bytes of every chunk but the last one.
+        """
+        return connect_storage(settings).min_upload_chunk_size
+
+    def get_max_chunk_size(self, obj) -> int:
+        """
+        Get the maximum size in bytes of a chunk.
+        """
+        return settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE
+
+    def validate_upload_path(self, upload_path):
+        """
+        Overriden to check whether the provided path is a valid user file path that
+        is not taken by an existing file or another upload.
+        """
+        upload_path = validate_upload_path(upload_path, self.context['request'].user)
+
+        if ChrisFile.objects.filter(fname=upload_path).exists():
+            raise serializers.ValidationError([f"A file with path '{upload_path}' "
+                                               f"already exists."])
+        if UserFileUpload.objects.filter(upload_path=upload_path).exists():
+            raise serializers.ValidationError([f"An upload to path '{upload_path}' is "
+                                               f"already in progress."])
+        return upload_path
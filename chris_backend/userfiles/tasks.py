@@ -0,0 +1,24 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from celery import shared_task
+
+from .models import UserFileUpload
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def delete_expired_user_file_uploads():
+    """
+    Delete the resumable uploads that haven't received a chunk within the expiration
+    time, which discards their chunks from storage.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.CHUNKED_UPLOAD_EXPIRATION)
+    for upload in UserFileUpload.objects.filter(modification_date__lt=cutoff):
+        logger.info(f"Deleting expired upload to path '{upload.upload_path}'")
+        upload.delete()
@@ -144,6 +144,28 @@ class UserFileSerializerTests(TestCase):
             with self.assertRaises(serializers.ValidationError):
                 userfiles_serializer.validate_upload_path('SERVICES/PACS/random/file1.txt')
 
+    def test_validate_upload_path_failure_folder_pending_move(self):
+        """
+        Test whether overriden validate_upload_path method validates submitted path
+        is not under a folder being moved asynchronously.
+        """
+        user = User.objects.get(username=self.username)
+        folder, _ = ChrisFolder.objects.get_or_create(
+            path=f'home/{self.username}/uploads/moving', owner=user)
+        folder.mark_move_pending(f'home/{self.username}/uploads/moved')
+
+        userfiles_serializer = UserFileSerializer()
+        request = mock.Mock()
+        request.user = user
+        with mock.patch.dict(userfiles_serializer.context,
+                             {'request': request}, clear=True):
+            with self.assertRaises(serializers.ValidationError):
+                userfiles_serializer.validate_upload_path(
+                    f'home/{self.username}/uploads/moving/file1.txt')
+            with self.assertRaises(serializers.ValidationError):
+                userfiles_serializer.validate_upload_path(
+                    f'home/{self.username}/uploads/moved/file1.txt')
+
     def test_validate_upload_path_success(self):
         """
         Test whether overriden validate_upload_path method validates submitted path.
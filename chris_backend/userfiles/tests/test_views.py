@@ -16,7 +16,8 @@ import jwt
 
 from core.models import ChrisFolder, FileDownloadToken
 from core.storage.helpers import connect_storage, mock_storage
-from userfiles.models import UserFile
+from core.storage.storagemanager import ObjectInfo
+from userfiles.models import UserFile, UserFileUpload
 from userfiles import views
 
 
@@ -191,10 +192,16 @@ class UserFileResourceViewTests(UserFileViewTests):
         userfile = self.userfile
         fileresource_view_inst = mock.Mock()
         fileresource_view_inst.get_object = mock.Mock(return_value=userfile)
-        request_mock = mock.Mock()
-        with mock.patch('userfiles.views.FileResponse') as response_mock:
-            views.UserFileResource.get(fileresource_view_inst, request_mock)
-            response_mock.assert_called_with(userfile.fname)
+        request_mock = mock.Mock(headers={})
+        storage_manager_mock = mock.Mock()
+        storage_manager_mock.obj_info.return_value = ObjectInfo(userfile.fname.name, 9,
+                                                                'etag')
+        with mock.patch('core.views.connect_storage',
+                        return_value=storage_manager_mock):
+            response = views.UserFileResource.get(fileresource_view_inst, request_mock)
+        storage_manager_mock.download_obj_range.assert_called_with(
+            userfile.fname.name, 0, 8, settings.FILE_DOWNLOAD_CHUNK_SIZE)
+        self.assertEqual(response['ETag'], '"etag"')
 
     @tag('integration')
     def test_integration_userfileresource_download_success(self):
@@ -224,3 +231,189 @@ class UserFileResourceViewTests(UserFileViewTests):
     def test_fileresource_download_failure_unauthenticated(self):
         response = self.client.get(self.download_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class UserFileUploadViewTests(UserFileViewTests):
+    """
+    Test the userfileupload-list, userfileupload-detail and userfileupload-finalize
+    views.
+    """
+
+    def setUp(self):
+        super(UserFileUploadViewTests, self).setUp()
+        self.create_read_url = reverse("userfileupload-list")
+        self.new_upload_path = f'home/{self.username}/uploads/volumes/brain.nii'
+
+        # all the chunks but the last one must be at least the minimum chunk size
+        self.chunks = [b'a' * self.storage_manager.min_upload_chunk_size, b'brain']
+        self.size = sum(len(chunk) for chunk in self.chunks)
+
+    def tearDown(self):
+        UserFileUpload.objects.all().delete()  # abort the unfinished uploads
+        if self.storage_manager.obj_exists(self.new_upload_path):
+            self.storage_manager.delete_obj(self.new_upload_path)
+        super(UserFileUploadViewTests, self).tearDown()
+
+    def create_upload(self, upload_path, size):
+        post = json.dumps({"template": {"data": [{"name": "upload_path",
+                                                  "value": upload_path},
+                                                 {"name": "size", "value": size}]}})
+        return self.client.post(self.create_read_url, data=post,
+                                content_type=self.content_type)
+
+    def upload_chunk(self, upload_id, offset, chunk):
+        return self.client.patch(reverse("userfileupload-detail",
+                                         kwargs={"pk": upload_id}),
+                                 data=chunk,
+                                 content_type=views.UPLOAD_CHUNK_CONTENT_TYPE,
+                                 headers={'Upload-Offset': str(offset)})
+
+    def test_userfileupload_create_success(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.create_upload(self.new_upload_path, self.size)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['offset'], 0)
+        upload = UserFileUpload.objects.get(upload_path=self.new_upload_path)
+        self.assertTrue(upload.storage_upload_id)
+
+    def test_userfileupload_create_failure_file_exists(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.create_upload(self.upload_path, self.size)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_userfileupload_create_failure_upload_in_progress(self):
+        self.client.login(username=self.username, password=self.password)
+        self.create_upload(self.new_upload_path, self.size)
+        response = self.create_upload(self.new_upload_path, self.size)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_userfileupload_create_failure_unauthenticated(self):
+        response = self.create_upload(self.new_upload_path, self.size)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_userfileupload_chunks_and_finalize_success(self):
+        self.client.login(username=self.username, password=self.password)
+        upload_id = self.create_upload(self.new_upload_path, self.size).data['id']
+
+        response = self.upload_chunk(upload_id, 0, self.chunks[0])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response['Upload-Offset'], str(len(self.chunks[0])))
+
+        # the upload is resumed from the offset returned by a HEAD request
+        response = self.client.head(reverse("userfileupload-detail",
+                                            kwargs={"pk": upload_id}))
+        offset = int(response['Upload-Offset'])
+        self.assertEqual(offset, len(self.chunks[0]))
+        response = self.upload_chunk(upload_id, offset, self.chunks[1])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.post(reverse("userfileupload-finalize",
+                                            kwargs={"pk": upload_id}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user_file = UserFile.objects.get(fname=self.new_upload_path)
+        self.assertEqual(user_file.size, self.size)
+        self.assertEqual(user_file.parent_folder.path,
+                         os.path.dirname(self.new_upload_path))
+        self.assertEqual(self.storage_manager.download_obj(self.new_upload_path),
+                         b''.join(self.chunks))
+        self.assertFalse(UserFileUpload.objects.filter(id=upload_id).exists())
+
+    def test_userfileupload_chunk_failure_wrong_offset(self):
+        self.client.login(username=self.username, password=self.password)
+        upload_id = self.create_upload(self.new_upload_path, self.size).data['id']
+        response = self.upload_chunk(upload_id, 1, self.chunks[0])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response['Upload-Offset'], '0')
+
+    def test_userfileupload_chunk_failure_chunk_in_progress(self):
+        self.client.login(username=self.username, password=self.password)
+        upload_id = self.create_upload(self.new_upload_path, self.size).data['id']
+        UserFileUpload.objects.filter(id=upload_id).update(
+            chunk_started_at=timezone.now())
+        response = self.upload_chunk(upload_id, 0, self.chunks[0])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response['Upload-Offset'], '0')
+
+    def test_userfileupload_chunk_success_stale_chunk_in_progress(self):
+        self.client.login(username=self.username, password=self.password)
+        upload_id = self.create_upload(self.new_upload_path, self.size).data['id']
+        timeout = timezone.timedelta(seconds=settings.CHUNKED_UPLOAD_CHUNK_TIMEOUT + 1)
+        UserFileUpload.objects.filter(id=upload_id).update(
+            chunk_started_at=timezone.now() - timeout)
+        response = self.upload_chunk(upload_id, 0, self.chunks[0])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        upload = UserFileUpload.objects.get(id=upload_id)
+        self.assertEqual(upload.offset, len(self.chunks[0]))
+        self.assertIsNone(upload.chunk_started_at)
+
+    def test_userfileupload_chunk_failure_storage_error_releases_chunk(self):
+        self.client.login(username=self.username, password=self.password)
+        upload_id = self.create_upload(self.new_upload_path, self.size).data['id']
+        with mock.patch.object(type(self.storage_manager), 'upload_chunk',
+                               side_effect=IOError('storage error')):
+            with self.assertRaises(IOError):
+                self.upload_chunk(upload_id, 0, self.chunks[0])
+        upload = UserFileUpload.objects.get(id=upload_id)
+        self.assertEqual(upload.offset, 0)
+        self.assertIsNone(upload.chunk_started_at)
+
+    def test_userfileupload_chunk_failure_exceeds_size(self):
+        self.client.login(username=self.username, password=self.password)
+        upload_id = self.create_upload(self.new_upload_path, 3).data['id']
+        response = self.upload_chunk(upload_id, 0, b'abcd')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_userfileupload_chunk_failure_unsupported_media_type(self):
+        self.client.login(username=self.username, password=self.password)
+        upload_id = self.create_upload(self.new_upload_path, self.size).data['id']
+        response = self.client.patch(reverse("userfileupload-detail",
+                                             kwargs={"pk": upload_id}),
+                                     data=self.chunks[0],
+                                     content_type='application/octet-stream',
+                                     headers={'Upload-Offset': '0'})
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_userfileupload_chunk_failure_access_denied(self):
+        self.client.login(username=self.username, password=self.password)
+        upload_id = self.create_upload(self.new_upload_path, self.size).data['id']
+        self.client.login(username=self.other_username, password=self.other_password)
+        response = self.upload_chunk(upload_id, 0, self.chunks[0])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_userfileupload_finalize_failure_incomplete(self):
+        self.client.login(username=self.username, password=self.password)
+        upload_id = self.create_upload(self.new_upload_path, self.size).data['id']
+        self.upload_chunk(upload_id, 0, self.chunks[0])
+        response = self.client.post(reverse("userfileupload-finalize",
+                                             kwargs={"pk": upload_id}))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(UserFile.objects.filter(fname=self.new_upload_path).exists())
+
+    def test_userfileupload_finalize_failure_db_error_deletes_file(self):
+        self.client.login(username=self.username, password=self.password)
+        upload_id = self.create_upload(self.new_upload_path, self.size).data['id']
+        self.upload_chunk(upload_id, 0, self.chunks[0])
+        self.upload_chunk(upload_id, len(self.chunks[0]), self.chunks[1])
+        with mock.patch.object(views.UserFileSerializer, 'create',
+                               side_effect=IOError('DB error')):
+            with self.assertRaises(IOError):
+                self.client.post(reverse("userfileupload-finalize",
+                                         kwargs={"pk": upload_id}))
+        self.assertFalse(self.storage_manager.obj_exists(self.new_upload_path))
+        self.assertFalse(UserFile.objects.filter(fname=self.new_upload_path).exists())
+
+    def test_userfileupload_delete_success(self):
+        self.client.login(username=self.username, password=self.password)
+        upload_id = self.create_upload(self.new_upload_path, self.size).data['id']
+        upload = UserFileUpload.objects.get(id=upload_id)
+
+        storage_manager_mock = mock.Mock()
+        with mock.patch('userfiles.models.connect_storage',
+                        return_value=storage_manager_mock):
+            response = self.client.delete(reverse("userfileupload-detail",
+                                                  kwargs={"pk": upload_id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        storage_manager_mock.abort_chunked_upload.assert_called_with(
+            self.new_upload_path, upload.storage_upload_id)
+        self.storage_manager.abort_chunked_upload(self.new_upload_path,
+                                                  upload.storage_upload_id)
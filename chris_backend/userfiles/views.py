@@ -1,21 +1,31 @@
+from datetime import timedelta
 
-from pathlib import Path
-
-from django.http import FileResponse
-
-from rest_framework import generics, permissions
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import generics, permissions, serializers, status
+from rest_framework.exceptions import UnsupportedMediaType
+from rest_framework.response import Response
 from rest_framework.reverse import reverse
 from rest_framework.authentication import BasicAuthentication, SessionAuthentication
-from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiResponse, OpenApiTypes
+from drf_spectacular.utils import (extend_schema, extend_schema_view, OpenApiParameter,
+                                   OpenApiResponse, OpenApiTypes)
 
 from collectionjson import services
-from core.renderers import BinaryFileRenderer
-from core.views import TokenAuthSupportQueryString
-from .models import UserFile, UserFileFilter
-from .serializers import UserFileSerializer
+from core.models import ChrisFile
+from core.storage import connect_storage
+from core.views import TokenAuthSupportQueryString, FileResourceView
+from .models import UserFile, UserFileFilter, UserFileUpload
+from .serializers import (UserFileSerializer, UserFileUploadSerializer,
+                          validate_upload_path)
 from .permissions import IsOwnerOrChris
 
 
+# media type of the request bodies with the chunks of the resumable uploads (as in tus)
+UPLOAD_CHUNK_CONTENT_TYPE = 'application/offset+octet-stream'
+
+
 @extend_schema_view(
     post=extend_schema(
         request={
@@ -64,6 +74,10 @@ class UserFileList(generics.ListCreateAPIView):
         query_list = [reverse('userfile-list-query-search', request=request)]
         response = services.append_collection_querylist(response, query_list)
 
+        # append document-level link relations
+        links = {'uploads': reverse('userfileupload-list', request=request)}
+        response = services.append_collection_links(response, links)
+
         # append write template
         template_data = {'upload_path': "", 'fname': ""}
         return services.append_collection_template(response, template_data)
@@ -112,24 +126,213 @@ class UserFileDetail(generics.RetrieveUpdateDestroyAPIView):
         return services.append_collection_template(response, template_data)
 
 
-class UserFileResource(generics.GenericAPIView):
+class UserFileResource(FileResourceView):
     """
     A view to enable downloading of a file resource.
     """
-    http_method_names = ['get']
     queryset = UserFile.get_base_queryset()
-    renderer_classes = (BinaryFileRenderer,)
     permission_classes = (IsOwnerOrChris,)
     authentication_classes = (TokenAuthSupportQueryString, BasicAuthentication,
                               SessionAuthentication)
 
-    @extend_schema(responses=OpenApiResponse(OpenApiTypes.BINARY))
-    def get(self, request, *args, **kwargs):
+
+class UserFileUploadList(generics.ListCreateAPIView):
+    """
+    A view for the collection of resumable user file uploads.
+    """
+    http_method_names = ['get', 'post']
+    serializer_class = UserFileUploadSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        """
+        Overriden to return a custom queryset that is only comprised by the uploads
+        owned by the currently authenticated user.
+        """
+        if getattr(self, "swagger_fake_view", False):
+            return UserFileUpload.objects.none()
+
+        user = self.request.user
+
+        # if the user is chris then return all the uploads
+        if user.username == 'chris':
+            return UserFileUpload.objects.all()
+
+        return UserFileUpload.objects.filter(owner=user)
+
+    def perform_create(self, serializer):
+        """
+        Overriden to associate an owner with the upload before first saving to the DB.
+        """
+        serializer.save(owner=self.request.user)
+
+    def list(self, request, *args, **kwargs):
         """
-        Overriden to be able to make a GET request to an actual file resource.
+        Overriden to append a collection+json template to the response.
         """
-        user_file = self.get_object()
-        f = user_file.fname
-        resp = FileResponse(f)
-        resp['Content-Disposition'] = f'attachment; filename="{Path(f.name).name}"'
-        return resp
+        response = super(UserFileUploadList, self).list(request, *args, **kwargs)
+        template_data = {'upload_path': "", 'size': ""}
+        return services.append_collection_template(response, template_data)
+
+
+class UserFileUploadDetail(generics.RetrieveDestroyAPIView):
+    """
+    A resumable user file upload view. The file data is uploaded in consecutive
+    chunks with PATCH requests and deleting the upload discards the uploaded chunks.
+    """
+    http_method_names = ['get', 'head', 'patch', 'delete']
+    queryset = UserFileUpload.objects.all()
+    serializer_class = UserFileUploadSerializer
+    permission_classes = (IsOwnerOrChris,)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Overriden to append the offset from which the upload must be resumed to the
+        response headers.
+        """
+        response = super(UserFileUploadDetail, self).retrieve(request, *args, **kwargs)
+        response['Upload-Offset'] = str(response.data['offset'])
+        response['Upload-Length'] = str(response.data['size'])
+        return response
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('Upload-Offset', OpenApiTypes.INT, OpenApiParameter.HEADER,
+                             required=True,
+                             description='offset in the file of the chunk\'s first byte'),
+        ],
+        request={UPLOAD_CHUNK_CONTENT_TYPE: OpenApiTypes.BINARY},
+        responses={204: OpenApiResponse(description='The chunk was uploaded.')},
+    )
+    def patch(self, request, *args, **kwargs):
+        """
+        Upload the chunk of the file data in the request body. It must start at the
+        upload's current offset and all the chunks but the last one must be at least
+        the storage's minimum chunk size.
+        """
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type != UPLOAD_CHUNK_CONTENT_TYPE:
+            raise UnsupportedMediaType(content_type)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            raise serializers.ValidationError(
+                {'non_field_errors': ['A valid Upload-Offset header is required.']})
+        if length < 1:
+            raise serializers.ValidationError(
+                {'non_field_errors': ['The chunk can not be empty.']})
+        if length > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+            return Response({'detail': f'Chunks can not be larger than '
+                                       f'{settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE} '
+                                       f'bytes.'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        upload = self.get_object()
+        storage_manager = connect_storage(settings)
+        if offset + length > upload.size:
+            raise serializers.ValidationError(
+                {'non_field_errors': [f'The chunk exceeds the upload size '
+                                      f'{upload.size}.']})
+        min_chunk_size = storage_manager.min_upload_chunk_size
+        if offset + length < upload.size and length < min_chunk_size:
+            raise serializers.ValidationError(
+                {'non_field_errors': [f'All the chunks but the last one must be at '
+                                      f'least {min_chunk_size} bytes.']})
+
+        # claim the chunk at the current offset with a single conditional update, the
+        # data is sent to storage without holding a DB transaction or row lock
+        started_at = timezone.now()
+        timeout = timedelta(seconds=settings.CHUNKED_UPLOAD_CHUNK_TIMEOUT)
+        claimed = UserFileUpload.objects.filter(pk=upload.pk, offset=offset).filter(
+            Q(chunk_started_at__isnull=True) |
+            Q(chunk_started_at__lt=started_at - timeout)).update(
+            chunk_started_at=started_at)
+        upload.refresh_from_db()
+        if not claimed:
+            if offset != upload.offset:
+                detail = f'The chunk must start at the current offset {upload.offset}.'
+            else:
+                detail = 'Another chunk of this upload is being uploaded.'
+            return Response({'detail': detail}, status=status.HTTP_409_CONFLICT,
+                            headers={'Upload-Offset': str(upload.offset)})
+        try:
+            # the chunk is read straight from the request stream, Django doesn't
+            # buffer it in a temporary file as it does with multipart uploads
+            data = request.stream.read(length)
+            if len(data) != length:
+                raise serializers.ValidationError(
+                    {'non_field_errors': ['Incomplete chunk.']})
+
+            part_number = len(upload.parts) + 1
+            tag = storage_manager.upload_chunk(upload.upload_path,
+                                               upload.storage_upload_id, part_number,
+                                               offset, data)
+        except Exception:
+            UserFileUpload.objects.filter(pk=upload.pk,
+                                          chunk_started_at=started_at).update(
+                chunk_started_at=None)
+            raise
+
+        # the new offset is only stored if the claim wasn't taken over meanwhile
+        new_offset = offset + length
+        updated = UserFileUpload.objects.filter(
+            pk=upload.pk, offset=offset, chunk_started_at=started_at).update(
+            offset=new_offset, parts=upload.parts + [tag], chunk_started_at=None,
+            modification_date=timezone.now())
+        if not updated:
+            return Response({'detail': 'The upload was modified while the chunk was '
+                                       'being uploaded.'},
+                            status=status.HTTP_409_CONFLICT)
+        return Response(status=status.HTTP_204_NO_CONTENT,
+                        headers={'Upload-Offset': str(new_offset)})
+
+
+class UserFileUploadFinalize(generics.GenericAPIView):
+    """
+    A view to finalize a resumable upload once all its chunks have been uploaded.
+    """
+    http_method_names = ['post']
+    queryset = UserFileUpload.objects.all()
+    serializer_class = UserFileSerializer
+    permission_classes = (IsOwnerOrChris,)
+
+    @extend_schema(request=None, responses={201: UserFileSerializer})
+    def post(self, request, *args, **kwargs):
+        """
+        Assemble the uploaded chunks into the file in storage and register the new
+        user file in the DB. The upload is deleted.
+        """
+        upload = self.get_object()
+        storage_manager = connect_storage(settings)
+        with transaction.atomic():
+            upload = UserFileUpload.objects.select_for_update().get(pk=upload.pk)
+            if upload.offset != upload.size:
+                return Response({'detail': f'Only {upload.offset} of the {upload.size} '
+                                           f'bytes have been uploaded.'},
+                                status=status.HTTP_409_CONFLICT,
+                                headers={'Upload-Offset': str(upload.offset)})
+            # the folders may have changed while the chunks were being uploaded
+            upload_path = validate_upload_path(upload.upload_path, upload.owner)
+            if ChrisFile.objects.filter(fname=upload_path).exists():
+                raise serializers.ValidationError(
+                    {'upload_path': [f"A file with path '{upload_path}' already "
+                                     f"exists."]})
+
+            storage_manager.complete_chunked_upload(upload_path,
+                                                    upload.storage_upload_id,
+                                                    upload.parts)
+            serializer = self.get_serializer()
+            try:
+                user_file = serializer.create({'owner': upload.owner,
+                                               'upload_path': upload_path,
+                                               'size': upload.size})
+            except Exception:
+                # don't leave the assembled file in storage without a DB entry
+                if storage_manager.obj_exists(upload_path):
+                    storage_manager.delete_obj(upload_path)
+                raise
+            upload.storage_upload_id = ''  # the chunks are now the file's data
+            upload.delete()
+        serializer = self.get_serializer(user_file)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
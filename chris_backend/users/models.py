@@ -84,9 +84,11 @@ class UserProxy(User):
             welcome_file_path = f'{uploads_path}/welcome.txt'
             try:
                 with io.StringIO('Welcome to ChRIS!') as f:
-                    storage_manager.upload_obj(welcome_file_path, f.read(),
+                    contents = f.read()
+                    storage_manager.upload_obj(welcome_file_path, contents,
                                                content_type='text/plain')
-                welcome_file = UserFile(parent_folder=uploads_folder, owner=user)
+                welcome_file = UserFile(parent_folder=uploads_folder, owner=user,
+                                        size=len(contents.encode()))
                 welcome_file.fname.name = welcome_file_path
                 welcome_file.save()
             except Exception as e:
@@ -0,0 +1,91 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from pipelines.models import Pipeline, PluginPiping
+from plugins.models import ComputeResource, PluginMeta, Plugin
+from plugininstances.models import PluginInstance
+from workflows.models import Workflow
+from workflows.views import WorkflowList
+from workflows.services import create_workflow_plugin_instances
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the creation of the plugin instances of workflows for synthetic '
+            'pipelines of the given sizes. All the synthetic data is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500],
+                            help='number of pipings of the synthetic pipelines')
+        parser.add_argument('--branching', type=int, default=2,
+                            help='number of children of each piping (1 for a chain)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user, previous = self.create_fixtures()
+
+            for size in options['sizes']:
+                pipeline = self.create_pipeline(f'benchmark_{size}', size,
+                                                options['branching'], user)
+                nodes_info = [{'piping_id': pip.id, 'compute_resource_name': None,
+                               'title': pip.title, 'plugin_parameter_defaults': []}
+                              for pip in pipeline.plugin_pipings.all()]
+                workflow = Workflow.objects.create(title=pipeline.name,
+                                                   pipeline=pipeline, owner=user)
+
+                start = time.perf_counter()
+                tree, root_id, inst_data = WorkflowList._build_inst_templates(
+                    pipeline, nodes_info)
+                templates_time = time.perf_counter() - start
+
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    create_workflow_plugin_instances(workflow, user, tree, root_id,
+                                                     inst_data, previous)
+                    create_time = time.perf_counter() - start
+
+                self.stdout.write(f'{size} pipings: templates {templates_time:.3f}s, '
+                                  f'plugin instances {create_time:.3f}s '
+                                  f'({len(ctx.captured_queries)} queries)')
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def create_fixtures():
+        """
+        Create the user, plugins and previous plugin instance used by the benchmark.
+        """
+        user = User.objects.create_user(username='benchmark_workflow_user')
+        compute_resource = ComputeResource.objects.create(
+            name='benchmark_workflow_host', compute_url='http://localhost:30005/api/v1/')
+
+        plugins = {}
+        for plugin_type in ('fs', 'ds'):
+            meta = PluginMeta.objects.create(name=f'benchmark_{plugin_type}app',
+                                             type=plugin_type)
+            plugin = Plugin.objects.create(meta=meta, version='0.1')
+            plugin.compute_resources.set([compute_resource])
+            plugins[plugin_type] = plugin
+
+        previous = PluginInstance.objects.create(plugin=plugins['fs'], owner=user,
+                                                 compute_resource=compute_resource,
+                                                 status='finishedSuccessfully')
+        return user, previous
+
+    @staticmethod
+    def create_pipeline(name, size, branching, user):
+        """
+        Create a pipeline with ``size`` pipings of the benchmark 'ds' plugin where each
+        piping has ``branching`` children.
+        """
+        plugin = Plugin.objects.get(meta__name='benchmark_dsapp')
+        pipeline = Pipeline.objects.create(name=name, owner=user)
+        pipings = []
+        for i in range(size):
+            previous = pipings[(i - 1) // branching] if i else None
+            pipings.append(PluginPiping.objects.create(title=f'pip_{i}', plugin=plugin,
+                                                       pipeline=pipeline,
+                                                       previous=previous))
+        return pipeline
@@ -4,28 +4,13 @@ from django.db.models import Count, Case, When, IntegerField
 import django_filters
 from django_filters.rest_framework import FilterSet
 
+from feeds.models import JobsStatusCount, get_jobs_status_count_annotations
 from pipelines.models import Pipeline
-from plugininstances.enums import STATUS_CHOICES
-
-
-# Mapping of (annotation field name) -> (plugin-instance status string).
-# Source of truth for valid status strings is plugininstances.enums.STATUS_CHOICES;
-# the field-name side of the pair is workflow-specific (e.g. 'registeringFiles' is
-# surfaced as 'registering_jobs', 'finishedSuccessfully' as 'finished_jobs').
-JOBS_STATUS_FIELDS = (
-    ('created_jobs',     'created'),
-    ('waiting_jobs',     'waiting'),
-    ('copying_jobs',     'copying'),
-    ('scheduled_jobs',   'scheduled'),
-    ('started_jobs',     'started'),
-    ('uploading_jobs',   'uploading'),
-    ('registering_jobs', 'registeringFiles'),
-    ('finished_jobs',    'finishedSuccessfully'),
-    ('errored_jobs',     'finishedWithError'),
-    ('cancelled_jobs',   'cancelled'),
-)
+from plugininstances.enums import STATUS_CHOICES, JOBS_STATUS_FIELDS
+
+
 assert {s for _, s in JOBS_STATUS_FIELDS} <= {c[0] for c in STATUS_CHOICES}, (
-    'workflows.JOBS_STATUS_FIELDS references a status missing from '
+    'plugininstances.enums.JOBS_STATUS_FIELDS references a status missing from '
     'plugininstances.enums.STATUS_CHOICES'
 )
 
@@ -66,7 +51,7 @@ class Workflow(models.Model):
         execution status to each element of a Workflow queryset.
         """
         return workflow_qs.annotate(
-            **_status_count_kwargs('plugin_instances__status')
+            **get_jobs_status_count_annotations('jobs_status_count')
         ).order_by('-creation_date')
 
     def get_jobs_status_count(self):
@@ -77,6 +62,15 @@ class Workflow(models.Model):
         return self.plugin_instances.aggregate(**_status_count_kwargs('status'))
 
 
+class WorkflowJobsStatusCount(JobsStatusCount):
+    """
+    Number of plugin instances of a workflow per execution status. The counts are
+    maintained by DB triggers on the plugin instances table.
+    """
+    workflow = models.OneToOneField(Workflow, on_delete=models.CASCADE,
+                                    primary_key=True, related_name='jobs_status_count')
+
+
 class WorkflowFilter(FilterSet):
     title = django_filters.CharFilter(field_name='title', lookup_expr='icontains')
     pipeline_name = django_filters.CharFilter(field_name='pipeline__name',
@@ -0,0 +1,152 @@
+"""
+Bulk instantiation of the tree of plugin instances of a workflow.
+"""
+
+from collections import defaultdict, deque
+from typing import Dict, List
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from core.models import ChrisFolder
+from core.utils import reserve_primary_keys
+from plugins.models import Plugin
+from plugininstances.models import (PluginInstance, PluginInstanceDependency,
+                                    PARAMETER_MODELS)
+from ._types import WorkflowPluginInstanceTemplate, PipingId
+from .models import Workflow
+
+
+def get_breadth_first_piping_ids(tree, root_id: PipingId) -> List[PipingId]:
+    """
+    Return the ids of the pipings in ``tree`` in breadth-first order so that every
+    piping comes after its parent.
+    """
+    pip_ids = []
+    queue = deque([root_id])
+    while queue:
+        curr_id = queue.popleft()
+        pip_ids.append(curr_id)
+        queue.extend(tree[curr_id]['child_ids'])
+    return pip_ids
+
+
+def translate_ts_parent_ids(value: str,
+                            plg_inst_ids: Dict[PipingId, int]) -> str:
+    """
+    Translate the comma-separated ``plugininstances`` parameter value of a ``ts``
+    plugin instance from piping ids (as stored on the pipeline) to the ids of the
+    plugin instances created for this workflow.
+    """
+    if not value:
+        return value
+    return ','.join(str(plg_inst_ids[int(pip_id)]) for pip_id in value.split(','))
+
+
+@transaction.atomic
+def create_workflow_plugin_instances(
+        workflow: Workflow, owner: User, tree, root_id: PipingId,
+        inst_data: Dict[PipingId, WorkflowPluginInstanceTemplate],
+        previous: PluginInstance | None) -> Dict[PipingId, PluginInstance]:
+    """
+    Create the plugin instances of a workflow for every piping in ``tree`` along with
+    their output folders, parameters and dependency edges.
+
+    The root plugin instance is saved as usual and left in 'created' status. All its
+    descendants are bulk created in 'waiting' status, waiting for their parents, with
+    a number of queries that doesn't depend on the size of the tree. Their primary
+    keys are reserved in advance so that the instances, their output folders and
+    their parameters can reference each other in a single INSERT query per model.
+    Returns a piping-id -> plugin-instance map.
+    """
+    pip_ids = get_breadth_first_piping_ids(tree, root_id)
+    plugins = Plugin.objects.select_related('meta').in_bulk(
+        {inst_data[pip_id].piping.plugin_id for pip_id in pip_ids})
+
+    root_inst = _new_plugin_instance(inst_data[root_id], plugins, owner, workflow,
+                                     previous)
+    root_inst.save()  # creates the feed for 'fs' plugins and the output folder
+
+    plugin_instances = {root_id: root_inst}
+    job_folders = {root_id: root_inst.output_folder.parent}
+    parent_pip_ids = {child_id: pip_id for pip_id in pip_ids
+                      for child_id in tree[pip_id]['child_ids']}
+
+    child_pip_ids = pip_ids[1:]
+    inst_ids = reserve_primary_keys(PluginInstance, len(child_pip_ids))
+    folder_ids = iter(reserve_primary_keys(ChrisFolder, 2 * len(child_pip_ids)))
+    folders = []
+
+    for (pip_id, inst_id) in zip(child_pip_ids, inst_ids):
+        parent_pip_id = parent_pip_ids[pip_id]
+        plg_inst = _new_plugin_instance(inst_data[pip_id], plugins, owner, workflow,
+                                        plugin_instances[parent_pip_id])
+        plg_inst.id = inst_id
+        plg_inst.feed = root_inst.feed
+        plg_inst.status = 'waiting'
+        plg_inst._set_compute_defaults()
+
+        # same output folder layout as PluginInstance._save_output_folder
+        parent_job_folder = job_folders[parent_pip_id]
+        job_folder = ChrisFolder(
+            id=next(folder_ids), parent=parent_job_folder, owner=owner,
+            path=f'{parent_job_folder.path}/{plg_inst.plugin.meta.name}_{inst_id}')
+        output_folder = ChrisFolder(id=next(folder_ids), parent=job_folder,
+                                    owner=owner, path=f'{job_folder.path}/data')
+        folders.extend([job_folder, output_folder])
+        plg_inst.output_folder = output_folder
+
+        plugin_instances[pip_id] = plg_inst
+        job_folders[pip_id] = job_folder
+
+    plg_inst_ids = {pip_id: plg_inst.id for (pip_id, plg_inst) in plugin_instances.items()}
+    params = defaultdict(list)
+    edges = []
+
+    for pip_id in pip_ids:
+        plg_inst = plugin_instances[pip_id]
+        parent_ids = set()
+
+        for (plugin_param, value) in inst_data[pip_id].params:
+            if (plg_inst.plugin.meta.type == 'ts' and
+                    plugin_param.name == 'plugininstances'):
+                value = translate_ts_parent_ids(value, plg_inst_ids)
+                if value:
+                    parent_ids.update(int(parent_id) for parent_id in value.split(','))
+
+            param_model = PARAMETER_MODELS[plugin_param.type]
+            params[param_model].append(param_model(plugin_inst=plg_inst,
+                                                   plugin_param=plugin_param,
+                                                   value=value))
+        if pip_id != root_id:
+            parent_ids.add(plg_inst.previous.id)
+            edges.extend(PluginInstanceDependency(parent_id=parent_id, child=plg_inst)
+                         for parent_id in sorted(parent_ids))
+
+    ChrisFolder.objects.bulk_create(folders)
+    PluginInstance.objects.bulk_create([plugin_instances[pip_id]
+                                        for pip_id in child_pip_ids])
+    for (param_model, objs) in params.items():
+        param_model.objects.bulk_create(objs)
+    PluginInstanceDependency.objects.bulk_create(edges)
+    return plugin_instances
+
+
+def _new_plugin_instance(data: WorkflowPluginInstanceTemplate, plugins, owner: User,
+                         workflow: Workflow,
+                         previous: PluginInstance | None) -> PluginInstance:
+    """
+    Return an unsaved plugin instance created from a workflow piping template.
+    """
+    return PluginInstance(
+        plugin=plugins[data.piping.plugin_id],
+        owner=owner,
+        previous=previous,
+        title=data.title,
+        compute_resource=data.compute_resource,
+        workflow=workflow,
+        cpu_limit=data.cpu_limit,
+        memory_limit=data.memory_limit,
+        number_of_workers=data.number_of_workers,
+        gpu_limit=data.gpu_limit,
+    )
@@ -0,0 +1,25 @@
+import io
+import logging
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from plugininstances.models import PluginInstance
+
+
+class BenchmarkWorkflowCreationCommandTests(TestCase):
+
+    def setUp(self):
+        logging.disable(logging.WARNING)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_benchmark_reports_every_size_and_rolls_back(self):
+        before = PluginInstance.objects.count()
+        out = io.StringIO()
+        call_command('benchmark_workflow_creation', sizes=[3, 7], stdout=out)
+        output = out.getvalue()
+        self.assertIn('3 pipings', output)
+        self.assertIn('7 pipings', output)
+        self.assertEqual(PluginInstance.objects.count(), before)
@@ -1,6 +1,7 @@
 
 import json
 import logging
+import os
 from unittest import mock
 
 from django.conf import settings
@@ -443,14 +444,25 @@ class WorkflowListPerformCreateHelperTests(ViewTests):
         self.assertEqual(set(result.keys()), {pip.id for pip in self.pips})
         # The root's previous is the supplied previous instance.
         self.assertEqual(result[root_id].previous, self.previous_plugin_inst)
+        self.assertEqual(result[root_id].status, 'created')
         # Every non-root child's previous is its parent piping's plugin instance.
         for parent_id, node in tree.items():
             for child_id in node['child_ids']:
-                self.assertEqual(result[child_id].previous, result[parent_id])
-
-    # ---- _rewrite_ts_parent_ids --------------------------------------------------
-
-    def test__rewrite_ts_parent_ids_translates_piping_ids(self):
+                child_inst = PluginInstance.objects.get(pk=result[child_id].id)
+                self.assertEqual(child_inst.previous, result[parent_id])
+                self.assertEqual(child_inst.feed, self.previous_plugin_inst.feed)
+                self.assertEqual(child_inst.status, 'waiting')
+                self.assertIn(result[parent_id].id, child_inst.dependency_edges.values_list(
+                    'parent_id', flat=True))
+                # output folder layout is the same as for individually saved instances
+                parent_path = os.path.dirname(result[parent_id].output_folder.path)
+                self.assertEqual(
+                    child_inst.output_folder.path,
+                    f'{parent_path}/{child_inst.plugin.meta.name}_{child_inst.id}/data')
+                self.assertEqual(child_inst.output_folder.parent.parent.path,
+                                 parent_path)
+
+    def test__create_plugin_instance_tree_translates_ts_parent_ids(self):
         nodes = self._make_canonical_nodes()
         tree, root_id, inst_data = WorkflowList._build_inst_templates(
             self.pipeline, nodes)
@@ -459,34 +471,20 @@ class WorkflowListPerformCreateHelperTests(ViewTests):
 
         ts_pip = self.pips[2]  # the 'ts' piping built in ViewTests.setUp
         ts_inst = plugin_instances_dict[ts_pip.id]
-        # Before: param value is the comma-separated piping ids set in setUp.
-        param_before = ts_inst.string_param.filter(
-            plugin_param__name='plugininstances').first()
-        self.assertEqual(param_before.value,
-                         f"{self.pips[0].id},{self.pips[1].id}")
-
-        WorkflowList._rewrite_ts_parent_ids(ts_inst, plugin_instances_dict)
-
-        param_after = ts_inst.string_param.filter(
+        param = ts_inst.string_param.filter(
             plugin_param__name='plugininstances').first()
         expected_ids = (f"{plugin_instances_dict[self.pips[0].id].id},"
                         f"{plugin_instances_dict[self.pips[1].id].id}")
-        self.assertEqual(param_after.value, expected_ids)
-
-    def test__rewrite_ts_parent_ids_no_op_when_param_missing(self):
-        """If no 'plugininstances' string param exists, the helper is a no-op."""
-        plugin_ds = Plugin.objects.get(meta__name=self.plugin_ds_name)
-        ds_inst = PluginInstance.objects.create(
-            plugin=plugin_ds, owner=self.view.request.user,
-            compute_resource=plugin_ds.compute_resources.all()[0],
-            previous=self.previous_plugin_inst,
-            workflow=self.workflow)
-        # Should not raise even though plugin_instances_dict is empty.
-        WorkflowList._rewrite_ts_parent_ids(ds_inst, {})
+        self.assertEqual(param.value, expected_ids)
+        # the ts instance waits for all of its parents
+        self.assertEqual(
+            set(ts_inst.dependency_edges.values_list('parent_id', flat=True)),
+            {plugin_instances_dict[self.pips[0].id].id,
+             plugin_instances_dict[self.pips[1].id].id})
 
     # ---- _dispatch_runs ----------------------------------------------------------
 
-    def test__dispatch_runs_calls_run_if_ready_for_every_instance(self):
+    def test__dispatch_runs_calls_run_if_ready_for_root_instance(self):
         nodes = self._make_canonical_nodes()
         tree, root_id, inst_data = WorkflowList._build_inst_templates(
             self.pipeline, nodes)
@@ -495,4 +493,5 @@ class WorkflowListPerformCreateHelperTests(ViewTests):
 
         with mock.patch('workflows.views.run_if_ready') as run_mock:
             self.view._dispatch_runs(plugin_instances_dict)
-        self.assertEqual(run_mock.call_count, len(plugin_instances_dict))
+        root_inst = plugin_instances_dict[root_id]
+        run_mock.assert_called_once_with(root_inst, self.previous_plugin_inst)
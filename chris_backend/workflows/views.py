@@ -1,14 +1,14 @@
 
 from typing import List, Dict
-from collections import deque
 
+from django.db import transaction
 from rest_framework import generics, permissions
 from rest_framework.reverse import reverse
 from drf_spectacular.utils import extend_schema, extend_schema_view
 
 from collectionjson import services
 from pipelines.models import Pipeline
-from plugininstances.models import PluginInstance, PARAMETER_MODELS
+from plugininstances.models import PluginInstance
 from plugininstances.serializers import PluginInstanceSerializer
 from plugininstances.utils import run_if_ready
 from plugininstances.tasks import cancel_plugin_instance_job
@@ -17,6 +17,7 @@ from ._types import (GivenNodeInfo, WorkflowPluginInstanceTemplateFactory,
 from .models import Workflow, WorkflowFilter
 from .permissions import IsOwnerOrChrisOrReadOnly
 from .serializers import WorkflowSerializer
+from .services import create_workflow_plugin_instances
 
 @extend_schema_view(
     get=extend_schema(operation_id="workflows_list")
@@ -42,13 +43,14 @@ class WorkflowList(generics.ListCreateAPIView):
         
         title = self._resolve_workflow_title(serializer, pipeline)
 
-        workflow = serializer.save(owner=self.request.user, pipeline=pipeline,
-                                   title=title)
+        with transaction.atomic():
+            workflow = serializer.save(owner=self.request.user, pipeline=pipeline,
+                                       title=title)
 
-        tree, root_id, inst_data = self._build_inst_templates(pipeline, nodes_info)
+            tree, root_id, inst_data = self._build_inst_templates(pipeline, nodes_info)
 
-        plugin_instances_dict = self._create_plugin_instance_tree(
-            tree, root_id, inst_data, previous_plugin_inst, workflow)
+            plugin_instances_dict = self._create_plugin_instance_tree(
+                tree, root_id, inst_data, previous_plugin_inst, workflow)
         
         self._dispatch_runs(plugin_instances_dict)
 
@@ -80,62 +82,24 @@ class WorkflowList(generics.ListCreateAPIView):
     def _create_plugin_instance_tree(self, tree, root_id, inst_data, previous,
                                      workflow) -> Dict[PipingId, PluginInstance]:
         """
-        Create plugin instances for every node in ``tree`` via breadth-first
-        traversal so each child's ``previous`` is its parent's freshly-created
-        plugin instance. Returns a piping-id -> plugin-instance map.
+        Bulk create plugin instances for every node in ``tree`` so each child's
+        ``previous`` is its parent's freshly-created plugin instance. All the
+        descendants of the root instance are created in 'waiting' status. Returns a
+        piping-id -> plugin-instance map.
         """
-        root_inst = self.create_plugin_inst(inst_data[root_id], previous, workflow)
-        plugin_instances_dict: Dict[PipingId, PluginInstance] = {root_id: root_inst}
-
-        pip_id_queue = deque([root_id])
-        plugin_inst_queue = deque([root_inst])
-
-        while pip_id_queue:
-            curr_id = pip_id_queue.popleft()
-            curr_plugin_inst = plugin_inst_queue.popleft()
-
-            for child_id in tree[curr_id]['child_ids']:
-                child_inst = self.create_plugin_inst(
-                    inst_data[child_id], curr_plugin_inst, workflow)
-                
-                plugin_instances_dict[child_id] = child_inst
-
-                pip_id_queue.append(child_id)
-                plugin_inst_queue.append(child_inst)
-        return plugin_instances_dict
-
-    def _dispatch_runs(self,
-                       plugin_instances_dict: Dict[PipingId, PluginInstance]) -> None:
-        """
-        For each created plugin instance: rewrite the ``plugininstances`` param of
-        any ``ts`` plugin instance from piping-id refs to plugin-instance-id refs,
-        then submit the instance via :func:`run_if_ready`.
-        """
-        for plg_inst in plugin_instances_dict.values():
-            if plg_inst.plugin.meta.type == 'ts':
-                self._rewrite_ts_parent_ids(plg_inst, plugin_instances_dict)
-            run_if_ready(plg_inst, plg_inst.previous)
+        return create_workflow_plugin_instances(workflow, self.request.user, tree,
+                                                root_id, inst_data, previous)
 
     @staticmethod
-    def _rewrite_ts_parent_ids(
-            plg_inst: PluginInstance,
-            plugin_instances_dict: Dict[PipingId, PluginInstance]) -> None:
+    def _dispatch_runs(plugin_instances_dict: Dict[PipingId, PluginInstance]) -> None:
         """
-        Translate the comma-separated ``plugininstances`` string param of a ``ts``
-        plugin instance from piping ids (as stored on the pipeline) to the actual
-        plugin-instance ids created for this workflow.
+        Submit the root plugin instance of the workflow via :func:`run_if_ready`. The
+        rest of the instances are waiting for their parents and are released as soon
+        as the parents finish.
         """
-        param = plg_inst.string_param.filter(plugin_param__name='plugininstances').first()
-        if not (param and param.value):
-            return
-        
-        parent_pip_ids = [int(pip_id) for pip_id in param.value.split(',')]
-
-        parent_plg_inst_ids = [str(plugin_instances_dict[pip_id].id)
-                               for pip_id in parent_pip_ids]
-        
-        param.value = ','.join(parent_plg_inst_ids)
-        param.save()
+        for plg_inst in plugin_instances_dict.values():
+            if plg_inst.status == 'created':
+                run_if_ready(plg_inst, plg_inst.previous)
 
     def list(self, request, *args, **kwargs):
         """
@@ -163,31 +127,6 @@ class WorkflowList(generics.ListCreateAPIView):
         pipeline = self.get_object()
         return Workflow.add_jobs_status_count(pipeline.workflows.all())
 
-    def create_plugin_inst(self, data: WorkflowPluginInstanceTemplate, previous:
-    PluginInstance, workflow: Workflow) -> PluginInstance:
-        """
-        Custom method to create a plugin instance and set its parameters.
-        """
-        plg_inst = PluginInstance.objects.create(
-            plugin=data.piping.plugin,
-            owner=self.request.user,
-            previous=previous,
-            title=data.title,
-            compute_resource=data.compute_resource,
-            workflow=workflow,
-            cpu_limit=data.cpu_limit,
-            memory_limit=data.memory_limit,
-            number_of_workers=data.number_of_workers,
-            gpu_limit=data.gpu_limit,
-        )
-        for plugin_param, value in data.params:
-            PARAMETER_MODELS[plugin_param.type].objects.create(
-                plugin_inst=plg_inst,
-                plugin_param=plugin_param,
-                value=value
-            )
-        return plg_inst
-
 
 @extend_schema_view(
     get=extend_schema(operation_id="all_workflows_list")